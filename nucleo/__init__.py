@@ -0,0 +1,78 @@
+"""
+Núcleo de cálculo del tablero - Ferreinox S.A.S. BIC
+Sin dependencia de Streamlit: ingesta, KPIs, presupuestos, albaranes, CL4,
+marquillas y ciclo de vida. Las páginas sólo cachean y renderizan sus resultados;
+'python -m nucleo' los ejecuta sobre una carpeta local (ver nucleo/cli.py) y
+'python -m nucleo.paquetes' pre-genera los paquetes de cierre de cada vendedor.
+Ingesta y KPIs del periodo pueden ir por Polars (APP_CONFIG['motor_calculo']);
+'python -m nucleo.motor_polars' compara ese camino con pandas.
+"""
+
+from .config import APP_CONFIG, DATA_CONFIG, normalizar_texto
+from .ingesta import ErrorIngesta, limpiar_csv, limpiar_reporte_cl4, leer_ventas, leer_cobros, leer_reporte_cl4
+from .presupuesto import calcular_presupuesto_dinamico_global, calcular_mejor_venta_semestre
+from .albaranes import (
+    grupos_cancelados,
+    albaranes_pendientes,
+    albaranes_pendientes_periodo,
+    calcular_albaranes_anuales,
+    resumen_albaranes_anuales
+)
+from .kpis import procesar_datos_periodo, resumenes_periodo, expandir_grupos, grupo_de
+from .cl4 import (
+    meses_del_trimestre,
+    actualizar_oportunidades_con_ventas_del_trimestre,
+    cl4_con_vendedor,
+    meta_clientes_cl4,
+    clientes_en_meta,
+    oportunidades,
+    tabla_descarga_oportunidades
+)
+from .marquillas import MARQUILLAS_CLAVE, filtrar_ventas_marquillas, calcular_matriz_compra, calcular_potencial_venta
+from .ciclo_vida import resumen_ciclo_vida
+
+
+def __getattr__(nombre):
+    # motor_polars se importa al pedirlo: importarlo aquí haría que 'python -m nucleo.motor_polars' lo
+    # encontrara ya cargado (RuntimeWarning de runpy) y cargaría polars aunque el motor sea pandas
+    if nombre in ('POLARS_DISPONIBLE', 'usar_polars'):
+        from . import motor_polars
+        return getattr(motor_polars, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+__all__ = [
+    'APP_CONFIG',
+    'DATA_CONFIG',
+    'normalizar_texto',
+    'ErrorIngesta',
+    'limpiar_csv',
+    'limpiar_reporte_cl4',
+    'leer_ventas',
+    'leer_cobros',
+    'leer_reporte_cl4',
+    'calcular_presupuesto_dinamico_global',
+    'calcular_mejor_venta_semestre',
+    'grupos_cancelados',
+    'albaranes_pendientes',
+    'albaranes_pendientes_periodo',
+    'calcular_albaranes_anuales',
+    'resumen_albaranes_anuales',
+    'procesar_datos_periodo',
+    'resumenes_periodo',
+    'POLARS_DISPONIBLE',
+    'usar_polars',
+    'expandir_grupos',
+    'grupo_de',
+    'meses_del_trimestre',
+    'actualizar_oportunidades_con_ventas_del_trimestre',
+    'cl4_con_vendedor',
+    'meta_clientes_cl4',
+    'clientes_en_meta',
+    'oportunidades',
+    'tabla_descarga_oportunidades',
+    'MARQUILLAS_CLAVE',
+    'filtrar_ventas_marquillas',
+    'calcular_matriz_compra',
+    'calcular_potencial_venta',
+    'resumen_ciclo_vida',
+]
@@ -0,0 +1,59 @@
+"""Albaranes pendientes de facturar: neteo histórico de albaranes y sus reversiones"""
+import pandas as pd
+
+import utils_documentos
+import utils_rendimiento
+from utils_documentos import ALBARAN
+from utils_rendimiento import AGREGACION
+
+CLAVES_NETEO = ['Serie', 'cliente_id', 'codigo_articulo', 'codigo_vendedor']
+COLUMNAS_DESCARGA_ANUAL = ['Fecha', 'Nombre Cliente', 'Numero Albaran/Serie', 'Nombre Vendedor', 'Valor Total Albaran']
+
+
+def grupos_cancelados(df_ventas_historicas: pd.DataFrame) -> pd.DataFrame:
+    """Grupos (serie, cliente, artículo, vendedor) cuyo albarán quedó en cero con su reversión en todo el histórico."""
+    df_albaranes_historicos_bruto = df_ventas_historicas[utils_documentos.mascara_clase(df_ventas_historicas, ALBARAN)]
+    if df_albaranes_historicos_bruto.empty:
+        return pd.DataFrame(columns=CLAVES_NETEO)
+    df_neto_historico = df_albaranes_historicos_bruto.groupby(CLAVES_NETEO).agg(valor_neto=('valor_venta', 'sum')).reset_index()
+    return df_neto_historico[df_neto_historico['valor_neto'] == 0]
+
+
+def albaranes_pendientes(df_ventas: pd.DataFrame, df_grupos_cancelados: pd.DataFrame) -> pd.DataFrame:
+    """Albaranes de 'df_ventas' que no pertenecen a un grupo cancelado (incluye las líneas de reversión)."""
+    df_albaranes_bruto = df_ventas[utils_documentos.mascara_clase(df_ventas, ALBARAN)].copy()
+    if df_albaranes_bruto.empty or df_grupos_cancelados.empty:
+        return df_albaranes_bruto
+    return df_albaranes_bruto.merge(
+        df_grupos_cancelados[CLAVES_NETEO], on=CLAVES_NETEO, how='left', indicator=True
+    ).query('_merge == "left_only"').drop(columns=['_merge'])
+
+
+def albaranes_pendientes_periodo(df_ventas_periodo: pd.DataFrame, df_ventas_historicas: pd.DataFrame) -> tuple:
+    """(detalle de albaranes pendientes del periodo, resumen 'albaranes_pendientes' por vendedor)."""
+    with utils_rendimiento.medir(AGREGACION, "neteo de albaranes"):
+        df_albaranes_reales_pendientes = albaranes_pendientes(df_ventas_periodo, grupos_cancelados(df_ventas_historicas))
+        resumen_albaranes = resumen_albaranes_periodo(df_albaranes_reales_pendientes)
+    return df_albaranes_reales_pendientes, resumen_albaranes
+
+
+def resumen_albaranes_periodo(df_albaranes_reales_pendientes: pd.DataFrame) -> pd.DataFrame:
+    """'albaranes_pendientes' (valor positivo) por vendedor a partir del detalle pendiente."""
+    if df_albaranes_reales_pendientes.empty:
+        return pd.DataFrame(columns=['codigo_vendedor', 'nomvendedor', 'albaranes_pendientes'])
+    return df_albaranes_reales_pendientes[df_albaranes_reales_pendientes['valor_venta'] > 0].groupby(['codigo_vendedor', 'nomvendedor']).agg(albaranes_pendientes=('valor_venta', 'sum')).reset_index()
+
+
+def calcular_albaranes_anuales(df_ventas_historicas: pd.DataFrame, anio_sel: int) -> pd.DataFrame:
+    """Líneas de albarán con valor positivo aún pendientes de todo el año."""
+    df_ventas_anual = df_ventas_historicas[df_ventas_historicas['anio'] == anio_sel]
+    df_albaranes_pendientes_del_anio = albaranes_pendientes(df_ventas_anual, grupos_cancelados(df_ventas_historicas))
+    return df_albaranes_pendientes_del_anio[df_albaranes_pendientes_del_anio['valor_venta'] > 0]
+
+
+def resumen_albaranes_anuales(df_albaranes_pendientes_del_anio: pd.DataFrame) -> pd.DataFrame:
+    """Valor total por albarán (fecha, cliente, serie, vendedor), con los encabezados de la descarga."""
+    claves_agrupacion = ['fecha_venta', 'nombre_cliente', 'Serie', 'nomvendedor']
+    df_para_descargar_anual = df_albaranes_pendientes_del_anio.groupby(claves_agrupacion).agg(valor_venta=('valor_venta', 'sum')).reset_index()
+    df_para_descargar_anual.columns = COLUMNAS_DESCARGA_ANUAL
+    return df_para_descargar_anual.sort_values(by=['Fecha', 'Nombre Cliente'], ascending=[False, True])
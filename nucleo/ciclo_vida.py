@@ -0,0 +1,40 @@
+"""Ciclo de vida de clientes por vendedor con las métricas de BI de la reunión de ventas"""
+import numpy as np
+import pandas as pd
+
+import utils_ciclo_vida
+import utils_documentos
+
+
+def resumen_ciclo_vida(df_ventas: pd.DataFrame, anio_actual: int, anio_base: int) -> pd.DataFrame:
+    """
+    Resumen por vendedor calculado desde el histórico de ventas netas: ciclo de vida
+    (utils_ciclo_vida), variaciones, ganancia/pérdida bruta, Pareto y tickets promedio.
+    """
+    df_neto = df_ventas[utils_documentos.mascara_venta_neta(df_ventas)]
+    df = utils_ciclo_vida.calcular_ciclo_vida(df_neto, anio_actual, anio_base)
+
+    # Filtrado Básico
+    df = df.dropna(subset=['Vendedor'])
+    df = df[~df['Vendedor'].astype(str).str.upper().isin(['TOTAL', 'NAN', 'NONE', ''])]
+
+    # --- CÁLCULOS DE BI BÁSICOS ---
+    df['Variacion_Neta'] = df['Venta_Actual'] - df['Venta_Anterior']
+    df['Variacion_Pct'] = (df['Variacion_Neta'] / df['Venta_Anterior']).replace([float('inf'), -float('inf')], 0).fillna(0) * 100
+
+    df['Ganancia_Bruta'] = df['Valor_Nuevos'] + df['Valor_Reactivados'] + df['Valor_Crecimiento']
+    df['Perdida_Bruta'] = df['Valor_Perdidos'] + df['Valor_Decrecimiento']
+
+    # Pareto
+    df = df.sort_values('Venta_Actual', ascending=False)
+    df['Acumulado_Venta'] = df['Venta_Actual'].cumsum()
+    df['Pct_Acumulado'] = (df['Acumulado_Venta'] / df['Venta_Actual'].sum()) * 100
+    df['Categoria_Pareto'] = df['Pct_Acumulado'].apply(lambda x: 'A (Top 80%)' if x <= 80 else 'B (Cola 20%)')
+
+    # Ticket Promedio (Aproximación); evitar división por cero
+    df['Ticket_Promedio_Actual'] = np.where(df['Total_Clientes'] > 0, df['Venta_Actual'] / df['Total_Clientes'], 0)
+
+    # Clientes del año base: conteo real desde el histórico (antes se estimaba)
+    df['Ticket_Promedio_Anterior'] = np.where(df['Total_Clientes_Anterior'] > 0, df['Venta_Anterior'] / df['Total_Clientes_Anterior'], 0)
+
+    return df
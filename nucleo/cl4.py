@@ -0,0 +1,96 @@
+"""Oportunidades CL4: actualización con las ventas del trimestre en curso, metas y productos a ofrecer"""
+import pandas as pd
+
+import utils_clientes
+
+from .config import APP_CONFIG, DATA_CONFIG
+
+COLUMNAS_OPORTUNIDADES = {'NOMBRE': 'Cliente', 'NIT': 'NIT', 'CL4': 'Nivel Actual', 'nomvendedor': 'Vendedor Asignado'}
+COLUMNAS_DESCARGA_OPORTUNIDADES = {'NOMBRE': 'Cliente', 'NIT': 'NIT Cliente', 'CL4': 'Nivel Actual', 'nomvendedor': 'Vendedor Asignado'}
+NIVEL_META_CL4 = 4
+
+
+def meses_del_trimestre(mes: int) -> list:
+    """Meses del trimestre de 'mes' transcurridos hasta él (inclusive)."""
+    inicio_trimestre = (((mes - 1) // 3) * 3) + 1
+    return list(range(inicio_trimestre, mes + 1))
+
+
+def actualizar_oportunidades_con_ventas_del_trimestre(df_cl4_original: pd.DataFrame, df_ventas_historicas: pd.DataFrame,
+                                                      anio_seleccionado: int, mes_seleccionado: int, aviso=None) -> pd.DataFrame:
+    """
+    Marca con 1 cada producto de oportunidad que el cliente compró en el trimestre y recalcula 'CL4'.
+    'aviso(mensaje)' se llama cuando hay ventas de clientes CL4 que aplicar (la página muestra un toast).
+    """
+    if df_cl4_original is None or df_cl4_original.empty: return pd.DataFrame()
+    df_cl4_actualizado = df_cl4_original.copy()
+    meses_a_buscar = meses_del_trimestre(mes_seleccionado)
+    df_ventas_trimestre = df_ventas_historicas[
+        (df_ventas_historicas['anio'] == anio_seleccionado) &
+        (df_ventas_historicas['mes'].isin(meses_a_buscar))
+    ]
+    if df_ventas_trimestre.empty: return df_cl4_actualizado
+    productos_oportunidad = APP_CONFIG['productos_oportunidad_cl4']
+    clientes_cl4 = set(df_cl4_actualizado['cliente_id'])
+    df_ventas_clientes_cl4 = df_ventas_trimestre[df_ventas_trimestre['cliente_id'].isin(clientes_cl4)]
+    if df_ventas_clientes_cl4.empty: return df_cl4_actualizado
+    if aviso is not None:
+        mes_inicio_str = DATA_CONFIG['mapeo_meses'].get(meses_a_buscar[0], '')
+        mes_fin_str = DATA_CONFIG['mapeo_meses'].get(mes_seleccionado, '')
+        aviso(f"Actualizando oportunidades con ventas de {mes_inicio_str} a {mes_fin_str}...")
+    for producto in productos_oportunidad:
+        if producto in df_cl4_actualizado.columns:
+            clientes_que_compraron = df_ventas_clientes_cl4.loc[
+                df_ventas_clientes_cl4['nombre_articulo'].str.contains(producto, case=False, na=False), 'cliente_id'
+            ].unique()
+            df_cl4_actualizado[producto] = df_cl4_actualizado['cliente_id'].isin(clientes_que_compraron).astype(int)
+    columnas_producto_existentes = [p for p in productos_oportunidad if p in df_cl4_actualizado.columns]
+    if columnas_producto_existentes:
+        df_cl4_actualizado['CL4'] = df_cl4_actualizado[columnas_producto_existentes].sum(axis=1)
+    return df_cl4_actualizado
+
+
+def cl4_con_vendedor(df_cl4_actualizado: pd.DataFrame, indice_propietarios) -> pd.DataFrame:
+    """Reporte CL4 con 'nomvendedor' del propietario actual de cada cliente."""
+    if df_cl4_actualizado.empty:
+        return pd.DataFrame()
+    return utils_clientes.asignar_propietario(df_cl4_actualizado, indice_propietarios)
+
+
+def meta_clientes_cl4(codigos) -> int:
+    """Suma de las metas de clientes CL4 de los vendedores/grupos dados (por código)."""
+    return sum(DATA_CONFIG['metas_cl4_individual'].get(str(codigo), 0) for codigo in codigos)
+
+
+def clientes_en_meta(df_cl4_con_vendedor: pd.DataFrame, nombres) -> int:
+    if df_cl4_con_vendedor.empty:
+        return 0
+    df = df_cl4_con_vendedor[df_cl4_con_vendedor['nomvendedor'].isin(nombres)]
+    return int((df['CL4'] >= NIVEL_META_CL4).sum())
+
+
+def oportunidades(df_cl4_con_vendedor: pd.DataFrame, nombres) -> pd.DataFrame:
+    """Clientes de 'nombres' con CL4 < 4 y la lista de 'Productos a Ofrecer' (los que aún no compran)."""
+    if df_cl4_con_vendedor.empty:
+        return pd.DataFrame()
+    df_oportunidades = df_cl4_con_vendedor[
+        df_cl4_con_vendedor['nomvendedor'].isin(nombres) & (df_cl4_con_vendedor['CL4'] < NIVEL_META_CL4)
+    ].copy()
+    if df_oportunidades.empty:
+        return df_oportunidades
+    productos = [p for p in APP_CONFIG['productos_oportunidad_cl4'] if p in df_oportunidades.columns]
+    if productos:
+        falta = df_oportunidades[productos].eq(0).to_numpy()
+        df_oportunidades['Productos a Ofrecer'] = [
+            ", ".join(p for p, f in zip(productos, fila) if f) or "N/A" for fila in falta
+        ]
+    else:
+        df_oportunidades['Productos a Ofrecer'] = "N/A"
+    return df_oportunidades
+
+
+def tabla_descarga_oportunidades(df_oportunidades: pd.DataFrame) -> pd.DataFrame:
+    """Columnas y encabezados del Excel de oportunidades."""
+    cols_excel = ['NOMBRE', 'NIT', 'CL4', 'nomvendedor'] + APP_CONFIG['productos_oportunidad_cl4']
+    cols_excel_existentes = [c for c in cols_excel if c in df_oportunidades.columns]
+    return df_oportunidades[cols_excel_existentes].rename(columns=COLUMNAS_DESCARGA_OPORTUNIDADES)
@@ -0,0 +1,174 @@
+"""Línea de comandos del núcleo: ejecuta cualquier cálculo sobre una carpeta local y escribe Parquet"""
+# Uso:
+#   python -m nucleo kpis --datos .cache/datos_sinteticos/1000000_s42 --salida resultados
+#   python -m nucleo todos --datos <carpeta> --salida <carpeta> --anio 2025 --mes 12 --tiempos
+# La carpeta de datos tiene los mismos archivos que Dropbox (ventas_detalle.csv, cobros_detalle.csv
+# y, opcional, reporte_cl4.xlsx), p. ej. los que escribe utils_datos_sinteticos.
+import argparse
+import os
+import sys
+import time
+from functools import cached_property
+
+import pandas as pd
+
+import utils_clientes
+import utils_rendimiento
+
+from . import albaranes, ciclo_vida, cl4, ingesta, kpis, marquillas, presupuesto
+from .config import APP_CONFIG, MOTORES
+from .exportacion import escribir_parquet
+
+
+class DatosLocales:
+    """Carga perezosa de las fuentes de una carpeta: cada cálculo lee sólo lo que usa."""
+
+    def __init__(self, directorio: str, anio: int = None, mes: int = None, anio_base: int = None):
+        self.directorio = directorio
+        self._anio, self._mes, self._anio_base = anio, mes, anio_base
+
+    @cached_property
+    def ventas(self) -> pd.DataFrame:
+        return ingesta.leer_ventas(self.directorio)
+
+    @cached_property
+    def cobros(self) -> pd.DataFrame:
+        return ingesta.leer_cobros(self.directorio)
+
+    @cached_property
+    def cl4(self) -> pd.DataFrame:
+        return ingesta.leer_reporte_cl4(self.directorio)
+
+    @cached_property
+    def periodo(self) -> tuple:
+        """(anio, mes) pedido o, por defecto, el último mes con ventas."""
+        if self._anio is not None and self._mes is not None:
+            return self._anio, self._mes
+        anio = self._anio if self._anio is not None else int(self.ventas['anio'].max())
+        meses = self.ventas.loc[self.ventas['anio'] == anio, 'mes']
+        return anio, self._mes if self._mes is not None else int(meses.max())
+
+    @property
+    def anio_base(self) -> int:
+        return self._anio_base if self._anio_base is not None else self.periodo[0] - 1
+
+    def del_periodo(self, df: pd.DataFrame) -> pd.DataFrame:
+        anio, mes = self.periodo
+        if df.empty:
+            return df
+        return df[(df['anio'] == anio) & (df['mes'] == mes)]
+
+
+# ==============================================================================
+# CÁLCULOS: cada uno devuelve {nombre_de_archivo: DataFrame}
+# ==============================================================================
+def _ingesta(datos: DatosLocales) -> dict:
+    return {'ventas': datos.ventas, 'cobros': datos.cobros, 'cl4': datos.cl4}
+
+
+def _kpis(datos: DatosLocales) -> dict:
+    anio, mes = datos.periodo
+    df_resumen, df_albaranes = kpis.procesar_datos_periodo(
+        datos.del_periodo(datos.ventas), datos.del_periodo(datos.cobros), datos.ventas, anio, mes
+    )
+    return {f'kpis_{anio}_{mes:02d}': df_resumen, f'albaranes_periodo_{anio}_{mes:02d}': df_albaranes}
+
+
+def _presupuesto(datos: DatosLocales) -> dict:
+    return {'presupuesto_mensual': presupuesto.calcular_presupuesto_dinamico_global(datos.ventas)}
+
+
+def _albaranes(datos: DatosLocales) -> dict:
+    anio, _ = datos.periodo
+    return {f'albaranes_anuales_{anio}': albaranes.resumen_albaranes_anuales(albaranes.calcular_albaranes_anuales(datos.ventas, anio))}
+
+
+def _cl4(datos: DatosLocales) -> dict:
+    anio, mes = datos.periodo
+    df_actualizado = cl4.actualizar_oportunidades_con_ventas_del_trimestre(datos.cl4, datos.ventas, anio, mes)
+    df_con_vendedor = cl4.cl4_con_vendedor(df_actualizado, utils_clientes.construir_indice_propietarios(datos.ventas))
+    return {f'cl4_{anio}_{mes:02d}': df_con_vendedor}
+
+
+def _marquillas(datos: DatosLocales) -> dict:
+    df_marquillas = marquillas.filtrar_ventas_marquillas(datos.ventas)
+    matriz = marquillas.calcular_matriz_compra(df_marquillas)
+    total, por_marquilla = marquillas.calcular_potencial_venta(df_marquillas, datos.del_periodo(df_marquillas), matriz)
+    anio, mes = datos.periodo
+    df_potencial = pd.DataFrame({'marquilla': list(por_marquilla), 'potencial': list(por_marquilla.values())})
+    return {'matriz_marquillas': matriz.rename_axis('nombre_cliente').reset_index(),
+            f'potencial_marquillas_{anio}_{mes:02d}': df_potencial}
+
+
+def _ciclo_vida(datos: DatosLocales) -> dict:
+    anio, _ = datos.periodo
+    return {f'ciclo_vida_{anio}_vs_{datos.anio_base}': ciclo_vida.resumen_ciclo_vida(datos.ventas, anio, datos.anio_base)}
+
+
+CALCULOS = {
+    'ingesta': ("Ventas, cobros y CL4 limpios", _ingesta),
+    'kpis': ("Resumen del periodo por vendedor/grupo y albaranes pendientes del mes", _kpis),
+    'presupuesto': ("Presupuesto dinámico mensual por vendedor", _presupuesto),
+    'albaranes': ("Albaranes pendientes de todo el año (valor por albarán)", _albaranes),
+    'cl4': ("Reporte CL4 actualizado con el trimestre y vendedor asignado", _cl4),
+    'marquillas': ("Matriz cliente × marquilla y potencial de venta del periodo", _marquillas),
+    'ciclo_vida': ("Ciclo de vida de clientes por vendedor (año vs año base)", _ciclo_vida),
+}
+
+
+def ejecutar(calculos: list, datos: DatosLocales, salida: str) -> dict:
+    """Ejecuta los cálculos y escribe un Parquet por resultado. Devuelve {ruta: (filas, segundos)}."""
+    os.makedirs(salida, exist_ok=True)
+    escritos = {}
+    for nombre in calculos:
+        inicio = time.perf_counter()
+        with utils_rendimiento.medir(utils_rendimiento.PROCESO, f"cli.{nombre}"):
+            resultados = CALCULOS[nombre][1](datos)
+        segundos = time.perf_counter() - inicio
+        for archivo, df in resultados.items():
+            ruta = os.path.join(salida, f"{archivo}.parquet")
+            escribir_parquet(df, ruta)
+            escritos[ruta] = (len(df), segundos)
+    return escritos
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m nucleo", description="Cálculos del tablero sin interfaz, con salida Parquet.")
+    parser.add_argument('calculos', nargs='*', help=f"Cálculos a ejecutar ({', '.join(CALCULOS)}) o 'todos'")
+    parser.add_argument('--datos', help="Carpeta con ventas_detalle.csv, cobros_detalle.csv y reporte_cl4.xlsx")
+    parser.add_argument('--salida', default='resultados', help="Carpeta de salida de los .parquet")
+    parser.add_argument('--anio', type=int, help="Año del periodo (por defecto el último con ventas)")
+    parser.add_argument('--mes', type=int, help="Mes del periodo (por defecto el último con ventas)")
+    parser.add_argument('--anio-base', type=int, help="Año de comparación del ciclo de vida (por defecto anio - 1)")
+    parser.add_argument('--listar', action='store_true', help="Muestra los cálculos disponibles")
+    parser.add_argument('--motor', choices=MOTORES, help="Motor de ingesta y KPIs (por defecto APP_CONFIG['motor_calculo'])")
+    parser.add_argument('--tiempos', action='store_true', help="Muestra las etapas medidas más lentas")
+    args = parser.parse_args(argv)
+
+    if args.listar or not args.calculos:
+        for nombre, (descripcion, _) in CALCULOS.items():
+            print(f"{nombre:<12} {descripcion}")
+        return 0
+    calculos = list(CALCULOS) if 'todos' in args.calculos else args.calculos
+    desconocidos = [c for c in calculos if c not in CALCULOS]
+    if desconocidos:
+        parser.error(f"Cálculos desconocidos: {', '.join(desconocidos)}")
+    if not args.datos:
+        parser.error("Falta --datos")
+
+    datos = DatosLocales(args.datos, args.anio, args.mes, args.anio_base)
+    try:
+        if args.motor:
+            from . import motor_polars  # perezoso, como en ingesta y kpis: sin --motor no se carga polars
+            motor_polars.usar_polars(args.motor)
+            APP_CONFIG['motor_calculo'] = args.motor
+        escritos = ejecutar(calculos, datos, args.salida)
+    except (ingesta.ErrorIngesta, FileNotFoundError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for ruta, (filas, segundos) in escritos.items():
+        print(f"{ruta}: {filas:,} filas ({segundos:.2f} s)")
+    if args.tiempos:
+        for fila in utils_rendimiento.REGISTRO_GLOBAL.etapas():
+            print(f"{fila['etapa']:<12} {fila['nombre']:<45} {fila['ultimo']:>8.3f} s")
+    return 0
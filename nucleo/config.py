@@ -0,0 +1,56 @@
+"""Configuración del negocio (rutas, columnas, presupuestos, grupos y metas) y normalización de texto"""
+import os
+import unicodedata
+
+MOTORES = ("pandas", "polars")
+
+APP_CONFIG = {
+    "page_title": "Resumen Mensual | Tablero de Ventas",
+    "url_logo": "https://raw.githubusercontent.com/DiegoMao2021/Resumen-Ventas-Gerenciales/main/LOGO%20FERREINOX%20SAS%20BIC%202024.png",
+    "dropbox_paths": {
+        "ventas": "/data/ventas_detalle.csv",
+        "cobros": "/data/cobros_detalle.csv",
+        "cl4_report": "/data/reporte_cl4.xlsx"
+    },
+    "column_names": {
+        "ventas": ['anio', 'mes', 'fecha_venta', 'Serie', 'TipoDocumento', 'codigo_vendedor', 'nomvendedor', 'cliente_id', 'nombre_cliente', 'codigo_articulo', 'nombre_articulo', 'categoria_producto', 'linea_producto', 'marca_producto', 'valor_venta', 'unidades_vendidas', 'costo_unitario', 'super_categoria'],
+        "cobros": ['anio', 'mes', 'fecha_cobro', 'codigo_vendedor', 'valor_cobro']
+    },
+    "kpi_goals": {
+        "meta_clientes_cl4": 120 
+    },
+    "marquillas_clave": ['VINILTEX', 'KORAZA', 'ESTUCOMAS', 'VINILICO', 'PINTULUX'],
+    "productos_oportunidad_cl4": ['ESTUCOMAS', 'PINTULUX', 'KORAZA', 'VINILTEX', 'VINILICO'],
+    "complementarios": {"exclude_super_categoria": "Pintuco", "presupuesto_pct": 0.10},
+    "sub_meta_complementarios": {"nombre_marca_objetivo": "non-AN Third Party", "presupuesto_pct": 0.10},
+    "categorias_clave_venta": ['ABRACOL', 'YALE', 'SAINT GOBAIN', 'GOYA', 'ALLEGION', 'SEGUREX', 'ARTECOLA', 'ATLAS', 'INDUMA'],
+    "presupuesto_mostradores": {"incremento_anual_pct": 0.10}, # Se mantiene como referencia, aunque ahora usamos utils
+    # Motor de ingesta y KPIs: uno de MOTORES (nucleo/motor_polars.py); se puede forzar con NUCLEO_MOTOR
+    "motor_calculo": os.environ.get("NUCLEO_MOTOR", "pandas").lower()
+}
+
+DATA_CONFIG = {
+    "presupuestos": {'154033':{'presupuesto':123873239, 'presupuestocartera':121955931}, '154044':{'presupuesto':80000000, 'presupuestocartera':64853530}, '154034':{'presupuesto':82753045, 'presupuestocartera':35242575}, '154014':{'presupuesto':268214737, 'presupuestocartera':283458406}, '154046':{'presupuesto':85469798, 'presupuestocartera':37112627}, '154012':{'presupuesto':246616193, 'presupuestocartera':301988912}, '154043':{'presupuesto':124885413, 'presupuestocartera':183134333}, '154035':{'presupuesto':80000000, 'presupuestocartera':39077583}, '154006':{'presupuesto':81250000, 'presupuestocartera':146638108}, '154049':{'presupuesto':0, 'presupuestocartera':0}, '154013':{'presupuesto':303422639, 'presupuestocartera':379543527}, '154011':{'presupuesto':447060250, 'presupuestocartera':484588896}, '154029':{'presupuesto':50000000, 'presupuestocartera':2172522}, '154040':{'presupuesto':0, 'presupuestocartera':18312455}, '154053':{'presupuesto':0, 'presupuestocartera':0}, '154048':{'presupuesto':0, 'presupuestocartera':4129945}, '154042':{'presupuesto':30000000, 'presupuestocartera':669842}, '154031':{'presupuesto':0, 'presupuestocartera':0}, '154039':{'presupuesto':0, 'presupuestocartera':0}, '154051':{'presupuesto':0, 'presupuestocartera':0}, '154008':{'presupuesto':0, 'presupuestocartera':0}, '154052':{'presupuesto':30000000, 'presupuestocartera':8161068}, '154055':{'presupuesto':40000000, 'presupuestocartera':90519052}, '154050':{'presupuesto':0, 'presupuestocartera':783906}},
+    "grupos_vendedores": {"MOSTRADOR PEREIRA": ["ALEJANDRO CARBALLO MARQUEZ", "GEORGINA A. GALVIS HERRERA"], "MOSTRADOR ARMENIA": ["CRISTIAN CAMILO RENDON MONTES", "FANDRY JOHANA ABRIL PENHA", "JAVIER ORLANDO PATINO HURTADO"], "MOSTRADOR MANIZALES": ["DAVID FELIPE MARTINEZ RIOS", "JHON JAIRO CASTAÑO MONTES"], "MOSTRADOR LAURELES": ["MAURICIO RIOS MORALES"], "MOSTRADOR OPALO": ["MARIA PAULA DEL JESUS GALVIS HERRERA"]},
+    "metas_cl4_individual": {
+        '154033': 15, '154044': 2, '154034': 2, '154014': 30, '154046': 2, '154012': 30,
+        '154043': 15, '154035': 2, '154006': 15, '154049': 15, '154013': 3, '154011': 3, '154029': 10, '154055': 10,
+        'MOSTRADOR PEREIRA': 3, 'MOSTRADOR ARMENIA': 3, 'MOSTRADOR MANIZALES': 3,
+        'MOSTRADOR LAURELES': 3, 'MOSTRADOR OPALO': 3
+    },
+    "mapeo_meses": {1:"Enero", 2:"Febrero", 3:"Marzo", 4:"Abril", 5:"Mayo", 6:"Junio", 7:"Julio", 8:"Agosto", 9:"Septiembre", 10:"Octubre", 11:"Noviembre", 12:"Diciembre"},
+    "mapeo_marcas": {50:"P8-ASC-MEGA", 54:"MPY-International", 55:"DPP-AN COLORANTS LATAM", 56:"DPP-Pintuco Profesional", 57:"ASC-Mega", 58:"DPP-Pintuco", 59:"DPP-Madetec", 60:"POW-Interpon", 61:"various", 62:"DPP-ICO", 63:"DPP-Terinsa", 64:"MPY-Pintuco", 65:"non-AN Third Party", 66:"ICO-AN Packaging", 67:"ASC-Automotive OEM", 68:"POW-Resicoat", 73:"DPP-Coral", 91:"DPP-Sikkens"}
+}
+
+
+def normalizar_texto(texto):
+    if not isinstance(texto, str): return texto
+    try:
+        texto_sin_tildes = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+        return texto_sin_tildes.upper().replace('-', ' ').replace('_', ' ').replace('.', ' ').strip().replace('  ', ' ')
+    except (TypeError, AttributeError): return texto
+
+
+APP_CONFIG['complementarios']['exclude_super_categoria'] = normalizar_texto(APP_CONFIG['complementarios']['exclude_super_categoria'])
+APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo'] = normalizar_texto(APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo'])
+APP_CONFIG['categorias_clave_venta'] = [normalizar_texto(cat) for cat in APP_CONFIG['categorias_clave_venta']]
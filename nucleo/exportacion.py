@@ -0,0 +1,126 @@
+"""Exportaciones del resumen mensual (XLSX con estilos vía utils_excel, Parquet): albaranes, oportunidades y ventas"""
+import pandas as pd
+
+import utils_excel
+
+from .albaranes import calcular_albaranes_anuales, resumen_albaranes_anuales
+from .config import APP_CONFIG
+
+
+def excel_albaranes(df):
+    return utils_excel.exportar_tabla_simple(
+        df, 'AlbaranesPendientes',
+        anchos={'Fecha': 12, 'Nombre Cliente': 35, 'Numero Albaran/Serie': 25, 'Nombre Vendedor': 35, 'Valor Total Albaran': 20},
+        formatos={
+            'Fecha': {'num_format': 'yyyy-mm-dd', 'border': 1, 'align': 'left'},
+            'Nombre Cliente': {'border': 1}, 'Numero Albaran/Serie': {'border': 1}, 'Nombre Vendedor': {'border': 1},
+            'Valor Total Albaran': {'num_format': '$#,##0', 'border': 1}
+        },
+        formato_encabezado={'bold': True, 'text_wrap': False, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1}
+    )
+
+
+def excel_oportunidades(df):
+    libro = utils_excel.LibroExcel()
+    ws = libro.hoja('Oportunidades_CL4')
+    libro.definir_formatos({
+        'encabezado': {'bold': True, 'text_wrap': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1},
+        'oportunidad': {'bg_color': '#FFFFCC', 'border': 1},
+        'borde': {'border': 1}
+    })
+    marcas_cols = APP_CONFIG['productos_oportunidad_cl4']
+    ws.set_column('A:A', 45, libro.formato('borde'))
+    ws.set_column('B:B', 15, libro.formato('borde'))
+    col_start_marcas = df.columns.get_loc(marcas_cols[0]) if marcas_cols and marcas_cols[0] in df.columns else 4
+    ws.set_column(col_start_marcas, col_start_marcas + len(marcas_cols) - 1, 15, libro.formato('borde'))
+    ultima = libro.escribir_tabla(ws, df, formato_encabezado='encabezado', formatos={c: 'borde' for c in df.columns})
+    for marca in marcas_cols:
+        if marca in df.columns:
+            col_idx = df.columns.get_loc(marca)
+            ws.conditional_format(1, col_idx, len(df), col_idx, {'type': 'cell', 'criteria': '==', 'value': 0, 'format': libro.formato('oportunidad')})
+    ws.autofilter(0, 0, max(ultima, 0), df.shape[1] - 1)
+    return libro.cerrar()
+
+
+COLUMNAS_VENTAS_MENSUAL = {'fecha_venta': 'Fecha', 'TipoDocumento': 'Tipo Documento', 'Serie': 'Serie', 'nombre_cliente': 'Cliente', 'nombre_articulo': 'Artículo', 'unidades_vendidas': 'Unidades', 'valor_venta': 'Valor Venta', 'nomvendedor': 'Vendedor'}
+
+
+def preparar_ventas_mensual(df):
+    return df[list(COLUMNAS_VENTAS_MENSUAL)].rename(columns=COLUMNAS_VENTAS_MENSUAL)
+
+
+def excel_ventas_mensual(df, preparado=False):
+    df_excel = df if preparado else preparar_ventas_mensual(df)
+    borde = {'border': 1}
+    return utils_excel.exportar_tabla_simple(
+        df_excel, 'Ventas_del_Mes',
+        anchos={'Fecha': 12, 'Tipo Documento': 18, 'Serie': 15, 'Cliente': 40, 'Artículo': 45, 'Valor Venta': 18},
+        formatos={
+            'Fecha': {'num_format': 'yyyy-mm-dd', 'border': 1},
+            'Tipo Documento': borde, 'Serie': borde, 'Cliente': borde, 'Artículo': borde, 'Unidades': borde, 'Vendedor': borde,
+            'Valor Venta': {'num_format': '$#,##0.00', 'border': 1}
+        },
+        formato_encabezado={'bold': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1},
+        congelar_encabezado=True
+    )
+
+
+def excel_analisis_cliente(df, cliente_nombre, fecha_inicio, fecha_fin, total_venta, num_facturas):
+    df_excel = df[['fecha_venta', 'TipoDocumento', 'Serie', 'nombre_articulo', 'unidades_vendidas', 'valor_venta']]
+    df_excel.columns = ['Fecha', 'Tipo Documento', 'Serie', 'Artículo', 'Unidades', 'Valor Venta']
+    libro = utils_excel.LibroExcel()
+    ws = libro.hoja('Analisis_Cliente')
+    libro.definir_formatos({
+        'titulo': {'bold': True, 'font_size': 16, 'font_color': '#1F4E78', 'valign': 'vcenter'},
+        'subtitulo': {'bold': True, 'font_size': 12, 'fg_color': '#DDEBF7', 'border': 1, 'align': 'right'},
+        'valor': {'font_size': 12, 'border': 1, 'num_format': '$#,##0.00'},
+        'conteo': {'font_size': 12, 'border': 1},
+        'encabezado': {'bold': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1},
+        'moneda': {'num_format': '$#,##0.00', 'border': 1},
+        'fecha': {'num_format': 'yyyy-mm-dd', 'border': 1},
+        'borde': {'border': 1}
+    })
+    ws.set_column(0, 0, 12, libro.formato('fecha'))
+    ws.set_column(1, 1, 18, libro.formato('borde'))
+    ws.set_column(3, 3, 50, libro.formato('borde'))
+    ws.set_column(5, 5, 18, libro.formato('moneda'))
+    # constant_memory: las celdas de cabecera se escriben en orden de fila
+    ws.merge_range('B1:F1', f"Análisis de Compras: {cliente_nombre}", libro.formato('titulo'))
+    ws.write('B2', 'Periodo Desde:', libro.formato('subtitulo'))
+    ws.write('C2', fecha_inicio.strftime('%Y-%m-%d'), libro.formato('valor'))
+    ws.write('E2', 'Total Venta Neta:', libro.formato('subtitulo'))
+    ws.write('F2', total_venta, libro.formato('valor'))
+    ws.write('B3', 'Periodo Hasta:', libro.formato('subtitulo'))
+    ws.write('C3', fecha_fin.strftime('%Y-%m-%d'), libro.formato('valor'))
+    ws.write('E3', 'Número de Facturas:', libro.formato('subtitulo'))
+    ws.write('F3', num_facturas, libro.formato('conteo'))
+    ultima = libro.escribir_tabla(ws, df_excel, fila=4, formato_encabezado='encabezado', formatos={
+        'Fecha': 'fecha', 'Tipo Documento': 'borde', 'Serie': 'borde', 'Artículo': 'borde', 'Unidades': 'borde', 'Valor Venta': 'moneda'
+    })
+    ws.autofilter(4, 0, max(ultima, 4), df_excel.shape[1] - 1)
+    ws.freeze_panes(5, 0)
+    return libro.cerrar()
+
+
+def exportar_albaranes_anuales(df_ventas_historicas, anio_sel, formato):
+    """Valor total por albarán pendiente de todo el año; se ejecuta sólo al preparar la descarga."""
+    df_albaranes_pendientes_del_anio = calcular_albaranes_anuales(df_ventas_historicas, anio_sel)
+    if df_albaranes_pendientes_del_anio.empty:
+        raise ValueError(f"No se encontraron albaranes pendientes en todo el año {anio_sel}.")
+    df_para_descargar_anual = resumen_albaranes_anuales(df_albaranes_pendientes_del_anio)
+    return utils_excel.exportar_en_formato(df_para_descargar_anual, formato, excel_albaranes, f"Reporte_Albaranes_Pendientes_{anio_sel}")
+
+
+def para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Nombres de columna en texto y columnas object con tipos mezclados convertidas a texto."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def escribir_parquet(df: pd.DataFrame, ruta: str):
+    with open(ruta, 'wb') as archivo:
+        archivo.write(utils_excel.exportar_parquet(para_parquet(df)))
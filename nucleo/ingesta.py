@@ -0,0 +1,98 @@
+"""Ingesta: de los bytes de Dropbox (o de una carpeta local) a DataFrames limpios"""
+import io
+import os
+
+import pandas as pd
+
+import utils_documentos
+import utils_rendimiento
+from utils_rendimiento import CARGA, LIMPIEZA
+
+from .config import APP_CONFIG, DATA_CONFIG, normalizar_texto
+
+COLUMNAS_A_NORMALIZAR = ['super_categoria', 'categoria_producto', 'nombre_marca', 'nomvendedor', 'TipoDocumento', 'nombre_articulo', 'nombre_cliente']
+COLUMNAS_NUMERICAS = ['anio', 'mes', 'valor_venta', 'valor_cobro', 'unidades_vendidas', 'costo_unitario', 'marca_producto']
+
+
+class ErrorIngesta(ValueError):
+    """El archivo se leyó pero no tiene la estructura esperada."""
+
+
+def limpiar_csv(contenido: bytes, nombres_columnas: list, motor: str = None) -> pd.DataFrame:
+    """
+    CSV separado por '|' en latin-1 (ventas o cobros) → DataFrame tipado, con texto normalizado
+    y clase de documento. Lanza ErrorIngesta si el separador no coincide (una sola columna).
+    'motor' como en procesar_datos_periodo: con 'polars' el mismo resultado sale de motor_polars.
+    """
+    from . import motor_polars  # perezoso: 'python -m nucleo.motor_polars' no debe encontrarlo ya importado
+    if motor_polars.usar_polars(motor):
+        return motor_polars.limpiar_csv(contenido, nombres_columnas)
+    with utils_rendimiento.medir(CARGA, "lectura CSV"):
+        contenido_csv = contenido.decode('latin-1')
+        df = pd.read_csv(io.StringIO(contenido_csv), header=None, sep='|', engine='python', quoting=3, on_bad_lines='warn')
+    if df.shape[1] < 5 and not df.empty:
+        raise ErrorIngesta("Se leyó una sola columna.")
+    if df.shape[1] != len(nombres_columnas):
+        if df.shape[1] < len(nombres_columnas): df = df.reindex(columns=range(len(nombres_columnas)))
+    df.columns = nombres_columnas
+    if 'codigo_vendedor' in df.columns:
+        df['codigo_vendedor'] = pd.to_numeric(df['codigo_vendedor'], errors='coerce').fillna(0).astype(int).astype(str)
+    for col in COLUMNAS_NUMERICAS:
+        if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.dropna(subset=['anio', 'mes'], inplace=True)
+    df = df.astype({'anio': int, 'mes': int})
+    if 'fecha_venta' in df.columns: df['fecha_venta'] = pd.to_datetime(df['fecha_venta'], errors='coerce')
+    if 'cliente_id' in df.columns: df['cliente_id'] = df['cliente_id'].astype(str)
+    if 'marca_producto' in df.columns: df['nombre_marca'] = df['marca_producto'].map(DATA_CONFIG["mapeo_marcas"]).fillna('No Especificada')
+    with utils_rendimiento.medir(LIMPIEZA, "normalizar_texto"):
+        for col in COLUMNAS_A_NORMALIZAR:
+            if col in df.columns: df[col] = df[col].apply(normalizar_texto)
+    # Clasificación única del documento: los filtros posteriores comparan códigos, no regex
+    with utils_rendimiento.medir(LIMPIEZA, "clase de documento"):
+        df = utils_documentos.agregar_clase_documento(df)
+    return df
+
+
+def limpiar_reporte_cl4(contenido: bytes) -> pd.DataFrame:
+    """Excel del reporte CL4 → DataFrame con 'cliente_id' y banderas numéricas por producto (vacío si no hay columna de ID)."""
+    with utils_rendimiento.medir(CARGA, "lectura Excel CL4"):
+        df = pd.read_excel(io.BytesIO(contenido))
+    df.columns = [normalizar_texto(col) for col in df.columns]
+    columna_id = next((nombre for nombre in ['ID CLIENTE', 'IDCLIENTE'] if nombre in df.columns), None)
+    if columna_id is None:
+        return pd.DataFrame()
+    df.rename(columns={columna_id: 'cliente_id'}, inplace=True)
+    df['cliente_id'] = df['cliente_id'].astype(str)
+    if 'NIT' in df.columns: df['NIT'] = df['NIT'].astype(str).str.strip()
+    if 'NOMBRE' in df.columns: df['NOMBRE'] = df['NOMBRE'].astype(str)
+    for producto in APP_CONFIG['productos_oportunidad_cl4']:
+        if producto in df.columns: df[producto] = pd.to_numeric(df[producto], errors='coerce').fillna(0)
+    return df
+
+
+def ruta_local(directorio: str, fuente: str) -> str:
+    """Archivo local de una fuente ('ventas', 'cobros', 'cl4_report'): mismo nombre que en Dropbox."""
+    return os.path.join(directorio, os.path.basename(APP_CONFIG['dropbox_paths'][fuente]))
+
+
+def _leer_bytes(ruta: str) -> bytes:
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    utils_rendimiento.registrar_bytes("Local", len(contenido))
+    return contenido
+
+
+def leer_ventas(directorio: str) -> pd.DataFrame:
+    return limpiar_csv(_leer_bytes(ruta_local(directorio, 'ventas')), APP_CONFIG['column_names']['ventas'])
+
+
+def leer_cobros(directorio: str) -> pd.DataFrame:
+    return limpiar_csv(_leer_bytes(ruta_local(directorio, 'cobros')), APP_CONFIG['column_names']['cobros'])
+
+
+def leer_reporte_cl4(directorio: str) -> pd.DataFrame:
+    """El reporte CL4 es opcional: sin archivo devuelve un DataFrame vacío."""
+    ruta = ruta_local(directorio, 'cl4_report')
+    if not os.path.exists(ruta):
+        return pd.DataFrame()
+    return limpiar_reporte_cl4(_leer_bytes(ruta))
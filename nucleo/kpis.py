@@ -0,0 +1,159 @@
+"""KPIs del periodo por vendedor y grupo: ventas netas, cobros, complementarios, albaranes y presupuestos"""
+import pandas as pd
+
+import utils_documentos
+
+from .albaranes import albaranes_pendientes_periodo
+from .config import APP_CONFIG, DATA_CONFIG, normalizar_texto
+from .presupuesto import calcular_mejor_venta_semestre, calcular_presupuesto_dinamico_global
+
+
+def grupo_de(vendedor_norm: str):
+    """Nombre original del grupo cuyo nombre normalizado es 'vendedor_norm', o None."""
+    return next((k for k in DATA_CONFIG['grupos_vendedores'] if normalizar_texto(k) == vendedor_norm), None)
+
+
+def expandir_grupos(vendedores_norm) -> list:
+    """Nombres normalizados de vendedores a filtrar: cada grupo se reemplaza por sus integrantes."""
+    nombres = []
+    for vendedor_norm in vendedores_norm:
+        nombre_grupo_orig = grupo_de(vendedor_norm)
+        if nombre_grupo_orig:
+            nombres.extend(normalizar_texto(v) for v in DATA_CONFIG['grupos_vendedores'][nombre_grupo_orig])
+        else:
+            nombres.append(vendedor_norm)
+    return nombres
+
+
+def resumenes_periodo(df_ventas_periodo: pd.DataFrame, df_cobros_periodo: pd.DataFrame, df_ventas_historicas: pd.DataFrame) -> tuple:
+    """
+    Parte del cálculo que recorre filas: (ventas e impactos, cobros, complementarios y sub-meta por vendedor,
+    detalle de albaranes pendientes, resumen de albaranes). motor_polars.resumenes_periodo devuelve lo mismo.
+    """
+    df_ventas_reales = df_ventas_periodo[utils_documentos.mascara_venta_neta(df_ventas_periodo)].copy()
+
+    # Resúmenes básicos
+    resumen_ventas = df_ventas_reales.groupby(['codigo_vendedor', 'nomvendedor']).agg(ventas_totales=('valor_venta', 'sum'), impactos=('cliente_id', 'nunique')).reset_index()
+    resumen_cobros = df_cobros_periodo.groupby('codigo_vendedor').agg(cobros_totales=('valor_cobro', 'sum')).reset_index()
+
+    categorias_objetivo = APP_CONFIG['categorias_clave_venta']
+    df_ventas_comp = df_ventas_reales[df_ventas_reales['categoria_producto'].isin(categorias_objetivo)]
+    resumen_complementarios = df_ventas_comp.groupby(['codigo_vendedor','nomvendedor']).agg(ventas_complementarios=('valor_venta', 'sum')).reset_index()
+
+    marca_sub_meta = APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo']
+    df_ventas_sub_meta = df_ventas_reales[df_ventas_reales['nombre_marca'] == marca_sub_meta]
+    resumen_sub_meta = df_ventas_sub_meta.groupby(['codigo_vendedor', 'nomvendedor']).agg(ventas_sub_meta=('valor_venta', 'sum')).reset_index()
+
+    # Albaranes
+    df_albaranes_reales_pendientes, resumen_albaranes = albaranes_pendientes_periodo(df_ventas_periodo, df_ventas_historicas)
+    return resumen_ventas, resumen_cobros, resumen_complementarios, resumen_sub_meta, df_albaranes_reales_pendientes, resumen_albaranes
+
+
+def procesar_datos_periodo(df_ventas_periodo: pd.DataFrame, df_cobros_periodo: pd.DataFrame, df_ventas_historicas: pd.DataFrame,
+                           anio_sel: int, mes_sel: int, df_presupuesto_mensual: pd.DataFrame = None, motor: str = None) -> tuple:
+    """
+    (resumen por vendedor y grupo, detalle de albaranes pendientes del periodo). 'df_presupuesto_mensual'
+    es el resultado de calcular_presupuesto_dinamico_global; si no se pasa, se calcula aquí.
+    'motor' ('pandas' o 'polars') elige cómo se recorren las filas; por defecto, APP_CONFIG['motor_calculo'].
+    """
+    from . import motor_polars  # perezoso, como en ingesta.limpiar_csv
+    calcular_resumenes = motor_polars.resumenes_periodo if motor_polars.usar_polars(motor) else resumenes_periodo
+    (resumen_ventas, resumen_cobros, resumen_complementarios, resumen_sub_meta,
+     df_albaranes_reales_pendientes, resumen_albaranes) = calcular_resumenes(df_ventas_periodo, df_cobros_periodo, df_ventas_historicas)
+
+    # Merge inicial
+    df_resumen = pd.merge(resumen_ventas, resumen_cobros, on='codigo_vendedor', how='left')
+    df_resumen = pd.merge(df_resumen, resumen_complementarios, on=['codigo_vendedor', 'nomvendedor'], how='left')
+    df_resumen = pd.merge(df_resumen, resumen_sub_meta, on=['codigo_vendedor', 'nomvendedor'], how='left')
+    df_resumen = pd.merge(df_resumen, resumen_albaranes, on=['codigo_vendedor', 'nomvendedor'], how='left')
+
+    # ==============================================================================
+    # INTEGRACIÓN DE PRESUPUESTOS (VENTAS: DINÁMICO / CARTERA: ESTÁTICO)
+    # ==============================================================================
+
+    # 1. Cartera Estática (Original)
+    presupuestos_fijos = DATA_CONFIG['presupuestos']
+    df_resumen['presupuestocartera'] = df_resumen['codigo_vendedor'].map(lambda x: presupuestos_fijos.get(x, {}).get('presupuestocartera', 0))
+
+    # 2. Ventas Dinámicas (Nuevo con utils_presupuesto)
+    # Calculamos el presupuesto dinámico global (la página lo pasa ya cacheado)
+    df_dynamic_full = df_presupuesto_mensual if df_presupuesto_mensual is not None else calcular_presupuesto_dinamico_global(df_ventas_historicas)
+
+    # Filtramos para el mes seleccionado
+    df_dynamic_mes = df_dynamic_full[df_dynamic_full['mes'] == mes_sel][['nomvendedor', 'presupuesto_mensual']]
+    df_dynamic_mes.rename(columns={'presupuesto_mensual': 'presupuesto_dinamico'}, inplace=True)
+
+    # Normalizamos el nombre en el resumen actual para asegurar el cruce
+    df_resumen['nomvendedor_norm'] = df_resumen['nomvendedor'].apply(normalizar_texto)
+
+    # Merge con el presupuesto dinámico
+    df_resumen = pd.merge(df_resumen, df_dynamic_mes, left_on='nomvendedor_norm', right_on='nomvendedor', how='left')
+
+    # Asignamos el presupuesto dinámico a la columna 'presupuesto' (y manejamos nulos)
+    df_resumen['presupuesto'] = df_resumen['presupuesto_dinamico'].fillna(0)
+
+    # ==============================================================================
+    # EXCEPCIÓN ÚNICA: JULIO 2026
+    # El presupuesto de ventas de julio/2026 = la MEJOR venta neta mensual de cada
+    # vendedor entre enero y junio 2026. Solo aplica a este mes; los demás meses
+    # siguen usando el presupuesto dinámico normal.
+    # ==============================================================================
+    if anio_sel == 2026 and mes_sel == 7:
+        mejor_venta = calcular_mejor_venta_semestre(df_ventas_historicas, 2026, meses=range(1, 7))
+        if mejor_venta:
+            # En este punto el nombre normalizado vive en 'nomvendedor_norm'
+            # (la columna 'nomvendedor' aún no se ha renombrado tras el merge).
+            override = df_resumen['nomvendedor_norm'].map(mejor_venta)
+            # Solo reemplaza donde hay dato de ene-jun; si no, conserva el dinámico
+            df_resumen['presupuesto'] = override.fillna(df_resumen['presupuesto'])
+
+    # Limpieza
+    if 'presupuesto_dinamico' in df_resumen.columns: df_resumen.drop(columns=['presupuesto_dinamico'], inplace=True)
+    if 'nomvendedor_y' in df_resumen.columns: df_resumen.drop(columns=['nomvendedor_y'], inplace=True)
+    if 'nomvendedor_x' in df_resumen.columns: df_resumen.rename(columns={'nomvendedor_x': 'nomvendedor'}, inplace=True)
+    if 'nomvendedor_norm' in df_resumen.columns: df_resumen.drop(columns=['nomvendedor_norm'], inplace=True)
+
+    df_resumen.fillna(0, inplace=True)
+
+    # Agrupación de Grupos / Mostradores
+    registros_agrupados = []
+
+    # Para los grupos, ya no usamos "incremento_mostradores" manual.
+    # Sumamos los presupuestos dinámicos individuales calculados por el utils.
+
+    for grupo, lista_vendedores in DATA_CONFIG['grupos_vendedores'].items():
+        lista_vendedores_norm = [normalizar_texto(v) for v in lista_vendedores]
+
+        # Filtramos el DF resumen actual (que ya tiene ventas reales y presupuesto dinámico individual)
+        df_grupo_actual = df_resumen[df_resumen['nomvendedor'].apply(normalizar_texto).isin(lista_vendedores_norm)]
+
+        cols_a_sumar = ['ventas_totales', 'cobros_totales', 'impactos', 'presupuestocartera', 'ventas_complementarios', 'ventas_sub_meta', 'albaranes_pendientes']
+        suma_grupo = df_grupo_actual[cols_a_sumar].sum().to_dict()
+
+        # Sumar los presupuestos individuales dinámicos para obtener la meta del grupo
+        suma_grupo['presupuesto'] = df_grupo_actual['presupuesto'].sum()
+
+        # Si el grupo está vacío en ventas reales, buscamos si tiene presupuesto asignado en la tabla dinámica
+        if df_grupo_actual.empty:
+            presupuesto_grupo_faltante = df_dynamic_mes[df_dynamic_mes['nomvendedor'].isin(lista_vendedores_norm)]['presupuesto_dinamico'].sum()
+            suma_grupo['presupuesto'] = presupuesto_grupo_faltante
+
+        codigo_grupo_norm = normalizar_texto(grupo)
+        registro = {'nomvendedor': codigo_grupo_norm, 'codigo_vendedor': codigo_grupo_norm, **suma_grupo}
+        registros_agrupados.append(registro)
+
+    df_agrupado = pd.DataFrame(registros_agrupados)
+    vendedores_en_grupos = [v for lista in DATA_CONFIG['grupos_vendedores'].values() for v in [normalizar_texto(i) for i in lista]]
+
+    # Filtramos individuales (quitamos los que pertenecen a grupos para no duplicar en la vista general si fuera necesario)
+    # Pero mantenemos la lógica original de concatenar
+    df_individuales = df_resumen[~df_resumen['nomvendedor'].apply(normalizar_texto).isin(vendedores_en_grupos)]
+
+    df_final = pd.concat([df_agrupado, df_individuales], ignore_index=True)
+    df_final.fillna(0, inplace=True)
+
+    # Presupuestos derivados (Complementarios y Sub-meta)
+    df_final['presupuesto_complementarios'] = df_final['presupuesto'] * APP_CONFIG['complementarios']['presupuesto_pct']
+    df_final['presupuesto_sub_meta'] = df_final['presupuesto_complementarios'] * APP_CONFIG['sub_meta_complementarios']['presupuesto_pct']
+
+    return df_final, df_albaranes_reales_pendientes
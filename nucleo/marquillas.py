@@ -0,0 +1,101 @@
+"""Venta cruzada de marquillas clave: ventas por marquilla, matriz cliente × marquilla y potencial"""
+import re
+from typing import Dict, Tuple
+
+import pandas as pd
+
+MARQUILLAS_CLAVE = sorted(['VINILTEX', 'KORAZA', 'ESTUCOMAS', 'VINILICO', 'PINTULUX'])
+
+
+def filtrar_ventas_marquillas(df_ventas_historicas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filtra el historial de ventas para incluir solo transacciones de las
+    marquillas clave y añade una columna con la marquilla identificada.
+    """
+    if df_ventas_historicas.empty or 'nombre_articulo' not in df_ventas_historicas.columns:
+        return pd.DataFrame()
+
+    regex_marquillas = '|'.join(MARQUILLAS_CLAVE)
+    df_filtrado = df_ventas_historicas[
+        df_ventas_historicas['nombre_articulo'].str.contains(regex_marquillas, case=False, na=False)
+    ].copy()
+
+    # Extrae la primera marquilla encontrada en el nombre del artículo.
+    df_filtrado['marquilla'] = df_filtrado['nombre_articulo'].str.extract(f'({regex_marquillas})', flags=re.IGNORECASE)[0].str.upper()
+    df_filtrado.dropna(subset=['marquilla'], inplace=True)
+    return df_filtrado
+
+
+def calcular_matriz_compra(df_ventas_marquillas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Crea una matriz que muestra qué clientes (filas) han comprado
+    qué marquillas (columnas), marcada con 1 si hubo compra y 0 si no.
+    """
+    if df_ventas_marquillas.empty:
+        # Devuelve un DF vacío con la estructura esperada si no hay datos.
+        return pd.DataFrame(columns=MARQUILLAS_CLAVE + ['conteo_marquillas'])
+
+    matriz_compra_valor = pd.crosstab(
+        index=df_ventas_marquillas['nombre_cliente'],
+        columns=df_ventas_marquillas['marquilla'],
+        values=df_ventas_marquillas['valor_venta'],
+        aggfunc='sum'
+    ).fillna(0)
+
+    # Convierte los valores de venta a un formato binario (1 si compró, 0 si no).
+    matriz_binaria = (matriz_compra_valor > 0).astype(int)
+
+    # Asegura que todas las marquillas clave existan como columnas, incluso si no se vendieron.
+    for marquilla in MARQUILLAS_CLAVE:
+        if marquilla not in matriz_binaria.columns:
+            matriz_binaria[marquilla] = 0
+
+    # Calcula cuántas marquillas únicas ha comprado cada cliente.
+    matriz_binaria['conteo_marquillas'] = matriz_binaria[MARQUILLAS_CLAVE].sum(axis=1)
+
+    return matriz_binaria.sort_values('conteo_marquillas', ascending=False)
+
+
+def calcular_potencial_venta(df_ventas_marquillas_historicas: pd.DataFrame, df_clientes_activos: pd.DataFrame,
+                             matriz_compra_historica: pd.DataFrame = None) -> Tuple[float, Dict]:
+    """
+    Calcula el potencial de venta si CADA CLIENTE ACTIVO del periodo
+    comprara las marquillas que le faltan, basado en el TICKET PROMEDIO POR TRANSACCIÓN.
+    'matriz_compra_historica' permite reutilizar una matriz ya calculada (p. ej. cacheada).
+    """
+    if df_ventas_marquillas_historicas.empty or df_clientes_activos.empty:
+        return 0.0, {m: 0.0 for m in MARQUILLAS_CLAVE}
+
+    # 1. Calcular el valor de venta PROMEDIO POR TRANSACCIÓN para cada marquilla
+    #    usando todo el historial disponible para tener un ticket estable.
+    ticket_promedio_por_transaccion = {}
+    for marquilla in MARQUILLAS_CLAVE:
+        df_marquilla = df_ventas_marquillas_historicas[df_ventas_marquillas_historicas['marquilla'] == marquilla]
+        if not df_marquilla.empty:
+            valor_promedio_transaccion = df_marquilla['valor_venta'].mean()
+            ticket_promedio_por_transaccion[marquilla] = valor_promedio_transaccion
+        else:
+            ticket_promedio_por_transaccion[marquilla] = 0.0
+
+    # 2. Crear la matriz de compra histórica para saber quién ha comprado qué en el pasado.
+    if matriz_compra_historica is None:
+        matriz_compra_historica = calcular_matriz_compra(df_ventas_marquillas_historicas)
+
+    # 3. Calcular el potencial total sumando las oportunidades perdidas
+    #    SOLO para los clientes que estuvieron activos en el periodo seleccionado.
+    venta_potencial_total = 0.0
+    potencial_por_marquilla = {m: 0.0 for m in MARQUILLAS_CLAVE}
+    clientes_activos_unicos = df_clientes_activos['nombre_cliente'].unique()
+
+    for cliente in clientes_activos_unicos:
+        for marquilla in MARQUILLAS_CLAVE:
+            # Revisa si el cliente ha comprado la marquilla en su historial.
+            ha_comprado_historicamente = cliente in matriz_compra_historica.index and matriz_compra_historica.loc[cliente, marquilla] == 1
+
+            # Si el cliente activo NUNCA ha comprado la marquilla, se suma el potencial.
+            if not ha_comprado_historicamente:
+                potencial_cliente_marquilla = ticket_promedio_por_transaccion.get(marquilla, 0)
+                venta_potencial_total += potencial_cliente_marquilla
+                potencial_por_marquilla[marquilla] += potencial_cliente_marquilla
+
+    return venta_potencial_total, potencial_por_marquilla
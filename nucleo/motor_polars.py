@@ -0,0 +1,321 @@
+"""Motor Polars (opcional): ingesta y agregados del periodo como planes perezosos, con el mismo resultado que pandas"""
+# Se activa con APP_CONFIG['motor_calculo'] = "polars" (o NUCLEO_MOTOR=polars). Sin polars/pyarrow
+# instalados, la configuración cae a pandas; pedir motor="polars" explícitamente lanza ImportError.
+# Validación contra pandas sobre los datos sintéticos:
+#   python -m nucleo.motor_polars --datos .cache/datos_sinteticos/1000000_s42
+#   python -m nucleo.motor_polars --lineas 200k        (genera los datos en una carpeta temporal)
+# La lectura del CSV es donde Polars ahorra tiempo; los KPIs del periodo cuestan lo mismo que con pandas
+# (a veces más, por la conversión), así que ese camino se ofrece por coherencia del motor, no por velocidad.
+import argparse
+import io
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import utils_clientes
+import utils_documentos
+import utils_memoria
+import utils_rendimiento
+from utils_documentos import ALBARAN
+from utils_rendimiento import AGREGACION, CARGA, LIMPIEZA
+
+from . import ingesta
+from .albaranes import CLAVES_NETEO, grupos_cancelados, resumen_albaranes_periodo
+from .config import APP_CONFIG, DATA_CONFIG, MOTORES, normalizar_texto
+
+try:
+    import polars as pl
+    import pyarrow  # noqa: F401  (to_pandas/from_pandas lo necesitan)
+    POLARS_DISPONIBLE = True
+except ImportError:
+    POLARS_DISPONIBLE = False
+
+
+# Valores que pandas.read_csv toma como vacíos por defecto; Polars sólo trata así el campo vacío
+VALORES_NULOS_PANDAS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+COLUMNA_FILA = "__fila"
+COLUMNA_ALBARAN = "__albaran"
+COLUMNAS_RESUMEN = ['codigo_vendedor', 'nomvendedor', 'valor_venta', 'cliente_id', 'categoria_producto', 'nombre_marca']
+CONVERSIONES_MAX = 2
+
+
+def usar_polars(motor: str = None) -> bool:
+    """True si el cálculo debe ir por Polars: 'motor' explícito o, si es None, APP_CONFIG['motor_calculo']."""
+    if motor is None:
+        return APP_CONFIG.get('motor_calculo') == "polars" and POLARS_DISPONIBLE
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor} (usa {' o '.join(MOTORES)})")
+    if motor == "polars" and not POLARS_DISPONIBLE:
+        raise ImportError("El motor 'polars' necesita los paquetes polars y pyarrow.")
+    return motor == "polars"
+
+
+# ==============================================================================
+# INGESTA
+# ==============================================================================
+def _expresion_cliente_id(tipo, tiene_nulos: bool):
+    """astype(str) de pandas: enteros con vacíos se leen como float ('123.0') y el vacío queda 'nan'."""
+    columna = pl.col('cliente_id')
+    if tipo.is_integer() and tiene_nulos:
+        columna = columna.cast(pl.Float64)
+    return columna.cast(pl.Utf8).fill_null('nan')
+
+
+def _expresion_numerica(columna: str, tipo):
+    """pd.to_numeric(errors='coerce'): enteros y decimales se conservan; el texto pasa a Float64 con nulos."""
+    if tipo.is_numeric():
+        return pl.col(columna)
+    return pl.col(columna).cast(pl.Float64, strict=False)
+
+
+def _plan_limpieza(df: pl.DataFrame) -> pl.LazyFrame:
+    """Tipos y filtros de ingesta.limpiar_csv como un solo plan: el filtro de anio/mes baja hasta la lectura."""
+    esquema = dict(zip(df.columns, df.dtypes))
+    plan = df.lazy().with_row_index(COLUMNA_FILA)
+    expresiones = []
+    if 'codigo_vendedor' in esquema:
+        expresiones.append(pl.col('codigo_vendedor').cast(pl.Float64, strict=False).fill_null(0).cast(pl.Int64).cast(pl.Utf8))
+    for columna in ingesta.COLUMNAS_NUMERICAS:
+        if columna in esquema:
+            expresiones.append(_expresion_numerica(columna, esquema[columna]))
+    if 'cliente_id' in esquema:
+        # El tipo de pandas depende de los vacíos de todo el archivo, antes de descartar filas
+        expresiones.append(_expresion_cliente_id(esquema['cliente_id'], df['cliente_id'].null_count() > 0))
+    plan = plan.with_columns(expresiones)
+    plan = plan.filter(pl.col('anio').is_not_null() & pl.col('mes').is_not_null())
+    plan = plan.with_columns(pl.col('anio').cast(pl.Int64), pl.col('mes').cast(pl.Int64))
+    if 'fecha_venta' in esquema and esquema['fecha_venta'] == pl.Utf8:
+        plan = plan.with_columns(pl.col('fecha_venta').str.to_datetime(strict=False, time_unit='ns'))
+    if 'marca_producto' in esquema:
+        mapeo = {float(codigo): nombre for codigo, nombre in DATA_CONFIG["mapeo_marcas"].items()}
+        plan = plan.with_columns(
+            pl.col('marca_producto').cast(pl.Float64)
+            .replace_strict(mapeo, default=None, return_dtype=pl.Utf8).fill_null('No Especificada').alias('nombre_marca')
+        )
+    return plan
+
+
+def _normalizar_columnas(df: pl.DataFrame) -> pl.DataFrame:
+    """normalizar_texto sobre los valores únicos de cada columna de texto; el resto de filas sólo se reemplaza."""
+    reemplazos = []
+    for columna in ingesta.COLUMNAS_A_NORMALIZAR:
+        if columna not in df.columns or df.schema[columna] != pl.Utf8:
+            continue
+        unicos = df[columna].drop_nulls().unique().to_list()
+        mapeo = {valor: normalizar_texto(valor) for valor in unicos}
+        mapeo = {valor: normal for valor, normal in mapeo.items() if normal != valor}
+        if mapeo:
+            reemplazos.append(pl.col(columna).replace(mapeo))
+    return df.with_columns(reemplazos) if reemplazos else df
+
+
+def _a_pandas(df: pl.DataFrame) -> pd.DataFrame:
+    """DataFrame de pandas con el índice y los vacíos (NaN, no None) que deja el camino pandas."""
+    indice = pd.Index(df[COLUMNA_FILA].cast(pl.Int64).to_numpy())
+    resultado = df.drop(COLUMNA_FILA).to_pandas()
+    resultado.index = indice
+    for columna in resultado.columns[resultado.dtypes == object]:
+        if resultado[columna].isna().any():
+            resultado[columna] = resultado[columna].where(resultado[columna].notna(), np.nan)
+    return resultado
+
+
+def limpiar_csv(contenido: bytes, nombres_columnas: list) -> pd.DataFrame:
+    """Mismo contrato y resultado que ingesta.limpiar_csv, leyendo y tipando con Polars (multihilo)."""
+    with utils_rendimiento.medir(CARGA, "lectura CSV (polars)"):
+        # Polars sólo lee UTF-8: se recodifica el latin-1 antes de pasarle los bytes. Las líneas con
+        # campos de más se recortan (pandas las descarta con aviso); en un archivo bien formado no hay.
+        contenido_utf8 = contenido.decode('latin-1').encode('utf-8')
+        df = pl.read_csv(io.BytesIO(contenido_utf8), has_header=False, separator='|', quote_char=None,
+                         infer_schema_length=None, null_values=VALORES_NULOS_PANDAS, truncate_ragged_lines=True)
+    if df.width < 5 and df.height:
+        raise ingesta.ErrorIngesta("Se leyó una sola columna.")
+    if df.width < len(nombres_columnas):
+        df = df.with_columns(pl.lit(None, dtype=pl.Float64).alias(f"column_{i + 1}") for i in range(df.width, len(nombres_columnas)))
+    df.columns = nombres_columnas
+    with utils_rendimiento.medir(LIMPIEZA, "tipos y filtros (polars)"):
+        df = _plan_limpieza(df).collect()
+    with utils_rendimiento.medir(LIMPIEZA, "normalizar_texto (polars)"):
+        df = _normalizar_columnas(df)
+    resultado = _a_pandas(df)
+    with utils_rendimiento.medir(LIMPIEZA, "clase de documento"):
+        return utils_documentos.agregar_clase_documento(resultado)
+
+
+# ==============================================================================
+# AGREGADOS DEL PERIODO
+# ==============================================================================
+_CONVERSIONES = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _convertir(df: pd.DataFrame, columnas: list) -> pl.DataFrame:
+    columnas = [c for c in columnas if c in df.columns]
+    df_pl = pl.from_pandas(df[columnas].reset_index(drop=True))
+    clase = utils_documentos.mascara_clase(df, ALBARAN).to_numpy()
+    return df_pl.with_columns(
+        pl.Series('es_albaran', clase),
+        pl.Series('es_venta_neta', utils_documentos.mascara_venta_neta(df).to_numpy()),
+    )
+
+
+def _cancelados_polars(df_ventas_historicas: pd.DataFrame) -> pl.DataFrame:
+    """
+    Grupos cancelados del histórico, marcados con 'cancelado', listos para el join; se reutilizan mientras
+    el histórico no cambie. El neto se calcula con albaranes.grupos_cancelados: un grupo cuenta como
+    cancelado sólo si su suma es exactamente cero, y la suma de Polars (en otro orden que la de pandas)
+    deja residuos de coma flotante que cambiarían qué albaranes quedan pendientes.
+    """
+    clave = (id(df_ventas_historicas), utils_clientes.version_ventas(df_ventas_historicas))
+    with _LOCK:
+        if clave in _CONVERSIONES:
+            _CONVERSIONES.move_to_end(clave)
+            return _CONVERSIONES[clave]
+    df_cancelados = grupos_cancelados(df_ventas_historicas)[CLAVES_NETEO].reset_index(drop=True)
+    df_pl = pl.from_pandas(df_cancelados).with_columns(cancelado=pl.lit(True))
+    with _LOCK:
+        _CONVERSIONES[clave] = df_pl
+        while len(_CONVERSIONES) > CONVERSIONES_MAX:
+            _CONVERSIONES.popitem(last=False)
+    return df_pl
+
+
+def limpiar_conversiones():
+    with _LOCK:
+        _CONVERSIONES.clear()
+
+
+utils_memoria.registrar_liberable("motor_polars.conversiones", limpiar_conversiones)
+
+
+def _por_vendedor(plan: pl.LazyFrame, claves: list, **agregados) -> pl.LazyFrame:
+    """groupby(...).agg(...).reset_index() de pandas: sin grupos con clave vacía y ordenado por clave."""
+    return plan.filter(pl.all_horizontal([pl.col(c).is_not_null() for c in claves])).group_by(claves).agg(**agregados).sort(claves)
+
+
+def _filas_pendientes(ventas: pl.LazyFrame, cancelados: pl.DataFrame) -> tuple:
+    """
+    (posiciones en el periodo, posiciones entre sus albaranes) de los albaranes que no pertenecen a un grupo
+    cancelado. La segunda es el índice que deja el merge de albaranes.albaranes_pendientes.
+    """
+    pendientes = (
+        ventas.with_row_index(COLUMNA_FILA).filter(pl.col('es_albaran')).with_row_index(COLUMNA_ALBARAN)
+        .join(cancelados.lazy(), on=CLAVES_NETEO, how='left')
+        .filter(pl.col('cancelado').is_null()).select(COLUMNA_FILA, COLUMNA_ALBARAN).sort(COLUMNA_FILA)
+        .collect()
+    )
+    return pendientes[COLUMNA_FILA].to_numpy(), pendientes[COLUMNA_ALBARAN].cast(pl.Int64).to_numpy()
+
+
+def resumenes_periodo(df_ventas_periodo: pd.DataFrame, df_cobros_periodo: pd.DataFrame, df_ventas_historicas: pd.DataFrame) -> tuple:
+    """Mismo contrato que kpis.resumenes_periodo: los recorridos de filas van en un plan perezoso por resultado."""
+    claves = ['codigo_vendedor', 'nomvendedor']
+    with utils_rendimiento.medir(AGREGACION, "resúmenes del periodo (polars)"):
+        ventas = _convertir(df_ventas_periodo, list(dict.fromkeys(COLUMNAS_RESUMEN + CLAVES_NETEO))).lazy()
+        netas = ventas.filter(pl.col('es_venta_neta'))
+        cobros = pl.from_pandas(df_cobros_periodo[['codigo_vendedor', 'valor_cobro']].reset_index(drop=True)).lazy()
+        marca_sub_meta = APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo']
+        planes = [
+            _por_vendedor(netas, claves, ventas_totales=pl.col('valor_venta').sum(),
+                          impactos=pl.col('cliente_id').drop_nulls().n_unique().cast(pl.Int64)),
+            _por_vendedor(cobros, ['codigo_vendedor'], cobros_totales=pl.col('valor_cobro').sum()),
+            _por_vendedor(netas.filter(pl.col('categoria_producto').is_in(APP_CONFIG['categorias_clave_venta'])),
+                          claves, ventas_complementarios=pl.col('valor_venta').sum()),
+            _por_vendedor(netas.filter(pl.col('nombre_marca') == marca_sub_meta), claves, ventas_sub_meta=pl.col('valor_venta').sum()),
+        ]
+        # collect_all optimiza los planes juntos: 'netas' se calcula una sola vez para los tres que la usan
+        resumenes = [df.to_pandas() for df in pl.collect_all(planes)]
+
+    with utils_rendimiento.medir(AGREGACION, "neteo de albaranes (polars)"):
+        df_albaranes_bruto = df_ventas_periodo[utils_documentos.mascara_clase(df_ventas_periodo, ALBARAN)].copy()
+        cancelados = _cancelados_polars(df_ventas_historicas)
+        if df_albaranes_bruto.empty or cancelados.is_empty():
+            # Como albaranes.albaranes_pendientes: sin nada que netear se devuelve la copia con su índice
+            df_albaranes_reales_pendientes = df_albaranes_bruto
+        else:
+            filas, indice = _filas_pendientes(ventas, cancelados)
+            df_albaranes_reales_pendientes = df_ventas_periodo.iloc[filas].copy()
+            df_albaranes_reales_pendientes.index = pd.Index(indice)
+        resumen_albaranes = resumen_albaranes_periodo(df_albaranes_reales_pendientes)
+    return (*resumenes, df_albaranes_reales_pendientes, resumen_albaranes)
+
+
+# ==============================================================================
+# VALIDACIÓN CONTRA PANDAS
+# ==============================================================================
+def _comparar(nombre: str, esperado: pd.DataFrame, obtenido: pd.DataFrame, diferencias: list):
+    try:
+        pd.testing.assert_frame_equal(esperado, obtenido, check_exact=False, rtol=1e-9, check_categorical=True)
+    except AssertionError as e:
+        diferencias.append(f"{nombre}: {e}")
+
+
+def validar(directorio: str, anio: int = None, mes: int = None) -> tuple:
+    """
+    Ejecuta ingesta y procesar_datos_periodo con ambos motores sobre 'directorio'.
+    Devuelve (diferencias, {paso: (segundos pandas, segundos polars)}); sin diferencias, la lista queda vacía.
+    """
+    from .kpis import procesar_datos_periodo
+    from .presupuesto import calcular_presupuesto_dinamico_global
+
+    diferencias, tiempos, resultados = [], {}, {}
+    for fuente in ('ventas', 'cobros'):
+        contenido = ingesta._leer_bytes(ingesta.ruta_local(directorio, fuente))
+        por_motor = {}
+        for motor in MOTORES:
+            inicio = time.perf_counter()
+            por_motor[motor] = ingesta.limpiar_csv(contenido, APP_CONFIG['column_names'][fuente], motor=motor)
+            tiempos.setdefault(f"ingesta {fuente}", []).append(time.perf_counter() - inicio)
+        _comparar(f"ingesta {fuente}", por_motor['pandas'], por_motor['polars'], diferencias)
+        resultados[fuente] = por_motor['pandas']
+
+    df_ventas, df_cobros = resultados['ventas'], resultados['cobros']
+    anio = anio if anio is not None else int(df_ventas['anio'].max())
+    mes = mes if mes is not None else int(df_ventas.loc[df_ventas['anio'] == anio, 'mes'].max())
+    ventas_periodo = df_ventas[(df_ventas['anio'] == anio) & (df_ventas['mes'] == mes)]
+    cobros_periodo = df_cobros[(df_cobros['anio'] == anio) & (df_cobros['mes'] == mes)]
+    df_presupuesto = calcular_presupuesto_dinamico_global(df_ventas)
+    por_motor = {}
+    for motor in MOTORES:
+        inicio = time.perf_counter()
+        por_motor[motor] = procesar_datos_periodo(ventas_periodo, cobros_periodo, df_ventas, anio, mes, df_presupuesto, motor=motor)
+        tiempos.setdefault(f"kpis {anio}-{mes:02d}", []).append(time.perf_counter() - inicio)
+    _comparar("resumen del periodo", por_motor['pandas'][0], por_motor['polars'][0], diferencias)
+    _comparar("albaranes del periodo", por_motor['pandas'][1], por_motor['polars'][1], diferencias)
+    return diferencias, {paso: tuple(segundos) for paso, segundos in tiempos.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m nucleo.motor_polars", description="Compara el motor Polars con pandas.")
+    parser.add_argument('--datos', help="Carpeta con ventas_detalle.csv y cobros_detalle.csv (p. ej. de utils_datos_sinteticos)")
+    parser.add_argument('--lineas', default='200k', help="Sin --datos: líneas sintéticas a generar (por defecto 200k)")
+    parser.add_argument('--anio', type=int, help="Año del periodo (por defecto el último con ventas)")
+    parser.add_argument('--mes', type=int, help="Mes del periodo (por defecto el último con ventas)")
+    args = parser.parse_args(argv)
+
+    if not POLARS_DISPONIBLE:
+        print("Error: el motor 'polars' necesita los paquetes polars y pyarrow.", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = args.datos
+        if not directorio:
+            import utils_datos_sinteticos
+            directorio = temporal
+            utils_datos_sinteticos.generar_datos(directorio, utils_datos_sinteticos.parsear_escala(args.lineas))
+        diferencias, tiempos = validar(directorio, args.anio, args.mes)
+    for paso, (pandas_s, polars_s) in tiempos.items():
+        print(f"{paso:<20} pandas {pandas_s:>8.3f} s   polars {polars_s:>8.3f} s")
+    for diferencia in diferencias:
+        print(f"DIFERENCIA {diferencia}", file=sys.stderr)
+    print("Resultados idénticos." if not diferencias else f"{len(diferencias)} resultado(s) distinto(s).")
+    return 1 if diferencias else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Paquetes de cierre de mes: resumen, albaranes, oportunidades y ventas de cada vendedor/grupo pre-generados en paralelo"""
+# Uso (p. ej. cada noche desde cron, sobre la copia local de los archivos de Dropbox):
+#   python -m nucleo.paquetes --datos <carpeta> --anio 2025 --mes 12 --procesos 4
+#   0 2 * * * cd /srv/tablero && python -m nucleo.paquetes --datos /srv/datos
+# Cada periodo queda en <artefactos>/<anio>-<mes>/ con un manifiesto.json que guarda la huella de
+# los datos de origen; el tablero sólo usa el paquete si la huella coincide con los datos cargados.
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+import utils_clientes
+import utils_documentos
+import utils_excel
+import utils_rendimiento
+
+from . import cl4, ingesta
+from .cli import DatosLocales
+from .exportacion import (
+    COLUMNAS_VENTAS_MENSUAL,
+    escribir_parquet,
+    excel_oportunidades,
+    excel_ventas_mensual,
+    exportar_albaranes_anuales,
+    preparar_ventas_mensual
+)
+from .kpis import expandir_grupos, procesar_datos_periodo
+from .presupuesto import calcular_presupuesto_dinamico_global
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_PAQUETES = os.environ.get("PAQUETES_DIR", os.path.join(RAIZ, ".cache", "paquetes"))
+
+MANIFIESTO = "manifiesto.json"
+ALCANCE_GERENTE = "GERENTE"
+
+# Resultados globales del periodo (los mismos para todos los usuarios)
+ARCHIVOS_PERIODO = ('resumen', 'albaranes', 'cl4')
+ARCHIVO_ALBARANES_ANUALES = "albaranes_anuales.xlsx"
+# Archivos de cada alcance (vendedor, grupo o GERENTE con todos)
+ARCHIVO_OPORTUNIDADES = "oportunidades_cl4.xlsx"
+ARCHIVO_VENTAS_MES = "ventas_mes.xlsx"
+
+
+def _version(df: pd.DataFrame, col_fecha: str) -> list:
+    if df is None or df.empty:
+        return [0, None]
+    return [int(len(df)), str(df[col_fecha].max())]
+
+
+def huella_datos(df_ventas: pd.DataFrame, df_cobros: pd.DataFrame = None, df_cl4: pd.DataFrame = None) -> dict:
+    """Huella (serializable en JSON) de las fuentes: filas y última fecha de ventas y cobros, filas del CL4."""
+    filas, fecha_max = utils_clientes.version_ventas(df_ventas)
+    return {
+        'ventas': [int(filas), None if fecha_max is None else str(fecha_max)],
+        'cobros': _version(df_cobros, 'fecha_cobro'),
+        'cl4': 0 if df_cl4 is None else int(len(df_cl4)),
+    }
+
+
+def directorio_periodo(base: str, anio: int, mes: int) -> str:
+    return os.path.join(base, f"{int(anio)}-{int(mes):02d}")
+
+
+def nombre_directorio(alcance: str) -> str:
+    """Nombre de carpeta seguro para un alcance (los nombres ya vienen normalizados en mayúsculas)."""
+    return "".join(c if c.isalnum() else "_" for c in alcance)
+
+
+# ==============================================================================
+# LECTURA (TABLERO)
+# ==============================================================================
+def leer_manifiesto(base: str, anio: int, mes: int):
+    try:
+        with open(os.path.join(directorio_periodo(base, anio, mes), MANIFIESTO), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def marca_periodo(base: str, anio: int, mes: int):
+    """Fecha de modificación del manifiesto (o None): invalida las cachés cuando se regenera el paquete."""
+    try:
+        return os.path.getmtime(os.path.join(directorio_periodo(base, anio, mes), MANIFIESTO))
+    except OSError:
+        return None
+
+
+def manifiesto_vigente(base: str, anio: int, mes: int, huella: dict):
+    """Manifiesto del periodo si se generó con exactamente los mismos datos; si no, None."""
+    manifiesto = leer_manifiesto(base, anio, mes)
+    return manifiesto if manifiesto is not None and manifiesto.get('huella') == huella else None
+
+
+def leer_periodo(base: str, anio: int, mes: int, huella: dict):
+    """{'resumen', 'albaranes', 'cl4'} del paquete vigente, o None si no hay paquete para estos datos."""
+    if not utils_excel.PARQUET_DISPONIBLE or manifiesto_vigente(base, anio, mes, huella) is None:
+        return None
+    directorio = directorio_periodo(base, anio, mes)
+    return {nombre: pd.read_parquet(os.path.join(directorio, f"{nombre}.parquet")) for nombre in ARCHIVOS_PERIODO}
+
+
+def archivos_vigentes(base: str, anio: int, mes: int, huella: dict, alcance: str = None) -> dict:
+    """{archivo: ruta} de los archivos globales del periodo y, si se indica, de los del alcance."""
+    manifiesto = manifiesto_vigente(base, anio, mes, huella)
+    if manifiesto is None:
+        return {}
+    directorio = directorio_periodo(base, anio, mes)
+    rutas = {archivo: os.path.join(directorio, archivo) for archivo in manifiesto['archivos']}
+    entrada = manifiesto['alcances'].get(alcance) if alcance is not None else None
+    if entrada:
+        rutas.update({archivo: os.path.join(directorio, entrada['directorio'], archivo) for archivo in entrada['archivos']})
+    return rutas
+
+
+def leer_archivo(ruta: str) -> bytes:
+    with open(ruta, 'rb') as archivo:
+        return archivo.read()
+
+
+# ==============================================================================
+# GENERACIÓN (PROCESO POR LOTES)
+# ==============================================================================
+_COMPARTIDO = {}
+
+
+def _iniciar_trabajador(compartido: dict):
+    """Cada proceso recibe una sola vez los resultados globales del periodo."""
+    _COMPARTIDO.update(compartido)
+
+
+def alcances_del_periodo(df_resumen: pd.DataFrame) -> dict:
+    """{alcance: (vendedores del resumen, nombres de vendedor)}: uno por vendedor/grupo y GERENTE con todos."""
+    vendedores = sorted(df_resumen['nomvendedor'].unique())
+    alcances = {v: ([v], expandir_grupos([v])) for v in vendedores}
+    alcances[ALCANCE_GERENTE] = (vendedores, expandir_grupos(vendedores))
+    return alcances
+
+
+def generar_alcance(directorio: str, alcance: str, vendedores: list, nombres: list) -> dict:
+    """Escribe los Parquet y XLSX de un alcance y devuelve su entrada del manifiesto."""
+    inicio = time.perf_counter()
+    subdirectorio = nombre_directorio(alcance)
+    destino = os.path.join(directorio, subdirectorio)
+    os.makedirs(destino, exist_ok=True)
+    archivos = []
+
+    def guardar_parquet(nombre, df):
+        escribir_parquet(df, os.path.join(destino, f"{nombre}.parquet"))
+        archivos.append(f"{nombre}.parquet")
+
+    def guardar_excel(nombre, contenido):
+        with open(os.path.join(destino, nombre), 'wb') as archivo:
+            archivo.write(contenido)
+        archivos.append(nombre)
+
+    df_resumen = _COMPARTIDO['resumen']
+    guardar_parquet('resumen', df_resumen[df_resumen['nomvendedor'].isin(vendedores)])
+
+    df_albaranes = _COMPARTIDO['albaranes']
+    if not df_albaranes.empty:
+        guardar_parquet('albaranes', df_albaranes[df_albaranes['nomvendedor'].isin(nombres)])
+
+    df_oportunidades = cl4.oportunidades(_COMPARTIDO['cl4'], nombres)
+    if not df_oportunidades.empty:
+        guardar_parquet('oportunidades', df_oportunidades)
+        guardar_excel(ARCHIVO_OPORTUNIDADES, excel_oportunidades(cl4.tabla_descarga_oportunidades(df_oportunidades)))
+
+    df_facturas = _COMPARTIDO['facturas']
+    df_facturas = df_facturas[df_facturas['nomvendedor'].isin(nombres)]
+    if not df_facturas.empty:
+        df_ventas_mes = preparar_ventas_mensual(df_facturas)
+        guardar_parquet('ventas_mes', df_ventas_mes)
+        guardar_excel(ARCHIVO_VENTAS_MES, excel_ventas_mensual(df_ventas_mes, preparado=True))
+
+    return {'directorio': subdirectorio, 'archivos': archivos, 'segundos': round(time.perf_counter() - inicio, 3)}
+
+
+def _publicar(temporal: str, destino: str):
+    """Reemplaza el paquete anterior por el nuevo sin dejar nunca a medias el directorio servido."""
+    anterior = f"{destino}.anterior-{os.getpid()}"
+    if os.path.isdir(destino):
+        os.replace(destino, anterior)
+    os.replace(temporal, destino)
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+def generar_paquetes(df_ventas: pd.DataFrame, df_cobros: pd.DataFrame, df_cl4: pd.DataFrame, anio: int, mes: int,
+                     base: str = DIRECTORIO_PAQUETES, procesos: int = None) -> dict:
+    """
+    Calcula una sola vez los resultados globales del periodo (KPIs, albaranes, CL4 con vendedor) y
+    reparte entre 'procesos' trabajadores los archivos de cada alcance. Devuelve el manifiesto.
+    """
+    if not utils_excel.PARQUET_DISPONIBLE:
+        raise ImportError("Los paquetes se guardan en Parquet: instala 'pyarrow'.")
+    inicio = time.perf_counter()
+    df_ventas_periodo = df_ventas[(df_ventas['anio'] == anio) & (df_ventas['mes'] == mes)]
+    df_cobros_periodo = df_cobros[(df_cobros['anio'] == anio) & (df_cobros['mes'] == mes)] if not df_cobros.empty else pd.DataFrame()
+
+    with utils_rendimiento.medir(utils_rendimiento.PROCESO, "paquetes.periodo"):
+        df_resumen, df_albaranes = procesar_datos_periodo(
+            df_ventas_periodo, df_cobros_periodo, df_ventas, anio, mes,
+            df_presupuesto_mensual=calcular_presupuesto_dinamico_global(df_ventas)
+        )
+        df_cl4_actualizado = cl4.actualizar_oportunidades_con_ventas_del_trimestre(df_cl4, df_ventas, anio, mes)
+        df_cl4_con_vendedor = cl4.cl4_con_vendedor(df_cl4_actualizado, utils_clientes.construir_indice_propietarios(df_ventas))
+        df_facturas = df_ventas_periodo[utils_documentos.mascara_venta_neta(df_ventas_periodo)][list(COLUMNAS_VENTAS_MENSUAL)]
+
+    destino = directorio_periodo(base, anio, mes)
+    temporal = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    for nombre, df in (('resumen', df_resumen), ('albaranes', df_albaranes), ('cl4', df_cl4_con_vendedor)):
+        escribir_parquet(df, os.path.join(temporal, f"{nombre}.parquet"))
+
+    compartido = {'resumen': df_resumen, 'albaranes': df_albaranes, 'cl4': df_cl4_con_vendedor, 'facturas': df_facturas}
+    archivos = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=(compartido,)) as pool:
+        futuros = {
+            pool.submit(generar_alcance, temporal, alcance, vendedores, nombres): alcance
+            for alcance, (vendedores, nombres) in alcances_del_periodo(df_resumen).items()
+        }
+        # El reporte anual no depende del alcance: lo arma el proceso principal mientras los trabajadores avanzan
+        with utils_rendimiento.medir(utils_rendimiento.PROCESO, "paquetes.albaranes_anuales"):
+            try:
+                contenido, _, _ = exportar_albaranes_anuales(df_ventas, anio, utils_excel.FORMATO_EXCEL)
+            except ValueError:
+                contenido = None
+        if contenido is not None:
+            with open(os.path.join(temporal, ARCHIVO_ALBARANES_ANUALES), 'wb') as archivo:
+                archivo.write(contenido)
+            archivos.append(ARCHIVO_ALBARANES_ANUALES)
+        alcances = {futuros[futuro]: futuro.result() for futuro in as_completed(futuros)}
+
+    manifiesto = {
+        'anio': int(anio),
+        'mes': int(mes),
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'huella': huella_datos(df_ventas, df_cobros, df_cl4),
+        'archivos': archivos,
+        'alcances': dict(sorted(alcances.items())),
+    }
+    with open(os.path.join(temporal, MANIFIESTO), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+    _publicar(temporal, destino)
+    return manifiesto
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m nucleo.paquetes", description="Pre-genera los paquetes de cierre de mes de cada vendedor y grupo.")
+    parser.add_argument('--datos', required=True, help="Carpeta con ventas_detalle.csv, cobros_detalle.csv y reporte_cl4.xlsx")
+    parser.add_argument('--artefactos', default=DIRECTORIO_PAQUETES, help="Carpeta que sirve el tablero (variable PAQUETES_DIR)")
+    parser.add_argument('--anio', type=int, help="Año del periodo (por defecto el último con ventas)")
+    parser.add_argument('--mes', type=int, help="Mes del periodo (por defecto el último con ventas)")
+    parser.add_argument('--procesos', type=int, help="Procesos trabajadores (por defecto, uno por CPU)")
+    args = parser.parse_args(argv)
+
+    datos = DatosLocales(args.datos, args.anio, args.mes)
+    try:
+        anio, mes = datos.periodo
+        manifiesto = generar_paquetes(datos.ventas, datos.cobros, datos.cl4, anio, mes, args.artefactos, args.procesos)
+    except (ingesta.ErrorIngesta, FileNotFoundError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for alcance, entrada in manifiesto['alcances'].items():
+        print(f"{alcance:<40} {len(entrada['archivos'])} archivos ({entrada['segundos']:.2f} s)")
+    print(f"{len(manifiesto['alcances'])} alcances en {directorio_periodo(args.artefactos, anio, mes)} ({manifiesto['segundos']:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Periodos comparables (YTD, QTD, MTD): el mismo corte de mes y día aplicado a cada año"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import utils_memoria
+import utils_rendimiento
+from utils_rendimiento import PROCESO
+
+COMPLETO = "COMPLETO"
+ALCANCES = {
+    COMPLETO: "Año completo",
+    'YTD': "Año a la fecha (YTD)",
+    'QTD': "Trimestre a la fecha (QTD)",
+    'MTD': "Mes a la fecha (MTD)",
+}
+MASCARAS_MAX = 8
+
+
+def fecha_corte(df: pd.DataFrame, col_fecha: str = 'fecha_venta'):
+    """Último día con ventas (el corte por defecto), o None si no hay fechas."""
+    if df.empty or col_fecha not in df.columns:
+        return None
+    ultima = df[col_fecha].max()
+    return None if pd.isna(ultima) else pd.Timestamp(ultima).normalize()
+
+
+def corte_del_mes(df: pd.DataFrame, anio: int, mes: int, col_fecha: str = 'fecha_venta') -> pd.Timestamp:
+    """Corte para un mes elegido: su último día o, si es el mes en curso de los datos, el último día con ventas."""
+    fin_mes = pd.Timestamp(year=int(anio), month=int(mes), day=1) + pd.offsets.MonthEnd(0)
+    ultima = fecha_corte(df, col_fecha)
+    return fin_mes if ultima is None else min(fin_mes, ultima)
+
+
+def etiqueta(alcance: str, corte) -> str:
+    """Texto corto para la interfaz, p. ej. 'YTD al 15/10'."""
+    if alcance == COMPLETO or corte is None:
+        return ALCANCES[COMPLETO]
+    return f"{alcance} al {pd.Timestamp(corte):%d/%m}"
+
+
+def mascara_periodo(df: pd.DataFrame, alcance: str, corte, col_fecha: str = 'fecha_venta') -> np.ndarray:
+    """
+    Filas dentro del periodo comparable de su propio año: mismo mes/día de corte para todos los años.
+    Sin 'col_fecha' se usa 'mes' (el mes del corte entra completo). Las fechas vacías quedan fuera.
+    """
+    if alcance not in ALCANCES:
+        raise ValueError(f"Alcance desconocido: {alcance} (usa {', '.join(ALCANCES)})")
+    if alcance == COMPLETO:
+        return np.ones(len(df), dtype=bool)
+    corte = pd.Timestamp(corte)
+    if col_fecha in df.columns:
+        fechas = pd.to_datetime(df[col_fecha], errors='coerce')
+        mes = fechas.dt.month.to_numpy(dtype=float, na_value=np.nan)
+        mes_dia = mes * 100 + fechas.dt.day.to_numpy(dtype=float, na_value=np.nan)
+        mascara = mes_dia <= corte.month * 100 + corte.day
+    else:
+        mes = df['mes'].to_numpy(dtype=float)
+        mascara = mes <= corte.month
+    if alcance == 'MTD':
+        mascara &= mes == corte.month
+    elif alcance == 'QTD':
+        mascara &= (mes - 1) // 3 == (corte.month - 1) // 3
+    return mascara
+
+
+# ==============================================================================
+# CACHÉ POR (ALCANCE, CORTE, VERSIÓN DE DATOS)
+# ==============================================================================
+_MASCARAS = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _version(df: pd.DataFrame, col_fecha: str) -> tuple:
+    """Huella barata, como utils_clientes.version_ventas, más el id del DataFrame (la máscara va por posición)."""
+    ultima = df[col_fecha].max() if col_fecha in df.columns and not df.empty else None
+    return (id(df), len(df), ultima)
+
+
+def periodo_comparable(df: pd.DataFrame, alcance: str, corte=None, version=None, col_fecha: str = 'fecha_venta') -> np.ndarray:
+    """
+    mascara_periodo memoizada por (alcance, corte, versión de datos). 'corte' por defecto es fecha_corte(df);
+    'version' identifica el DataFrame (por defecto, su id, filas y última fecha).
+    La máscara devuelta es de sólo lectura y está alineada por posición con 'df'.
+    """
+    corte = corte if corte is not None else fecha_corte(df, col_fecha)
+    if corte is None:
+        return mascara_periodo(df, COMPLETO, None)
+    clave = (alcance, pd.Timestamp(corte).date(), version if version is not None else _version(df, col_fecha), col_fecha)
+    with _LOCK:
+        if clave in _MASCARAS:
+            _MASCARAS.move_to_end(clave)
+            return _MASCARAS[clave]
+    with utils_rendimiento.medir(PROCESO, f"periodo comparable {alcance}"):
+        mascara = mascara_periodo(df, alcance, corte, col_fecha)
+    mascara.flags.writeable = False
+    with _LOCK:
+        _MASCARAS[clave] = mascara
+        while len(_MASCARAS) > MASCARAS_MAX:
+            _MASCARAS.popitem(last=False)
+    return mascara
+
+
+def limpiar_mascaras():
+    with _LOCK:
+        _MASCARAS.clear()
+
+
+utils_memoria.registrar_liberable("periodos_comparables", limpiar_mascaras)
+
+
+def mascara_comparable(df: pd.DataFrame, alcance: str, corte=None, base: pd.DataFrame = None, col_fecha: str = 'fecha_venta') -> np.ndarray:
+    """
+    Como periodo_comparable; con 'base' (el histórico del que 'df' es un recorte) la máscara se cachea
+    sobre 'base', que no cambia entre recargas de la página, y se toma por índice.
+    """
+    if base is None or base is df or not base.index.is_unique:
+        return periodo_comparable(df, alcance, corte, col_fecha=col_fecha)
+    mascara_base = periodo_comparable(base, alcance, corte, col_fecha=col_fecha)
+    return pd.Series(mascara_base, index=base.index).reindex(df.index, fill_value=False).to_numpy()
+
+
+def filtrar_periodo(df: pd.DataFrame, alcance: str, corte=None, version=None, col_fecha: str = 'fecha_venta') -> pd.DataFrame:
+    """Filas del periodo comparable de cada año (el mismo DataFrame si el alcance es el año completo)."""
+    if alcance == COMPLETO:
+        return df
+    return df[periodo_comparable(df, alcance, corte, version, col_fecha)]
+
+
+def crecimiento_comparable(df: pd.DataFrame, anio: int, alcance: str, corte, col_valor: str = 'valor_venta',
+                           base: pd.DataFrame = None) -> dict:
+    """
+    Venta de 'anio' y de 'anio - 1' hasta el mismo corte de mes y día: {'actual', 'anterior', 'variacion_pct'}.
+    'variacion_pct' es None sin venta anterior.
+    """
+    mascara = mascara_comparable(df, alcance, corte, base)
+    anios = df['anio'].to_numpy()
+    valores = df[col_valor].to_numpy(dtype=float)
+    actual = float(np.nansum(valores[mascara & (anios == anio)]))
+    anterior = float(np.nansum(valores[mascara & (anios == anio - 1)]))
+    return {
+        'actual': actual,
+        'anterior': anterior,
+        'variacion_pct': (actual - anterior) / anterior * 100 if anterior > 0 else None,
+    }
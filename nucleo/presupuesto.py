@@ -0,0 +1,58 @@
+"""Presupuesto de ventas: dinámico por vendedor y mes (utils_presupuesto) y excepción de julio 2026"""
+import pandas as pd
+
+import utils_documentos
+import utils_presupuesto
+
+from .config import DATA_CONFIG, normalizar_texto
+
+
+def calcular_presupuesto_dinamico_global(df_ventas_historicas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Función que envuelve la lógica del utils_presupuesto para calcular
+    el presupuesto dinámico para todo el año 2026.
+    """
+    # 1. Obtener totales 2024 y 2025 para la proyección global
+    total_2024 = df_ventas_historicas[df_ventas_historicas['anio'] == 2024]['valor_venta'].sum()
+    total_2025 = df_ventas_historicas[df_ventas_historicas['anio'] == 2025]['valor_venta'].sum()
+
+    # 2. Proyectar Total 2026 usando la lógica del utils
+    target_2026, tasa_crec = utils_presupuesto.proyectar_total_2026(total_2024, total_2025)
+
+    # 3. Asignar presupuesto anual por vendedor
+    # Nota: Asegurarse de que el DataFrame histórico esté limpio y tenga columnas correctas
+    df_asignacion_anual = utils_presupuesto.asignar_presupuesto(
+        df_ventas_historicas,
+        DATA_CONFIG['grupos_vendedores'],
+        target_2026
+    )
+
+    # 4. Distribuir mensualmente según estacionalidad histórica individual
+    df_presupuesto_mensual = utils_presupuesto.distribuir_presupuesto_mensual(
+        df_asignacion_anual,
+        df_ventas_historicas
+    )
+
+    # Normalizar nombres para facilitar el merge posterior
+    df_presupuesto_mensual['nomvendedor'] = df_presupuesto_mensual['nomvendedor'].apply(normalizar_texto)
+
+    return df_presupuesto_mensual
+
+
+def calcular_mejor_venta_semestre(df_ventas_historicas: pd.DataFrame, anio: int, meses=range(1, 7)) -> dict:
+    """
+    EXCEPCIÓN JULIO: por cada vendedor devuelve su MEJOR venta NETA mensual
+    (facturas + notas crédito) dentro de los meses indicados del año dado.
+    Retorna un dict {nomvendedor_normalizado: mejor_venta_mensual}.
+    """
+    df = df_ventas_historicas[
+        (df_ventas_historicas['anio'] == anio) &
+        (df_ventas_historicas['mes'].isin(list(meses))) &
+        utils_documentos.mascara_venta_neta(df_ventas_historicas)
+    ]
+    if df.empty:
+        return {}
+    # Venta neta por vendedor y mes, luego el mejor mes de cada vendedor
+    ventas_mes = df.groupby(['nomvendedor', 'mes'])['valor_venta'].sum().reset_index()
+    mejor = ventas_mes.groupby('nomvendedor')['valor_venta'].max()
+    return {normalizar_texto(k): v for k, v in mejor.items()}
@@ -5,6 +5,14 @@ Versión 2.0 - Arquitectura Modular
 
 from .config import AppConfig, FerreinoxColors, configurar_pagina
 from .data_loader import cargar_y_validar_datos
+from .context import ContextoAnalisis, obtener_contexto, limpiar_contextos, huella_datos
+from .consultas import Consulta, FuenteDatos, obtener_fuente, limpiar_fuentes
+from .indice_filtros import IndiceFiltros, obtener_indice, limpiar_indices
+from .llm_cache import CacheLLM, BackendOpenAI, BackendStub, completar_con_cache
+from .ai_jobs import TrabajoIA, enviar_trabajo_ia, transmitir_trabajo
+from .ai_analysis import iniciar_analisis_ia, mostrar_narrativa_ia
+from .lazy_tabs import selector_tabs
+from .pdf_generator import generar_reporte_completo, generar_listado_clientes, limpiar_cache_pdf
 from .ui_components import (
     renderizar_sidebar,
     aplicar_filtros,
@@ -27,6 +35,30 @@ __all__ = [
     'FerreinoxColors',
     'configurar_pagina',
     'cargar_y_validar_datos',
+    'ContextoAnalisis',
+    'obtener_contexto',
+    'limpiar_contextos',
+    'huella_datos',
+    'Consulta',
+    'FuenteDatos',
+    'obtener_fuente',
+    'limpiar_fuentes',
+    'IndiceFiltros',
+    'obtener_indice',
+    'limpiar_indices',
+    'CacheLLM',
+    'BackendOpenAI',
+    'BackendStub',
+    'completar_con_cache',
+    'TrabajoIA',
+    'enviar_trabajo_ia',
+    'transmitir_trabajo',
+    'iniciar_analisis_ia',
+    'mostrar_narrativa_ia',
+    'selector_tabs',
+    'generar_reporte_completo',
+    'generar_listado_clientes',
+    'limpiar_cache_pdf',
     'renderizar_sidebar',
     'aplicar_filtros',
     'validar_datos_filtrados',
@@ -1,8 +1,47 @@
 """Motor de análisis ejecutivo con IA - GPT-4 Mini"""
 import streamlit as st
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
+import os
+
+from .config import AppConfig
+from .llm_cache import BackendOpenAI, BackendStub, completar_con_cache, obtener_cache
+from .ai_jobs import TrabajoIA, enviar_trabajo_ia, transmitir_trabajo
+
+PROMPT_SISTEMA_CFO = """Eres el CFO y Director Estratégico de una empresa de distribución industrial.
+                    Tu especialidad es análisis de crecimiento, identificación de motores de negocio y gestión de portafolio.
+                    Generas análisis ejecutivos concisos, contundentes y 100% accionables.
+                    Usas datos específicos, porcentajes y cifras concretas.
+                    Tu estilo es directo, sin relleno, solo insights que generan decisiones."""
+
+
+def obtener_backend_llm():
+    """
+    Devuelve el backend configurado o None si no hay IA disponible.
+    LLM_BACKEND=stub (variable de entorno o AppConfig) usa el backend local de pruebas;
+    LLM_BASE_URL apunta el cliente OpenAI a otro servidor compatible (p. ej. uno falso local).
+    """
+    config = AppConfig()
+    tipo = os.environ.get("LLM_BACKEND", config.LLM_BACKEND).lower()
+    if tipo == "stub":
+        return BackendStub()
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        return None
+    base_url = os.environ.get("LLM_BASE_URL", config.LLM_BASE_URL)
+    api_key = st.secrets.get("OPENAI_API_KEY", "") or ("local" if base_url else "")
+    if not api_key:
+        return None
+    return BackendOpenAI(api_key, base_url=base_url)
+
+
+def cache_llm():
+    config = AppConfig()
+    return obtener_cache(config.LLM_CACHE_DIR, config.LLM_CACHE_TTL, config.LLM_CACHE_MAX_MB * 1024 * 1024)
+
 
 def analizar_con_ia_avanzado(
     df_actual: pd.DataFrame,
@@ -18,18 +57,11 @@ def analizar_con_ia_avanzado(
     """
     
     try:
-        # Verificar OpenAI
-        try:
-            from openai import OpenAI
-        except ImportError:
-            return _analisis_manual_avanzado(df_actual, df_anterior, metricas, lineas_estrategicas)
-        
-        api_key = st.secrets.get("OPENAI_API_KEY", "")
-        if not api_key:
+        # Verificar backend de IA
+        backend = obtener_backend_llm()
+        if backend is None:
             return _analisis_manual_avanzado(df_actual, df_anterior, metricas, lineas_estrategicas)
         
-        client = OpenAI(api_key=api_key)
-        
         # Preparar análisis detallado de líneas
         analisis_lineas = _analizar_lineas_estrategicas(df_actual, df_anterior, lineas_estrategicas)
         
@@ -41,29 +73,19 @@ def analizar_con_ia_avanzado(
             metricas, analisis_lineas, analisis_clientes
         )
         
-        # Llamar a GPT-4 Mini
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Eres el CFO y Director Estratégico de una empresa de distribución industrial.
-                    Tu especialidad es análisis de crecimiento, identificación de motores de negocio y gestión de portafolio.
-                    Generas análisis ejecutivos concisos, contundentes y 100% accionables.
-                    Usas datos específicos, porcentajes y cifras concretas.
-                    Tu estilo es directo, sin relleno, solo insights que generan decisiones."""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
+        # Llamar a GPT-4 Mini (respuestas cacheadas por hash de prompt + modelo)
+        analisis_ia = completar_con_cache(
+            backend,
+            cache_llm(),
+            mensajes=[
+                {"role": "system", "content": PROMPT_SISTEMA_CFO},
+                {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
+            modelo=AppConfig().LLM_MODELO,
+            temperatura=0.7,
             max_tokens=2000
         )
         
-        analisis_ia = response.choices[0].message.content
-        
         return {
             "analisis_ejecutivo": analisis_ia,
             "analisis_lineas": analisis_lineas,
@@ -76,6 +98,64 @@ def analizar_con_ia_avanzado(
         return _analisis_manual_avanzado(df_actual, df_anterior, metricas, lineas_estrategicas)
 
 
+def iniciar_analisis_ia(
+    df_actual: pd.DataFrame,
+    df_anterior: pd.DataFrame,
+    metricas: Dict,
+    lineas_estrategicas: List[str]
+) -> Tuple[Dict, Optional[TrabajoIA]]:
+    """
+    Versión no bloqueante: calcula ya las secciones cuantitativas y encola la narrativa
+    de IA en el pool. Devuelve (análisis cuantitativo, trabajo) — trabajo es None sin IA.
+    """
+    analisis_lineas = _analizar_lineas_estrategicas(df_actual, df_anterior, lineas_estrategicas)
+    analisis_clientes = _analizar_retencion_clientes(df_actual, df_anterior)
+    base = {
+        "analisis_ejecutivo": None,
+        "analisis_lineas": analisis_lineas,
+        "analisis_clientes": analisis_clientes,
+        "metricas_clave": metricas
+    }
+
+    backend = obtener_backend_llm()
+    if backend is None:
+        return base, None
+
+    prompt = _construir_prompt_ejecutivo_avanzado(metricas, analisis_lineas, analisis_clientes)
+    trabajo = enviar_trabajo_ia(
+        backend,
+        cache_llm(),
+        mensajes=[
+            {"role": "system", "content": PROMPT_SISTEMA_CFO},
+            {"role": "user", "content": prompt}
+        ],
+        modelo=AppConfig().LLM_MODELO,
+        temperatura=0.7,
+        max_tokens=2000
+    )
+    return base, trabajo
+
+
+def mostrar_narrativa_ia(placeholder, base: Dict, trabajo: Optional[TrabajoIA], timeout: Optional[float] = None) -> str:
+    """
+    Transmite la narrativa de IA al placeholder a medida que llegan tokens.
+    Si no hay IA o se supera el timeout se muestra el análisis manual con las mismas cifras.
+    """
+    metricas = base["metricas_clave"]
+
+    def respaldo() -> str:
+        return _narrativa_manual(metricas, base["analisis_lineas"], base["analisis_clientes"])
+
+    texto = transmitir_trabajo(
+        trabajo,
+        placeholder.markdown,
+        respaldo,
+        timeout if timeout is not None else AppConfig().LLM_TIMEOUT
+    )
+    base["analisis_ejecutivo"] = texto
+    return texto
+
+
 def _resolver_columnas(df: pd.DataFrame, df_fb: pd.DataFrame | None = None) -> Dict[str, str | None]:
     def pick(cands):
         for c in cands:
@@ -87,61 +167,99 @@ def _resolver_columnas(df: pd.DataFrame, df_fb: pd.DataFrame | None = None) -> D
     col_linea   = pick(["Linea_Estrategica", "linea_producto", next((x for x in df.columns if "linea" in x.lower()), None)])
     return {"cliente": col_cliente, "valor": col_valor, "linea": col_linea}
 
+def _claves_mayusculas(serie: pd.Series) -> pd.Series:
+    """
+    astype(str).str.upper() calculado sobre los valores únicos y expandido por código (una pasada).
+    factorize junta None y NaN; los vacíos se convierten aparte para conservar 'NONE' frente a 'NAN'.
+    """
+    codigos, unicos = pd.factorize(serie)
+    etiquetas = np.append(pd.Index(unicos).astype(str).str.upper().to_numpy(dtype=object), "NAN")
+    claves = etiquetas[codigos]
+    vacios = codigos < 0
+    if vacios.any():
+        claves[vacios] = serie[vacios].astype(str).str.upper().to_numpy(dtype=object)
+    return pd.Series(claves, index=serie.index)
+
+def _agregar_por_linea(df, columna_linea, columna_valor, columna_cliente):
+    """Una sola agregación por año: ventas y clientes distintos por línea (sin distinguir mayúsculas)"""
+    if df.empty:
+        return pd.DataFrame(columns=["ventas", "clientes"], dtype=float)
+    base = pd.DataFrame({
+        "linea": _claves_mayusculas(df[columna_linea]),
+        "valor": df[columna_valor],
+        "cliente": df[columna_cliente].astype(str)
+    })
+    return base.groupby("linea", sort=False).agg(ventas=("valor", "sum"), clientes=("cliente", "nunique"))
+
 def _analizar_lineas_estrategicas(df_actual, df_anterior, lineas_estrategicas):
     cols = _resolver_columnas(df_actual, df_anterior)
     columna_linea, columna_valor, columna_cliente = cols["linea"], cols["valor"], cols["cliente"]
-    if None in (columna_linea, columna_valor, columna_cliente):
+    if None in (columna_linea, columna_valor, columna_cliente) or not lineas_estrategicas:
         return {}
-    resultados = {}
-    for linea in lineas_estrategicas:
-        mask_a = df_actual[columna_linea].astype(str).str.upper() == linea.upper()
-        mask_b = df_anterior[columna_linea].astype(str).str.upper() == linea.upper()
-        ventas_a = df_actual.loc[mask_a, columna_valor].sum()
-        ventas_b = df_anterior.loc[mask_b, columna_valor].sum()
-        variacion_abs = ventas_a - ventas_b
-        variacion_pct = (variacion_abs / ventas_b * 100) if ventas_b > 0 else (100.0 if ventas_a > 0 else 0.0)
-        clientes_a = df_actual.loc[mask_a, columna_cliente].astype(str).nunique()
-        clientes_b = df_anterior.loc[mask_b, columna_cliente].astype(str).nunique()
-        resultados[linea] = {
-            "ventas_actual": ventas_a,
-            "ventas_anterior": ventas_b,
-            "variacion_abs": variacion_abs,
-            "variacion_pct": variacion_pct,
-            "clientes_actual": clientes_a,
-            "clientes_anterior": clientes_b,
-            "impacto": "MOTOR" if variacion_pct > 10 else "FRENO" if variacion_pct < -10 else "ESTABLE",
+    lineas = list(lineas_estrategicas)
+    claves = [str(l).upper() for l in lineas]
+    actual = _agregar_por_linea(df_actual, columna_linea, columna_valor, columna_cliente).reindex(claves, fill_value=0)
+    anterior = _agregar_por_linea(df_anterior, columna_linea, columna_valor, columna_cliente).reindex(claves, fill_value=0)
+
+    ventas_a = actual["ventas"].to_numpy(dtype=float)
+    ventas_b = anterior["ventas"].to_numpy(dtype=float)
+    variacion_abs = ventas_a - ventas_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variacion_pct = np.where(
+            ventas_b > 0,
+            variacion_abs / ventas_b * 100,
+            np.where(ventas_a > 0, 100.0, 0.0)
+        )
+    impacto = np.select([variacion_pct > 10, variacion_pct < -10], ["MOTOR", "FRENO"], default="ESTABLE")
+    clientes_a = actual["clientes"].to_numpy(dtype=int)
+    clientes_b = anterior["clientes"].to_numpy(dtype=int)
+
+    return {
+        linea: {
+            "ventas_actual": ventas_a[i],
+            "ventas_anterior": ventas_b[i],
+            "variacion_abs": variacion_abs[i],
+            "variacion_pct": float(variacion_pct[i]),
+            "clientes_actual": int(clientes_a[i]),
+            "clientes_anterior": int(clientes_b[i]),
+            "impacto": str(impacto[i]),
         }
-    return resultados
+        for i, linea in enumerate(lineas)
+    }
 
 def _analizar_retencion_clientes(df_actual, df_anterior):
     cols = _resolver_columnas(df_actual, df_anterior)
     col_cliente, col_valor = cols["cliente"], cols["valor"]
     if None in (col_cliente, col_valor):
         return {k: 0 for k in ["total_clientes_actual","total_clientes_anterior","clientes_retenidos","clientes_nuevos","clientes_perdidos","ventas_retenidos","ventas_nuevos","tasa_retencion","top_retenidos","top_nuevos"]}
-    clientes_actual = set(df_actual[col_cliente].astype(str).unique())
-    clientes_anterior = set(df_anterior[col_cliente].astype(str).unique())
-    clientes_retenidos = clientes_actual & clientes_anterior
-    clientes_nuevos = clientes_actual - clientes_anterior
-    clientes_perdidos = clientes_anterior - clientes_actual
-    ventas_retenidos = df_actual[df_actual[col_cliente].isin(clientes_retenidos)][col_valor].sum()
-    ventas_nuevos = df_actual[df_actual[col_cliente].isin(clientes_nuevos)][col_valor].sum()
-    top_retenidos = df_actual[df_actual[col_cliente].isin(clientes_retenidos)].groupby(col_cliente)[col_valor].sum().nlargest(10)
-    top_nuevos = df_actual[df_actual[col_cliente].isin(clientes_nuevos)].groupby(col_cliente)[col_valor].sum().nlargest(10)
-    tasa_retencion = (len(clientes_retenidos) / len(clientes_anterior) * 100) if len(clientes_anterior) > 0 else 0
+    # Una suma por cliente y año, y un único outer join: la presencia en cada lado define el grupo
+    suma_actual = df_actual[col_valor].groupby(df_actual[col_cliente].astype(str)).sum()
+    suma_anterior = df_anterior[col_valor].groupby(df_anterior[col_cliente].astype(str)).sum()
+    clientes = pd.concat([suma_actual.rename("actual"), suma_anterior.rename("anterior")], axis=1, join="outer")
+
+    en_actual = clientes["actual"].notna().to_numpy()
+    en_anterior = clientes["anterior"].notna().to_numpy()
+    mask_retenidos = en_actual & en_anterior
+    mask_nuevos = en_actual & ~en_anterior
+    mask_perdidos = en_anterior & ~en_actual
+
+    ventas_retenidas = clientes.loc[mask_retenidos, "actual"]
+    ventas_nuevas = clientes.loc[mask_nuevos, "actual"]
+    total_anterior = int(en_anterior.sum())
+    n_retenidos = int(mask_retenidos.sum())
     return {
-        "total_clientes_actual": len(clientes_actual),
-        "total_clientes_anterior": len(clientes_anterior),
-        "clientes_retenidos": len(clientes_retenidos),
-        "clientes_nuevos": len(clientes_nuevos),
-        "clientes_perdidos": len(clientes_perdidos),
-        "ventas_retenidos": ventas_retenidos,
-        "ventas_nuevos": ventas_nuevos,
-        "tasa_retencion": tasa_retencion,
-        "top_retenidos": top_retenidos.to_dict(),
-        "top_nuevos": top_nuevos.to_dict(),
+        "total_clientes_actual": int(en_actual.sum()),
+        "total_clientes_anterior": total_anterior,
+        "clientes_retenidos": n_retenidos,
+        "clientes_nuevos": int(mask_nuevos.sum()),
+        "clientes_perdidos": int(mask_perdidos.sum()),
+        "ventas_retenidos": ventas_retenidas.sum(),
+        "ventas_nuevos": ventas_nuevas.sum(),
+        "tasa_retencion": (n_retenidos / total_anterior * 100) if total_anterior > 0 else 0,
+        "top_retenidos": ventas_retenidas.nlargest(10).to_dict(),
+        "top_nuevos": ventas_nuevas.nlargest(10).to_dict(),
     }
 
-
 def _construir_prompt_ejecutivo_avanzado(
     metricas: Dict,
     analisis_lineas: Dict,
@@ -224,6 +342,17 @@ def _analisis_manual_avanzado(
     analisis_lineas = _analizar_lineas_estrategicas(df_actual, df_anterior, lineas_estrategicas)
     analisis_clientes = _analizar_retencion_clientes(df_actual, df_anterior)
     
+    return {
+        "analisis_ejecutivo": _narrativa_manual(metricas, analisis_lineas, analisis_clientes),
+        "analisis_lineas": analisis_lineas,
+        "analisis_clientes": analisis_clientes,
+        "metricas_clave": metricas
+    }
+
+
+def _narrativa_manual(metricas: Dict, analisis_lineas: Dict, analisis_clientes: Dict) -> str:
+    """Resumen ejecutivo determinista a partir de las secciones cuantitativas"""
+    
     # Identificar motores y frenos
     motores = sorted(
         [(l, d) for l, d in analisis_lineas.items() if d['impacto'] == 'MOTOR'],
@@ -280,12 +409,7 @@ Las líneas que presentaron retrocesos fueron:
 5. **RECUPERACIÓN**: Contactar inmediatamente a los {analisis_clientes['clientes_perdidos']} clientes perdidos
 """
     
-    return {
-        "analisis_ejecutivo": analisis_ejecutivo,
-        "analisis_lineas": analisis_lineas,
-        "analisis_clientes": analisis_clientes,
-        "metricas_clave": metricas
-    }
+    return analisis_ejecutivo
 
 
 def _generar_listado_motores(motores: List[Tuple]) -> str:
@@ -0,0 +1,128 @@
+"""Trabajos de IA asíncronos: pool de hilos, streaming de tokens y respaldo por timeout"""
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Callable, Dict, List, Optional, Union
+
+from .llm_cache import CacheLLM, clave_prompt
+
+_EJECUTOR_IA = ThreadPoolExecutor(max_workers=4, thread_name_prefix="trabajos_ia")
+_TRABAJOS: "OrderedDict[str, TrabajoIA]" = OrderedDict()
+_TRABAJOS_LOCK = Lock()
+_TRABAJOS_MAX = 64
+
+
+class TrabajoIA:
+    """Estado de una generación en curso: texto parcial, fin y posible error"""
+
+    def __init__(self, clave: str):
+        self.clave = clave
+        self.error: Optional[BaseException] = None
+        self.desde_cache = False
+        self.terminado = Event()
+        self._fragmentos: List[str] = []
+        self._lock = Lock()
+
+    def agregar(self, fragmento: str):
+        with self._lock:
+            self._fragmentos.append(fragmento)
+
+    @property
+    def texto(self) -> str:
+        with self._lock:
+            return "".join(self._fragmentos)
+
+    @property
+    def exitoso(self) -> bool:
+        return self.terminado.is_set() and self.error is None and bool(self.texto)
+
+
+def _ejecutar(trabajo: TrabajoIA, backend, cache: CacheLLM, mensajes: List[Dict], modelo: str,
+              temperatura: float, max_tokens: int):
+    try:
+        if hasattr(backend, "transmitir"):
+            for fragmento in backend.transmitir(modelo, mensajes, temperatura, max_tokens):
+                trabajo.agregar(fragmento)
+        else:
+            trabajo.agregar(backend.completar(modelo, mensajes, temperatura, max_tokens))
+        if trabajo.texto:  # una respuesta vacía no se guarda: la próxima vista vuelve a pedirla
+            cache.escribir(trabajo.clave, trabajo.texto, modelo)
+    except Exception as e:
+        trabajo.error = e
+    finally:
+        trabajo.terminado.set()
+
+
+def enviar_trabajo_ia(
+    backend,
+    cache: CacheLLM,
+    mensajes: List[Dict],
+    modelo: str,
+    temperatura: float = 0.7,
+    max_tokens: int = 2000
+) -> TrabajoIA:
+    """
+    Encola la generación en el pool y devuelve el trabajo sin bloquear.
+    Si la respuesta está en caché el trabajo nace terminado; si el mismo prompt
+    ya se está generando, se reutiliza ese trabajo (una sola llamada al modelo).
+    Los trabajos terminados no se reutilizan: su respuesta se vuelve a pedir a la
+    caché, que es quien aplica el TTL y el límite de tamaño.
+    """
+    clave = clave_prompt(modelo, mensajes, temperatura=temperatura, max_tokens=max_tokens)
+    with _TRABAJOS_LOCK:
+        trabajo = _TRABAJOS.get(clave)
+        if trabajo is not None and not trabajo.terminado.is_set():
+            _TRABAJOS.move_to_end(clave)
+            return trabajo
+
+        trabajo = TrabajoIA(clave)
+        _TRABAJOS[clave] = trabajo
+        while len(_TRABAJOS) > _TRABAJOS_MAX:
+            _TRABAJOS.popitem(last=False)
+
+    respuesta = cache.leer(clave)
+    if respuesta is not None:
+        trabajo.agregar(respuesta)
+        trabajo.desde_cache = True
+        trabajo.terminado.set()
+        return trabajo
+
+    _EJECUTOR_IA.submit(_ejecutar, trabajo, backend, cache, mensajes, modelo, temperatura, max_tokens)
+    return trabajo
+
+
+def transmitir_trabajo(
+    trabajo: Optional[TrabajoIA],
+    mostrar: Callable[[str], None],
+    respaldo: Union[str, Callable[[], str]],
+    timeout: float,
+    intervalo: float = 0.15
+) -> str:
+    """
+    Vuelca el texto parcial en 'mostrar' (p. ej. placeholder.markdown) a medida que llegan tokens.
+    Si se supera 'timeout' o la generación falla o llega vacía, muestra el respaldo; el trabajo sigue
+    corriendo y su resultado queda en caché para la próxima vista.
+    """
+    def _respaldo() -> str:
+        texto = respaldo() if callable(respaldo) else respaldo
+        mostrar(texto)
+        return texto
+
+    if trabajo is None:
+        return _respaldo()
+
+    inicio = time.monotonic()
+    ultimo = None
+    while not trabajo.terminado.wait(intervalo):
+        texto = trabajo.texto
+        if texto and texto != ultimo:
+            mostrar(texto + " ▌")
+            ultimo = texto
+        if time.monotonic() - inicio > timeout:
+            return _respaldo()
+
+    if not trabajo.exitoso:
+        return _respaldo()
+    mostrar(trabajo.texto)
+    return trabajo.texto
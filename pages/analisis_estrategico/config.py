@@ -20,6 +20,25 @@ class AppConfig:
     PAGE_ICON: str = "📊"
     LAYOUT: str = "wide"
     CACHE_TTL: int = 3600
+    CONTEXTO_CACHE_MAX: int = 8  # Combinaciones de filtros memoizadas por el contexto compartido
+    INDICE_FILTROS_MAX: int = 2  # Versiones de datos con índice de filtros (filas por valor) en memoria
+
+    # Capa LLM: backend "openai" o "stub" (local, sin red); se puede forzar con la variable LLM_BACKEND
+    LLM_BACKEND: str = "openai"
+    LLM_MODELO: str = "gpt-4o-mini"
+    LLM_BASE_URL: str = ""  # Servidor compatible con OpenAI (p. ej. uno falso local); variable LLM_BASE_URL
+    LLM_TIMEOUT: int = 45  # Segundos antes de mostrar el análisis manual mientras la IA termina en segundo plano
+    LLM_CACHE_DIR: str = ".cache/llm"
+    LLM_CACHE_TTL: int = 24 * 3600
+    LLM_CACHE_MAX_MB: int = 50
+    PDF_CACHE_MAX: int = 16  # Reportes PDF renderizados que se conservan en memoria (compartidos entre sesiones)
+
+    # Consultas: "duckdb" (instantánea Parquet particionada por año, fuera de memoria) o "pandas"; variable CONSULTAS_BACKEND
+    CONSULTAS_BACKEND: str = "duckdb"
+    CONSULTAS_CACHE_MAX: int = 64  # Resultados de consultas memoizados por fuente de datos
+    INSTANTANEA_DIR: str = ".cache/analisis"
+    INSTANTANEAS_MAX: int = 2  # Versiones de datos cuya instantánea se conserva en disco
+    DUCKDB_MEMORIA: str = "2GB"  # Por encima de este límite DuckDB derrama a disco en lugar de fallar
     
     LOGO_URL: str = "https://raw.githubusercontent.com/DiegoMao2021/Resumen-Ventas-Gerenciales/main/LOGO%20FERREINOX%20SAS%20BIC%202024.png"
     WEBSITE_URL: str = "https://www.ferreinox.co"
@@ -0,0 +1,349 @@
+"""Capa de consultas: constructor de agregaciones sobre DuckDB (instantánea Parquet por año) o pandas"""
+import hashlib
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple
+import pandas as pd
+
+import utils_memoria
+import utils_rendimiento
+from nucleo.exportacion import para_parquet
+
+from .config import AppConfig
+
+try:
+    import duckdb
+    DUCKDB_DISPONIBLE = True
+except ImportError:
+    duckdb = None
+    DUCKDB_DISPONIBLE = False
+
+# Filtro de la barra lateral -> columna del maestro que restringe
+COLUMNAS_FILTRO = {
+    'ciudades': 'Poblacion_Real',
+    'lineas': 'Linea_Estrategica',
+    'vendedores': 'nomvendedor',
+    'marcas': 'nombre_marca',
+    'anios': 'anio'
+}
+
+SUMA = "suma"
+DISTINTOS = "distintos"
+FILAS = "filas"
+
+
+def _escalar(valor):
+    """numpy -> tipo nativo (DuckDB no acepta np.int64 como parámetro)"""
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def _condiciones(condiciones: Dict) -> Tuple:
+    """{columna: valor | lista} -> tupla ordenada y hashable; las listas significan 'IN'"""
+    normalizadas = []
+    for columna, valor in sorted(condiciones.items()):
+        if isinstance(valor, (list, tuple, set, frozenset, pd.Index, pd.Series)) or getattr(valor, "ndim", 0) == 1:
+            valor = tuple(sorted({_escalar(v) for v in valor}, key=str))
+        else:
+            valor = _escalar(valor)
+        normalizadas.append((columna, valor))
+    return tuple(normalizadas)
+
+
+def predicados_filtros(filtros: Dict, columnas) -> Dict:
+    """Condiciones equivalentes a aplicar_filtros para las columnas presentes"""
+    return {
+        columna: filtros[clave]
+        for clave, columna in COLUMNAS_FILTRO.items()
+        if filtros.get(clave) and columna in columnas
+    }
+
+
+@dataclass(frozen=True)
+class Agregado:
+    funcion: str
+    columna: Optional[str]
+    alias: str
+    condiciones: Tuple = ()
+
+
+@dataclass(frozen=True)
+class Consulta:
+    """
+    Consulta inmutable: cada método devuelve una copia, de modo que se puede derivar de una base común
+    y usar como clave de caché. Ej.:
+        contexto.consulta().agrupar('nombre_cliente').sumar('valor_venta', 'Ventas', anio=2025).ordenar('Ventas').limite(50).a_pandas()
+    """
+    fuente: "FuenteDatos" = field(compare=False, repr=False)
+    condiciones: Tuple = ()
+    grupos: Tuple = ()
+    agregados: Tuple = ()
+    existencia: Tuple = ()
+    orden: Optional[Tuple] = None
+    limite_filas: Optional[int] = None
+
+    def donde(self, **condiciones) -> "Consulta":
+        return replace(self, condiciones=self.condiciones + _condiciones(condiciones))
+
+    def agrupar(self, *columnas) -> "Consulta":
+        return replace(self, grupos=self.grupos + tuple(columnas))
+
+    def sumar(self, columna: str, alias: Optional[str] = None, **condiciones) -> "Consulta":
+        """Suma de 'columna'; las condiciones restringen sólo este agregado (SUM ... FILTER)"""
+        return self._agregar(SUMA, columna, alias or columna, condiciones)
+
+    def contar_distintos(self, columna: str, alias: Optional[str] = None, **condiciones) -> "Consulta":
+        return self._agregar(DISTINTOS, columna, alias or columna, condiciones)
+
+    def contar(self, alias: str = "filas", **condiciones) -> "Consulta":
+        return self._agregar(FILAS, None, alias, condiciones)
+
+    def grupos_de(self, **condiciones) -> "Consulta":
+        """Conserva sólo los grupos con alguna fila que cumpla las condiciones (p. ej. presentes en el año objetivo)"""
+        return replace(self, existencia=self.existencia + _condiciones(condiciones))
+
+    def ordenar(self, columna: str, descendente: bool = True) -> "Consulta":
+        """Los empates se desempatan por las columnas de agrupación para que ambos motores coincidan"""
+        return replace(self, orden=(columna, descendente))
+
+    def limite(self, filas: int) -> "Consulta":
+        return replace(self, limite_filas=int(filas))
+
+    def a_pandas(self) -> pd.DataFrame:
+        return self.fuente.ejecutar(self)
+
+    def _agregar(self, funcion: str, columna: Optional[str], alias: str, condiciones: Dict) -> "Consulta":
+        return replace(self, agregados=self.agregados + (Agregado(funcion, columna, alias, _condiciones(condiciones)),))
+
+
+# ===== MOTORES =====
+def _mascara(df: pd.DataFrame, condiciones: Tuple) -> pd.Series:
+    mascara = pd.Series(True, index=df.index)
+    for columna, valor in condiciones:
+        mascara &= df[columna].isin(valor) if isinstance(valor, tuple) else df[columna].eq(valor)
+    return mascara
+
+
+def _agregar_pandas(df: pd.DataFrame, agregado: Agregado, grupos: list):
+    if agregado.condiciones:
+        df = df[_mascara(df, agregado.condiciones)]
+    if grupos:
+        agrupado = df.groupby(grupos, observed=True)
+        if agregado.funcion == FILAS:
+            return agrupado.size()
+        serie = agrupado[agregado.columna]
+        return serie.sum() if agregado.funcion == SUMA else serie.nunique()
+    if agregado.funcion == FILAS:
+        return len(df)
+    return df[agregado.columna].sum() if agregado.funcion == SUMA else df[agregado.columna].nunique()
+
+
+def ejecutar_pandas(df: pd.DataFrame, consulta: Consulta) -> pd.DataFrame:
+    if consulta.condiciones:
+        df = df[_mascara(df, consulta.condiciones)]
+    grupos = list(consulta.grupos)
+    if not grupos:
+        return pd.DataFrame({a.alias: [_agregar_pandas(df, a, grupos)] for a in consulta.agregados})
+
+    # groupby descarta las claves nulas, igual que 'IS NOT NULL' en SQL
+    indice = df.groupby(grupos, observed=True).size().index
+    if consulta.existencia:
+        presentes = df[_mascara(df, consulta.existencia)].groupby(grupos, observed=True).size().index
+        indice = indice[indice.isin(presentes)]
+    resultado = pd.DataFrame(
+        {a.alias: _agregar_pandas(df, a, grupos).reindex(indice, fill_value=0) for a in consulta.agregados},
+        index=indice
+    ).reset_index()
+
+    if consulta.orden is not None:
+        columna, descendente = consulta.orden
+        claves = [columna] + [g for g in grupos if g != columna]
+        resultado = resultado.sort_values(claves, ascending=[not descendente] + [True] * (len(claves) - 1), kind="mergesort")
+    if consulta.limite_filas is not None:
+        resultado = resultado.head(consulta.limite_filas)
+    return resultado.reset_index(drop=True)
+
+
+def _col(nombre: str) -> str:
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _sql_condiciones(condiciones: Tuple, parametros: list) -> str:
+    partes = []
+    for columna, valor in condiciones:
+        if isinstance(valor, tuple):
+            if not valor:
+                partes.append("FALSE")
+                continue
+            partes.append(f"{_col(columna)} IN ({', '.join('?' * len(valor))})")
+            parametros.extend(valor)
+        else:
+            partes.append(f"{_col(columna)} = ?")
+            parametros.append(valor)
+    return " AND ".join(partes) or "TRUE"
+
+
+def sql_consulta(consulta: Consulta, origen: str) -> Tuple[str, list]:
+    """SQL parametrizado de la consulta; los parámetros siguen el orden en que aparecen los '?'"""
+    parametros = []
+    grupos = [_col(g) for g in consulta.grupos]
+    columnas = list(grupos)
+    for a in consulta.agregados:
+        expresion = {SUMA: f"SUM({_col(a.columna)})", DISTINTOS: f"COUNT(DISTINCT {_col(a.columna)})", FILAS: "COUNT(*)"}[a.funcion]
+        if a.condiciones:
+            expresion += f" FILTER (WHERE {_sql_condiciones(a.condiciones, parametros)})"
+        columnas.append(f"COALESCE({expresion}, 0) AS {_col(a.alias)}")
+
+    sql = f"SELECT {', '.join(columnas)} FROM {origen}"
+    where = [_sql_condiciones(consulta.condiciones, parametros)] if consulta.condiciones else []
+    where += [f"{g} IS NOT NULL" for g in grupos]
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if grupos:
+        sql += " GROUP BY " + ", ".join(grupos)
+        if consulta.existencia:
+            sql += f" HAVING COUNT(*) FILTER (WHERE {_sql_condiciones(consulta.existencia, parametros)}) > 0"
+    if consulta.orden is not None and grupos:
+        columna, descendente = consulta.orden
+        claves = [f"{_col(columna)} {'DESC' if descendente else 'ASC'}"] + [g + " ASC" for g in grupos if g != _col(columna)]
+        sql += " ORDER BY " + ", ".join(claves)
+    if consulta.limite_filas is not None:
+        sql += f" LIMIT {int(consulta.limite_filas)}"
+    return sql, parametros
+
+
+# ===== FUENTES DE DATOS =====
+_CONEXION = None
+_CONEXION_LOCK = Lock()
+
+
+def _cursor():
+    """Cursor propio por llamada sobre una conexión DuckDB compartida (multi-hilo, derrama a disco)"""
+    global _CONEXION
+    with _CONEXION_LOCK:
+        if _CONEXION is None:
+            config = AppConfig()
+            _CONEXION = duckdb.connect()
+            _CONEXION.execute(f"SET memory_limit = '{config.DUCKDB_MEMORIA}'")
+            _CONEXION.execute(f"SET temp_directory = '{os.path.join(config.INSTANTANEA_DIR, 'tmp')}'")
+        return _CONEXION.cursor()
+
+
+class FuenteDatos:
+    """
+    Origen de las consultas. Con 'ruta' consulta con DuckDB la instantánea Parquet particionada por año
+    (sólo lee los años que pide la consulta); sin ella, ejecuta las mismas agregaciones en pandas sobre 'df'.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, ruta: Optional[str] = None, columnas=None, version: Optional[Hashable] = None):
+        self.df = df
+        self.ruta = ruta
+        self.columnas = tuple(columnas if columnas is not None else df.columns)
+        self.version = version
+        self._resultados: "OrderedDict[Consulta, pd.DataFrame]" = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def backend(self) -> str:
+        return "duckdb" if self.ruta else "pandas"
+
+    def ejecutar(self, consulta: Consulta) -> pd.DataFrame:
+        """Resultado de la consulta (memoizado por fuente); cada llamada recibe una copia editable"""
+        with self._lock:
+            if consulta in self._resultados:
+                self._resultados.move_to_end(consulta)
+                return self._resultados[consulta].copy()
+        with utils_rendimiento.medir(utils_rendimiento.AGREGACION, f"consulta {self.backend}"):
+            if self.ruta:
+                origen = f"read_parquet('{os.path.join(self.ruta, '**', '*.parquet')}', hive_partitioning = true)"
+                sql, parametros = sql_consulta(consulta, origen)
+                resultado = _cursor().execute(sql, parametros).df()
+            else:
+                resultado = ejecutar_pandas(self.df, consulta)
+        with self._lock:
+            self._resultados[consulta] = resultado
+            while len(self._resultados) > AppConfig().CONSULTAS_CACHE_MAX:
+                self._resultados.popitem(last=False)
+        return resultado.copy()
+
+
+def backend_consultas() -> str:
+    """'duckdb' si está configurado e instalado; si no, 'pandas'. Se puede forzar con CONSULTAS_BACKEND"""
+    backend = os.environ.get("CONSULTAS_BACKEND", AppConfig().CONSULTAS_BACKEND).lower()
+    return "duckdb" if backend == "duckdb" and DUCKDB_DISPONIBLE else "pandas"
+
+
+def escribir_instantanea(df: pd.DataFrame, ruta: str):
+    """Escribe el maestro como Parquet particionado por año (anio=AAAA/) de forma atómica"""
+    temporal = f"{ruta}.tmp-{uuid.uuid4().hex}"
+    conexion = duckdb.connect()
+    try:
+        conexion.register("instantanea", para_parquet(df))
+        conexion.execute(f"COPY instantanea TO '{temporal}' (FORMAT PARQUET, PARTITION_BY (anio))")
+    finally:
+        conexion.close()
+    try:
+        os.replace(temporal, ruta)
+    except OSError:
+        # Otra sesión publicó la misma instantánea primero
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def _limpiar_instantaneas(base: str, conservar: str):
+    """Deja sólo las AppConfig.INSTANTANEAS_MAX instantáneas más recientes"""
+    directorios = [
+        os.path.join(base, d) for d in os.listdir(base)
+        if os.path.isdir(os.path.join(base, d)) and ".tmp-" not in d and d != "tmp"
+    ]
+    directorios.sort(key=os.path.getmtime, reverse=True)
+    for directorio in directorios[AppConfig().INSTANTANEAS_MAX:]:
+        if directorio != conservar:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+
+_FUENTES: "OrderedDict[Hashable, FuenteDatos]" = OrderedDict()
+_FUENTES_LOCK = Lock()
+
+
+def obtener_fuente(df: pd.DataFrame, version_datos: Hashable) -> FuenteDatos:
+    """
+    Fuente de consultas del maestro. Con DuckDB la instantánea se escribe una vez por versión de datos y se
+    comparte entre sesiones (la fuente no retiene el DataFrame); sin DuckDB, pandas sobre 'df'.
+    """
+    if backend_consultas() != "duckdb" or 'anio' not in df.columns:
+        return FuenteDatos(df, version=version_datos)
+
+    with _FUENTES_LOCK:
+        fuente = _FUENTES.get(version_datos)
+        if fuente is not None:
+            _FUENTES.move_to_end(version_datos)
+            return fuente
+
+        base = AppConfig().INSTANTANEA_DIR
+        ruta = os.path.join(base, hashlib.sha1(repr(version_datos).encode()).hexdigest()[:16])
+        try:
+            if not os.path.isdir(ruta):
+                os.makedirs(base, exist_ok=True)
+                with utils_rendimiento.medir(utils_rendimiento.CARGA, "escribir instantánea parquet"):
+                    escribir_instantanea(df, ruta)
+                _limpiar_instantaneas(base, ruta)
+        except (duckdb.Error, OSError):
+            return FuenteDatos(df, version=version_datos)
+
+        fuente = FuenteDatos(ruta=ruta, columnas=df.columns, version=version_datos)
+        _FUENTES[version_datos] = fuente
+        while len(_FUENTES) > AppConfig().INSTANTANEAS_MAX:
+            _FUENTES.popitem(last=False)
+    return fuente
+
+
+def limpiar_fuentes():
+    """Olvida las fuentes DuckDB y sus resultados memoizados; las instantáneas en disco se reutilizan"""
+    with _FUENTES_LOCK:
+        _FUENTES.clear()
+
+
+utils_memoria.registrar_liberable("consultas_estrategico", limpiar_fuentes)
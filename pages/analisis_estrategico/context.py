@@ -0,0 +1,196 @@
+"""Contexto de análisis compartido entre tabs (cortes por año, consultas y resúmenes memoizados)"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .config import AppConfig
+from .consultas import Consulta, FuenteDatos, predicados_filtros
+
+
+class ContextoAnalisis:
+    """
+    Materializa una sola vez, por combinación de filtros, los cortes del año
+    objetivo/base y el comparativo año contra año de cada dimensión que usan los tabs.
+    Las agregaciones se piden a 'fuente' (consultas.py): con la instantánea DuckDB del
+    maestro se le aplican los filtros como predicados; sin ella, pandas sobre 'df' ya filtrado.
+    """
+
+    def __init__(self, df: pd.DataFrame, filtros: Dict, fuente: Optional[FuenteDatos] = None):
+        self.df = df
+        self.filtros = filtros
+        self.fuente = fuente if fuente is not None else FuenteDatos(df)
+        self._predicados = predicados_filtros(filtros, self.fuente.columnas) if fuente is not None else {}
+        self.clave: Optional[Hashable] = None  # Clave (filtros, datos) con la que se registró en la caché
+        self._df_actual = None
+        self._df_anterior = None
+        self._comparativos: Dict[Tuple, pd.DataFrame] = {}
+        self._total_clientes: Dict[str, int] = {}
+        self._metricas: Dict[str, Dict] = {}
+        self._lock = Lock()
+
+    @property
+    def df_actual(self) -> pd.DataFrame:
+        if self._df_actual is None:
+            self._df_actual = self.df[self.df["anio"] == self.filtros["anio_objetivo"]]
+        return self._df_actual
+
+    @property
+    def df_anterior(self) -> pd.DataFrame:
+        if self._df_anterior is None:
+            self._df_anterior = self.df[self.df["anio"] == self.filtros["anio_base"]]
+        return self._df_anterior
+
+    def consulta(self) -> Consulta:
+        """Consulta sobre los datos filtrados del análisis"""
+        return Consulta(self.fuente).donde(**self._predicados)
+
+    def consulta_comparativa(self, col_group: str, col_valor: str, actual: str = "Actual", anterior: str = "Anterior",
+                             solo_actual: bool = True) -> Consulta:
+        """
+        Venta del año objetivo y del año base por 'col_group' en una sola pasada (sólo lee esos dos años).
+        Con 'solo_actual' conserva únicamente los grupos con ventas en el año objetivo.
+        """
+        anio_objetivo, anio_base = self.filtros["anio_objetivo"], self.filtros["anio_base"]
+        consulta = (
+            self.consulta()
+            .donde(anio=[anio_objetivo, anio_base])
+            .agrupar(col_group)
+            .sumar(col_valor, actual, anio=anio_objetivo)
+            .sumar(col_valor, anterior, anio=anio_base)
+        )
+        return consulta.grupos_de(anio=anio_objetivo) if solo_actual else consulta
+
+    def metricas_basicas(self, col_valor: str) -> Dict:
+        """Venta actual/anterior, diferencia y variación porcentual (memoizado)"""
+        if col_valor not in self._metricas:
+            anio_objetivo, anio_base = self.filtros["anio_objetivo"], self.filtros["anio_base"]
+            totales = (
+                self.consulta()
+                .donde(anio=[anio_objetivo, anio_base])
+                .sumar(col_valor, "actual", anio=anio_objetivo)
+                .sumar(col_valor, "anterior", anio=anio_base)
+                .a_pandas().iloc[0]
+            )
+            venta_actual = totales["actual"]
+            venta_anterior = totales["anterior"]
+            diferencia = venta_actual - venta_anterior
+            self._metricas[col_valor] = {
+                'venta_actual': venta_actual,
+                'venta_anterior': venta_anterior,
+                'diferencia': diferencia,
+                'pct_variacion': (diferencia / venta_anterior * 100) if venta_anterior > 0 else 0
+            }
+        return dict(self._metricas[col_valor])
+
+    def comparativo(self, col_group: str, col_valor: str, col_cliente: Optional[str] = None) -> pd.DataFrame:
+        """
+        Comparativo año contra año de cualquier dimensión, alineado por grupo en una sola agregación
+        sobre los dos años: Actual, Anterior, Var_abs, Var_pct (NaN sin venta anterior), En_actual
+        (tiene filas en el año objetivo) y, con 'col_cliente', Clientes y Penetracion (% de los clientes
+        activos del año objetivo). Incluye los grupos de cualquiera de los dos años, ordenados por Actual.
+        Se calcula una vez por (dimensión, valor, cliente) y se comparte entre tabs; cada llamada recibe una copia.
+        """
+        clave = (col_group, col_valor, col_cliente)
+        with self._lock:
+            if clave not in self._comparativos:
+                self._comparativos[clave] = self._calcular_comparativo(col_group, col_valor, col_cliente)
+        return self._comparativos[clave].copy()
+
+    def total_clientes(self, col_cliente: str) -> int:
+        """Clientes distintos con ventas en el año objetivo (memoizado)"""
+        if col_cliente not in self._total_clientes:
+            self._total_clientes[col_cliente] = int(
+                self.consulta().donde(anio=self.filtros["anio_objetivo"]).contar_distintos(col_cliente, "total").a_pandas()["total"].iat[0]
+            )
+        return self._total_clientes[col_cliente]
+
+    def _calcular_comparativo(self, col_group: str, col_valor: str, col_cliente: Optional[str]) -> pd.DataFrame:
+        anio_objetivo = self.filtros["anio_objetivo"]
+        consulta = self.consulta_comparativa(col_group, col_valor, solo_actual=False).contar("Filas_actual", anio=anio_objetivo)
+        if col_cliente is not None:
+            consulta = consulta.contar_distintos(col_cliente, "Clientes", anio=anio_objetivo)
+        df_comp = consulta.ordenar("Actual").a_pandas()
+
+        actual = df_comp["Actual"].to_numpy(dtype=float)
+        anterior = df_comp["Anterior"].to_numpy(dtype=float)
+        df_comp["Var_abs"] = actual - anterior
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df_comp["Var_pct"] = np.where(anterior > 0, (actual - anterior) / anterior * 100, np.nan)
+        df_comp["En_actual"] = df_comp.pop("Filas_actual").to_numpy() > 0
+        if col_cliente is not None:
+            total_clientes = self.total_clientes(col_cliente)
+            df_comp["Clientes"] = df_comp.pop("Clientes")
+            df_comp["Penetracion"] = df_comp["Clientes"] / total_clientes * 100 if total_clientes > 0 else 0.0
+        return df_comp
+
+    def resumen_crecimiento(self, col_group: str, col_valor: str, col_cliente: str) -> pd.DataFrame:
+        """
+        Resumen Actual/Anterior/Clientes/Var/Penetración/Impacto de los grupos con venta en el año objetivo,
+        derivado del comparativo compartido (sin variación base, Var_pct cuenta como 100).
+        """
+        df_comp = self.comparativo(col_group, col_valor, col_cliente)
+        df_comp = df_comp[df_comp["En_actual"]].reset_index(drop=True)
+        df_comp["Var_pct"] = df_comp["Var_pct"].fillna(100)
+        df_comp["Impacto"] = np.select(
+            [
+                df_comp["Var_pct"] >= 10,
+                df_comp["Var_pct"] <= -10
+            ],
+            ["MOTOR", "FRENO"],
+            default="ESTABLE"
+        )
+        return df_comp[[col_group, "Actual", "Anterior", "Clientes", "Var_abs", "Var_pct", "Penetracion", "Impacto"]].copy()
+
+
+# ===== CACHÉ LRU DE CONTEXTOS =====
+_CONTEXTOS: "OrderedDict[Hashable, ContextoAnalisis]" = OrderedDict()
+_CONTEXTOS_LOCK = Lock()
+
+
+def _congelar(valor):
+    """Convierte listas/dicts de filtros en estructuras hashables"""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(sorted(map(str, valor)))
+    return valor
+
+
+def huella_datos(df: pd.DataFrame) -> Tuple:
+    """Huella barata del DataFrame filtrado (filas, columnas y total de venta)"""
+    col_valor = "valor_venta" if "valor_venta" in df.columns else None
+    total = float(df[col_valor].sum()) if col_valor else 0.0
+    return (len(df), tuple(df.columns), round(total, 2))
+
+
+def clave_contexto(df: pd.DataFrame, filtros: Dict, version_datos: Optional[Hashable] = None) -> Tuple:
+    return (_congelar(filtros), version_datos if version_datos is not None else huella_datos(df))
+
+
+def obtener_contexto(df: pd.DataFrame, filtros: Dict, version_datos: Optional[Hashable] = None,
+                     fuente: Optional[FuenteDatos] = None) -> ContextoAnalisis:
+    """
+    Devuelve el contexto compartido para (filtros, datos). Mantiene como máximo
+    AppConfig.CONTEXTO_CACHE_MAX contextos, expulsando el menos usado recientemente.
+    'fuente' es la fuente de consultas del maestro sin filtrar (consultas.obtener_fuente).
+    """
+    clave = clave_contexto(df, filtros, version_datos)
+    with _CONTEXTOS_LOCK:
+        contexto = _CONTEXTOS.get(clave)
+        if contexto is not None:
+            _CONTEXTOS.move_to_end(clave)
+            return contexto
+        contexto = ContextoAnalisis(df, filtros, fuente)
+        contexto.clave = clave
+        _CONTEXTOS[clave] = contexto
+        while len(_CONTEXTOS) > AppConfig().CONTEXTO_CACHE_MAX:
+            _CONTEXTOS.popitem(last=False)
+    return contexto
+
+
+def limpiar_contextos():
+    """Vacía la caché de contextos (p. ej. tras recargar datos)"""
+    with _CONTEXTOS_LOCK:
+        _CONTEXTOS.clear()
@@ -3,10 +3,11 @@ import streamlit as st
 import pandas as pd
 import dropbox
 import io
-from datetime import date
 from typing import Tuple, Dict, Any  # <-- añade Any aquí
 from .config import AppConfig
 import unicodedata
+import utils_rendimiento
+from nucleo import periodos
 
 @st.cache_resource
 def get_dropbox_client():
@@ -19,7 +20,9 @@ def get_dropbox_client():
     except Exception as e:
         return None
 
+@utils_rendimiento.instrumentar(utils_rendimiento.CARGA, cache="cargar_poblaciones")
 @st.cache_data(ttl=7200)
+@utils_rendimiento.fallo_cache("cargar_poblaciones")
 def cargar_poblaciones() -> pd.DataFrame:
     """Carga datos geográficos desde Dropbox"""
     dbx = get_dropbox_client()
@@ -31,6 +34,7 @@ def cargar_poblaciones() -> pd.DataFrame:
     for ruta in rutas:
         try:
             _, res = dbx.files_download(path=ruta)
+            utils_rendimiento.registrar_bytes("Dropbox", len(res.content))
             df = pd.read_excel(io.BytesIO(res.content), engine='openpyxl')
             return _procesar_poblaciones(df)
         except:
@@ -63,10 +67,6 @@ def _normalizar_txt(txt: str) -> str:
     t = "".join(c for c in unicodedata.normalize("NFD", str(txt)) if unicodedata.category(c) != "Mn")
     return t.strip().upper()
 
-def obtener_lista_ordenada(serie: pd.Series) -> list:
-    """Devuelve lista ordenada y sin nulos."""
-    return sorted(serie.dropna().astype(str).unique())
-
 def _unificar_lineas_marcas(df: pd.DataFrame) -> pd.DataFrame:
     import re
 
@@ -108,6 +108,16 @@ def _unificar_lineas_marcas(df: pd.DataFrame) -> pd.DataFrame:
         df["marca_producto"] = df["marca_producto"].fillna("").apply(_normalizar_txt)
     return df
 
+def periodo_seleccionado(df: pd.DataFrame) -> Tuple[str, Any]:
+    """(alcance, fecha de corte) elegidos en el sidebar; el corte por defecto es el último día con ventas"""
+    alcance = st.session_state.get("periodo_comparable")
+    if alcance not in periodos.ALCANCES:
+        alcance = "YTD" if st.session_state.get("filtro_ytd", False) else periodos.COMPLETO
+    if alcance == periodos.COMPLETO:
+        return alcance, None
+    corte = st.session_state.get("fecha_corte_comparable") or periodos.fecha_corte(df)
+    return alcance, pd.Timestamp(corte) if corte is not None else None
+
 def cargar_y_validar_datos() -> Tuple[pd.DataFrame, Dict]:
     """Pipeline completo usando los datos de Resumen_Mensual.py"""
     if 'df_ventas' not in st.session_state:
@@ -116,13 +126,19 @@ def cargar_y_validar_datos() -> Tuple[pd.DataFrame, Dict]:
         st.stop()
     
     try:
-        df_raw = st.session_state.df_ventas.copy()
-        
+        df_raw = st.session_state.df_ventas
+
         if df_raw.empty:
             st.error("❌ El DataFrame está vacío")
             st.stop()
-        
-        df_clean = df_raw.copy()
+
+        # Periodo comparable (YTD/QTD/MTD) antes de copiar: la máscara se cachea sobre el histórico de la sesión
+        alcance, corte = periodo_seleccionado(df_raw)
+        with utils_rendimiento.medir(utils_rendimiento.LIMPIEZA, "periodo comparable"):
+            df_periodo = periodos.filtrar_periodo(df_raw, alcance, corte)
+
+        # Una sola copia: el histórico de la sesión no se modifica
+        df_clean = df_periodo.copy()
 
         # Mapear marcas a nombre y asegurar líneas/categorías en texto
         if 'marca_producto' in df_clean.columns and 'nombre_marca' not in df_clean.columns:
@@ -136,14 +152,17 @@ def cargar_y_validar_datos() -> Tuple[pd.DataFrame, Dict]:
             df_clean['Linea_Estrategica'] = df_clean['categoria_producto'].astype(str).str.strip()
         
         # Limpiar tipos de datos
-        df_clean = _limpiar_tipos_datos(df_clean)
+        with utils_rendimiento.medir(utils_rendimiento.LIMPIEZA, "limpiar tipos de datos"):
+            df_clean = _limpiar_tipos_datos(df_clean)
         # Clasificar líneas y enriquecer (ya incluye geografía)
-        df_clean, config_filtros = _clasificar_lineas_estrategicas(df_clean)
-
-        # Filtro YTD opcional
-        if st.session_state.get("filtro_ytd", False):
-            df_clean = _aplicar_filtro_ytd(df_clean)
-
+        with utils_rendimiento.medir(utils_rendimiento.LIMPIEZA, "clasificar líneas y geografía"):
+            df_clean, config_filtros = _clasificar_lineas_estrategicas(df_clean)
+
+        config_filtros.update({
+            'periodo': alcance,
+            'fecha_corte': corte,
+            'ultima_fecha': periodos.fecha_corte(df_raw)
+        })
         return df_clean, config_filtros
         
     except Exception as e:
@@ -192,13 +211,10 @@ def _clasificar_lineas_estrategicas(df: pd.DataFrame) -> pd.DataFrame:
     # Clasificar líneas y enriquecer
     df_clean = _unificar_lineas_marcas(df)
     df_clean = _enriquecer_geografia(df_clean)
+    # Las opciones de ciudad, línea, vendedor y marca salen del índice de filtros (indice_filtros.py)
     anios_disponibles = sorted(df_clean['anio'].unique(), reverse=True)
     config_filtros = {
-        'anios_disponibles': anios_disponibles,
-        'ciudades_disponibles': obtener_lista_ordenada(df_clean['Poblacion_Real']) if 'Poblacion_Real' in df_clean.columns else [],
-        'lineas_disponibles': obtener_lista_ordenada(df_clean['Linea_Estrategica']) if 'Linea_Estrategica' in df_clean.columns else [],
-        'marcas_disponibles': obtener_lista_ordenada(df_clean['marca_producto']) if 'marca_producto' in df_clean.columns else [],
-        'vendedores_disponibles': obtener_lista_ordenada(df_clean['nomvendedor']) if 'nomvendedor' in df_clean.columns else []
+        'anios_disponibles': anios_disponibles
     }
     return df_clean, config_filtros
 
@@ -219,31 +235,3 @@ def _enriquecer_geografia(df: pd.DataFrame) -> pd.DataFrame:
     df['Poblacion_Real'] = df['Poblacion_Real'].fillna('Sin Geo').astype(str)
     
     return df
-
-def _aplicar_filtro_ytd(df: pd.DataFrame) -> pd.DataFrame:
-    """Aplica filtro Year-To-Date"""
-    hoy = date.today()
-    
-    if 'fecha_venta' not in df.columns:
-        if all(col in df.columns for col in ['anio', 'mes']):
-            df['fecha_venta'] = pd.to_datetime(
-                df[['anio', 'mes']].assign(dia=15),
-                errors='coerce'
-            )
-    
-    def es_ytd(row):
-        try:
-            if row['mes'] < hoy.month:
-                return True
-            if row['mes'] == hoy.month:
-                return True
-            return False
-        except:
-            return False
-    
-    df_ytd = df[df.apply(es_ytd, axis=1)].copy()
-    
-    if df_ytd.empty:
-        return df
-    
-    return df_ytd
\ No newline at end of file
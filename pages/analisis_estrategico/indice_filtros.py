@@ -0,0 +1,130 @@
+"""Índice invertido de filtros: filas de cada valor por dimensión, resueltas por intersección"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+import utils_memoria
+
+from .config import AppConfig
+from .consultas import COLUMNAS_FILTRO
+
+
+class IndiceFiltros:
+    """
+    Para cada dimensión filtrable (COLUMNAS_FILTRO) guarda, por valor, las posiciones de sus filas
+    como arreglo ordenado. Una combinación de filtros une los valores elegidos de cada dimensión e
+    intersecta entre dimensiones empezando por la más selectiva; el DataFrame base nunca se copia.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas: Optional[Iterable[str]] = None):
+        self.filas_total = len(df)
+        self._valores: Dict[str, pd.Index] = {}
+        self._posiciones: Dict[str, np.ndarray] = {}
+        self._limites: Dict[str, np.ndarray] = {}
+        self._selecciones: "OrderedDict[Hashable, Optional[np.ndarray]]" = OrderedDict()
+        self._lock = Lock()
+        tipo = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+        for columna in (columnas if columnas is not None else COLUMNAS_FILTRO.values()):
+            if columna in df.columns:
+                self._indexar(columna, df[columna], tipo)
+
+    def _indexar(self, columna: str, serie: pd.Series, tipo):
+        # Códigos ordenados por valor (-1 = nulo); el argsort estable deja las filas de cada valor en orden
+        codigos, valores = pd.factorize(serie, sort=True)
+        orden = np.argsort(codigos, kind="stable").astype(tipo)
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+        nulos = len(codigos) - int(conteos.sum())
+        self._posiciones[columna] = orden[nulos:]
+        self._limites[columna] = np.concatenate(([0], np.cumsum(conteos)))
+        self._valores[columna] = valores
+
+    def columnas(self) -> List[str]:
+        return list(self._valores)
+
+    def valores(self, columna: str) -> list:
+        """Valores presentes de la dimensión, ordenados y sin nulos (para las opciones del sidebar)"""
+        return self._valores[columna].tolist() if columna in self._valores else []
+
+    def filas_de(self, columna: str, valores: Iterable) -> np.ndarray:
+        """Posiciones ordenadas de las filas cuyo valor está en 'valores'"""
+        codigos = self._valores[columna].get_indexer(pd.Index(list(valores)).unique())
+        codigos = np.unique(codigos[codigos >= 0])
+        posiciones, limites = self._posiciones[columna], self._limites[columna]
+        partes = [posiciones[limites[c]:limites[c + 1]] for c in codigos]
+        if not partes:
+            return posiciones[:0]
+        if len(partes) == 1:
+            return partes[0]
+        return np.sort(np.concatenate(partes))
+
+    def seleccion(self, filtros: Dict) -> Optional[np.ndarray]:
+        """
+        Posiciones que cumplen todos los filtros activos (mismas claves que aplicar_filtros);
+        None si no hay ninguno activo, es decir, todas las filas. Memoizado por combinación.
+        """
+        activos = tuple(sorted(
+            (COLUMNAS_FILTRO[clave], tuple(sorted(set(valores), key=str)))
+            for clave, valores in filtros.items()
+            if clave in COLUMNAS_FILTRO and valores and COLUMNAS_FILTRO[clave] in self._valores
+        ))
+        if not activos:
+            return None
+        with self._lock:
+            if activos in self._selecciones:
+                self._selecciones.move_to_end(activos)
+                return self._selecciones[activos]
+
+        conjuntos = sorted((self.filas_de(columna, valores) for columna, valores in activos), key=len)
+        filas = conjuntos[0]
+        for otras in conjuntos[1:]:
+            if len(filas) == 0:
+                break
+            filas = np.intersect1d(filas, otras, assume_unique=True)
+        filas.flags.writeable = False
+
+        with self._lock:
+            self._selecciones[activos] = filas
+            while len(self._selecciones) > AppConfig().CONTEXTO_CACHE_MAX:
+                self._selecciones.popitem(last=False)
+        return filas
+
+    def aplicar(self, df: pd.DataFrame, filtros: Dict) -> pd.DataFrame:
+        """'df' (el mismo con el que se construyó el índice) restringido a la selección, sin copiarlo entero"""
+        filas = self.seleccion(filtros)
+        if filas is None:
+            return df
+        return df.take(filas)
+
+
+# ===== CACHÉ POR VERSIÓN DE DATOS =====
+_INDICES: "OrderedDict[Hashable, IndiceFiltros]" = OrderedDict()
+_INDICES_LOCK = Lock()
+
+
+def obtener_indice(df: pd.DataFrame, version_datos: Hashable) -> IndiceFiltros:
+    """
+    Índice de filtros de 'df', construido una vez por 'version_datos' (p. ej. context.huella_datos).
+    Las posiciones valen para cualquier DataFrame con esa misma versión y orden de filas.
+    """
+    with _INDICES_LOCK:
+        indice = _INDICES.get(version_datos)
+        if indice is not None:
+            _INDICES.move_to_end(version_datos)
+            return indice
+    indice = IndiceFiltros(df)
+    with _INDICES_LOCK:
+        _INDICES[version_datos] = indice
+        while len(_INDICES) > AppConfig().INDICE_FILTROS_MAX:
+            _INDICES.popitem(last=False)
+    return indice
+
+
+def limpiar_indices():
+    """Vacía los índices de filtros (p. ej. tras recargar datos)"""
+    with _INDICES_LOCK:
+        _INDICES.clear()
+
+
+utils_memoria.registrar_liberable("indice_filtros_estrategico", limpiar_indices)
@@ -0,0 +1,19 @@
+"""Renderizado perezoso de tabs: sólo se ejecuta el código del tab seleccionado"""
+from typing import List
+import streamlit as st
+
+
+def selector_tabs(etiquetas: List[str], key: str = "tab_estrategico") -> str:
+    """
+    Reemplaza st.tabs: sólo el tab seleccionado ejecuta su código en cada rerun.
+    La selección se conserva en session_state entre reruns.
+    """
+    if st.session_state.get(key) not in etiquetas:
+        st.session_state[key] = etiquetas[0]
+    return st.radio(
+        "Sección de análisis",
+        etiquetas,
+        key=key,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
@@ -0,0 +1,215 @@
+"""Capa de caché para respuestas de LLM: disco con TTL/tamaño máximo y coalescencia de peticiones"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class BackendOpenAI:
+    """
+    Backend real: reutiliza un único cliente OpenAI por (API key, base_url).
+    'base_url' permite apuntar a cualquier servidor compatible, p. ej. un servidor falso local en pruebas.
+    """
+
+    _clientes: Dict[tuple, object] = {}
+    _lock = Lock()
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url or None
+
+    def _cliente(self):
+        clave = (self.api_key, self.base_url)
+        with self._lock:
+            if clave not in self._clientes:
+                from openai import OpenAI
+                self._clientes[clave] = OpenAI(api_key=self.api_key, base_url=self.base_url)
+            return self._clientes[clave]
+
+    def completar(self, modelo: str, mensajes: List[Dict], temperatura: float, max_tokens: int) -> str:
+        response = self._cliente().chat.completions.create(
+            model=modelo,
+            messages=mensajes,
+            temperature=temperatura,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+    def transmitir(self, modelo: str, mensajes: List[Dict], temperatura: float, max_tokens: int) -> Iterator[str]:
+        """Genera los fragmentos de texto a medida que llegan del servidor"""
+        stream = self._cliente().chat.completions.create(
+            model=modelo,
+            messages=mensajes,
+            temperature=temperatura,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class BackendStub:
+    """
+    Backend local determinista para pruebas y desarrollo sin API key.
+    Por defecto devuelve un texto fijo que incluye la huella del prompt.
+    """
+
+    def __init__(self, respuesta: Optional[Callable[[str, List[Dict]], str]] = None, latencia: float = 0.0):
+        self.respuesta = respuesta
+        self.latencia = latencia
+        self.llamadas = 0
+
+    def _texto(self, modelo: str, mensajes: List[Dict]) -> str:
+        if self.respuesta is not None:
+            return self.respuesta(modelo, mensajes)
+        huella = clave_prompt(modelo, mensajes)[:12]
+        return f"## 📊 RESUMEN EJECUTIVO (stub)\n\nRespuesta simulada de `{modelo}` para el prompt `{huella}`."
+
+    def completar(self, modelo: str, mensajes: List[Dict], temperatura: float, max_tokens: int) -> str:
+        self.llamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self._texto(modelo, mensajes)
+
+    def transmitir(self, modelo: str, mensajes: List[Dict], temperatura: float, max_tokens: int) -> Iterator[str]:
+        """Entrega la respuesta palabra por palabra, repartiendo la latencia entre fragmentos"""
+        self.llamadas += 1
+        palabras = self._texto(modelo, mensajes).split(" ")
+        pausa = self.latencia / max(len(palabras), 1)
+        for i, palabra in enumerate(palabras):
+            if pausa:
+                time.sleep(pausa)
+            yield palabra if i == 0 else " " + palabra
+
+
+def clave_prompt(modelo: str, mensajes: List[Dict], **parametros) -> str:
+    """Hash SHA-256 estable del modelo, los mensajes y los parámetros de generación"""
+    carga = json.dumps({"modelo": modelo, "mensajes": mensajes, "parametros": parametros},
+                       sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(carga.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    """
+    Caché persistente en disco (un JSON por respuesta) con:
+    - TTL: las entradas más viejas que 'ttl' segundos se ignoran y se borran.
+    - Tamaño máximo: al superar 'max_bytes' se expulsan primero las menos usadas recientemente.
+    - Coalescencia: peticiones concurrentes con la misma clave comparten una sola llamada.
+    """
+
+    def __init__(self, directorio: str, ttl: int = 86400, max_bytes: int = 50 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._en_vuelo: Dict[str, Future] = {}
+        self._lock = Lock()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / f"{clave}.json"
+
+    def leer(self, clave: str) -> Optional[str]:
+        ruta = self._ruta(clave)
+        try:
+            edad = time.time() - ruta.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if edad > self.ttl:
+            ruta.unlink(missing_ok=True)
+            return None
+        try:
+            contenido = json.loads(ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        os.utime(ruta, None)  # marca de uso para la expulsión LRU
+        return contenido.get("respuesta")
+
+    def escribir(self, clave: str, respuesta: str, modelo: str = ""):
+        ruta = self._ruta(clave)
+        temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+        temporal.write_text(json.dumps({"modelo": modelo, "creado": time.time(), "respuesta": respuesta},
+                                       ensure_ascii=False), encoding="utf-8")
+        os.replace(temporal, ruta)
+        self._expulsar()
+
+    def _expulsar(self):
+        entradas = []
+        total = 0
+        for ruta in self.directorio.glob("*.json"):
+            try:
+                info = ruta.stat()
+            except FileNotFoundError:
+                continue
+            if time.time() - info.st_mtime > self.ttl:
+                ruta.unlink(missing_ok=True)
+                continue
+            entradas.append((info.st_mtime, info.st_size, ruta))
+            total += info.st_size
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            ruta.unlink(missing_ok=True)
+            total -= tamano
+
+    def obtener_o_calcular(self, clave: str, calcular: Callable[[], str], modelo: str = "") -> str:
+        """Devuelve la respuesta en caché o la calcula una sola vez aunque haya varios solicitantes"""
+        respuesta = self.leer(clave)
+        if respuesta is not None:
+            return respuesta
+
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            propietario = futuro is None
+            if propietario:
+                futuro = Future()
+                self._en_vuelo[clave] = futuro
+
+        if not propietario:
+            return futuro.result()
+
+        try:
+            respuesta = calcular()
+            self.escribir(clave, respuesta, modelo)
+            futuro.set_result(respuesta)
+            return respuesta
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+
+
+_CACHES: Dict[tuple, CacheLLM] = {}
+_CACHES_LOCK = Lock()
+
+
+def obtener_cache(directorio: str, ttl: int, max_bytes: int) -> CacheLLM:
+    """Una instancia de caché por configuración, compartida por todas las sesiones del proceso"""
+    clave = (str(directorio), ttl, max_bytes)
+    with _CACHES_LOCK:
+        if clave not in _CACHES:
+            _CACHES[clave] = CacheLLM(directorio, ttl, max_bytes)
+        return _CACHES[clave]
+
+
+def completar_con_cache(
+    backend,
+    cache: CacheLLM,
+    mensajes: List[Dict],
+    modelo: str,
+    temperatura: float = 0.7,
+    max_tokens: int = 2000
+) -> str:
+    """Completa el chat usando la caché; el mismo prompt y modelo nunca se paga dos veces dentro del TTL"""
+    clave = clave_prompt(modelo, mensajes, temperatura=temperatura, max_tokens=max_tokens)
+    return cache.obtener_o_calcular(
+        clave,
+        lambda: backend.completar(modelo, mensajes, temperatura, max_tokens),
+        modelo
+    )
@@ -10,9 +10,23 @@ from reportlab.platypus import (
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
 from io import BytesIO
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import math
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import utils_memoria
+import utils_rendimiento
+
+from .config import AppConfig
+
+# Cambiar al modificar el diseño del reporte: invalida los PDFs en caché
+VERSION_PLANTILLA = "2.1"
+FILAS_POR_PAGINA_LISTADO = 40
 
 class EncabezadoPiePagina:
     """Clase para manejar encabezados y pies de página"""
@@ -231,19 +245,16 @@ class GeneradorPDFFerreinox:
             ))
             return
         
-        df_marcas = df_marcas.head(10).reset_index()
-        
-        datos_tabla = [['Marca', 'Ventas', 'Participación']]
-        
-        total_ventas = df_marcas['Ventas'].sum()
-        
-        for _, row in df_marcas.iterrows():
-            participacion = (row['Ventas'] / total_ventas * 100) if total_ventas > 0 else 0
-            datos_tabla.append([
-                row['Marca'],
-                f"${row['Ventas']:,.0f}",
-                f"{participacion:.1f}%"
-            ])
+        df_marcas = df_marcas.nlargest(10, 'Ventas')
+        ventas = df_marcas['Ventas'].to_numpy(dtype=float)
+        total_ventas = ventas.sum()
+        participacion = ventas / total_ventas * 100 if total_ventas > 0 else np.zeros(len(ventas))
+
+        datos_tabla = [['Marca', 'Ventas', 'Participación']] + _filas_texto(
+            df_marcas['Marca'].astype(str).to_numpy(),
+            _formatear_moneda(ventas),
+            _formatear_pct(participacion)
+        )
         
         tabla = Table(datos_tabla, colWidths=[3*inch, 2*inch, 1.5*inch])
         
@@ -277,19 +288,35 @@ class GeneradorPDFFerreinox:
             ))
             return
         
-        df_top = df_clientes.head(top_n).reset_index()
-        
-        datos_tabla = [['#', 'Cliente', 'Ventas']]
-        
-        for idx, row in enumerate(df_top.iterrows(), 1):
-            datos_tabla.append([
-                str(idx),
-                row[1]['Cliente'][:40],
-                f"${row[1]['Ventas']:,.0f}"
-            ])
-        
-        tabla = Table(datos_tabla, colWidths=[0.5*inch, 4*inch, 2*inch])
-        
+        self.elementos.extend(self._tablas_clientes(df_clientes.nlargest(top_n, 'Ventas'), filas_por_pagina=top_n))
+
+    def agregar_listado_clientes(
+        self,
+        df_clientes: pd.DataFrame,
+        filas_por_pagina: int = FILAS_POR_PAGINA_LISTADO,
+        paginas: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Listado completo de clientes ordenado por ventas, una tabla por página.
+        'paginas' = (inicio, fin), 1-based e inclusivo, construye sólo ese tramo del listado.
+        """
+        df_orden = df_clientes.sort_values('Ventas', ascending=False, kind='mergesort')
+        inicio, fin = paginas if paginas else (1, paginas_listado(len(df_orden), filas_por_pagina))
+        desde = (max(inicio, 1) - 1) * filas_por_pagina
+        hasta = max(fin, inicio) * filas_por_pagina
+        self.elementos.extend(self._tablas_clientes(df_orden.iloc[desde:hasta], filas_por_pagina, primer_puesto=desde + 1))
+
+    def _tablas_clientes(self, df_clientes: pd.DataFrame, filas_por_pagina: int, primer_puesto: int = 1) -> List:
+        """
+        Filas construidas en bloque desde arrays NumPy y partidas en tablas de una página:
+        reportlab no tiene que dividir una tabla enorme, que es lo costoso en listados largos.
+        """
+        n = len(df_clientes)
+        filas = _filas_texto(
+            np.arange(primer_puesto, primer_puesto + n).astype(str),
+            np.array([c[:40] for c in df_clientes['Cliente'].astype(str).to_numpy()], dtype=object),
+            _formatear_moneda(df_clientes['Ventas'].to_numpy(dtype=float))
+        )
         estilo_tabla = TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), self.colores['accent']),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -300,9 +327,16 @@ class GeneradorPDFFerreinox:
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.colores['gray_light']])
         ])
-        
-        tabla.setStyle(estilo_tabla)
-        self.elementos.append(tabla)
+
+        flowables = []
+        for i in range(0, max(n, 1), filas_por_pagina):
+            if i > 0:
+                flowables.append(PageBreak())
+            tabla = Table([['#', 'Cliente', 'Ventas']] + filas[i:i + filas_por_pagina],
+                          colWidths=[0.5*inch, 4*inch, 2*inch], repeatRows=1)
+            tabla.setStyle(estilo_tabla)
+            flowables.append(tabla)
+        return flowables
     
     def agregar_conclusiones(self, conclusiones: List[str]):
         """Agrega sección de conclusiones y recomendaciones"""
@@ -355,35 +389,132 @@ class GeneradorPDFFerreinox:
         return self.buffer.getvalue()
 
 
+# ===== TABLAS EN BLOQUE =====
+def _formatear_moneda(valores: np.ndarray) -> np.ndarray:
+    return np.array([f"${v:,.0f}" for v in valores.tolist()], dtype=object)
+
+
+def _formatear_pct(valores: np.ndarray) -> np.ndarray:
+    return np.array([f"{v:.1f}%" for v in valores.tolist()], dtype=object)
+
+
+def _filas_texto(*columnas: np.ndarray) -> List[List[str]]:
+    """Une columnas ya formateadas en filas para Table (sin recorrer el DataFrame fila a fila)"""
+    if not columnas or len(columnas[0]) == 0:
+        return []
+    return np.column_stack(columnas).tolist()
+
+
+def paginas_listado(total_filas: int, filas_por_pagina: int = FILAS_POR_PAGINA_LISTADO) -> int:
+    """Número de páginas que ocupa un listado de clientes"""
+    return max(1, math.ceil(total_filas / filas_por_pagina))
+
+
+# ===== CACHÉ DE PDFs =====
+_PDFS: "OrderedDict[str, bytes]" = OrderedDict()
+_PDFS_LOCK = Lock()
+
+
+def _clave_pdf(tipo: str, clave_cache: Hashable, *extra) -> str:
+    """(tipo de reporte, filtros + versión de datos, plantilla, parámetros) -> hash estable"""
+    return hashlib.sha256(repr((tipo, clave_cache, VERSION_PLANTILLA) + extra).encode("utf-8")).hexdigest()
+
+
+def _pdf_en_cache(clave: Optional[str], construir) -> bytes:
+    """Devuelve el PDF en caché o lo construye; sin clave no se guarda"""
+    if clave is None:
+        with utils_rendimiento.medir(utils_rendimiento.EXPORTACION, "PDF estratégico"):
+            return construir()
+    with _PDFS_LOCK:
+        en_cache = clave in _PDFS
+        utils_rendimiento.registrar_cache("pdf_estrategico", en_cache)
+        if en_cache:
+            _PDFS.move_to_end(clave)
+            return _PDFS[clave]
+    with utils_rendimiento.medir(utils_rendimiento.EXPORTACION, "PDF estratégico"):
+        pdf_bytes = construir()
+    with _PDFS_LOCK:
+        _PDFS[clave] = pdf_bytes
+        while len(_PDFS) > AppConfig().PDF_CACHE_MAX:
+            _PDFS.popitem(last=False)
+    return pdf_bytes
+
+
+def limpiar_cache_pdf():
+    """Vacía la caché de PDFs (p. ej. tras recargar datos)"""
+    with _PDFS_LOCK:
+        _PDFS.clear()
+
+
+utils_memoria.registrar_liberable("pdf_estrategico", limpiar_cache_pdf)
+
+
 def generar_reporte_completo(
     metricas_basicas: Dict,
     df_marcas: pd.DataFrame,
     df_clientes: pd.DataFrame,
     anio_objetivo: int,
     anio_base: int,
-    conclusiones: List[str] = None
+    conclusiones: List[str] = None,
+    clave_cache: Optional[Hashable] = None
 ) -> bytes:
-    """Genera un reporte PDF completo con todos los análisis"""
-    
-    generador = GeneradorPDFFerreinox("Análisis Estratégico de Crecimiento")
-    
-    # Portada
-    generador.agregar_portada(
-        anio_objetivo=anio_objetivo,
-        anio_base=anio_base
-    )
-    
-    # Resumen ejecutivo
-    generador.agregar_resumen_ejecutivo(metricas_basicas)
-    
-    # Análisis por marca
-    generador.agregar_analisis_marcas(df_marcas)
-    
-    # Top clientes
-    generador.agregar_top_clientes(df_clientes, top_n=20)
-    
-    # Conclusiones
-    if conclusiones:
-        generador.agregar_conclusiones(conclusiones)
-    
-    return generador.generar()
\ No newline at end of file
+    """
+    Genera un reporte PDF completo con todos los análisis.
+    Con 'clave_cache' (filtros + versión de datos) las solicitudes idénticas, de cualquier
+    usuario, reciben los bytes ya renderizados.
+    """
+    def construir() -> bytes:
+        generador = GeneradorPDFFerreinox("Análisis Estratégico de Crecimiento")
+        
+        # Portada
+        generador.agregar_portada(
+            anio_objetivo=anio_objetivo,
+            anio_base=anio_base
+        )
+        
+        # Resumen ejecutivo
+        generador.agregar_resumen_ejecutivo(metricas_basicas)
+        
+        # Análisis por marca
+        generador.agregar_analisis_marcas(df_marcas)
+        
+        # Top clientes
+        generador.agregar_top_clientes(df_clientes, top_n=20)
+        
+        # Conclusiones
+        if conclusiones:
+            generador.agregar_conclusiones(conclusiones)
+        
+        return generador.generar()
+
+    clave = _clave_pdf("completo", clave_cache, anio_objetivo, anio_base, tuple(conclusiones or ())) if clave_cache is not None else None
+    return _pdf_en_cache(clave, construir)
+
+
+def generar_listado_clientes(
+    df_clientes: pd.DataFrame,
+    anio_objetivo: int,
+    pagina_inicio: int = 1,
+    pagina_fin: Optional[int] = None,
+    filas_por_pagina: int = FILAS_POR_PAGINA_LISTADO,
+    clave_cache: Optional[Hashable] = None
+) -> bytes:
+    """
+    PDF del listado de clientes sólo para el rango de páginas pedido, de modo que un listado
+    de miles de clientes se entrega por tramos; cada tramo queda en caché por separado.
+    """
+    total_paginas = paginas_listado(len(df_clientes), filas_por_pagina)
+    pagina_fin = min(pagina_fin or total_paginas, total_paginas)
+    pagina_inicio = min(max(pagina_inicio, 1), pagina_fin)
+
+    def construir() -> bytes:
+        generador = GeneradorPDFFerreinox(f"Listado de Clientes {anio_objetivo}")
+        generador.elementos.append(Paragraph(
+            f"👥 Clientes por Ventas {anio_objetivo} (páginas {pagina_inicio}-{pagina_fin} de {total_paginas})",
+            generador.estilos['titulo_seccion']
+        ))
+        generador.agregar_listado_clientes(df_clientes, filas_por_pagina, (pagina_inicio, pagina_fin))
+        return generador.generar()
+
+    clave = _clave_pdf("listado", clave_cache, anio_objetivo, pagina_inicio, pagina_fin, filas_por_pagina) if clave_cache is not None else None
+    return _pdf_en_cache(clave, construir)
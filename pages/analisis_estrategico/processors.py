@@ -4,21 +4,21 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
-from typing import Dict
+from typing import Dict, Optional
 
 from .projections import proyectar_ventas_2026, proyectar_por_vendedor, proyectar_por_ciudad
-from .pdf_generator import generar_reporte_completo
-from .ai_analysis import analizar_con_ia_avanzado
-from .config import AppConfig
+from .pdf_generator import generar_reporte_completo, generar_listado_clientes, paginas_listado
+from .ai_analysis import iniciar_analisis_ia, mostrar_narrativa_ia
+from .context import ContextoAnalisis, obtener_contexto, clave_contexto
 
 class BaseTab(ABC):
     """Clase base abstracta para tabs de análisis"""
-    def __init__(self, df: pd.DataFrame, filtros: Dict):
+    def __init__(self, df: pd.DataFrame, filtros: Dict, contexto: Optional[ContextoAnalisis] = None):
         self.df = df
         self.filtros = filtros
-        self.df_actual = df[df["anio"] == filtros["anio_objetivo"]]
-        self.df_anterior = df[df["anio"] == filtros["anio_base"]]
+        # Los cortes por año se comparten entre tabs a través del contexto
+        self.contexto = contexto if contexto is not None else obtener_contexto(df, filtros)
+        self.clave_filtros = self.contexto.clave if self.contexto.clave is not None else clave_contexto(df, filtros)
 
         def pick(names):
             return next((c for c in names if c in df.columns), names[-1])
@@ -31,6 +31,15 @@ class BaseTab(ABC):
         self.col_vendedor = pick(["nomvendedor", "Vendedor"])
         self.col_ciudad = pick(["Poblacion_Real", "Ciudad"])
     
+    @property
+    def df_actual(self) -> pd.DataFrame:
+        """Filas del año objetivo; sólo se materializan si el tab las necesita (las agregaciones van por consulta)"""
+        return self.contexto.df_actual
+
+    @property
+    def df_anterior(self) -> pd.DataFrame:
+        return self.contexto.df_anterior
+
     @abstractmethod
     def render(self):
         """Método que cada tab debe implementar"""
@@ -38,17 +47,24 @@ class BaseTab(ABC):
     
     def calcular_metricas_basicas(self) -> Dict:
         """Calcula métricas comparativas básicas"""
-        venta_actual = self.df_actual[self.col_valor].sum()
-        venta_anterior = self.df_anterior[self.col_valor].sum()
-        diferencia = venta_actual - venta_anterior
-        pct_variacion = (diferencia / venta_anterior * 100) if venta_anterior > 0 else 0
-        
-        return {
-            'venta_actual': venta_actual,
-            'venta_anterior': venta_anterior,
-            'diferencia': diferencia,
-            'pct_variacion': pct_variacion
-        }
+        return self.contexto.metricas_basicas(self.col_valor)
+
+    def comparativo(self, col_group: str) -> pd.DataFrame:
+        """Comparativo año contra año compartido de 'col_group' (con penetración salvo en la dimensión cliente)"""
+        col_cliente = None if col_group == self.col_cliente else self.col_cliente
+        return self.contexto.comparativo(col_group, self.col_valor, col_cliente)
+
+    def _top_comparativo(self, col_group: str, etiqueta: str, top_n: int) -> pd.DataFrame:
+        """Tabla Top N (Ventas_Actual/Anterior, Variacion y Variacion_Pct) de los grupos con venta en el año objetivo"""
+        df_comp = self.comparativo(col_group)
+        df_comp = df_comp[df_comp['En_actual']].head(top_n)
+        return pd.DataFrame({
+            etiqueta: df_comp[col_group].to_numpy(),
+            'Ventas_Actual': df_comp['Actual'].to_numpy(),
+            'Ventas_Anterior': df_comp['Anterior'].to_numpy(),
+            'Variacion': df_comp['Var_abs'].to_numpy(),
+            'Variacion_Pct': df_comp['Var_pct'].fillna(100).to_numpy()
+        })
 
 
 class TabADNCrecimiento(BaseTab):
@@ -112,7 +128,8 @@ class TabADNCrecimiento(BaseTab):
                 df_clientes=df_clientes,
                 anio_objetivo=self.filtros['anio_objetivo'],
                 anio_base=self.filtros['anio_base'],
-                conclusiones=conclusiones
+                conclusiones=conclusiones,
+                clave_cache=self.clave_filtros
             )
             
             st.download_button(
@@ -126,7 +143,13 @@ class TabADNCrecimiento(BaseTab):
         """Tendencias mensuales"""
         st.subheader("📈 Tendencias Mensuales")
         
-        df_tendencias = self.df.groupby(['anio', 'mes'])[self.col_valor].sum().reset_index()
+        df_tendencias = (
+            self.contexto.consulta()
+            .agrupar('anio', 'mes')
+            .sumar(self.col_valor)
+            .ordenar('anio', descendente=False)
+            .a_pandas()
+        )
         
         fig = px.line(
             df_tendencias,
@@ -143,18 +166,8 @@ class TabADNCrecimiento(BaseTab):
         st.subheader("🏷️ Desempeño por Marca")
         col_marca = "nombre_marca" if "nombre_marca" in self.df.columns else self.col_marca
 
-        marcas_actual = (
-            self.df_actual.groupby(col_marca)[self.col_valor]
-            .sum()
-            .sort_values(ascending=False)
-            .head(10)
-        )
-        marcas_anterior = self.df_anterior.groupby(col_marca)[self.col_valor].sum()
-
-        df_comp = pd.DataFrame({
-            'Actual': marcas_actual,
-            'Anterior': [marcas_anterior.get(m, 0) for m in marcas_actual.index]
-        }).fillna(0)
+        df_comp = self.comparativo(col_marca)
+        df_comp = df_comp[df_comp['En_actual']].head(10).set_index(col_marca)
 
         fig = go.Figure()
         fig.add_trace(go.Bar(name=f'{self.filtros["anio_base"]}', x=df_comp.index, y=df_comp['Anterior']))
@@ -170,22 +183,20 @@ class TabAnalisisIA(BaseTab):
         st.header("🤖 Análisis Estratégico Ejecutivo con IA")
         st.markdown("**Análisis profundo generado por GPT-4 Mini + Análisis Cuantitativo**")
         
-        config = AppConfig()
-        
-        with st.spinner("🧠 Generando análisis estratégico completo..."):
-            metricas = self.calcular_metricas_basicas()
+        metricas = self.calcular_metricas_basicas()
 
-            lineas_presentes = sorted(self.df['Linea_Estrategica'].dropna().unique()) if 'Linea_Estrategica' in self.df.columns else []
-            if not lineas_presentes:
-                st.warning("No se encontraron líneas estratégicas en los datos.")
-                return
+        lineas_presentes = sorted(self.df['Linea_Estrategica'].dropna().unique()) if 'Linea_Estrategica' in self.df.columns else []
+        if not lineas_presentes:
+            st.warning("No se encontraron líneas estratégicas en los datos.")
+            return
 
-            # corregir llamada
-            analisis_completo = analizar_con_ia_avanzado(self.df_actual, self.df_anterior, metricas, lineas_presentes)
+        # Las secciones cuantitativas se calculan ya; la narrativa de IA se genera en el pool
+        analisis_completo, trabajo_ia = iniciar_analisis_ia(self.df_actual, self.df_anterior, metricas, lineas_presentes)
         
-        # Análisis Ejecutivo IA
+        # Análisis Ejecutivo IA (se llena al final, token a token, sin bloquear el resto del tab)
         st.markdown("---")
-        st.markdown(analisis_completo['analisis_ejecutivo'])
+        placeholder_ejecutivo = st.empty()
+        placeholder_ejecutivo.info("🧠 Generando análisis estratégico...")
         
         # Análisis de Líneas Estratégicas
         st.markdown("---")
@@ -272,6 +283,8 @@ class TabAnalisisIA(BaseTab):
         
         st.markdown("---")
         st.caption("✨ Análisis generado por OpenAI GPT-4 Mini + Motor Cuantitativo Ferreinox | Sistema de Inteligencia Comercial v2.0")
+        
+        mostrar_narrativa_ia(placeholder_ejecutivo, analisis_completo, trabajo_ia)
 
 
 class TabOportunidadGeografica(BaseTab):
@@ -299,19 +312,8 @@ class TabOportunidadGeografica(BaseTab):
         """Mapa de calor de crecimiento por ciudad"""
         st.subheader("🗺️ Mapa de Calor de Crecimiento")
         
-        ciudades_actual = self.df_actual.groupby(self.col_ciudad)[self.col_valor].sum()
-        ciudades_anterior = self.df_anterior.groupby(self.col_ciudad)[self.col_valor].sum()
-        
-        df_crec = pd.DataFrame({
-            'Actual': ciudades_actual,
-            'Anterior': ciudades_anterior
-        }).fillna(0)
-        
-        df_crec['Crecimiento'] = np.where(
-            df_crec['Anterior'] > 0,
-            ((df_crec['Actual'] - df_crec['Anterior']) / df_crec['Anterior']) * 100,
-            0
-        )
+        df_crec = self.comparativo(self.col_ciudad).set_index(self.col_ciudad)
+        df_crec['Crecimiento'] = df_crec['Var_pct'].fillna(0)
         
         df_crec = df_crec.sort_values('Crecimiento', ascending=False).head(15)
         
@@ -340,21 +342,7 @@ class TabTopClientes(BaseTab):
     def render(self):
         st.header("👥 Top 50 Clientes")
         
-        clientes_actual = self.df_actual.groupby(self.col_cliente)[self.col_valor].sum().sort_values(ascending=False).head(50)
-        clientes_anterior = self.df_anterior.groupby(self.col_cliente)[self.col_valor].sum()
-        
-        df_comp = pd.DataFrame({
-            'Cliente': clientes_actual.index,
-            'Ventas_Actual': clientes_actual.values,
-            'Ventas_Anterior': [clientes_anterior.get(c, 0) for c in clientes_actual.index]
-        })
-        
-        df_comp['Variacion'] = df_comp['Ventas_Actual'] - df_comp['Ventas_Anterior']
-        df_comp['Variacion_Pct'] = np.where(
-            df_comp['Ventas_Anterior'] > 0,
-            (df_comp['Variacion'] / df_comp['Ventas_Anterior']) * 100,
-            100
-        )
+        df_comp = self._top_comparativo(self.col_cliente, 'Cliente', 50)
         
         st.dataframe(
             df_comp,
@@ -369,6 +357,41 @@ class TabTopClientes(BaseTab):
             hide_index=True
         )
 
+        self._listado_pdf()
+
+    def _listado_pdf(self):
+        """Listado completo de clientes en PDF, generado por rango de páginas"""
+        with st.expander("📄 Listado completo de clientes (PDF)"):
+            df_clientes = (
+                self.contexto.consulta()
+                .donde(anio=self.filtros['anio_objetivo'])
+                .agrupar(self.col_cliente)
+                .sumar(self.col_valor, 'Ventas')
+                .a_pandas()
+                .rename(columns={self.col_cliente: 'Cliente'})
+            )
+            total_paginas = paginas_listado(len(df_clientes))
+            st.caption(f"{len(df_clientes):,} clientes · {total_paginas} páginas")
+
+            col1, col2 = st.columns(2)
+            pagina_inicio = col1.number_input("Desde página", min_value=1, max_value=total_paginas, value=1, key="pdf_listado_desde")
+            pagina_fin = col2.number_input("Hasta página", min_value=1, max_value=total_paginas, value=min(total_paginas, 25), key="pdf_listado_hasta")
+
+            if st.button("Generar listado PDF", key="btn_pdf_listado"):
+                pdf_bytes = generar_listado_clientes(
+                    df_clientes,
+                    anio_objetivo=self.filtros['anio_objetivo'],
+                    pagina_inicio=int(pagina_inicio),
+                    pagina_fin=int(pagina_fin),
+                    clave_cache=self.clave_filtros
+                )
+                st.download_button(
+                    label="💾 Guardar Listado PDF",
+                    data=pdf_bytes,
+                    file_name=f"Clientes_{self.filtros['anio_objetivo']}_p{int(pagina_inicio)}-{int(pagina_fin)}.pdf",
+                    mime="application/pdf"
+                )
+
 
 class TabProductosEstrella(BaseTab):
     """Tab 4: Análisis de productos estrella"""
@@ -377,24 +400,10 @@ class TabProductosEstrella(BaseTab):
         st.header("📦 Productos Estrella")
         
         # Top productos
-        df_productos = self.df_actual.groupby(self.col_producto)[self.col_valor].sum().sort_values(ascending=False).head(50)
-        df_productos_anterior = self.df_anterior.groupby(self.col_producto)[self.col_valor].sum()
-        
         st.subheader("🏆 Top 50 Productos por Ventas")
         
         # Crear DataFrame comparativo
-        df_comp = pd.DataFrame({
-            'Producto': df_productos.index,
-            'Ventas_Actual': df_productos.values,
-            'Ventas_Anterior': [df_productos_anterior.get(p, 0) for p in df_productos.index]
-        })
-        
-        df_comp['Variacion'] = df_comp['Ventas_Actual'] - df_comp['Ventas_Anterior']
-        df_comp['Variacion_Pct'] = np.where(
-            df_comp['Ventas_Anterior'] > 0,
-            (df_comp['Variacion'] / df_comp['Ventas_Anterior']) * 100,
-            100
-        )
+        df_comp = self._top_comparativo(self.col_producto, 'Producto', 50)
         
         # Mostrar tabla
         st.dataframe(
@@ -451,15 +460,8 @@ class TabGestionRiesgo(BaseTab):
         st.markdown("Identificación de factores de riesgo comercial.")
         
         # Clientes en decrecimiento
-        clientes_actual = self.df_actual.groupby(self.col_cliente)[self.col_valor].sum()
-        clientes_anterior = self.df_anterior.groupby(self.col_cliente)[self.col_valor].sum()
-        
-        df_comp = pd.DataFrame({
-            'Actual': clientes_actual,
-            'Anterior': clientes_anterior
-        }).fillna(0)
-        
-        df_comp['Variacion'] = df_comp['Actual'] - df_comp['Anterior']
+        df_comp = self.comparativo(self.col_cliente).set_index(self.col_cliente)[['Actual', 'Anterior', 'Var_abs']]
+        df_comp = df_comp.rename(columns={'Var_abs': 'Variacion'})
         clientes_riesgo = df_comp[df_comp['Variacion'] < 0].sort_values('Variacion').head(20)
         
         st.subheader("⚠️ Top 20 Clientes en Riesgo")
@@ -519,16 +521,15 @@ class TabPortafolioMarcasCategorias(BaseTab):
         self._insights_ia()
 
     def _kpis_portafolio(self):
-        total_actual = self.df_actual[self.col_valor].sum()
-        total_anterior = self.df_anterior[self.col_valor].sum()
-        var_abs = total_actual - total_anterior
-        var_pct = (var_abs / total_anterior * 100) if total_anterior > 0 else 0
+        metricas = self.calcular_metricas_basicas()
+        total_actual, total_anterior = metricas['venta_actual'], metricas['venta_anterior']
+        var_abs, var_pct = metricas['diferencia'], metricas['pct_variacion']
 
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Venta actual", f"${total_actual:,.0f}", f"{var_pct:+.1f}%")
         col2.metric("Venta anterior", f"${total_anterior:,.0f}")
         col3.metric("Diferencia", f"${var_abs:,.0f}", delta_color="inverse" if var_abs < 0 else "normal")
-        col4.metric("Clientes activos", f"{self.df_actual[self.col_cliente].nunique():,}")
+        col4.metric("Clientes activos", f"{self.contexto.total_clientes(self.col_cliente):,}")
 
     def _panel_segmento(self, label: str, col_group: str, top_n: int = 10):
         st.subheader(f"⚡ {label}: Ranking, Pareto y Penetración")
@@ -595,38 +596,7 @@ class TabPortafolioMarcasCategorias(BaseTab):
             st.plotly_chart(fig2, use_container_width=True)
 
     def _resumen_crecimiento(self, col_group: str) -> pd.DataFrame:
-        actual = self.df_actual.groupby(col_group)[self.col_valor].sum()
-        anterior = self.df_anterior.groupby(col_group)[self.col_valor].sum()
-        clientes = self.df_actual.groupby(col_group)[self.col_cliente].nunique() if col_group in self.df_actual else pd.Series(dtype=int)
-        total_clientes = self.df_actual[self.col_cliente].nunique()
-
-        df_comp = pd.DataFrame({
-            col_group: actual.index,
-            "Actual": actual.values,
-            "Anterior": [anterior.get(x, 0) for x in actual.index],
-            "Clientes": [clientes.get(x, 0) for x in actual.index]
-        }).fillna(0)
-
-        df_comp["Var_abs"] = df_comp["Actual"] - df_comp["Anterior"]
-        df_comp["Var_pct"] = np.where(
-            df_comp["Anterior"] > 0,
-            (df_comp["Var_abs"] / df_comp["Anterior"]) * 100,
-            100
-        )
-        df_comp["Penetracion"] = np.where(
-            total_clientes > 0,
-            df_comp["Clientes"] / total_clientes * 100,
-            0
-        )
-        df_comp["Impacto"] = np.select(
-            [
-                df_comp["Var_pct"] >= 10,
-                df_comp["Var_pct"] <= -10
-            ],
-            ["MOTOR", "FRENO"],
-            default="ESTABLE"
-        )
-        return df_comp.sort_values("Actual", ascending=False).reset_index(drop=True)
+        return self.contexto.resumen_crecimiento(col_group, self.col_valor, self.col_cliente)
 
     def _alertas_gerenciales(self):
         st.subheader("🚨 Alertas y Oportunidades Automáticas")
@@ -647,7 +617,7 @@ class TabPortafolioMarcasCategorias(BaseTab):
     def _simulador_penetracion(self):
         st.subheader("🧮 Simulador de Escenarios de Penetración")
         resumen_c = self._resumen_crecimiento(self.col_linea)
-        total_clientes = self.df_actual[self.col_cliente].nunique()
+        total_clientes = self.contexto.total_clientes(self.col_cliente)
 
         categoria_sel = st.selectbox("Selecciona una categoría para simular", resumen_c[self.col_linea])
         row = resumen_c[resumen_c[self.col_linea] == categoria_sel].iloc[0]
@@ -665,16 +635,9 @@ class TabPortafolioMarcasCategorias(BaseTab):
     def _insights_ia(self):
         st.subheader("🤖 Insights de IA sobre Marcas y Categorías")
         # Puedes personalizar el prompt en ai_analysis.py si lo deseas
-        metricas = {
-            "venta_actual": self.df_actual[self.col_valor].sum(),
-            "venta_anterior": self.df_anterior[self.col_valor].sum(),
-            "diferencia": self.df_actual[self.col_valor].sum() - self.df_anterior[self.col_valor].sum(),
-            "pct_variacion": (
-                (self.df_actual[self.col_valor].sum() - self.df_anterior[self.col_valor].sum())
-                / self.df_anterior[self.col_valor].sum() * 100
-            ) if self.df_anterior[self.col_valor].sum() > 0 else 0
-        }
+        metricas = self.calcular_metricas_basicas()
         lineas_presentes = sorted(self.df_actual[self.col_linea].dropna().unique())
-        with st.spinner("🧠 Analizando con IA..."):
-            analisis = analizar_con_ia_avanzado(self.df_actual, self.df_anterior, metricas, lineas_presentes)
-        st.markdown(analisis.get("analisis_ejecutivo", "Sin respuesta de IA."))
\ No newline at end of file
+        analisis, trabajo_ia = iniciar_analisis_ia(self.df_actual, self.df_anterior, metricas, lineas_presentes)
+        placeholder = st.empty()
+        placeholder.info("🧠 Analizando con IA...")
+        mostrar_narrativa_ia(placeholder, analisis, trabajo_ia)
\ No newline at end of file
@@ -1,11 +1,17 @@
 """Componentes de interfaz de usuario reutilizables"""
 import streamlit as st
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional
+from nucleo import periodos
 from .config import AppConfig
+from .consultas import COLUMNAS_FILTRO
+from .context import huella_datos
+from .indice_filtros import IndiceFiltros, obtener_indice
 
-def renderizar_sidebar(df_master: pd.DataFrame, config: Dict) -> Dict:
-    """Renderiza sidebar con filtros interactivos"""
+def renderizar_sidebar(df_master: pd.DataFrame, config: Dict, indice: Optional[IndiceFiltros] = None) -> Dict:
+    """Renderiza sidebar con filtros interactivos; las opciones salen del índice de filtros, no del maestro"""
+    if indice is None:
+        indice = obtener_indice(df_master, huella_datos(df_master))
     st.sidebar.header("🎯 Filtros de Análisis")
     
     # Filtro de años
@@ -23,13 +29,32 @@ def renderizar_sidebar(df_master: pd.DataFrame, config: Dict) -> Dict:
         help="Año contra el cual comparar"
     )
     
+    # Periodo comparable: cargar_y_validar_datos lo lee de session_state en la siguiente ejecución
+    periodo = st.sidebar.selectbox(
+        "Periodo Comparable",
+        options=list(periodos.ALCANCES),
+        index=list(periodos.ALCANCES).index(config.get('periodo', periodos.COMPLETO)),
+        format_func=periodos.ALCANCES.get,
+        key="periodo_comparable",
+        help="Compara cada año sólo hasta el mismo mes y día de corte"
+    )
+    fecha_corte = None
+    if periodo != periodos.COMPLETO and config.get('ultima_fecha') is not None:
+        fecha_corte = st.sidebar.date_input(
+            "Fecha de Corte",
+            value=(config.get('fecha_corte') or config['ultima_fecha']).date(),
+            max_value=config['ultima_fecha'].date(),
+            key="fecha_corte_comparable",
+            help="Por defecto, el último día con ventas"
+        )
+    
     st.sidebar.markdown("---")
     st.sidebar.subheader("Filtros Opcionales")
     
     # Filtro de ciudades
     ciudades = st.sidebar.multiselect(
         "Ciudades",
-        options=config['ciudades_disponibles'],
+        options=indice.valores(COLUMNAS_FILTRO['ciudades']),
         default=[],
         help="Filtrar por ubicación geográfica"
     )
@@ -37,7 +62,7 @@ def renderizar_sidebar(df_master: pd.DataFrame, config: Dict) -> Dict:
     # Filtro de líneas estratégicas
     lineas = st.sidebar.multiselect(
         "Líneas Estratégicas",
-        options=config['lineas_disponibles'],
+        options=indice.valores(COLUMNAS_FILTRO['lineas']),
         default=[],
         help="ABRACOL, YALE, GOYA, DELTA, etc."
     )
@@ -45,36 +70,39 @@ def renderizar_sidebar(df_master: pd.DataFrame, config: Dict) -> Dict:
     # Filtro de vendedores
     vendedores = st.sidebar.multiselect(
         "Vendedores",
-        options=config['vendedores_disponibles'],
+        options=indice.valores(COLUMNAS_FILTRO['vendedores']),
         default=[],
         help="Filtrar por vendedor o grupo"
     )
     
+    # Filtro de marcas
+    marcas = st.sidebar.multiselect(
+        "Marcas",
+        options=indice.valores(COLUMNAS_FILTRO['marcas']),
+        default=[],
+        help="Filtrar por marca"
+    )
+    
     return {
         'anio_objetivo': anio_objetivo,
         'anio_base': anio_base,
+        'periodo': periodo,
+        'fecha_corte': fecha_corte,
         'ciudades': ciudades,
         'lineas': lineas,
-        'vendedores': vendedores
+        'vendedores': vendedores,
+        'marcas': marcas
     }
 
-def aplicar_filtros(df: pd.DataFrame, filtros: Dict) -> pd.DataFrame:
-    """Aplica filtros seleccionados al DataFrame"""
-    df_filtrado = df.copy()
-    
-    if filtros.get('ciudades'):
-        if 'Poblacion_Real' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['Poblacion_Real'].isin(filtros['ciudades'])]
-    
-    if filtros.get('lineas'):
-        if 'Linea_Estrategica' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['Linea_Estrategica'].isin(filtros['lineas'])]
-    
-    if filtros.get('vendedores'):
-        if 'nomvendedor' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['nomvendedor'].isin(filtros['vendedores'])]
-    
-    return df_filtrado
+def aplicar_filtros(df: pd.DataFrame, filtros: Dict, indice: Optional[IndiceFiltros] = None) -> pd.DataFrame:
+    """
+    Aplica filtros seleccionados al DataFrame: intersección de las filas de cada valor elegido en el
+    índice (las mismas columnas que consultas.predicados_filtros empuja a DuckDB). Sin filtros activos
+    devuelve el mismo DataFrame, sin copia.
+    """
+    if indice is None:
+        indice = obtener_indice(df, huella_datos(df))
+    return indice.aplicar(df, filtros)
 
 def validar_datos_filtrados(df: pd.DataFrame, filtros: Dict) -> bool:
     """Valida datos suficientes después de filtros"""
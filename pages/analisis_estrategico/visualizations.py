@@ -2,8 +2,9 @@
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
-import numpy as np
-from typing import Dict
+from typing import Dict, Union
+
+from .consultas import Consulta
 
 # Paleta de colores corporativos Ferreinox
 COLORES_FERREINOX = {
@@ -15,34 +16,31 @@ COLORES_FERREINOX = {
 }
 
 def crear_grafico_comparativo(
-    df_actual: pd.DataFrame,
-    df_anterior: pd.DataFrame,
+    comparativo: pd.DataFrame,
     columna_agrupacion: str,
-    columna_valor: str = 'VALOR',
     top_n: int = 10,
     titulo: str = "Comparación Año a Año"
 ) -> go.Figure:
-    """Crea gráfico comparativo profesional entre dos periodos"""
+    """Crea gráfico comparativo profesional entre dos periodos a partir de ContextoAnalisis.comparativo"""
     
-    # Agrupar y ordenar datos
-    actual = df_actual.groupby(columna_agrupacion)[columna_valor].sum().sort_values(ascending=False).head(top_n)
-    anterior = df_anterior.groupby(columna_agrupacion)[columna_valor].sum()
+    # El comparativo ya viene alineado y ordenado por venta actual
+    top = comparativo[comparativo['En_actual']].head(top_n)
     
     # Crear figura
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
         name='Periodo Anterior',
-        x=actual.index,
-        y=[anterior.get(x, 0) for x in actual.index],
+        x=top[columna_agrupacion],
+        y=top['Anterior'],
         marker_color=COLORES_FERREINOX['secondary'],
         hovertemplate='<b>%{x}</b><br>Ventas: $%{y:,.0f}<extra></extra>'
     ))
     
     fig.add_trace(go.Bar(
         name='Periodo Actual',
-        x=actual.index,
-        y=actual.values,
+        x=top[columna_agrupacion],
+        y=top['Actual'],
         marker_color=COLORES_FERREINOX['accent'],
         hovertemplate='<b>%{x}</b><br>Ventas: $%{y:,.0f}<extra></extra>'
     ))
@@ -68,35 +66,19 @@ def crear_grafico_comparativo(
 
 
 def crear_mapa_calor_crecimiento(
-    df_actual: pd.DataFrame,
-    df_anterior: pd.DataFrame,
+    comparativo: pd.DataFrame,
     columna_entidad: str,
-    columna_valor: str = 'VALOR',
     top_n: int = 15
 ) -> go.Figure:
-    """Crea mapa de calor de tasas de crecimiento"""
-    
-    # Calcular ventas por entidad
-    ventas_actual = df_actual.groupby(columna_entidad)[columna_valor].sum()
-    ventas_anterior = df_anterior.groupby(columna_entidad)[columna_valor].sum()
-    
-    # Crear DataFrame de crecimiento
-    df_crec = pd.DataFrame({
-        'Actual': ventas_actual,
-        'Anterior': ventas_anterior
-    }).fillna(0)
-    
-    df_crec['Crecimiento'] = np.where(
-        df_crec['Anterior'] > 0,
-        ((df_crec['Actual'] - df_crec['Anterior']) / df_crec['Anterior']) * 100,
-        0
-    )
+    """Crea mapa de calor de tasas de crecimiento a partir de ContextoAnalisis.comparativo"""
     
+    # Sin venta anterior el crecimiento cuenta como 0
+    df_crec = comparativo[[columna_entidad, 'Actual', 'Anterior']].assign(Crecimiento=comparativo['Var_pct'].fillna(0))
     df_crec = df_crec.sort_values('Crecimiento', ascending=False).head(top_n)
     
     # Crear gráfico
     fig = px.bar(
-        df_crec.reset_index(),
+        df_crec,
         x=columna_entidad,
         y='Crecimiento',
         title=f"Top {top_n} Entidades por Crecimiento",
@@ -145,16 +127,22 @@ def crear_grafico_tendencia_mensual(
 
 
 def crear_grafico_pareto(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, Consulta],
     columna_entidad: str,
     columna_valor: str = 'valor_venta',
     top_n: int = 20,
     titulo: str = "Análisis de Pareto"
 ) -> go.Figure:
-    """Crea gráfico de Pareto (80/20)"""
+    """Crea gráfico de Pareto (80/20); 'df' puede ser una Consulta (p. ej. contexto.consulta())"""
     
     # Agrupar y ordenar
-    datos = df.groupby(columna_entidad)[columna_valor].sum().sort_values(ascending=False).head(top_n)
+    if isinstance(df, Consulta):
+        datos = (
+            df.agrupar(columna_entidad).sumar(columna_valor).ordenar(columna_valor).limite(top_n)
+            .a_pandas().set_index(columna_entidad)[columna_valor]
+        )
+    else:
+        datos = df.groupby(columna_entidad)[columna_valor].sum().sort_values(ascending=False).head(top_n)
     
     # Calcular porcentaje acumulado
     total = datos.sum()
@@ -7,6 +7,11 @@ import unicodedata
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import utils_clientes
+import utils_excel
+import utils_rendimiento
+import utils_memoria
+from utils_rendimiento import CARGA, LIMPIEZA, PROCESO, AGREGACION, EXPORTACION
 
 # ==========================================
 # 1. CONFIGURACIÓN Y ESTILOS (SALA DE GUERRA)
@@ -89,6 +94,7 @@ def _normalizar_txt(txt: str) -> str:
     t = "".join(c for c in unicodedata.normalize("NFD", str(txt)) if unicodedata.category(c) != "Mn")
     return t.strip().upper()
 
+@utils_rendimiento.instrumentar(LIMPIEZA)
 def limpiar_df_ventas(df: pd.DataFrame) -> pd.DataFrame:
     dfc = df.copy()
     if "anio" in dfc: dfc["anio"] = pd.to_numeric(dfc["anio"], errors="coerce").astype(int)
@@ -103,6 +109,7 @@ def limpiar_df_ventas(df: pd.DataFrame) -> pd.DataFrame:
         dfc["fecha_venta"] = pd.to_datetime(dfc["fecha_venta"], errors="coerce")
     return dfc
 
+@utils_rendimiento.instrumentar(LIMPIEZA)
 def preparar_cliente_tipo(df_raw: pd.DataFrame) -> pd.DataFrame:
     ren = {
         "Código": "codigo_vendedor_tipo", "NOMVENDEDOR": "nomvendedor", 
@@ -128,12 +135,16 @@ def preparar_cliente_tipo(df_raw: pd.DataFrame) -> pd.DataFrame:
     if "nombre_cliente" in df: df["nombre_cliente"] = df["nombre_cliente"].apply(_normalizar_txt)
     return df
 
+@utils_rendimiento.instrumentar(CARGA, cache="cargar_cliente_tipo")
 @st.cache_data(ttl=1800)
+@utils_rendimiento.fallo_cache("cargar_cliente_tipo")
 def cargar_cliente_tipo() -> pd.DataFrame:
     dbx = get_dropbox_client()
     if not dbx: return pd.DataFrame()
     try:
-        _, res = dbx.files_download(path="/data/CLIENTE_TIPO.xlsx")
+        with utils_rendimiento.medir(CARGA, "descarga Dropbox"):
+            _, res = dbx.files_download(path="/data/CLIENTE_TIPO.xlsx")
+        utils_rendimiento.registrar_bytes("Dropbox", len(res.content))
         df = pd.read_excel(io.BytesIO(res.content))
         return preparar_cliente_tipo(df)
     except Exception:
@@ -143,6 +154,7 @@ def cargar_cliente_tipo() -> pd.DataFrame:
 # 3. LÓGICA DE NEGOCIO (PRESUPUESTO Y REAL)
 # ==========================================
 
+@utils_rendimiento.instrumentar(PROCESO)
 def asignar_presupuesto_detallista(df_tipo: pd.DataFrame, meta_total: float, canales=None) -> pd.DataFrame:
     canales = canales or ["DETALLISTAS", "FERRETERIA"]
     canales_norm = [_normalizar_txt(c) for c in canales]
@@ -176,6 +188,7 @@ def asignar_presupuesto_detallista(df_tipo: pd.DataFrame, meta_total: float, can
         
     return df_det
 
+@utils_rendimiento.instrumentar(AGREGACION)
 def resumen_por_vendedor(df_det: pd.DataFrame) -> pd.DataFrame:
     if df_det.empty: return pd.DataFrame()
     return df_det.groupby("nomvendedor").agg(
@@ -184,6 +197,7 @@ def resumen_por_vendedor(df_det: pd.DataFrame) -> pd.DataFrame:
         clientes=("codigo_cliente", "nunique")
     ).reset_index().sort_values("presupuesto", ascending=False)
 
+@utils_rendimiento.instrumentar(AGREGACION)
 def ventas_reales_periodo(df_ventas: pd.DataFrame, df_det: pd.DataFrame, canales=None) -> pd.DataFrame:
     if df_ventas.empty or df_det.empty: return pd.DataFrame()
     clientes_det = set(df_det["codigo_cliente"].dropna().astype(str)) | set(df_det["nit"].dropna().astype(str))
@@ -212,6 +226,7 @@ def ventas_reales_periodo(df_ventas: pd.DataFrame, df_det: pd.DataFrame, canales
     
     return df_final.groupby(["nomvendedor", "cliente_id"], as_index=False)["valor_venta"].sum()
 
+@utils_rendimiento.instrumentar(PROCESO)
 def tabla_seguimiento_vendedor(df_meta_vend: pd.DataFrame, df_real: pd.DataFrame) -> pd.DataFrame:
     if df_meta_vend.empty: return pd.DataFrame()
     if df_real.empty: 
@@ -224,10 +239,18 @@ def tabla_seguimiento_vendedor(df_meta_vend: pd.DataFrame, df_real: pd.DataFrame
     out["avance_pct"] = np.where(out["presupuesto"] > 0, (out["venta_real"] / out["presupuesto"]) * 100, 0)
     return out.sort_values("presupuesto", ascending=False)
 
-def tabla_seguimiento_cliente(df_det: pd.DataFrame, df_real: pd.DataFrame) -> pd.DataFrame:
+@utils_rendimiento.instrumentar(PROCESO)
+def tabla_seguimiento_cliente(df_det: pd.DataFrame, df_real: pd.DataFrame, indice_propietarios: pd.DataFrame = None) -> pd.DataFrame:
     if df_det.empty: return pd.DataFrame()
     base = df_det.groupby(["codigo_cliente", "nombre_cliente", "nomvendedor"], as_index=False)["presupuesto_meta"].sum()
     base = base.rename(columns={"codigo_cliente": "cliente_id"})
+    if indice_propietarios is not None:
+        # Clientes sin vendedor en CLIENTE_TIPO: se atribuyen al propietario actual según el histórico de ventas
+        propietarios = indice_propietarios[["nomvendedor", "ultima_compra"]].rename(columns={"nomvendedor": "nomvendedor_actual"})
+        base = base.join(propietarios, on="cliente_id")
+        sin_vendedor = base["nomvendedor"].isin(["", "NAN", "NONE"]) & base["nomvendedor_actual"].notna()
+        base.loc[sin_vendedor, "nomvendedor"] = base.loc[sin_vendedor, "nomvendedor_actual"]
+        base = base.drop(columns=["nomvendedor_actual"])
     
     if df_real.empty:
         base["venta_real"] = 0; base["avance_pct"] = 0; base["gap"] = base["presupuesto_meta"]
@@ -243,6 +266,7 @@ def tabla_seguimiento_cliente(df_det: pd.DataFrame, df_real: pd.DataFrame) -> pd
 # 4. INTELIGENCIA DE NEGOCIO (CATEGORIZADA)
 # ==========================================
 
+@utils_rendimiento.instrumentar(PROCESO)
 def clasificar_acciones(df_seg_vend, df_seg_cli):
     """Clasifica las acciones en 3 cubos para mostrarlas en columnas."""
     urgentes = []
@@ -278,126 +302,83 @@ def clasificar_acciones(df_seg_vend, df_seg_cli):
         
     return urgentes, oportunidades, cierres
 
+@utils_rendimiento.instrumentar(EXPORTACION)
 def exportar_plan_accion_excel(df_acciones: pd.DataFrame, vendedor_stats: dict) -> bytes:
     """
     Genera Excel Premium con Plan de Acción por Vendedor
     Formato profesional, visual y accionable
     """
-    output = io.BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # Escribir datos
-        df_acciones.to_excel(writer, sheet_name='Plan_Activacion', startrow=6, index=False)
-        
-        wb = writer.book
-        ws = writer.sheets['Plan_Activacion']
-        
-        # --- FORMATOS ---
-        fmt_titulo = wb.add_format({
-            'bold': True, 'font_size': 18, 'font_color': '#FFFFFF',
-            'bg_color': '#1565c0', 'align': 'center', 'valign': 'vcenter'
-        })
-        fmt_subtitulo = wb.add_format({
-            'font_size': 11, 'font_color': '#555555', 'italic': True,
-            'align': 'center'
-        })
-        fmt_kpi_label = wb.add_format({
-            'bold': True, 'font_size': 10, 'bg_color': '#e3f2fd',
-            'border': 1, 'align': 'right'
-        })
-        fmt_kpi_valor = wb.add_format({
-            'font_size': 12, 'num_format': '$#,##0', 'bg_color': '#f1f8e9',
-            'border': 1, 'bold': True
-        })
-        fmt_header = wb.add_format({
-            'bold': True, 'font_color': 'white', 'bg_color': '#1e88e5',
-            'align': 'center', 'valign': 'vcenter', 'border': 1, 'text_wrap': True
-        })
-        fmt_vendedor = wb.add_format({
-            'bold': True, 'font_size': 11, 'bg_color': '#fff9c4',
-            'border': 1, 'align': 'left'
-        })
-        fmt_cliente = wb.add_format({
-            'font_size': 10, 'border': 1, 'text_wrap': True
-        })
-        fmt_producto = wb.add_format({
-            'font_size': 10, 'border': 1, 'bg_color': '#e8f5e9', 'text_wrap': True
-        })
-        fmt_historico = wb.add_format({
-            'num_format': '$#,##0', 'border': 1, 'align': 'right'
-        })
-        fmt_compras = wb.add_format({
-            'border': 1, 'align': 'center', 'num_format': '0'
-        })
-        fmt_accion = wb.add_format({
-            'font_size': 9, 'border': 1, 'italic': True, 'text_wrap': True,
-            'font_color': '#c62828'
-        })
-        
-        # --- CABECERA ---
-        ws.merge_range('A1:F1', '🎯 PLAN DE ACCIÓN COMERCIAL | Pintuco', fmt_titulo)
-        ws.merge_range('A2:F2', f'Periodo: 16-31 Enero 2026 | Canal: Detallistas & Ferretería', fmt_subtitulo)
-        ws.set_row(0, 30)
-        ws.set_row(1, 18)
-        
-        # --- KPIs EJECUTIVOS (Fila 4) ---
-        ws.write('A4', 'META TOTAL:', fmt_kpi_label)
-        ws.write('B4', vendedor_stats.get('meta_total', 0), fmt_kpi_valor)
-        ws.write('C4', 'VENTA ACTUAL:', fmt_kpi_label)
-        ws.write('D4', vendedor_stats.get('venta_actual', 0), fmt_kpi_valor)
-        ws.write('E4', 'GAP (FALTA):', fmt_kpi_label)
-        ws.write('F4', vendedor_stats.get('gap', 0), fmt_kpi_valor)
-        
-        # --- ENCABEZADOS TABLA (Fila 7) ---
-        headers = ['Vendedor', 'Cliente a Contactar', 'Producto a Ofrecer', 
-                   'Compras Históricas', 'Valor Histórico', '🚀 ACCIÓN INMEDIATA']
-        for col_idx, header in enumerate(headers):
-            ws.write(6, col_idx, header, fmt_header)
-        
-        # --- APLICAR FORMATOS A DATOS ---
-        ultima_fila = 7 + len(df_acciones)
-        
-        # Columna Vendedor (A)
-        ws.set_column('A:A', 22, fmt_vendedor)
-        
-        # Columna Cliente (B)
-        ws.set_column('B:B', 35, fmt_cliente)
-        
-        # Columna Producto (C)
-        ws.set_column('C:C', 40, fmt_producto)
-        
-        # Columna Compras (D)
-        ws.set_column('D:D', 12, fmt_compras)
-        
-        # Columna Valor (E)
-        ws.set_column('E:E', 18, fmt_historico)
-        
-        # Columna Acción (F)
-        ws.set_column('F:F', 45, fmt_accion)
-        
-        # --- FORMATO CONDICIONAL: Resaltar alta prioridad ---
-        ws.conditional_format(f'E8:E{ultima_fila}', {
-            'type': '3_color_scale',
-            'min_color': '#ffffff',
-            'mid_color': '#fff9c4',
-            'max_color': '#4caf50'
-        })
-        
-        # --- AJUSTES FINALES ---
-        ws.freeze_panes(7, 0)  # Congelar encabezados
-        ws.autofilter(6, 0, ultima_fila - 1, 5)  # Filtros automáticos
-        ws.set_row(6, 35)  # Altura encabezados
-        
-        # Ajustar altura de filas de datos (auto-wrap)
-        for row_idx in range(7, ultima_fila):
-            ws.set_row(row_idx, 45)
-    
-    return output.getvalue()
+    libro = utils_excel.LibroExcel()
+    ws = libro.hoja('Plan_Activacion')
+
+    # --- FORMATOS ---
+    libro.definir_formatos({
+        'titulo': {'bold': True, 'font_size': 18, 'font_color': '#FFFFFF',
+                   'bg_color': '#1565c0', 'align': 'center', 'valign': 'vcenter'},
+        'subtitulo': {'font_size': 11, 'font_color': '#555555', 'italic': True, 'align': 'center'},
+        'kpi_label': {'bold': True, 'font_size': 10, 'bg_color': '#e3f2fd', 'border': 1, 'align': 'right'},
+        'kpi_valor': {'font_size': 12, 'num_format': '$#,##0', 'bg_color': '#f1f8e9', 'border': 1, 'bold': True},
+        'header': {'bold': True, 'font_color': 'white', 'bg_color': '#1e88e5',
+                   'align': 'center', 'valign': 'vcenter', 'border': 1, 'text_wrap': True},
+        'vendedor': {'bold': True, 'font_size': 11, 'bg_color': '#fff9c4', 'border': 1, 'align': 'left'},
+        'cliente': {'font_size': 10, 'border': 1, 'text_wrap': True},
+        'producto': {'font_size': 10, 'border': 1, 'bg_color': '#e8f5e9', 'text_wrap': True},
+        'historico': {'num_format': '$#,##0', 'border': 1, 'align': 'right'},
+        'compras': {'border': 1, 'align': 'center', 'num_format': '0'},
+        'accion': {'font_size': 9, 'border': 1, 'italic': True, 'text_wrap': True, 'font_color': '#c62828'}
+    })
+
+    # --- CABECERA (constant_memory: alto de fila antes de escribirla) ---
+    ws.set_row(0, 30)
+    ws.set_row(1, 18)
+    ws.merge_range('A1:F1', '🎯 PLAN DE ACCIÓN COMERCIAL | Pintuco', libro.formato('titulo'))
+    ws.merge_range('A2:F2', f'Periodo: 16-31 Enero 2026 | Canal: Detallistas & Ferretería', libro.formato('subtitulo'))
+
+    # --- KPIs EJECUTIVOS (Fila 4) ---
+    ws.write('A4', 'META TOTAL:', libro.formato('kpi_label'))
+    ws.write('B4', vendedor_stats.get('meta_total', 0), libro.formato('kpi_valor'))
+    ws.write('C4', 'VENTA ACTUAL:', libro.formato('kpi_label'))
+    ws.write('D4', vendedor_stats.get('venta_actual', 0), libro.formato('kpi_valor'))
+    ws.write('E4', 'GAP (FALTA):', libro.formato('kpi_label'))
+    ws.write('F4', vendedor_stats.get('gap', 0), libro.formato('kpi_valor'))
+
+    # --- TABLA (Fila 7): encabezados y datos ---
+    headers = ['Vendedor', 'Cliente a Contactar', 'Producto a Ofrecer',
+               'Compras Históricas', 'Valor Histórico', '🚀 ACCIÓN INMEDIATA']
+    formatos_columna = ['vendedor', 'cliente', 'producto', 'compras', 'historico', 'accion']
+    df_tabla = df_acciones.iloc[:, :len(headers)].set_axis(headers, axis=1)
+    ws.set_row(6, 35)  # Altura encabezados
+    libro.escribir_tabla(ws, df_tabla, fila=6, formato_encabezado='header',
+                         formatos=dict(zip(headers, formatos_columna)), alto_filas=45)
+    ultima_fila = 7 + len(df_acciones)
+
+    ws.set_column('A:A', 22, libro.formato('vendedor'))
+    ws.set_column('B:B', 35, libro.formato('cliente'))
+    ws.set_column('C:C', 40, libro.formato('producto'))
+    ws.set_column('D:D', 12, libro.formato('compras'))
+    ws.set_column('E:E', 18, libro.formato('historico'))
+    ws.set_column('F:F', 45, libro.formato('accion'))
+
+    # --- FORMATO CONDICIONAL: Resaltar alta prioridad ---
+    ws.conditional_format(f'E8:E{ultima_fila}', {
+        'type': '3_color_scale',
+        'min_color': '#ffffff',
+        'mid_color': '#fff9c4',
+        'max_color': '#4caf50'
+    })
+
+    # --- AJUSTES FINALES ---
+    ws.freeze_panes(7, 0)  # Congelar encabezados
+    ws.autofilter(6, 0, ultima_fila - 1, 5)  # Filtros automáticos
+
+    return libro.cerrar()
 
 # ==========================================
 # 5. UI PRINCIPAL (WAR ROOM)
 # ==========================================
 
+utils_rendimiento.activar_sesion_streamlit()
+utils_memoria.auditar_sesion_streamlit()
 if "df_ventas" not in st.session_state or st.session_state.df_ventas is None:
     st.error("⚠️ DATA NO CARGADA. Ve a 'Resumen_Mensual' primero.")
     st.stop()
@@ -412,7 +393,8 @@ df_det = asignar_presupuesto_detallista(df_tipo_raw, META_CANAL)
 df_meta_vendedor = resumen_por_vendedor(df_det)
 df_real_periodo = ventas_reales_periodo(df_ventas, df_det)
 df_seg_vend = tabla_seguimiento_vendedor(df_meta_vendedor, df_real_periodo)
-df_seg_cli = tabla_seguimiento_cliente(df_det, df_real_periodo)
+indice_propietarios = utils_clientes.indice_propietarios_al_dia(st.session_state, st.session_state.df_ventas)
+df_seg_cli = tabla_seguimiento_cliente(df_det, df_real_periodo, indice_propietarios)
 
 # Métricas Globales
 avance_val = df_seg_vend["venta_real"].sum() if not df_seg_vend.empty else 0
@@ -606,11 +588,10 @@ with tab3:
                                        "Compras Históricas", "Valor Histórico"]
             
             # Agregar columna de acción
-            df_export_excel["🚀 ACCIÓN INMEDIATA"] = df_export_excel.apply(
-                lambda r: f"☎️ Contactar HOY y ofrecer {r['Producto a Ofrecer'][:30]}. "
-                         f"Cliente ya lo compró {int(r['Compras Históricas'])} veces. "
-                         f"Potencial de venta: ${r['Valor Histórico']:,.0f}",
-                axis=1
+            df_export_excel["🚀 ACCIÓN INMEDIATA"] = (
+                "☎️ Contactar HOY y ofrecer " + df_export_excel["Producto a Ofrecer"].astype(str).str[:30]
+                + ". Cliente ya lo compró " + df_export_excel["Compras Históricas"].astype(int).astype(str)
+                + " veces. Potencial de venta: $" + df_export_excel["Valor Histórico"].map("{:,.0f}".format)
             )
             
             # Calcular stats para el Excel
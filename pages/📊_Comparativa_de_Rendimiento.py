@@ -23,150 +23,70 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-import re
-import io
-import unicodedata # Necesario para la función de normalización
 from typing import Dict, Tuple
+import utils_clientes
+import utils_excel
+import utils_rendimiento
+import utils_memoria
+import nucleo
+import nucleo.periodos
+from nucleo import MARQUILLAS_CLAVE, normalizar_texto
+from utils_rendimiento import PROCESO, AGREGACION, RENDER, EXPORTACION
 
 # ==============================================================================
 # 1. FUNCIONES DE UTILIDAD Y ANÁLISIS DE DATOS
 # ==============================================================================
 
-def normalizar_texto(texto: str) -> str:
-    """
-    Convierte un texto a mayúsculas, elimina tildes y caracteres especiales.
-    """
-    if not isinstance(texto, str):
-        return texto
-    try:
-        # NFD (Normalization Form D) descompone los caracteres en sus componentes base
-        texto_sin_tildes = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
-        # Convierte a mayúsculas y limpia otros caracteres
-        return texto_sin_tildes.upper().replace('-', ' ').replace('_', ' ').replace('.', ' ').strip().replace('  ', ' ')
-    except (TypeError, AttributeError):
-        return texto
-
+@utils_rendimiento.instrumentar(PROCESO, cache="filtrar_ventas_marquillas")
 @st.cache_data
+@utils_rendimiento.fallo_cache("filtrar_ventas_marquillas")
 def filtrar_ventas_marquillas(_df_ventas_historicas: pd.DataFrame) -> pd.DataFrame:
-    """
-    Filtra el historial de ventas para incluir solo transacciones de las
-    marquillas clave y añade una columna con la marquilla identificada.
-    """
-    if _df_ventas_historicas.empty or 'nombre_articulo' not in _df_ventas_historicas.columns:
-        return pd.DataFrame()
-
-    regex_marquillas = '|'.join(MARQUILLAS_CLAVE)
-    df_filtrado = _df_ventas_historicas[
-        _df_ventas_historicas['nombre_articulo'].str.contains(regex_marquillas, case=False, na=False)
-    ].copy()
-
-    # Extrae la primera marquilla encontrada en el nombre del artículo.
-    df_filtrado['marquilla'] = df_filtrado['nombre_articulo'].str.extract(f'({regex_marquillas})', flags=re.IGNORECASE)[0].str.upper()
-    df_filtrado.dropna(subset=['marquilla'], inplace=True)
-    return df_filtrado
+    """Ventas de las marquillas clave con la columna 'marquilla' (nucleo.marquillas)."""
+    return nucleo.filtrar_ventas_marquillas(_df_ventas_historicas)
 
+@utils_rendimiento.instrumentar(AGREGACION, cache="calcular_matriz_compra")
 @st.cache_data
+@utils_rendimiento.fallo_cache("calcular_matriz_compra")
 def calcular_matriz_compra(_df_ventas_marquillas: pd.DataFrame) -> pd.DataFrame:
-    """
-    Crea una matriz que muestra qué clientes (filas) han comprado
-    qué marquillas (columnas), marcada con 1 si hubo compra y 0 si no.
-    """
-    if _df_ventas_marquillas.empty:
-        # Devuelve un DF vacío con la estructura esperada si no hay datos.
-        return pd.DataFrame(columns=MARQUILLAS_CLAVE + ['conteo_marquillas'])
-
-    matriz_compra_valor = pd.crosstab(
-        index=_df_ventas_marquillas['nombre_cliente'],
-        columns=_df_ventas_marquillas['marquilla'],
-        values=_df_ventas_marquillas['valor_venta'],
-        aggfunc='sum'
-    ).fillna(0)
-
-    # Convierte los valores de venta a un formato binario (1 si compró, 0 si no).
-    matriz_binaria = (matriz_compra_valor > 0).astype(int)
-
-    # Asegura que todas las marquillas clave existan como columnas, incluso si no se vendieron.
-    for marquilla in MARQUILLAS_CLAVE:
-        if marquilla not in matriz_binaria.columns:
-            matriz_binaria[marquilla] = 0
-
-    # Calcula cuántas marquillas únicas ha comprado cada cliente.
-    matriz_binaria['conteo_marquillas'] = matriz_binaria[MARQUILLAS_CLAVE].sum(axis=1)
-
-    return matriz_binaria.sort_values('conteo_marquillas', ascending=False)
+    """Matriz binaria cliente × marquilla con el conteo de marquillas compradas."""
+    return nucleo.calcular_matriz_compra(_df_ventas_marquillas)
 
 
+@utils_rendimiento.instrumentar(AGREGACION, cache="calcular_potencial_venta")
 @st.cache_data
+@utils_rendimiento.fallo_cache("calcular_potencial_venta")
 def calcular_potencial_venta(_df_ventas_marquillas_historicas: pd.DataFrame, _df_clientes_activos: pd.DataFrame) -> Tuple[float, Dict]:
-    """
-    Calcula el potencial de venta si CADA CLIENTE ACTIVO del periodo
-    comprara las marquillas que le faltan, basado en el TICKET PROMEDIO POR TRANSACCIÓN.
-    """
-    if _df_ventas_marquillas_historicas.empty or _df_clientes_activos.empty:
-        return 0.0, {m: 0.0 for m in MARQUILLAS_CLAVE}
-
-    # 1. Calcular el valor de venta PROMEDIO POR TRANSACCIÓN para cada marquilla
-    #    usando todo el historial disponible para tener un ticket estable.
-    ticket_promedio_por_transaccion = {}
-    for marquilla in MARQUILLAS_CLAVE:
-        df_marquilla = _df_ventas_marquillas_historicas[_df_ventas_marquillas_historicas['marquilla'] == marquilla]
-        if not df_marquilla.empty:
-            valor_promedio_transaccion = df_marquilla['valor_venta'].mean()
-            ticket_promedio_por_transaccion[marquilla] = valor_promedio_transaccion
-        else:
-            ticket_promedio_por_transaccion[marquilla] = 0.0
-
-    # 2. Crear la matriz de compra histórica para saber quién ha comprado qué en el pasado.
-    matriz_compra_historica = calcular_matriz_compra(_df_ventas_marquillas_historicas)
-
-    # 3. Calcular el potencial total sumando las oportunidades perdidas
-    #    SOLO para los clientes que estuvieron activos en el periodo seleccionado.
-    venta_potencial_total = 0.0
-    potencial_por_marquilla = {m: 0.0 for m in MARQUILLAS_CLAVE}
-    clientes_activos_unicos = _df_clientes_activos['nombre_cliente'].unique()
-
-    for cliente in clientes_activos_unicos:
-        for marquilla in MARQUILLAS_CLAVE:
-            # Revisa si el cliente ha comprado la marquilla en su historial.
-            ha_comprado_historicamente = cliente in matriz_compra_historica.index and matriz_compra_historica.loc[cliente, marquilla] == 1
-
-            # Si el cliente activo NUNCA ha comprado la marquilla, se suma el potencial.
-            if not ha_comprado_historicamente:
-                potencial_cliente_marquilla = ticket_promedio_por_transaccion.get(marquilla, 0)
-                venta_potencial_total += potencial_cliente_marquilla
-                potencial_por_marquilla[marquilla] += potencial_cliente_marquilla
-
-    return venta_potencial_total, potencial_por_marquilla
+    """Potencial de venta cruzada de los clientes activos del periodo, reutilizando la matriz cacheada."""
+    return nucleo.calcular_potencial_venta(
+        _df_ventas_marquillas_historicas, _df_clientes_activos, calcular_matriz_compra(_df_ventas_marquillas_historicas)
+    )
 
+@utils_rendimiento.instrumentar(EXPORTACION)
 def generar_reporte_excel(segmentos: Dict[str, pd.DataFrame]) -> bytes:
     """
     Crea un archivo Excel en memoria con cada segmento de cliente en una hoja separada.
     """
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for nombre_segmento, df_segmento in segmentos.items():
-            # Prepara el dataframe para la exportación
-            if not df_segmento.empty:
-                df_export = df_segmento.reset_index()[['nombre_cliente', 'conteo_marquillas']].copy()
-                if 'marquillas_faltantes' in df_segmento.columns:
-                    df_export['marquillas_faltantes'] = df_segmento['marquillas_faltantes'].values
-
-                df_export.to_excel(writer, sheet_name=nombre_segmento, index=False)
-                worksheet = writer.sheets[nombre_segmento]
-                workbook = writer.book
-                header_format = workbook.add_format({
-                    'bold': True, 'text_wrap': True, 'valign': 'vcenter',
-                    'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1
-                })
-                # Escribir encabezados con formato
-                for col_num, value in enumerate(df_export.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-                # Ajustar ancho de columnas
-                worksheet.set_column('A:A', 45) # Nombre Cliente
-                worksheet.set_column('B:B', 18) # Conteo
-                worksheet.set_column('C:C', 45) # Faltantes
-
-    return output.getvalue()
+    libro = utils_excel.LibroExcel()
+    libro.formato('header', {
+        'bold': True, 'text_wrap': True, 'valign': 'vcenter',
+        'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1
+    })
+    for nombre_segmento, df_segmento in segmentos.items():
+        # Prepara el dataframe para la exportación
+        if not df_segmento.empty:
+            df_export = df_segmento.reset_index()[['nombre_cliente', 'vendedor_actual', 'conteo_marquillas']].copy()
+            if 'marquillas_faltantes' in df_segmento.columns:
+                df_export['marquillas_faltantes'] = df_segmento['marquillas_faltantes'].values
+
+            worksheet = libro.hoja(nombre_segmento)
+            libro.escribir_tabla(worksheet, df_export, formato_encabezado='header')
+            # Ajustar ancho de columnas
+            worksheet.set_column('A:A', 45) # Nombre Cliente
+            worksheet.set_column('B:B', 30) # Vendedor Actual
+            worksheet.set_column('C:C', 18) # Conteo
+            worksheet.set_column('D:D', 45) # Faltantes
+
+    return libro.cerrar()
 
 # ==============================================================================
 # 2. CONFIGURACIÓN Y ESTILO DE LA PÁGINA
@@ -202,13 +122,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Las marquillas clave se definen aquí para ser consistentes en todo el script.
-MARQUILLAS_CLAVE = sorted(['VINILTEX', 'KORAZA', 'ESTUCOMAS', 'VINILICO', 'PINTULUX'])
-
 # ==============================================================================
 # 3. RENDERIZADO DE LA PÁGINA Y COMPONENTES DE UI
 # ==============================================================================
 
+@utils_rendimiento.instrumentar(RENDER)
 def render_pagina_analisis():
     """Función principal que dibuja todos los componentes de la página."""
 
@@ -326,11 +244,18 @@ def render_pagina_analisis():
         #    ================================================================================
         potencial_total, potencial_por_marquilla = calcular_potencial_venta(df_ventas_marquillas, df_mes_actual)
 
+        # 5. Mismo mes del año anterior hasta el mismo día de corte (mes en curso comparado con su parte equivalente).
+        corte_comparable = nucleo.periodos.corte_del_mes(df_ventas_historicas_completo, anio_sel, mes_sel_num)
+        crecimiento_mtd = (
+            nucleo.periodos.crecimiento_comparable(df_ventas_marquillas, anio_sel, 'MTD', corte_comparable, base=df_ventas_historicas_completo)
+            if not df_ventas_marquillas.empty else {'actual': 0.0, 'anterior': 0.0, 'variacion_pct': None}
+        )
+
     # --- RENDERIZADO DE MÉTRICAS Y VISUALIZACIONES ---
     st.header(f"Indicadores para {mapeo_meses.get(mes_sel_num, '')} {anio_sel} | Foco: {seleccion_vendedor_orig}")
     st.markdown("---")
 
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     col1.metric(
         label="📈 Venta del Mes (Marquillas Clave)",
         value=f"${venta_mes_actual:,.0f}",
@@ -347,6 +272,12 @@ def render_pagina_analisis():
         value=f"${potencial_total:,.0f}",
         help="Estimación de venta adicional si CADA CLIENTE ACTIVO DEL MES comprara las marquillas que le faltan, basado en el ticket de compra promedio POR TRANSACCIÓN."
     )
+    col4.metric(
+        label=f"📅 {nucleo.periodos.etiqueta('MTD', corte_comparable)} vs {anio_sel - 1}",
+        value=f"${crecimiento_mtd['actual']:,.0f}",
+        delta=f"{crecimiento_mtd['variacion_pct']:+.1f}%" if crecimiento_mtd['variacion_pct'] is not None else None,
+        help=f"Marquillas clave del mismo mes de {anio_sel - 1} hasta el mismo día: ${crecimiento_mtd['anterior']:,.0f}"
+    )
 
     st.markdown("---")
     st.header("Análisis Visual del Desempeño y Potencial")
@@ -401,15 +332,20 @@ def render_pagina_analisis():
 
     matriz_clientes = calcular_matriz_compra(df_ventas_marquillas)
 
-    # Lógica de segmentación
+    def get_faltantes(row: pd.Series) -> str:
+        return ", ".join([m for m in MARQUILLAS_CLAVE if row[m] == 0])
+
+    # Lógica de segmentación. El vendedor actual sale del índice de propietarios
+    # precalculado en la ingesta, sin recorrer de nuevo el histórico de ventas.
+    indice_propietarios = utils_clientes.indice_propietarios_al_dia(st.session_state, df_ventas_historicas_completo)
+    vendedor_por_cliente = utils_clientes.propietario_por_nombre(indice_propietarios)
+    matriz_clientes = matriz_clientes.copy()
+    matriz_clientes['vendedor_actual'] = matriz_clientes.index.map(vendedor_por_cliente).fillna(utils_clientes.SIN_ASIGNAR)
     campeones = matriz_clientes[matriz_clientes['conteo_marquillas'] == 5]
     alto_potencial = matriz_clientes[matriz_clientes['conteo_marquillas'] == 4]
     oportunidades = matriz_clientes[matriz_clientes['conteo_marquillas'] == 3]
     bajo_penetracion = matriz_clientes[matriz_clientes['conteo_marquillas'] < 3]
 
-    def get_faltantes(row: pd.Series) -> str:
-        return ", ".join([m for m in MARQUILLAS_CLAVE if row[m] == 0])
-
     if not alto_potencial.empty:
         alto_potencial = alto_potencial.copy()
         alto_potencial['marquillas_faltantes'] = alto_potencial.apply(get_faltantes, axis=1)
@@ -430,19 +366,19 @@ def render_pagina_analisis():
 
     with tab1:
         st.subheader("Clientes que ya compran todo el portafolio clave.")
-        st.dataframe(campeones.reset_index()[['nombre_cliente', 'conteo_marquillas']], use_container_width=True, hide_index=True)
+        st.dataframe(campeones.reset_index()[['nombre_cliente', 'vendedor_actual', 'conteo_marquillas']], use_container_width=True, hide_index=True)
 
     with tab2:
         st.subheader("Clientes a punto de completar el portafolio (Falta 1 marquilla).")
-        st.dataframe(alto_potencial.reset_index()[['nombre_cliente', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
+        st.dataframe(alto_potencial.reset_index()[['nombre_cliente', 'vendedor_actual', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
 
     with tab3:
         st.subheader("Clientes con potencial claro de crecimiento (Faltan 2 marquillas).")
-        st.dataframe(oportunidades.reset_index()[['nombre_cliente', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
+        st.dataframe(oportunidades.reset_index()[['nombre_cliente', 'vendedor_actual', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
 
     with tab4:
         st.subheader("Clientes con la mayor oportunidad de venta cruzada (Faltan 3 o más).")
-        st.dataframe(bajo_penetracion.reset_index()[['nombre_cliente', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
+        st.dataframe(bajo_penetracion.reset_index()[['nombre_cliente', 'vendedor_actual', 'conteo_marquillas', 'marquillas_faltantes']], use_container_width=True, hide_index=True)
 
     # --- Botón de Descarga ---
     st.markdown("---")
@@ -470,6 +406,8 @@ def render_pagina_analisis():
 # ==============================================================================
 
 if __name__ == '__main__':
+    utils_rendimiento.activar_sesion_streamlit()
+    utils_memoria.auditar_sesion_streamlit()
     # Verifica si el usuario está autenticado (estado manejado por Resumen_Mensual.py)
     if 'autenticado' in st.session_state and st.session_state.autenticado:
         render_pagina_analisis()
@@ -0,0 +1,8 @@
+"""Rutas de importación de las pruebas: la raíz del repo (utils_*, nucleo) y pages/ (analisis_estrategico)"""
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+for ruta in (RAIZ, RAIZ / "pages"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
@@ -0,0 +1,90 @@
+"""Servidor local compatible con la API de chat de OpenAI, para probar la capa de IA sin red"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorLLMFalso:
+    """
+    Atiende POST /v1/chat/completions en 127.0.0.1 (puerto libre). Responde 'texto' palabra por
+    palabra (stream=True, eventos SSE) o completo, con 'pausa' segundos entre fragmentos.
+    Con 'estado_error' responde ese código HTTP. 'peticiones' cuenta las llamadas recibidas.
+    Uso: with ServidorLLMFalso(texto="...") as servidor: BackendOpenAI("clave", servidor.base_url)
+    """
+
+    def __init__(self, texto: str = "Análisis del servidor falso.", pausa: float = 0.0, estado_error: int = None):
+        self.texto = texto
+        self.pausa = pausa
+        self.estado_error = estado_error
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *_):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_):
+                pass
+
+            def _json(self, estado: int, cuerpo: dict):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_POST(self):
+                peticion = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with servidor._lock:
+                    servidor.peticiones += 1
+                if servidor.estado_error:
+                    self._json(servidor.estado_error, {"error": {"message": "fallo simulado", "type": "server_error"}})
+                    return
+                modelo = peticion.get("model", "falso")
+                if not peticion.get("stream"):
+                    time.sleep(servidor.pausa)
+                    self._json(200, {
+                        "id": "falso", "object": "chat.completion", "created": int(time.time()), "model": modelo,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": servidor.texto}}],
+                    })
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                palabras = servidor.texto.split(" ")
+                for i, palabra in enumerate(palabras):
+                    time.sleep(servidor.pausa)
+                    self._evento(modelo, {"content": palabra if i == 0 else " " + palabra}, None)
+                self._evento(modelo, {}, "stop")
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _evento(self, modelo: str, delta: dict, fin):
+                trozo = {"id": "falso", "object": "chat.completion.chunk", "created": int(time.time()), "model": modelo,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": fin}]}
+                self.wfile.write(f"data: {json.dumps(trozo)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Manejador
@@ -0,0 +1,119 @@
+"""Análisis de líneas y retención vectorizados frente a los bucles de la versión anterior"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analisis_estrategico.ai_analysis import (
+    _analizar_lineas_estrategicas,
+    _analizar_retencion_clientes,
+    _resolver_columnas,
+)
+
+
+# ===== Versión anterior (referencia): un recorrido completo por línea y filtros con sets =====
+def _lineas_con_bucle(df_actual, df_anterior, lineas_estrategicas):
+    cols = _resolver_columnas(df_actual, df_anterior)
+    columna_linea, columna_valor, columna_cliente = cols["linea"], cols["valor"], cols["cliente"]
+    resultados = {}
+    for linea in lineas_estrategicas:
+        mask_a = df_actual[columna_linea].astype(str).str.upper() == linea.upper()
+        mask_b = df_anterior[columna_linea].astype(str).str.upper() == linea.upper()
+        ventas_a = df_actual.loc[mask_a, columna_valor].sum()
+        ventas_b = df_anterior.loc[mask_b, columna_valor].sum()
+        variacion_abs = ventas_a - ventas_b
+        variacion_pct = (variacion_abs / ventas_b * 100) if ventas_b > 0 else (100.0 if ventas_a > 0 else 0.0)
+        resultados[linea] = {
+            "ventas_actual": ventas_a,
+            "ventas_anterior": ventas_b,
+            "variacion_abs": variacion_abs,
+            "variacion_pct": variacion_pct,
+            "clientes_actual": df_actual.loc[mask_a, columna_cliente].astype(str).nunique(),
+            "clientes_anterior": df_anterior.loc[mask_b, columna_cliente].astype(str).nunique(),
+            "impacto": "MOTOR" if variacion_pct > 10 else "FRENO" if variacion_pct < -10 else "ESTABLE",
+        }
+    return resultados
+
+
+def _retencion_con_sets(df_actual, df_anterior):
+    cols = _resolver_columnas(df_actual, df_anterior)
+    col_cliente, col_valor = cols["cliente"], cols["valor"]
+    clientes_actual = set(df_actual[col_cliente].astype(str).unique())
+    clientes_anterior = set(df_anterior[col_cliente].astype(str).unique())
+    retenidos = clientes_actual & clientes_anterior
+    nuevos = clientes_actual - clientes_anterior
+    df_retenidos = df_actual[df_actual[col_cliente].isin(retenidos)]
+    df_nuevos = df_actual[df_actual[col_cliente].isin(nuevos)]
+    return {
+        "total_clientes_actual": len(clientes_actual),
+        "total_clientes_anterior": len(clientes_anterior),
+        "clientes_retenidos": len(retenidos),
+        "clientes_nuevos": len(nuevos),
+        "clientes_perdidos": len(clientes_anterior - clientes_actual),
+        "ventas_retenidos": df_retenidos[col_valor].sum(),
+        "ventas_nuevos": df_nuevos[col_valor].sum(),
+        "tasa_retencion": (len(retenidos) / len(clientes_anterior) * 100) if clientes_anterior else 0,
+        "top_retenidos": df_retenidos.groupby(col_cliente)[col_valor].sum().nlargest(10).to_dict(),
+        "top_nuevos": df_nuevos.groupby(col_cliente)[col_valor].sum().nlargest(10).to_dict(),
+    }
+
+
+def _ventas(semilla: int, filas: int, clientes: int) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    lineas = np.array(["Pintuco", "PINTUCO", "abracol", "Yale", "Goya", None, np.nan, "None"], dtype=object)
+    return pd.DataFrame({
+        "nombre_cliente": [f"CLIENTE {i}" for i in rng.integers(0, clientes, filas)],
+        "linea_producto": lineas[rng.integers(0, len(lineas), filas)],
+        "valor_venta": rng.normal(200_000, 150_000, filas).round(2),
+    })
+
+
+@pytest.mark.parametrize("semilla", [1, 7, 42])
+def test_lineas_estrategicas_igual_que_el_bucle(semilla):
+    df_actual = _ventas(semilla, 3000, 400)
+    df_anterior = _ventas(semilla + 100, 2500, 400)
+    # Incluye una línea sin ventas en ningún año y las claves de vacíos 'None' y 'nan'
+    lineas = ["Pintuco", "ABRACOL", "yale", "Goya", "Sin Ventas", "None", "nan"]
+
+    esperado = _lineas_con_bucle(df_actual, df_anterior, lineas)
+    obtenido = _analizar_lineas_estrategicas(df_actual, df_anterior, lineas)
+
+    assert list(obtenido) == list(esperado)
+    for linea, valores in esperado.items():
+        for campo, valor in valores.items():
+            assert obtenido[linea][campo] == pytest.approx(valor, rel=1e-9), (linea, campo)
+
+
+def test_linea_solo_en_el_anio_anterior_es_freno():
+    df_actual = pd.DataFrame({"nombre_cliente": ["A"], "linea_producto": ["Goya"], "valor_venta": [10.0]})
+    df_anterior = pd.DataFrame({"nombre_cliente": ["A", "B"], "linea_producto": ["Goya", "Yale"], "valor_venta": [10.0, 5.0]})
+    resultado = _analizar_lineas_estrategicas(df_actual, df_anterior, ["Goya", "Yale"])
+    assert resultado == _lineas_con_bucle(df_actual, df_anterior, ["Goya", "Yale"])
+    assert resultado["Yale"]["impacto"] == "FRENO" and resultado["Goya"]["impacto"] == "ESTABLE"
+
+
+@pytest.mark.parametrize("semilla", [3, 11])
+def test_retencion_igual_que_los_sets(semilla):
+    df_actual = _ventas(semilla, 4000, 600)
+    df_anterior = _ventas(semilla + 50, 3500, 500)
+
+    esperado = _retencion_con_sets(df_actual, df_anterior)
+    obtenido = _analizar_retencion_clientes(df_actual, df_anterior)
+
+    for campo in ("total_clientes_actual", "total_clientes_anterior", "clientes_retenidos",
+                  "clientes_nuevos", "clientes_perdidos"):
+        assert obtenido[campo] == esperado[campo], campo
+    for campo in ("ventas_retenidos", "ventas_nuevos", "tasa_retencion"):
+        assert obtenido[campo] == pytest.approx(esperado[campo], rel=1e-9), campo
+    for campo in ("top_retenidos", "top_nuevos"):
+        assert list(obtenido[campo]) == list(esperado[campo]), campo
+        assert list(obtenido[campo].values()) == pytest.approx(list(esperado[campo].values()), rel=1e-9)
+
+
+def test_retencion_sin_anio_anterior():
+    df_actual = _ventas(5, 200, 50)
+    df_anterior = df_actual.iloc[:0]
+    obtenido = _analizar_retencion_clientes(df_actual, df_anterior)
+    esperado = _retencion_con_sets(df_actual, df_anterior)
+    assert obtenido["clientes_nuevos"] == esperado["clientes_nuevos"] == df_actual["nombre_cliente"].nunique()
+    assert obtenido["tasa_retencion"] == 0 and obtenido["clientes_retenidos"] == 0
+    assert obtenido["ventas_nuevos"] == pytest.approx(esperado["ventas_nuevos"])
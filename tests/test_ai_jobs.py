@@ -0,0 +1,98 @@
+"""Trabajos de IA contra el servidor falso local: streaming, timeout con respaldo, caché y errores"""
+import pytest
+
+from analisis_estrategico import ai_jobs
+from analisis_estrategico.ai_jobs import enviar_trabajo_ia, transmitir_trabajo
+from analisis_estrategico.llm_cache import BackendOpenAI, BackendStub, CacheLLM
+
+from servidor_llm_falso import ServidorLLMFalso
+
+RESPALDO = "Análisis manual"
+
+
+@pytest.fixture(autouse=True)
+def trabajos_limpios():
+    ai_jobs._TRABAJOS.clear()
+    yield
+    ai_jobs._TRABAJOS.clear()
+
+
+def _mensajes(texto: str):
+    return [{"role": "user", "content": texto}]
+
+
+def test_streaming_muestra_texto_parcial_y_final(tmp_path):
+    texto = "Las ventas crecen en la línea principal"
+    mostrado = []
+    with ServidorLLMFalso(texto=texto, pausa=0.05) as servidor:
+        backend = BackendOpenAI("clave-falsa", base_url=servidor.base_url)
+        trabajo = enviar_trabajo_ia(backend, CacheLLM(tmp_path), _mensajes("stream"), "modelo-falso")
+        resultado = transmitir_trabajo(trabajo, mostrado.append, RESPALDO, timeout=10, intervalo=0.02)
+
+    assert resultado == texto
+    assert mostrado[-1] == texto
+    assert any(parcial.endswith(" ▌") for parcial in mostrado[:-1])
+
+
+def test_timeout_muestra_respaldo_y_el_trabajo_termina_en_cache(tmp_path):
+    texto = "Respuesta lenta pero completa"
+    cache = CacheLLM(tmp_path)
+    mostrado = []
+    with ServidorLLMFalso(texto=texto, pausa=0.15) as servidor:
+        backend = BackendOpenAI("clave-falsa", base_url=servidor.base_url)
+        trabajo = enviar_trabajo_ia(backend, cache, _mensajes("lento"), "modelo-falso")
+        resultado = transmitir_trabajo(trabajo, mostrado.append, lambda: RESPALDO, timeout=0.2, intervalo=0.02)
+
+        assert resultado == RESPALDO and mostrado[-1] == RESPALDO
+        assert not trabajo.terminado.is_set()
+        assert trabajo.terminado.wait(10)
+
+    assert trabajo.exitoso and trabajo.texto == texto
+    assert cache.leer(trabajo.clave) == texto
+
+    # Reenviar el mismo prompt sale de la caché: sin nueva petición al servidor
+    peticiones = servidor.peticiones
+    repetido = enviar_trabajo_ia(backend, cache, _mensajes("lento"), "modelo-falso")
+    assert repetido is not trabajo
+    assert repetido.desde_cache and repetido.terminado.is_set()
+    assert transmitir_trabajo(repetido, mostrado.append, RESPALDO, timeout=1) == texto
+    assert servidor.peticiones == peticiones
+
+
+def test_mismo_prompt_en_curso_comparte_trabajo(tmp_path):
+    cache = CacheLLM(tmp_path)
+    with ServidorLLMFalso(pausa=0.05) as servidor:
+        backend = BackendOpenAI("clave-falsa", base_url=servidor.base_url)
+        primero = enviar_trabajo_ia(backend, cache, _mensajes("compartido"), "modelo-falso")
+        segundo = enviar_trabajo_ia(backend, cache, _mensajes("compartido"), "modelo-falso")
+        assert segundo is primero
+        assert primero.terminado.wait(10)
+    assert servidor.peticiones == 1
+
+
+def test_backend_con_error_cae_al_respaldo(tmp_path):
+    cache = CacheLLM(tmp_path)
+    mostrado = []
+    with ServidorLLMFalso(estado_error=400) as servidor:
+        backend = BackendOpenAI("clave-falsa", base_url=servidor.base_url)
+        trabajo = enviar_trabajo_ia(backend, cache, _mensajes("falla"), "modelo-falso")
+        resultado = transmitir_trabajo(trabajo, mostrado.append, RESPALDO, timeout=10, intervalo=0.02)
+
+    assert resultado == RESPALDO and mostrado == [RESPALDO]
+    assert trabajo.error is not None and not trabajo.exitoso
+    assert cache.leer(trabajo.clave) is None
+
+
+def test_respuesta_vacia_no_se_guarda_en_cache(tmp_path):
+    cache = CacheLLM(tmp_path)
+    backend = BackendStub(respuesta=lambda modelo, mensajes: "")
+    trabajo = enviar_trabajo_ia(backend, cache, _mensajes("vacío"), "modelo-falso")
+    assert transmitir_trabajo(trabajo, lambda _: None, RESPALDO, timeout=5, intervalo=0.01) == RESPALDO
+    assert cache.leer(trabajo.clave) is None
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_sin_trabajo_muestra_respaldo():
+    mostrado = []
+    assert transmitir_trabajo(None, mostrado.append, lambda: RESPALDO, timeout=1) == RESPALDO
+    assert mostrado == [RESPALDO]
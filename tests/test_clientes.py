@@ -0,0 +1,65 @@
+"""indice_propietarios_al_dia: reutilización, actualización por agregado y reconstrucción ante cambios"""
+import pandas as pd
+
+import utils_clientes
+
+
+def _ventas(filas: list) -> pd.DataFrame:
+    df = pd.DataFrame(filas, columns=["cliente_id", "codigo_vendedor", "nomvendedor", "nombre_cliente", "fecha_venta"])
+    df["fecha_venta"] = pd.to_datetime(df["fecha_venta"])
+    return df
+
+
+BASE = [
+    ("1", "10", "ANA", "CLIENTE 1", "2025-01-05"),
+    ("2", "20", "LUIS", "CLIENTE 2", "2025-01-10"),
+    ("1", "20", "LUIS", "CLIENTE 1", "2025-02-01"),
+]
+
+
+def test_sin_cambios_reutiliza_el_mismo_indice():
+    estado = {}
+    df = _ventas(BASE)
+    primero = utils_clientes.indice_propietarios_al_dia(estado, df)
+    assert utils_clientes.indice_propietarios_al_dia(estado, df) is primero
+    assert estado["indice_propietarios_version"] == utils_clientes.version_ventas(df)
+
+
+def test_agregado_de_ventas_nuevas_equivale_a_reconstruir():
+    estado = {}
+    utils_clientes.indice_propietarios_al_dia(estado, _ventas(BASE))
+    df = _ventas(BASE + [("2", "10", "ANA", "CLIENTE 2", "2025-03-01"), ("3", "30", "EVA", "CLIENTE 3", "2025-03-02")])
+    indice = utils_clientes.indice_propietarios_al_dia(estado, df)
+    pd.testing.assert_frame_equal(indice.sort_index(), utils_clientes.construir_indice_propietarios(df).sort_index())
+    assert indice.loc["2", "nomvendedor"] == "ANA"
+
+
+def test_correccion_sin_mover_la_ultima_fecha_reconstruye():
+    estado = {}
+    utils_clientes.indice_propietarios_al_dia(estado, _ventas(BASE))
+    # Reasignación de una venta antigua y una fila nueva con la misma última fecha: mismas filas + 1, misma fecha
+    corregido = [BASE[0], ("2", "30", "EVA", "CLIENTE 2", "2025-01-10"), BASE[2], ("3", "30", "EVA", "CLIENTE 3", "2025-02-01")]
+    df = _ventas(corregido)
+    indice = utils_clientes.indice_propietarios_al_dia(estado, df)
+    assert indice.loc["2", "nomvendedor"] == "EVA"
+    pd.testing.assert_frame_equal(indice, utils_clientes.construir_indice_propietarios(df))
+
+
+def test_filas_borradas_y_fecha_menor_reconstruyen():
+    estado = {}
+    utils_clientes.indice_propietarios_al_dia(estado, _ventas(BASE))
+    df = _ventas(BASE[:2])  # se retira la venta del 01/02: la última fecha baja
+    indice = utils_clientes.indice_propietarios_al_dia(estado, df)
+    assert indice.loc["1", "nomvendedor"] == "ANA"
+    pd.testing.assert_frame_equal(indice, utils_clientes.construir_indice_propietarios(df))
+
+
+def test_borrado_mas_agregado_reconstruye():
+    estado = {}
+    utils_clientes.indice_propietarios_al_dia(estado, _ventas(BASE))
+    # Se retira la venta del 01/02 y llegan dos ventas nuevas: hay más filas y la fecha sube, pero no es un
+    # agregado puro; actualizar sólo con lo nuevo dejaría al cliente 1 con LUIS
+    df = _ventas(BASE[:2] + [("3", "30", "EVA", "CLIENTE 3", "2025-03-01"), ("4", "10", "ANA", "CLIENTE 4", "2025-03-02")])
+    indice = utils_clientes.indice_propietarios_al_dia(estado, df)
+    assert indice.loc["1", "nomvendedor"] == "ANA"
+    pd.testing.assert_frame_equal(indice, utils_clientes.construir_indice_propietarios(df))
@@ -0,0 +1,42 @@
+"""doc_class / is_venta_neta frente a los filtros históricos por texto de TipoDocumento"""
+import numpy as np
+import pandas as pd
+
+import utils_documentos
+from utils_documentos import ALBARAN, FACTURA, NOTA_CREDITO, OTRO
+
+TIPOS = pd.Series([
+    "FACTURA", "FACTURA ALBARAN", "ALBARAN FACTURA", "albaran", "NOTA CREDITO", "NOTA DE CREDITO ALBARAN",
+    "Factura electrónica", "REMISION", None, np.nan, "", "ALBARAN", "NOTA CREDITO", "FACTURA ALBARAN",
+])
+
+
+def test_clase_y_venta_neta_conservan_los_filtros_historicos():
+    df = utils_documentos.agregar_clase_documento(pd.DataFrame({"TipoDocumento": TIPOS}))
+
+    # Filtros de la versión anterior, evaluados fila a fila sobre el texto
+    neta_historica = TIPOS.str.contains("FACTURA|NOTA.*CREDITO", case=False, na=False)
+    albaran_historico = TIPOS.str.contains("ALBARAN", case=False, na=False)
+
+    np.testing.assert_array_equal(df["is_venta_neta"].to_numpy(), neta_historica.to_numpy())
+    np.testing.assert_array_equal(utils_documentos.mascara_clase(df, ALBARAN).to_numpy(), albaran_historico.to_numpy())
+    np.testing.assert_array_equal(utils_documentos.mascara_venta_neta(df).to_numpy(), neta_historica.to_numpy())
+
+
+def test_etiquetas_mixtas_son_albaran_y_venta_neta():
+    df = utils_documentos.agregar_clase_documento(pd.DataFrame({"TipoDocumento": TIPOS}))
+    mixtas = df[df["TipoDocumento"].isin(["FACTURA ALBARAN", "ALBARAN FACTURA", "NOTA DE CREDITO ALBARAN"])]
+    assert (mixtas["doc_class"] == ALBARAN).all()
+    assert mixtas["is_venta_neta"].all()
+
+    clases = dict(zip(df["TipoDocumento"].fillna("<vacío>"), df["doc_class"].astype(str)))
+    assert clases["FACTURA"] == FACTURA
+    assert clases["Factura electrónica"] == FACTURA
+    assert clases["NOTA CREDITO"] == NOTA_CREDITO
+    assert clases["REMISION"] == OTRO and clases["<vacío>"] == OTRO
+
+
+def test_mascara_venta_neta_sin_columna_precalculada():
+    df = pd.DataFrame({"TipoDocumento": TIPOS})
+    neta_historica = TIPOS.str.contains("FACTURA|NOTA.*CREDITO", case=False, na=False)
+    np.testing.assert_array_equal(utils_documentos.mascara_venta_neta(df).to_numpy(), neta_historica.to_numpy())
@@ -0,0 +1,91 @@
+"""IndiceFiltros.seleccion / aplicar frente al filtrado encadenado con isin de la versión anterior"""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analisis_estrategico.consultas import COLUMNAS_FILTRO
+from analisis_estrategico.indice_filtros import IndiceFiltros
+
+
+def _filtrar_con_isin(df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+    """aplicar_filtros anterior: una copia y un isin por dimensión activa"""
+    df_filtrado = df.copy()
+    for clave, columna in COLUMNAS_FILTRO.items():
+        if filtros.get(clave) and columna in df_filtrado.columns:
+            df_filtrado = df_filtrado[df_filtrado[columna].isin(filtros[clave])]
+    return df_filtrado
+
+
+@pytest.fixture(scope="module")
+def ventas() -> pd.DataFrame:
+    rng = np.random.default_rng(2024)
+    n = 20_000
+    ciudades = np.array(["PEREIRA", "MANIZALES", "ARMENIA", "CALI", None, "None"], dtype=object)
+    lineas = np.array(["PINTUCO", "ABRACOL", "YALE", "GOYA", np.nan], dtype=object)
+    vendedores = np.array([f"VENDEDOR {i}" for i in range(12)], dtype=object)
+    marcas = np.array(["VINILTEX", "KORAZA", "No Especificada"], dtype=object)
+    df = pd.DataFrame({
+        "Poblacion_Real": ciudades[rng.integers(0, len(ciudades), n)],
+        "Linea_Estrategica": lineas[rng.integers(0, len(lineas), n)],
+        "nomvendedor": vendedores[rng.integers(0, len(vendedores), n)],
+        "nombre_marca": pd.Categorical(marcas[rng.integers(0, len(marcas), n)]),
+        "anio": rng.integers(2022, 2026, n),
+        "valor_venta": rng.normal(100_000, 50_000, n),
+    })
+    # Índice no contiguo, como el de un histórico ya recortado
+    df.index = rng.permutation(np.arange(n) * 3)
+    return df
+
+
+FILTROS = [
+    {},
+    {"ciudades": ["PEREIRA"]},
+    {"ciudades": ["PEREIRA", "CALI"], "lineas": ["YALE"]},
+    {"ciudades": ["None"]},
+    {"lineas": ["PINTUCO", "GOYA"], "vendedores": ["VENDEDOR 3", "VENDEDOR 7"], "anios": [2024, 2025]},
+    {"marcas": ["KORAZA"], "anios": [2023]},
+    {"ciudades": ["ARMENIA"], "lineas": ["ABRACOL"], "vendedores": ["VENDEDOR 1"], "marcas": ["VINILTEX"], "anios": [2025]},
+    {"ciudades": ["BOGOTA"]},  # valor inexistente: ninguna fila
+    {"vendedores": ["VENDEDOR 2", "VENDEDOR 2"], "lineas": []},  # repetidos y dimensión vacía
+]
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_aplicar_igual_que_isin_encadenado(ventas, filtros):
+    indice = IndiceFiltros(ventas)
+    esperado = _filtrar_con_isin(ventas, filtros)
+    obtenido = indice.aplicar(ventas, filtros)
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_seleccion_en_todas_las_combinaciones_de_valores(ventas):
+    indice = IndiceFiltros(ventas)
+    posiciones = pd.Series(np.arange(len(ventas)), index=ventas.index)
+    for ciudad, linea, anio in itertools.product(indice.valores("Poblacion_Real"), indice.valores("Linea_Estrategica"),
+                                                  indice.valores("anio")):
+        filtros = {"ciudades": [ciudad], "lineas": [linea], "anios": [anio]}
+        esperado = posiciones[_filtrar_con_isin(ventas, filtros).index].to_numpy()
+        np.testing.assert_array_equal(indice.seleccion(filtros), esperado)
+
+
+def test_sin_filtros_devuelve_el_mismo_dataframe(ventas):
+    indice = IndiceFiltros(ventas)
+    assert indice.seleccion({"lineas": [], "otra_clave": ["X"]}) is None
+    assert indice.aplicar(ventas, {}) is ventas
+
+
+def test_valores_sin_nulos_y_ordenados(ventas):
+    indice = IndiceFiltros(ventas)
+    assert indice.valores("Poblacion_Real") == sorted(ventas["Poblacion_Real"].dropna().unique())
+    assert indice.valores("Linea_Estrategica") == sorted(ventas["Linea_Estrategica"].dropna().unique())
+    assert indice.valores("anio") == sorted(ventas["anio"].unique())
+    assert indice.valores("columna_inexistente") == []
+
+
+def test_seleccion_memoizada_de_solo_lectura(ventas):
+    indice = IndiceFiltros(ventas)
+    primera = indice.seleccion({"ciudades": ["CALI", "PEREIRA"]})
+    assert indice.seleccion({"ciudades": ["PEREIRA", "CALI"]}) is primera
+    assert not primera.flags.writeable
@@ -0,0 +1,112 @@
+"""CacheLLM con BackendStub: coalescencia, TTL, expulsión por tamaño y propagación de errores"""
+import os
+import threading
+import time
+
+import pytest
+
+from analisis_estrategico.llm_cache import BackendStub, CacheLLM, clave_prompt, completar_con_cache
+
+MENSAJES = [{"role": "user", "content": "Resume el periodo"}]
+
+
+def _envejecer(cache: CacheLLM, clave: str, segundos: float):
+    ruta = cache._ruta(clave)
+    marca = time.time() - segundos
+    os.utime(ruta, (marca, marca))
+
+
+def test_peticiones_concurrentes_comparten_una_llamada(tmp_path):
+    backend = BackendStub(latencia=0.3)
+    cache = CacheLLM(tmp_path)
+    barrera = threading.Barrier(5)
+    respuestas = []
+
+    def pedir():
+        barrera.wait()
+        respuestas.append(completar_con_cache(backend, cache, MENSAJES, "modelo-prueba"))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert backend.llamadas == 1
+    assert len(respuestas) == 5 and len(set(respuestas)) == 1
+    # Una vista posterior sale de disco sin volver a llamar al modelo
+    assert completar_con_cache(backend, cache, MENSAJES, "modelo-prueba") == respuestas[0]
+    assert backend.llamadas == 1
+
+
+def test_entrada_vencida_por_ttl_se_recalcula(tmp_path):
+    backend = BackendStub()
+    cache = CacheLLM(tmp_path, ttl=60)
+    completar_con_cache(backend, cache, MENSAJES, "modelo-prueba")
+    clave = clave_prompt("modelo-prueba", MENSAJES, temperatura=0.7, max_tokens=2000)
+
+    _envejecer(cache, clave, 30)
+    assert cache.leer(clave) is not None
+
+    _envejecer(cache, clave, 120)
+    assert cache.leer(clave) is None
+    assert not cache._ruta(clave).exists()
+
+    completar_con_cache(backend, cache, MENSAJES, "modelo-prueba")
+    assert backend.llamadas == 2
+
+
+def test_expulsion_por_tamano_descarta_la_menos_usada(tmp_path):
+    cache = CacheLLM(tmp_path, max_bytes=10_000)
+    respuesta = "x" * 3000
+    for i, clave in enumerate(["a", "b", "c"]):
+        cache.escribir(clave, respuesta)
+        _envejecer(cache, clave, 100 - i * 10)
+    cache.leer("a")  # 'a' pasa a ser la más reciente; 'b' queda como la menos usada
+
+    cache.escribir("d", respuesta)
+
+    assert cache.leer("b") is None
+    for clave in ("a", "c", "d"):
+        assert cache.leer(clave) == respuesta
+    assert sum(ruta.stat().st_size for ruta in tmp_path.glob("*.json")) <= cache.max_bytes
+
+
+def test_error_se_propaga_a_quienes_esperan(tmp_path):
+    cache = CacheLLM(tmp_path)
+    liberar = threading.Event()
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        liberar.wait(5)
+        raise RuntimeError("modelo caído")
+
+    errores = []
+
+    def pedir():
+        try:
+            cache.obtener_o_calcular("clave", calcular)
+        except RuntimeError as e:
+            errores.append(e)
+
+    propietario = threading.Thread(target=pedir)
+    propietario.start()
+    while "clave" not in cache._en_vuelo:
+        time.sleep(0.01)
+    esperando = [threading.Thread(target=pedir) for _ in range(4)]
+    for hilo in esperando:
+        hilo.start()
+    time.sleep(0.2)
+    liberar.set()
+    for hilo in [propietario] + esperando:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert len(errores) == 5 and all(str(e) == "modelo caído" for e in errores)
+    assert "clave" not in cache._en_vuelo
+    assert cache.leer("clave") is None
+    # Tras el fallo no queda nada en vuelo: el siguiente intento vuelve a calcular
+    with pytest.raises(RuntimeError):
+        cache.obtener_o_calcular("clave", calcular)
+    assert len(llamadas) == 2
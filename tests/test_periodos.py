@@ -0,0 +1,93 @@
+"""Máscaras de periodo comparable (YTD/QTD/MTD) frente a una referencia fila a fila"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from nucleo import periodos
+
+
+def _fechas(desde: str, hasta: str) -> pd.DataFrame:
+    fechas = pd.date_range(desde, hasta, freq="D")
+    return pd.DataFrame({"fecha_venta": fechas, "anio": fechas.year, "mes": fechas.month, "valor_venta": 1.0})
+
+
+def _referencia(fecha, alcance: str, corte: pd.Timestamp) -> bool:
+    """Mismo mes/día de corte en el año de la fila; QTD y MTD además exigen el trimestre / mes del corte."""
+    if pd.isna(fecha):
+        return False
+    if (fecha.month, fecha.day) > (corte.month, corte.day):
+        return False
+    if alcance == "MTD":
+        return fecha.month == corte.month
+    if alcance == "QTD":
+        return (fecha.month - 1) // 3 == (corte.month - 1) // 3
+    return True
+
+
+@pytest.mark.parametrize("alcance", ["YTD", "QTD", "MTD"])
+@pytest.mark.parametrize("corte", ["2025-10-15", "2025-03-31", "2025-04-01", "2025-12-31", "2025-01-01", "2024-02-29"])
+def test_mascara_igual_que_la_referencia(alcance, corte):
+    df = _fechas("2022-01-01", "2025-12-31")
+    corte = pd.Timestamp(corte)
+    esperado = np.array([_referencia(f, alcance, corte) for f in df["fecha_venta"]])
+    np.testing.assert_array_equal(periodos.mascara_periodo(df, alcance, corte), esperado)
+
+
+def test_limites_del_dia_de_corte():
+    df = _fechas("2024-01-01", "2025-12-31")
+    incluidas = set(periodos.filtrar_periodo(df, "YTD", "2025-10-15", version="limites")["fecha_venta"])
+    for anio in (2024, 2025):
+        assert pd.Timestamp(anio, 10, 15) in incluidas
+        assert pd.Timestamp(anio, 10, 16) not in incluidas
+        assert pd.Timestamp(anio, 1, 1) in incluidas
+
+    mtd = periodos.filtrar_periodo(df, "MTD", "2025-10-15", version="limites")
+    assert set(mtd["mes"]) == {10} and mtd["fecha_venta"].dt.day.max() == 15 and len(mtd) == 30
+
+    qtd = periodos.filtrar_periodo(df, "QTD", "2025-10-15", version="limites")
+    assert set(qtd["mes"]) == {10}
+    qtd_marzo = periodos.filtrar_periodo(df, "QTD", "2025-03-31", version="limites")
+    assert set(qtd_marzo["mes"]) == {1, 2, 3} and len(qtd_marzo) == 2 * 90 + 1  # 2024 bisiesto
+
+
+def test_corte_en_dia_bisiesto():
+    df = _fechas("2023-01-01", "2025-03-31")
+    ytd = periodos.filtrar_periodo(df, "YTD", "2024-02-29", version="bisiesto")
+    por_anio = ytd.groupby("anio")["fecha_venta"].agg(["max", "size"])
+    # El 29/02 existe sólo en 2024; en los otros años el periodo termina el 28/02
+    assert por_anio.loc[2024, "max"] == pd.Timestamp("2024-02-29") and por_anio.loc[2024, "size"] == 60
+    assert por_anio.loc[2023, "max"] == pd.Timestamp("2023-02-28") and por_anio.loc[2023, "size"] == 59
+    assert por_anio.loc[2025, "max"] == pd.Timestamp("2025-02-28") and por_anio.loc[2025, "size"] == 59
+
+    # Con corte al 28/02 de un año normal, el 29/02/2024 queda fuera
+    ytd_normal = periodos.filtrar_periodo(df, "YTD", "2025-02-28", version="bisiesto")
+    assert pd.Timestamp("2024-02-29") not in set(ytd_normal["fecha_venta"])
+    mtd = periodos.filtrar_periodo(df, "MTD", "2024-02-29", version="bisiesto")
+    assert mtd.groupby("anio").size().to_dict() == {2023: 28, 2024: 29, 2025: 28}
+
+
+def test_fechas_vacias_quedan_fuera():
+    df = pd.DataFrame({"fecha_venta": pd.to_datetime(["2025-01-10", None, "2025-02-01"]), "mes": [1, 1, 2]})
+    np.testing.assert_array_equal(periodos.mascara_periodo(df, "YTD", "2025-01-31"), [True, False, False])
+
+
+def test_sin_fecha_usa_el_mes_como_el_filtro_anterior():
+    # El filtro YTD anterior comparaba fila a fila 'mes' <= mes del corte
+    df = pd.DataFrame({"anio": 2025, "mes": np.tile(np.arange(1, 13), 3)})
+    corte = pd.Timestamp("2025-06-03")
+    anterior = df.apply(lambda fila: fila["mes"] <= corte.month, axis=1).to_numpy()
+    np.testing.assert_array_equal(periodos.mascara_periodo(df, "YTD", corte), anterior)
+    np.testing.assert_array_equal(periodos.mascara_periodo(df, "MTD", corte), (df["mes"] == 6).to_numpy())
+
+
+def test_mascara_cacheada_es_de_solo_lectura_y_se_reutiliza():
+    df = _fechas("2024-01-01", "2025-06-30")
+    primera = periodos.periodo_comparable(df, "YTD", "2025-03-15")
+    assert periodos.periodo_comparable(df, "YTD", "2025-03-15") is primera
+    assert not primera.flags.writeable
+    np.testing.assert_array_equal(primera, periodos.mascara_periodo(df, "YTD", "2025-03-15"))
+
+
+def test_alcance_desconocido():
+    with pytest.raises(ValueError):
+        periodos.mascara_periodo(_fechas("2025-01-01", "2025-01-05"), "WTD", "2025-01-03")
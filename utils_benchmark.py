@@ -0,0 +1,325 @@
+# ==============================================================================
+# ARCHIVO: utils_benchmark.py
+# DESCRIPCIÓN: Suite de benchmarks sin interfaz: tiempo y memoria pico de cada
+#              ruta caliente sobre los datos sintéticos, a varias escalas, con
+#              historial JSON/CSV para comparar entre commits
+# ==============================================================================
+# Uso:
+#   python utils_benchmark.py --escalas 100k,1M --repeticiones 3
+#   python utils_benchmark.py --escalas 1M --rutas procesar_datos_periodo,calcular_albaranes_anuales
+# Sale con código 1 si alguna ruta del cierre mensual es más lenta que la última
+# medición de otro commit por encima del umbral (--umbral, 20% por defecto).
+import argparse
+import ast
+import csv
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from statistics import median
+
+import pandas as pd
+
+import utils_datos_sinteticos
+import utils_excel
+import utils_memoria
+import utils_presupuesto
+import nucleo
+from nucleo import exportacion
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+PAGINA_PRESUPUESTO = os.path.join(RAIZ, "pages", "📊_Presupuesto")
+DIRECTORIO_DATOS = os.path.join(RAIZ, ".cache", "datos_sinteticos")
+DIRECTORIO_HISTORIAL = os.path.join(RAIZ, ".cache", "benchmarks")
+
+# Rutas del cierre mensual: una regresión en cualquiera de ellas hace fallar la suite
+RUTAS_CIERRE_MENSUAL = {
+    "cargar_y_limpiar_datos", "procesar_datos_periodo", "calcular_albaranes_anuales",
+    "calcular_presupuesto_dinamico_global", "actualizar_oportunidades_con_ventas_del_trimestre"
+}
+UMBRAL_REGRESION = 0.20
+
+CAMPOS_HISTORIAL = ["commit", "fecha", "escala", "ruta", "filas", "segundos_mediana", "segundos_min",
+                    "pico_mb", "repeticiones", "python", "pandas"]
+
+
+@dataclass
+class Medicion:
+    commit: str
+    fecha: str
+    escala: int
+    ruta: str
+    filas: int
+    segundos_mediana: float
+    segundos_min: float
+    pico_mb: float
+    repeticiones: int
+    python: str
+    pandas: str
+
+
+# ==============================================================================
+# CARGA DE FUNCIONES DESDE LAS PÁGINAS
+# ==============================================================================
+def _usa_streamlit(nodo) -> bool:
+    return any(isinstance(n, ast.Name) and n.id == "st" for n in ast.walk(nodo))
+
+
+def cargar_funciones_pagina(ruta: str, reemplazos: dict = None) -> dict:
+    """
+    Ejecuta de una página sólo los imports, las definiciones y las constantes, sin su interfaz:
+    las llamadas sueltas (st.markdown, main()...), los bloques if/with/for y las asignaciones
+    que tocan 'st' se omiten. Las asignaciones que dependen de la interfaz (NameError) se saltan.
+    """
+    with open(ruta, encoding="utf-8") as archivo:
+        arbol = ast.parse(archivo.read(), filename=ruta)
+    espacio = {"__name__": "benchmark_pagina", "__file__": ruta}
+    for nodo in arbol.body:
+        if isinstance(nodo, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+            exec(compile(ast.Module(body=[nodo], type_ignores=[]), ruta, "exec"), espacio)
+        elif isinstance(nodo, (ast.Assign, ast.AnnAssign)) and not _usa_streamlit(nodo.value):
+            try:
+                exec(compile(ast.Module(body=[nodo], type_ignores=[]), ruta, "exec"), espacio)
+            except (NameError, KeyError, AttributeError):
+                continue
+    espacio.update(reemplazos or {})
+    return espacio
+
+
+# ==============================================================================
+# RUTAS CALIENTES
+# ==============================================================================
+def rutas_calientes(directorio_datos: str) -> list:
+    """
+    Prepara los datos base (fuera del cronómetro) y devuelve [(nombre, función, filas)].
+    Cada función reproduce la llamada que hace la aplicación en el cierre mensual; el cálculo
+    se mide directamente sobre el núcleo, que no pasa por st.cache_data.
+    """
+    presupuesto = cargar_funciones_pagina(PAGINA_PRESUPUESTO)
+    from pages.analisis_estrategico import ai_analysis
+
+    df_ventas = nucleo.leer_ventas(directorio_datos)
+    df_cobros = nucleo.leer_cobros(directorio_datos)
+    df_cl4 = nucleo.leer_reporte_cl4(directorio_datos)
+
+    anio, mes = df_ventas[["anio", "mes"]].sort_values(["anio", "mes"]).iloc[-1]
+    anio, mes = int(anio), int(mes)
+    df_ventas_periodo = df_ventas[(df_ventas["anio"] == anio) & (df_ventas["mes"] == mes)]
+    df_cobros_periodo = df_cobros[(df_cobros["anio"] == anio) & (df_cobros["mes"] == mes)]
+
+    total_2024 = df_ventas.loc[df_ventas["anio"] == 2024, "valor_venta"].sum()
+    total_2025 = df_ventas.loc[df_ventas["anio"] == 2025, "valor_venta"].sum()
+    total_2026, _ = utils_presupuesto.proyectar_total_2026(total_2024, total_2025)
+    grupos = nucleo.DATA_CONFIG["grupos_vendedores"]
+    df_asignado = utils_presupuesto.asignar_presupuesto(df_ventas, grupos, total_2026)
+    df_mensual = utils_presupuesto.distribuir_presupuesto_mensual(df_asignado, df_ventas)
+    df_mensual["vendedor_unificado"] = df_mensual["grupo"]  # construir_grupo ya devuelve el grupo o el vendedor
+    df_mensual_unificado = df_mensual.groupby(["vendedor_unificado", "mes"], as_index=False)["presupuesto_mensual"].sum()
+    df_coment = pd.DataFrame({"nomvendedor": df_asignado["nomvendedor"], "grupo": df_asignado["grupo"],
+                              "comentario": "Asignación por participación 2025."})
+
+    df_marquillas = nucleo.filtrar_ventas_marquillas(df_ventas)
+    df_marquillas_mes = df_marquillas[(df_marquillas["anio"] == anio) & (df_marquillas["mes"] == mes)]
+
+    df_actual = df_ventas[df_ventas["anio"] == anio]
+    df_anterior = df_ventas[df_ventas["anio"] == anio - 1]
+    venta_actual, venta_anterior = df_actual["valor_venta"].sum(), df_anterior["valor_venta"].sum()
+    metricas = {"venta_actual": venta_actual, "venta_anterior": venta_anterior,
+                "diferencia": venta_actual - venta_anterior,
+                "pct_variacion": (venta_actual / venta_anterior - 1) * 100 if venta_anterior else 0.0}
+    lineas = df_actual["linea_producto"].value_counts().head(10).index.astype(str).tolist()
+
+    df_oportunidades = df_cl4[df_cl4["CL4"] < 4].rename(columns={"NOMBRE": "Cliente", "NIT": "NIT Cliente", "CL4": "Nivel Actual"})
+    df_oportunidades = df_oportunidades[["Cliente", "NIT Cliente", "Nivel Actual"] + nucleo.APP_CONFIG["productos_oportunidad_cl4"]]
+    df_facturas_periodo = df_ventas_periodo[df_ventas_periodo["is_venta_neta"]]
+
+    return [
+        ("cargar_y_limpiar_datos", lambda: nucleo.leer_ventas(directorio_datos), len(df_ventas)),
+        ("procesar_datos_periodo",
+         lambda: nucleo.procesar_datos_periodo(df_ventas_periodo, df_cobros_periodo, df_ventas, anio, mes),
+         len(df_ventas)),
+        ("calcular_albaranes_anuales", lambda: nucleo.calcular_albaranes_anuales(df_ventas, anio),
+         len(df_ventas)),
+        ("calcular_presupuesto_dinamico_global", lambda: nucleo.calcular_presupuesto_dinamico_global(df_ventas),
+         len(df_ventas)),
+        ("utils_presupuesto.asignar_presupuesto",
+         lambda: utils_presupuesto.asignar_presupuesto(df_ventas, grupos, total_2026), len(df_ventas)),
+        ("utils_presupuesto.distribuir_presupuesto_mensual",
+         lambda: utils_presupuesto.distribuir_presupuesto_mensual(df_asignado, df_ventas), len(df_ventas)),
+        ("actualizar_oportunidades_con_ventas_del_trimestre",
+         lambda: nucleo.actualizar_oportunidades_con_ventas_del_trimestre(df_cl4, df_ventas, anio, mes),
+         len(df_cl4)),
+        ("calcular_potencial_venta", lambda: nucleo.calcular_potencial_venta(df_marquillas, df_marquillas_mes),
+         len(df_marquillas)),
+        ("analizar_con_ia_avanzado_manual",
+         lambda: ai_analysis._analisis_manual_avanzado(df_actual, df_anterior, metricas, lineas),
+         len(df_actual) + len(df_anterior)),
+        ("exportar.to_excel_ventas_mensual", lambda: exportacion.excel_ventas_mensual(df_facturas_periodo),
+         len(df_facturas_periodo)),
+        ("exportar.albaranes_anuales_xlsx",
+         lambda: exportacion.exportar_albaranes_anuales(df_ventas, anio, utils_excel.FORMATO_EXCEL),
+         len(df_ventas)),
+        ("exportar.albaranes_anuales_csv_gz",
+         lambda: exportacion.exportar_albaranes_anuales(df_ventas, anio, utils_excel.FORMATO_CSV_GZ),
+         len(df_ventas)),
+        ("exportar.to_excel_oportunidades", lambda: exportacion.excel_oportunidades(df_oportunidades),
+         len(df_oportunidades)),
+        ("exportar.exportar_excel_ejecutivo",
+         lambda: presupuesto["exportar_excel_ejecutivo"](df_mensual_unificado, df_coment, total_2026, "Realista"),
+         len(df_mensual_unificado)),
+    ]
+
+
+# ==============================================================================
+# MEDICIÓN
+# ==============================================================================
+def medir(funcion, repeticiones: int) -> tuple:
+    """
+    (tiempos, pico_mb): las repeticiones cronometradas van sin tracemalloc (que ralentiza);
+    la memoria pico sale de una ejecución adicional con tracemalloc activo. Antes de cada
+    ejecución se vacían las cachés en proceso registradas en utils_memoria (máscaras de
+    periodo, conversiones de Polars, exportaciones...), para que ninguna repetición las herede.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        utils_memoria.liberar_caches_proceso()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    utils_memoria.liberar_caches_proceso()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return tiempos, pico / 1024 ** 2
+
+
+def commit_actual() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        sucio = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}+sucio" if sucio else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def asegurar_datos(lineas: int, semilla: int) -> str:
+    """Carpeta con los datos sintéticos de esa escala; se generan sólo la primera vez."""
+    directorio = os.path.join(DIRECTORIO_DATOS, f"{lineas}_s{semilla}")
+    if not os.path.exists(os.path.join(directorio, "CLIENTE_TIPO.xlsx")):
+        print(f"Generando datos sintéticos ({lineas:,} líneas) en {directorio}...", flush=True)
+        utils_datos_sinteticos.generar_datos(directorio, lineas, semilla)
+    return directorio
+
+
+def ejecutar_suite(escalas: list, repeticiones: int = 3, semilla: int = 42, rutas: set = None) -> list:
+    commit = commit_actual()
+    fecha = datetime.datetime.now().isoformat(timespec="seconds")
+    mediciones = []
+    for lineas in escalas:
+        directorio = asegurar_datos(lineas, semilla)
+        for nombre, funcion, filas in rutas_calientes(directorio):
+            if rutas and nombre not in rutas:
+                continue
+            tiempos, pico_mb = medir(funcion, repeticiones)
+            medicion = Medicion(
+                commit=commit, fecha=fecha, escala=lineas, ruta=nombre, filas=int(filas),
+                segundos_mediana=round(median(tiempos), 4), segundos_min=round(min(tiempos), 4),
+                pico_mb=round(pico_mb, 1), repeticiones=repeticiones,
+                python=platform.python_version(), pandas=pd.__version__
+            )
+            mediciones.append(medicion)
+            print(f"{lineas:>11,}  {nombre:<52} {medicion.segundos_mediana:>9.3f}s  {medicion.pico_mb:>9.1f} MB", flush=True)
+    return mediciones
+
+
+# ==============================================================================
+# HISTORIAL Y COMPARACIÓN
+# ==============================================================================
+def leer_historial(ruta_jsonl: str) -> list:
+    if not os.path.exists(ruta_jsonl):
+        return []
+    with open(ruta_jsonl, encoding="utf-8") as archivo:
+        return [json.loads(linea) for linea in archivo if linea.strip()]
+
+
+def guardar_historial(mediciones: list, directorio: str):
+    """Añade las mediciones a historial.jsonl e historial.csv (una fila por escala y ruta)."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta_csv = os.path.join(directorio, "historial.csv")
+    nuevo_csv = not os.path.exists(ruta_csv)
+    with open(os.path.join(directorio, "historial.jsonl"), "a", encoding="utf-8") as jsonl, \
+            open(ruta_csv, "a", newline="", encoding="utf-8") as archivo_csv:
+        escritor = csv.DictWriter(archivo_csv, fieldnames=CAMPOS_HISTORIAL)
+        if nuevo_csv:
+            escritor.writeheader()
+        for medicion in mediciones:
+            fila = asdict(medicion)
+            jsonl.write(json.dumps(fila, ensure_ascii=False) + "\n")
+            escritor.writerow(fila)
+
+
+def comparar(mediciones: list, historial: list, umbral: float = UMBRAL_REGRESION) -> list:
+    """
+    Compara cada medición con la última de otro commit (misma escala y ruta).
+    Devuelve [(medicion, segundos_antes, cambio)] de las rutas más lentas que el umbral.
+    """
+    anteriores = {}
+    for fila in historial:
+        if fila["commit"] != (mediciones[0].commit if mediciones else None):
+            anteriores[(fila["escala"], fila["ruta"])] = fila
+    regresiones = []
+    for medicion in mediciones:
+        previa = anteriores.get((medicion.escala, medicion.ruta))
+        if not previa or previa["segundos_mediana"] <= 0:
+            continue
+        cambio = medicion.segundos_mediana / previa["segundos_mediana"] - 1
+        if cambio > umbral:
+            regresiones.append((medicion, previa["segundos_mediana"], cambio))
+    return regresiones
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas calientes sobre datos sintéticos.")
+    parser.add_argument("--escalas", default="100k,1M", help="Escalas separadas por coma (100k a 50M)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--rutas", default="", help="Limitar a estas rutas (separadas por coma)")
+    parser.add_argument("--historial", default=DIRECTORIO_HISTORIAL, help="Carpeta de historial.jsonl / historial.csv")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="Regresión tolerada (0.20 = 20%%)")
+    parser.add_argument("--sin-guardar", action="store_true", help="No añadir las mediciones al historial")
+    args = parser.parse_args(argv)
+
+    escalas = [utils_datos_sinteticos.parsear_escala(e) for e in args.escalas.split(",") if e.strip()]
+    rutas = {r.strip() for r in args.rutas.split(",") if r.strip()} or None
+    historial = leer_historial(os.path.join(args.historial, "historial.jsonl"))
+
+    mediciones = ejecutar_suite(escalas, args.repeticiones, args.semilla, rutas)
+    regresiones = comparar(mediciones, historial, args.umbral)
+    if not args.sin_guardar:
+        guardar_historial(mediciones, args.historial)
+
+    bloqueantes = 0
+    for medicion, antes, cambio in regresiones:
+        critica = medicion.ruta in RUTAS_CIERRE_MENSUAL
+        bloqueantes += critica
+        print(f"{'❌' if critica else '⚠️'} Regresión {medicion.ruta} @ {medicion.escala:,}: "
+              f"{antes:.3f}s → {medicion.segundos_mediana:.3f}s ({cambio:+.0%})")
+    return 1 if bloqueantes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
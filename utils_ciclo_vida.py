@@ -0,0 +1,125 @@
+# ==============================================================================
+# ARCHIVO: utils_ciclo_vida.py
+# DESCRIPCIÓN: Ciclo de vida de clientes por vendedor (nuevos, perdidos,
+#              reactivados, crecen, decrecen) calculado desde el histórico de ventas
+# ==============================================================================
+import numpy as np
+import pandas as pd
+
+NUEVO = "NUEVO"
+REACTIVADO = "REACTIVADO"
+PERDIDO = "PERDIDO"
+CRECE = "CRECE"
+DECRECE = "DECRECE"
+ESTABLE = "ESTABLE"
+INACTIVO = "INACTIVO"
+
+COLUMNAS_CICLO_VIDA = [
+    "Vendedor", "Venta_Actual", "Venta_Anterior",
+    "Clientes_Nuevos", "Valor_Nuevos",
+    "Clientes_Reactivados", "Valor_Reactivados",
+    "Clientes_Perdidos", "Valor_Perdidos",
+    "Clientes_Crecen", "Valor_Crecimiento",
+    "Clientes_Decrecen", "Valor_Decrecimiento",
+    "Total_Clientes", "Total_Clientes_Anterior"
+]
+
+
+def sumas_por_vendedor_cliente(df_ventas: pd.DataFrame, anio_actual: int, anio_base: int,
+                               col_vendedor: str = "nomvendedor", col_cliente: str = "cliente_id",
+                               col_valor: str = "valor_venta") -> pd.DataFrame:
+    """
+    Una sola pasada sobre el histórico: por (vendedor, cliente) devuelve la venta del año
+    actual, la del año base y si compró en algún otro año anterior al actual (historia previa).
+    """
+    anios = pd.to_numeric(df_ventas["anio"], errors="coerce")
+    df = df_ventas.loc[anios.lt(anio_actual + 1).to_numpy(), [col_vendedor, col_cliente, col_valor]]
+    anios = anios.loc[df.index].to_numpy()
+
+    sumas = df[col_valor].groupby(
+        [df[col_vendedor], df[col_cliente].astype(str), anios], sort=False
+    ).sum()
+    if sumas.empty:
+        return pd.DataFrame(columns=["actual", "anterior", "historia_previa"],
+                            index=pd.MultiIndex.from_arrays([[], []], names=["Vendedor", "cliente"]))
+
+    anio_fila = sumas.index.get_level_values(2).to_numpy()
+    valores = sumas.to_numpy(dtype=float)
+    es_actual = anio_fila == anio_actual
+    es_base = anio_fila == anio_base
+
+    por_anio = pd.DataFrame({
+        "actual": np.where(es_actual, valores, 0.0),
+        "anterior": np.where(es_base, valores, 0.0),
+        "historia_previa": (anio_fila < anio_actual) & ~es_base & (valores > 0)
+    }, index=sumas.index.droplevel(2))
+    por_anio.index.names = ["Vendedor", "cliente"]
+    return por_anio.groupby(level=[0, 1], sort=False).agg(
+        actual=("actual", "sum"), anterior=("anterior", "sum"), historia_previa=("historia_previa", "any")
+    )
+
+
+def clasificar_clientes(pares: pd.DataFrame) -> np.ndarray:
+    """Etiqueta cada par (vendedor, cliente) según su compra en el año actual frente al año base."""
+    compra_actual = pares["actual"].to_numpy() > 0
+    compra_base = pares["anterior"].to_numpy() > 0
+    historia = pares["historia_previa"].to_numpy(dtype=bool)
+    diferencia = pares["actual"].to_numpy() - pares["anterior"].to_numpy()
+    return np.select(
+        [
+            compra_actual & compra_base & (diferencia > 0),
+            compra_actual & compra_base & (diferencia < 0),
+            compra_actual & compra_base,
+            compra_actual & historia,
+            compra_actual,
+            compra_base
+        ],
+        [CRECE, DECRECE, ESTABLE, REACTIVADO, NUEVO, PERDIDO],
+        default=INACTIVO
+    )
+
+
+def calcular_ciclo_vida(df_ventas: pd.DataFrame, anio_actual: int, anio_base: int,
+                        col_vendedor: str = "nomvendedor", col_cliente: str = "cliente_id",
+                        col_valor: str = "valor_venta") -> pd.DataFrame:
+    """
+    Resumen por vendedor del ciclo de vida de su cartera entre anio_base y anio_actual.
+    - Nuevos: compran en el año actual y nunca antes con ese vendedor (valor = venta actual).
+    - Reactivados: compran en el año actual, no en el base, pero sí en años previos.
+    - Perdidos: compraron en el año base y no en el actual (valor = venta base).
+    - Crecen / Decrecen: compran en ambos años; el valor es la variación absoluta.
+    """
+    if df_ventas is None or df_ventas.empty:
+        return pd.DataFrame(columns=COLUMNAS_CICLO_VIDA)
+
+    pares = sumas_por_vendedor_cliente(df_ventas, anio_actual, anio_base, col_vendedor, col_cliente, col_valor)
+    if pares.empty:
+        return pd.DataFrame(columns=COLUMNAS_CICLO_VIDA)
+
+    estado = clasificar_clientes(pares)
+    actual = pares["actual"].to_numpy()
+    anterior = pares["anterior"].to_numpy()
+    variacion = actual - anterior
+
+    def _marca(etiqueta):
+        return (estado == etiqueta).astype(np.int64)
+
+    metricas = pd.DataFrame({
+        "Venta_Actual": actual,
+        "Venta_Anterior": anterior,
+        "Clientes_Nuevos": _marca(NUEVO),
+        "Valor_Nuevos": np.where(estado == NUEVO, actual, 0.0),
+        "Clientes_Reactivados": _marca(REACTIVADO),
+        "Valor_Reactivados": np.where(estado == REACTIVADO, actual, 0.0),
+        "Clientes_Perdidos": _marca(PERDIDO),
+        "Valor_Perdidos": np.where(estado == PERDIDO, anterior, 0.0),
+        "Clientes_Crecen": _marca(CRECE),
+        "Valor_Crecimiento": np.where(estado == CRECE, variacion, 0.0),
+        "Clientes_Decrecen": _marca(DECRECE),
+        "Valor_Decrecimiento": np.where(estado == DECRECE, -variacion, 0.0),
+        "Total_Clientes": (actual > 0).astype(np.int64),
+        "Total_Clientes_Anterior": (anterior > 0).astype(np.int64)
+    }, index=pares.index)
+
+    resumen = metricas.groupby(level="Vendedor", sort=False).sum().reset_index()
+    return resumen.reindex(columns=COLUMNAS_CICLO_VIDA)
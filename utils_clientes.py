@@ -0,0 +1,199 @@
+# ==============================================================================
+# ARCHIVO: utils_clientes.py
+# DESCRIPCIÓN: Índice de "propietario actual" de cada cliente (cliente → vendedor)
+#              e índice de transacciones por cliente para consultas por rango
+# ==============================================================================
+from dataclasses import dataclass, field
+import datetime
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_INDICE = ["codigo_vendedor", "nomvendedor", "nombre_cliente", "ultima_compra"]
+SIN_ASIGNAR = "SIN ASIGNAR"
+
+
+def _indice_vacio() -> pd.DataFrame:
+    indice = pd.DataFrame(columns=COLUMNAS_INDICE)
+    indice.index.name = "cliente_id"
+    return indice
+
+
+def construir_indice_propietarios(df_ventas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Construye el índice cliente_id → (codigo_vendedor, nomvendedor, nombre_cliente, ultima_compra).
+    El propietario es el vendedor de la compra más reciente del cliente.
+    Se espera que 'nomvendedor' ya venga normalizado desde la ingesta.
+    """
+    if df_ventas is None or df_ventas.empty or "cliente_id" not in df_ventas.columns:
+        return _indice_vacio()
+
+    cols = [c for c in ["cliente_id", "codigo_vendedor", "nomvendedor", "nombre_cliente", "fecha_venta"] if c in df_ventas.columns]
+    base = df_ventas[cols]
+    if "fecha_venta" in base.columns:
+        # Orden estable: ante empates de fecha gana la última fila del archivo (mismo criterio que keep='last')
+        base = base.sort_values("fecha_venta", kind="mergesort", na_position="first")
+
+    indice = base.drop_duplicates(subset=["cliente_id"], keep="last").set_index("cliente_id")
+    indice = indice.rename(columns={"fecha_venta": "ultima_compra"})
+    return indice.reindex(columns=COLUMNAS_INDICE)
+
+
+def actualizar_indice_propietarios(indice: pd.DataFrame, df_ventas_nuevas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Actualiza el índice sólo con las ventas nuevas (p. ej. el último mes cargado).
+    Un cliente cambia de propietario si su compra nueva es igual o posterior a la registrada.
+    """
+    if indice is None or indice.empty:
+        return construir_indice_propietarios(df_ventas_nuevas)
+    nuevos = construir_indice_propietarios(df_ventas_nuevas)
+    if nuevos.empty:
+        return indice
+
+    combinado = pd.concat([indice, nuevos])
+    combinado = combinado.sort_values("ultima_compra", kind="mergesort", na_position="first")
+    combinado = combinado[~combinado.index.duplicated(keep="last")]
+    combinado.index.name = "cliente_id"
+    return combinado
+
+
+def _solo_agregados(df_ventas: pd.DataFrame, version_anterior) -> bool:
+    """True si 'df_ventas' es el histórico de 'version_anterior' más ventas posteriores a su última fecha."""
+    if not version_anterior or version_anterior[1] is None or pd.isna(version_anterior[1]):
+        return False
+    filas_previas, corte = version_anterior
+    if len(df_ventas) <= filas_previas or not df_ventas["fecha_venta"].max() > corte:
+        return False
+    # Las filas hasta el corte (y las sin fecha) deben ser exactamente las que ya estaban indexadas
+    return int((~(df_ventas["fecha_venta"] > corte)).sum()) == filas_previas
+
+
+def indice_propietarios_al_dia(estado, df_ventas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Índice de propietarios guardado en 'estado' (p. ej. st.session_state), vigente para 'df_ventas'.
+    Se versiona con version_ventas (filas, última fecha), como el índice de transacciones: sin cambios
+    se reutiliza; si sólo se agregaron ventas posteriores a la última fecha indexada se actualiza con
+    ellas; cualquier otro cambio (correcciones, filas borradas, última fecha menor) lo reconstruye.
+    """
+    version = version_ventas(df_ventas)
+    indice = estado.get("indice_propietarios")
+    version_anterior = estado.get("indice_propietarios_version")
+    if indice is not None and version_anterior == version:
+        return indice
+    if indice is not None and df_ventas is not None and _solo_agregados(df_ventas, version_anterior):
+        df_nuevas = df_ventas[df_ventas["fecha_venta"] > version_anterior[1]]
+        indice = actualizar_indice_propietarios(indice, df_nuevas)
+    else:
+        indice = construir_indice_propietarios(df_ventas)
+    estado["indice_propietarios"] = indice
+    estado["indice_propietarios_version"] = version
+    return indice
+
+
+def propietario_de(indice: pd.DataFrame, cliente_id) -> dict:
+    """Consulta O(1) del propietario actual de un cliente. Devuelve {} si no existe."""
+    cliente_id = str(cliente_id)
+    if indice is None or cliente_id not in indice.index:
+        return {}
+    return indice.loc[cliente_id].to_dict()
+
+
+def asignar_propietario(df: pd.DataFrame, indice: pd.DataFrame, col_cliente: str = "cliente_id",
+                        columnas=("codigo_vendedor", "nomvendedor")) -> pd.DataFrame:
+    """
+    Añade a 'df' las columnas del propietario actual de cada cliente usando el índice
+    (búsqueda por hash, sin recorrer el histórico). Los clientes sin historial quedan 'SIN ASIGNAR'.
+    """
+    df_out = df.copy()
+    if df_out.empty:
+        for col in columnas:
+            df_out[col] = pd.Series(dtype=object)
+        return df_out
+
+    claves = df_out[col_cliente].astype(str)
+    datos = (indice if indice is not None else _indice_vacio()).reindex(claves)
+    for col in columnas:
+        valores = datos[col].to_numpy()
+        if col == "ultima_compra":
+            df_out[col] = pd.to_datetime(valores)
+        else:
+            df_out[col] = pd.Series(valores, index=df_out.index).fillna(SIN_ASIGNAR)
+    return df_out
+
+
+def propietario_por_nombre(indice: pd.DataFrame) -> pd.Series:
+    """Serie nombre_cliente → nomvendedor para vistas que agrupan por nombre de cliente."""
+    if indice is None or indice.empty:
+        return pd.Series(dtype=object)
+    por_nombre = indice.dropna(subset=["nombre_cliente"]).sort_values("ultima_compra", kind="mergesort", na_position="first")
+    por_nombre = por_nombre.drop_duplicates(subset=["nombre_cliente"], keep="last")
+    return por_nombre.set_index("nombre_cliente")["nomvendedor"]
+
+
+# ==============================================================================
+# ÍNDICE DE TRANSACCIONES POR CLIENTE
+# ==============================================================================
+@dataclass
+class IndiceTransacciones:
+    """
+    Líneas de venta ordenadas por (cliente, fecha) con el rango [inicio, fin) de cada cliente.
+    Consultar un cliente en un rango de fechas es una búsqueda binaria sobre su tramo contiguo.
+    """
+    datos: pd.DataFrame
+    fechas: np.ndarray
+    rangos: dict = field(default_factory=dict)
+    version: tuple = ()
+
+
+def version_ventas(df_ventas: pd.DataFrame) -> tuple:
+    """Huella barata del histórico (filas y última fecha) para saber si hay que reconstruir un índice."""
+    if df_ventas is None or df_ventas.empty:
+        return (0, None)
+    return (len(df_ventas), df_ventas["fecha_venta"].max())
+
+
+def construir_indice_transacciones(df_ventas: pd.DataFrame, col_cliente: str = "nombre_cliente",
+                                   col_fecha: str = "fecha_venta", version: tuple = None) -> IndiceTransacciones:
+    """
+    Ordena una sola vez las líneas por (cliente, fecha) y registra dónde empieza y termina
+    cada cliente. Las fechas vacías quedan al final del tramo de su cliente.
+    'version' identifica el histórico de origen (por defecto, version_ventas del propio df).
+    """
+    version = version if version is not None else version_ventas(df_ventas)
+    if df_ventas is None or df_ventas.empty or col_cliente not in df_ventas.columns:
+        vacio = df_ventas.iloc[0:0] if df_ventas is not None else pd.DataFrame()
+        return IndiceTransacciones(vacio, np.array([], dtype="datetime64[ns]"), {}, version)
+
+    base = df_ventas[df_ventas[col_cliente].notna()]
+    base = base.sort_values([col_cliente, col_fecha], kind="mergesort").reset_index(drop=True)
+    fechas = base[col_fecha].to_numpy(dtype="datetime64[ns]")
+
+    claves = base[col_cliente].to_numpy()
+    if len(claves):
+        cortes = np.flatnonzero(claves[1:] != claves[:-1]) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(claves)]))
+        rangos = dict(zip(claves[inicios], zip(inicios.tolist(), fines.tolist())))
+    else:
+        rangos = {}
+    return IndiceTransacciones(base, fechas, rangos, version)
+
+
+def transacciones_cliente(indice: IndiceTransacciones, cliente, fecha_inicio, fecha_fin) -> pd.DataFrame:
+    """
+    Líneas del cliente con fecha entre fecha_inicio y fecha_fin (ambas inclusive, por día).
+    El costo depende sólo del número de compras del cliente, no del tamaño del histórico.
+    """
+    rango = indice.rangos.get(cliente)
+    if rango is None:
+        return indice.datos.iloc[0:0].copy()
+
+    inicio, fin = rango
+    fechas = indice.fechas[inicio:fin]
+    desde = np.datetime64(pd.Timestamp(fecha_inicio).normalize(), "ns")
+    if isinstance(fecha_fin, datetime.datetime):
+        fecha_fin = fecha_fin.date()
+    hasta = np.datetime64(pd.Timestamp(fecha_fin) + pd.Timedelta(days=1), "ns")  # fin de día exclusivo
+    i = inicio + int(np.searchsorted(fechas, desde, side="left"))
+    j = inicio + int(np.searchsorted(fechas, hasta, side="left"))
+    return indice.datos.iloc[i:j].copy()
@@ -0,0 +1,446 @@
+# ==============================================================================
+# ARCHIVO: utils_datos_sinteticos.py
+# DESCRIPCIÓN: Generador determinista de datos sintéticos (ventas, cobros, CL4,
+#              clientes y CLIENTE_TIPO) con los mismos formatos que Dropbox,
+#              para medir el rendimiento sin credenciales
+# ==============================================================================
+# Uso:
+#   python utils_datos_sinteticos.py --lineas 1M --salida datos_sinteticos --semilla 42
+# Escalas admitidas: de 100k a 50M líneas de venta (sufijos k / M).
+import argparse
+import datetime
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import utils_excel
+
+# Mismo orden de columnas que APP_CONFIG['column_names'] en nucleo/config.py
+COLUMNAS_VENTAS = ['anio', 'mes', 'fecha_venta', 'Serie', 'TipoDocumento', 'codigo_vendedor', 'nomvendedor',
+                   'cliente_id', 'nombre_cliente', 'codigo_articulo', 'nombre_articulo', 'categoria_producto',
+                   'linea_producto', 'marca_producto', 'valor_venta', 'unidades_vendidas', 'costo_unitario',
+                   'super_categoria']
+COLUMNAS_COBROS = ['anio', 'mes', 'fecha_cobro', 'codigo_vendedor', 'valor_cobro']
+
+# Columnas que esperan cargar_reporte_cl4, _procesar_poblaciones y preparar_cliente_tipo
+COLUMNAS_CLIENTE_TIPO = ['Código', 'NOMVENDEDOR', 'CODIGO_TIPO_NEGOCIO', 'NOMBRE_TIPO_NEGOCIO', 'CODIGO_PRODUCTO',
+                         'NOMBRE_PRODUCTO', 'Cod. Cliente', 'NOMBRECLIENTE', 'NIT', 'Fecha',
+                         'VALOR_TOTAL_ITEM_VENDIDO']
+PRODUCTOS_CL4 = ['ESTUCOMAS', 'PINTULUX', 'KORAZA', 'VINILTEX', 'VINILICO']
+
+LINEAS_MIN = 100_000
+LINEAS_MAX = 50_000_000
+LINEAS_POR_BLOQUE = 1_000_000
+FILAS_XLSX_MAX = 1_000_000
+
+# Vendedores reales (MAPEO_VENDEDORES.md) con su peso relativo en la venta
+VENDEDORES = [
+    ('154011', 'TANIA RESTREPO BENJUMEA', 9.0), ('154013', 'PABLO CESAR MAFLA BAÑOL', 7.0),
+    ('154014', 'HUGO NELSON ZAPATA RAYO', 6.5), ('154012', 'JULIAN MAURICIO ORTIZ GOMEZ', 6.0),
+    ('154043', 'LEDUYN MELGAREJO ARIAS', 3.5), ('154033', 'CARLOS ALBERTO CASTRILLON LOPEZ', 3.5),
+    ('154006', 'PEREZ SANTA GUSTAVO ADOLFO', 2.5), ('154046', 'JAIME ANDRES LONDOÑO MONTENEGRO', 2.2),
+    ('154034', 'ELISABETH IBARRA M.', 2.0), ('154035', 'LEIVYN GRABIEL GARCIA MUÑOZ', 2.0),
+    ('154044', 'COMERCIAL FERREINOX', 2.0), ('154029', 'JOSE AURELIO MARTINEZ ROJAS', 1.5),
+    ('154055', 'JERSON ATEHORTUA OLARTE', 1.2), ('154042', 'EQUIPO CANALES DIGITALES', 0.8),
+    ('154052', 'MARY LUZ TREJOS LOPEZ', 0.8), ('154049', 'RICHARD RAFAEL FERRER ROZO', 0.6),
+    # Mostradores (grupos_vendedores)
+    ('154040', 'ALEJANDRO CARBALLO MARQUEZ', 3.0), ('154039', 'GEORGINA A. GALVIS HERRERA', 2.5),
+    ('154053', 'CRISTIAN CAMILO RENDON MONTES', 2.0), ('154031', 'FANDRY JOHANA ABRIL PENHA', 1.8),
+    ('154051', 'JAVIER ORLANDO PATINO HURTADO', 1.8), ('154048', 'DAVID FELIPE MARTINEZ RIOS', 2.0),
+    ('154008', 'JHON JAIRO CASTAÑO MONTES', 1.6), ('154050', 'MAURICIO RIOS MORALES', 1.5),
+    ('154054', 'MARIA PAULA DEL JESUS GALVIS HERRERA', 1.2),
+    # Ventas sin vendedor asignado
+    ('0', '', 0.3)
+]
+
+# (código mapeo_marcas, peso) separados por súper categoría
+MARCAS_PINTUCO = [(58, 30), (56, 12), (64, 8), (55, 5), (73, 4), (91, 2), (59, 3), (62, 3), (63, 2),
+                  (57, 2), (50, 1), (54, 1), (60, 1), (68, 1), (66, 1), (67, 1)]
+MARCAS_COMPLEMENTARIOS = [(65, 70), (61, 30)]
+
+MARQUILLAS = ['VINILTEX', 'KORAZA', 'ESTUCOMAS', 'VINILICO', 'PINTULUX', 'DOMESTICO', 'PINTULAC',
+              'TERINSA', 'CORAZA ELASTOMERICA', 'ANTICORROSIVO', 'BARNIZ MADETEC', 'AEROCOLOR']
+CATEGORIAS_PINTUCO = ['ARQUITECTONICO', 'ESMALTES', 'ESTUCOS', 'MADERA', 'INDUSTRIAL', 'AUTOMOTRIZ']
+CATEGORIAS_COMPLEMENTARIOS = ['ABRACOL', 'YALE', 'SAINT GOBAIN', 'GOYA', 'ALLEGION', 'SEGUREX', 'ARTECOLA',
+                              'ATLAS', 'INDUMA', 'TORNILLERIA', 'HERRAMIENTA MANUAL', 'ELECTRICOS', 'PLOMERIA']
+PRESENTACIONES = ['1/4 GL', '1 GL', '2.5 GL', '5 GL', 'CUNETE', 'AEROSOL', 'KIT']
+COLORES = ['BLANCO', 'NEGRO', 'GRIS', 'ROJO', 'AZUL', 'VERDE', 'AMARILLO', 'MARFIL', 'TRANSPARENTE', 'BASE']
+
+PREFIJOS_CLIENTE = ['FERRETERIA', 'DEPOSITO', 'PINTURAS', 'CONSTRUCTORA', 'MATERIALES', 'ALMACEN',
+                    'DISTRIBUIDORA', 'FERRELECTRICOS', 'TALLER', 'INVERSIONES']
+APELLIDOS_CLIENTE = ['GOMEZ', 'RESTREPO', 'OSPINA', 'CARDONA', 'GIRALDO', 'VALENCIA', 'MEJIA', 'HENAO',
+                     'ARANGO', 'LOPEZ', 'CASTAÑO', 'MUÑOZ', 'RIOS', 'SALAZAR', 'ZAPATA', 'EL CAFETERO',
+                     'LA 30', 'EL PROGRESO', 'LA ESPERANZA', 'CENTRAL']
+SUFIJOS_CLIENTE = ['SAS', 'LTDA', 'SA', '', '', '']
+POBLACIONES = [('PEREIRA', 30), ('DOSQUEBRADAS', 12), ('MANIZALES', 18), ('ARMENIA', 16), ('CALARCA', 4),
+               ('SANTA ROSA DE CABAL', 4), ('CHINCHINA', 3), ('VILLAMARIA', 3), ('LA VIRGINIA', 3),
+               ('CARTAGO', 4), ('MONTENEGRO', 2), ('LA TEBAIDA', 1)]
+TIPOS_NEGOCIO = [('01', 'DETALLISTAS', 45), ('02', 'FERRETERIA', 25), ('03', 'CONSTRUCTORAS', 8),
+                 ('04', 'INDUSTRIAL', 7), ('05', 'CONSUMIDOR FINAL', 10), ('06', 'INSTITUCIONAL', 5)]
+
+# Tipos de documento y reversión de albaranes
+TIPO_FACTURA = 'FACTURA ELECTRONICA DE VENTA'
+TIPO_NOTA_CREDITO = 'NOTA CREDITO ELECTRONICA'
+TIPO_ALBARAN = 'ALBARAN DE VENTA'
+PROBABILIDAD_TIPO = [0.80, 0.06, 0.14]  # factura, nota crédito, albarán (por documento)
+PROBABILIDAD_REVERSION_ALBARAN = 0.65
+
+
+@dataclass
+class Catalogos:
+    vendedor_codigo: np.ndarray
+    vendedor_nombre: np.ndarray
+    cliente_id: np.ndarray
+    cliente_nombre: np.ndarray
+    cliente_vendedor: np.ndarray
+    cliente_peso: np.ndarray
+    cliente_poblacion: np.ndarray
+    cliente_tipo: np.ndarray
+    articulo_codigo: np.ndarray
+    articulo_nombre: np.ndarray
+    articulo_categoria: np.ndarray
+    articulo_linea: np.ndarray
+    articulo_marca: np.ndarray
+    articulo_super: np.ndarray
+    articulo_precio: np.ndarray
+    articulo_peso: np.ndarray
+
+
+def parsear_escala(texto) -> int:
+    """'100k', '2.5M' o '1000000' -> número de líneas."""
+    texto = str(texto).strip().lower().replace('_', '')
+    multiplicador = 1
+    if texto.endswith('k'):
+        multiplicador, texto = 1_000, texto[:-1]
+    elif texto.endswith('m'):
+        multiplicador, texto = 1_000_000, texto[:-1]
+    return int(float(texto) * multiplicador)
+
+
+def _rng(semilla: int, *flujo) -> np.random.Generator:
+    """Generador independiente por flujo: el resultado no depende del orden de generación."""
+    return np.random.default_rng([semilla, *flujo])
+
+
+def _pesos(valores) -> np.ndarray:
+    pesos = np.asarray(valores, dtype=float)
+    return pesos / pesos.sum()
+
+
+def _elegir(rng, opciones, n, pesos=None) -> np.ndarray:
+    return np.asarray(opciones, dtype=object)[rng.choice(len(opciones), size=n, p=pesos)]
+
+
+def construir_catalogos(lineas: int, semilla: int = 42) -> Catalogos:
+    """Vendedores, clientes y artículos; el tamaño de la cartera crece con la escala."""
+    rng = _rng(semilla, 0)
+    n_clientes = int(np.clip(lineas // 250, 2_000, 200_000))
+    n_articulos = int(np.clip(lineas // 5_000, 1_500, 20_000))
+
+    vendedor_codigo = np.array([v[0] for v in VENDEDORES], dtype=object)
+    vendedor_nombre = np.array([v[1] for v in VENDEDORES], dtype=object)
+
+    # Clientes: actividad log-normal (pocos clientes grandes, cola larga) y un vendedor dueño
+    cliente_id = np.array([str(v) for v in 800_000_000 + rng.choice(99_999_999, n_clientes, replace=False)], dtype=object)
+    nombres = (
+        _elegir(rng, PREFIJOS_CLIENTE, n_clientes) + " " + _elegir(rng, APELLIDOS_CLIENTE, n_clientes) + " "
+        + _elegir(rng, SUFIJOS_CLIENTE, n_clientes)
+    )
+    cliente_nombre = np.array([f"{n.strip()} {i:05d}" for i, n in enumerate(nombres)], dtype=object)
+    cliente_vendedor = rng.choice(len(VENDEDORES), size=n_clientes, p=_pesos([v[2] for v in VENDEDORES]))
+    cliente_peso = _pesos(rng.lognormal(0.0, 1.4, n_clientes))
+    cliente_poblacion = _elegir(rng, [p[0] for p in POBLACIONES], n_clientes, _pesos([p[1] for p in POBLACIONES]))
+    cliente_tipo = rng.choice(len(TIPOS_NEGOCIO), size=n_clientes, p=_pesos([t[2] for t in TIPOS_NEGOCIO]))
+
+    # Artículos: 60% Pintuco (marquillas) y 40% complementarios de ferretería
+    es_pintuco = rng.random(n_articulos) < 0.6
+    marquilla = _elegir(rng, MARQUILLAS, n_articulos)
+    presentacion = _elegir(rng, PRESENTACIONES, n_articulos)
+    color = _elegir(rng, COLORES, n_articulos)
+    categoria_comp = _elegir(rng, CATEGORIAS_COMPLEMENTARIOS, n_articulos)
+    articulo_nombre = np.where(
+        es_pintuco,
+        marquilla + " " + color + " " + presentacion,
+        categoria_comp + " REF " + np.char.mod('%04d', rng.integers(1, 9999, n_articulos)).astype(object)
+    )
+    articulo_categoria = np.where(es_pintuco, _elegir(rng, CATEGORIAS_PINTUCO, n_articulos), categoria_comp)
+    articulo_linea = np.where(es_pintuco, marquilla, categoria_comp)
+    articulo_marca = np.where(
+        es_pintuco,
+        _elegir(rng, [m[0] for m in MARCAS_PINTUCO], n_articulos, _pesos([m[1] for m in MARCAS_PINTUCO])),
+        _elegir(rng, [m[0] for m in MARCAS_COMPLEMENTARIOS], n_articulos, _pesos([m[1] for m in MARCAS_COMPLEMENTARIOS]))
+    ).astype(np.int64)
+    articulo_super = np.where(es_pintuco, 'PINTUCO', 'COMPLEMENTARIOS').astype(object)
+    articulo_precio = np.round(rng.lognormal(11.0, 0.9, n_articulos), -2)
+
+    return Catalogos(
+        vendedor_codigo=vendedor_codigo, vendedor_nombre=vendedor_nombre,
+        cliente_id=cliente_id, cliente_nombre=cliente_nombre, cliente_vendedor=cliente_vendedor,
+        cliente_peso=cliente_peso, cliente_poblacion=cliente_poblacion, cliente_tipo=cliente_tipo,
+        articulo_codigo=np.array([f"{100000 + i}" for i in range(n_articulos)], dtype=object),
+        articulo_nombre=articulo_nombre.astype(object), articulo_categoria=articulo_categoria.astype(object),
+        articulo_linea=articulo_linea.astype(object), articulo_marca=articulo_marca,
+        articulo_super=articulo_super, articulo_precio=articulo_precio,
+        articulo_peso=_pesos(rng.zipf(1.6, n_articulos).clip(max=10_000))
+    )
+
+
+def pesos_diarios(desde: datetime.date, hasta: datetime.date) -> pd.Series:
+    """Peso de cada día: crecimiento anual, estacionalidad (pico en diciembre) y domingos casi sin venta."""
+    dias = pd.date_range(desde, hasta, freq='D')
+    anios = (dias.year - dias.year.min()).to_numpy()
+    estacional = 1.0 + 0.25 * np.cos((dias.month.to_numpy() - 12) * np.pi / 6)
+    semana = np.select([dias.dayofweek == 6, dias.dayofweek == 5], [0.05, 0.6], default=1.0)
+    return pd.Series((1.08 ** anios) * estacional * semana, index=dias)
+
+
+def _bloques(pesos: pd.Series, lineas: int, lineas_por_bloque: int) -> list:
+    """Reparte el rango de fechas en bloques contiguos de ~lineas_por_bloque líneas esperadas."""
+    esperadas = pesos.to_numpy() / pesos.sum() * lineas
+    acumuladas = np.cumsum(esperadas)
+    n_bloques = max(1, int(np.ceil(lineas / lineas_por_bloque)))
+    cortes = np.searchsorted(acumuladas, np.arange(1, n_bloques) * lineas / n_bloques) + 1
+    limites = np.unique(np.clip(np.concatenate([[0], cortes, [len(pesos)]]), 0, len(pesos)))
+    acumulado_fin = np.round(acumuladas[limites[1:] - 1]).astype(np.int64)
+    acumulado_fin[-1] = lineas
+    objetivos = np.diff(np.concatenate([[0], acumulado_fin]))
+    return [(int(limites[i]), int(limites[i + 1]), int(objetivos[i])) for i in range(len(limites) - 1)]
+
+
+def generar_bloque_ventas(cat: Catalogos, dias: pd.Series, lineas: int, semilla: int, bloque: int,
+                          primer_documento: int) -> tuple:
+    """
+    Líneas de venta de un bloque de días, ordenadas por fecha.
+    Devuelve (DataFrame con COLUMNAS_VENTAS, siguiente número de documento).
+    """
+    rng = _rng(semilla, 1, bloque)
+    if lineas <= 0 or dias.empty:
+        return pd.DataFrame(columns=COLUMNAS_VENTAS), primer_documento
+
+    # Documentos: 1 + Poisson(2.2) líneas cada uno, hasta cubrir las líneas del bloque
+    n_docs = int(lineas / 3.2) + 16
+    tamanos = rng.poisson(2.2, n_docs) + 1
+    while tamanos.sum() < lineas:
+        tamanos = np.concatenate([tamanos, rng.poisson(2.2, n_docs // 4 + 1) + 1])
+    fin = int(np.searchsorted(np.cumsum(tamanos), lineas)) + 1
+    tamanos = tamanos[:fin]
+    tamanos[-1] -= int(tamanos.sum() - lineas)
+    n_docs = len(tamanos)
+
+    doc_dia = np.sort(rng.choice(len(dias), size=n_docs, p=_pesos(dias.to_numpy())))
+    doc_cliente = rng.choice(len(cat.cliente_id), size=n_docs, p=cat.cliente_peso)
+    # 90% de los documentos los hace el dueño del cliente; el resto, otro vendedor cualquiera
+    doc_vendedor = np.where(
+        rng.random(n_docs) < 0.9,
+        cat.cliente_vendedor[doc_cliente],
+        rng.choice(len(VENDEDORES), size=n_docs, p=_pesos([v[2] for v in VENDEDORES]))
+    )
+    doc_tipo = rng.choice(3, size=n_docs, p=PROBABILIDAD_TIPO)
+    doc_numero = primer_documento + np.arange(n_docs)
+
+    # Expansión a líneas
+    idx_doc = np.repeat(np.arange(n_docs), tamanos)
+    articulo = rng.choice(len(cat.articulo_codigo), size=lineas, p=cat.articulo_peso)
+    unidades = rng.geometric(0.35, lineas)
+    descuento = rng.uniform(0.0, 0.18, lineas)
+    tipo = doc_tipo[idx_doc]
+    signo = np.where(tipo == 1, -1, 1)
+    valor = np.round(cat.articulo_precio[articulo] * unidades * (1 - descuento) * signo, 2)
+    costo = np.round(cat.articulo_precio[articulo] * rng.uniform(0.55, 0.8, lineas), 2)
+
+    fechas = dias.index[doc_dia[idx_doc]]
+    prefijo = np.array(['FE', 'NC', 'AL'], dtype=object)[tipo]
+    serie = prefijo + "-" + pd.Series(doc_numero[idx_doc]).astype(str).str.zfill(8).to_numpy(dtype=object)
+    df = pd.DataFrame({
+        'anio': fechas.year,
+        'mes': fechas.month,
+        'fecha_venta': fechas.strftime('%Y-%m-%d'),
+        'Serie': serie,
+        'TipoDocumento': np.array([TIPO_FACTURA, TIPO_NOTA_CREDITO, TIPO_ALBARAN], dtype=object)[tipo],
+        'codigo_vendedor': cat.vendedor_codigo[doc_vendedor[idx_doc]],
+        'nomvendedor': cat.vendedor_nombre[doc_vendedor[idx_doc]],
+        'cliente_id': cat.cliente_id[doc_cliente[idx_doc]],
+        'nombre_cliente': cat.cliente_nombre[doc_cliente[idx_doc]],
+        'codigo_articulo': cat.articulo_codigo[articulo],
+        'nombre_articulo': cat.articulo_nombre[articulo],
+        'categoria_producto': cat.articulo_categoria[articulo],
+        'linea_producto': cat.articulo_linea[articulo],
+        'marca_producto': cat.articulo_marca[articulo],
+        'valor_venta': valor,
+        'unidades_vendidas': unidades * signo,
+        'costo_unitario': costo,
+        'super_categoria': cat.articulo_super[articulo]
+    })[COLUMNAS_VENTAS]
+
+    # Reversión de albaranes: la misma línea en negativo (Serie, cliente, artículo, vendedor)
+    # unos días después, así el neto del grupo queda en cero como al facturarse
+    es_albaran = tipo == 2
+    revertir = es_albaran & (rng.random(lineas) < PROBABILIDAD_REVERSION_ALBARAN)
+    if revertir.any():
+        reversas = df.loc[revertir].copy()
+        desfase = rng.integers(1, 20, int(revertir.sum()))
+        nuevas = pd.to_datetime(reversas['fecha_venta']) + pd.to_timedelta(desfase, unit='D')
+        nuevas = nuevas.where(nuevas <= dias.index[-1], dias.index[-1])
+        reversas['fecha_venta'] = nuevas.dt.strftime('%Y-%m-%d')
+        reversas['anio'] = nuevas.dt.year
+        reversas['mes'] = nuevas.dt.month
+        reversas['valor_venta'] = -reversas['valor_venta']
+        reversas['unidades_vendidas'] = -reversas['unidades_vendidas']
+        df = pd.concat([df, reversas], ignore_index=True)
+        df = df.sort_values('fecha_venta', kind='mergesort', ignore_index=True)
+
+    return df, primer_documento + n_docs
+
+
+def generar_cobros(df_ventas_bloque: pd.DataFrame, semilla: int, bloque: int) -> pd.DataFrame:
+    """Recaudo por vendedor y día: ~95% de la venta neta del bloque con 0-60 días de rezago."""
+    rng = _rng(semilla, 2, bloque)
+    neto = df_ventas_bloque[df_ventas_bloque['TipoDocumento'] != TIPO_ALBARAN]
+    if neto.empty:
+        return pd.DataFrame(columns=COLUMNAS_COBROS)
+    por_dia = neto.groupby(['fecha_venta', 'codigo_vendedor'], sort=False)['valor_venta'].sum()
+    por_dia = por_dia[por_dia > 0]
+    n = len(por_dia)
+    # Cada total diario se cobra en 1-3 pagos iguales
+    pagos = rng.integers(1, 4, n)
+    idx = np.repeat(np.arange(n), pagos)
+    fraccion = 1.0 / pagos[idx]
+    fechas = (pd.to_datetime(por_dia.index.get_level_values(0).to_numpy()[idx])
+              + pd.to_timedelta(rng.integers(0, 61, len(idx)), unit='D'))
+    return pd.DataFrame({
+        'anio': fechas.year,
+        'mes': fechas.month,
+        'fecha_cobro': fechas.strftime('%Y-%m-%d'),
+        'codigo_vendedor': por_dia.index.get_level_values(1).to_numpy()[idx],
+        'valor_cobro': np.round(por_dia.to_numpy()[idx] * fraccion * rng.uniform(0.9, 1.0, len(idx)), 2)
+    })
+
+
+def generar_reporte_cl4(cat: Catalogos, semilla: int) -> pd.DataFrame:
+    """Reporte CL4: compra (1/0) de cada producto foco por cliente y CL4 = número de productos comprados."""
+    rng = _rng(semilla, 3)
+    incluidos = np.flatnonzero(rng.random(len(cat.cliente_id)) < 0.7)
+    # Los clientes más activos cubren más productos foco
+    percentil = pd.Series(cat.cliente_peso[incluidos]).rank(pct=True).to_numpy()
+    compras = (rng.random((len(incluidos), len(PRODUCTOS_CL4))) < (0.15 + 0.7 * percentil)[:, None]).astype(int)
+    df = pd.DataFrame({
+        'ID CLIENTE': cat.cliente_id[incluidos],
+        'NIT': cat.cliente_id[incluidos],
+        'NOMBRE': cat.cliente_nombre[incluidos],
+        'CL4': compras.sum(axis=1)
+    })
+    for i, producto in enumerate(PRODUCTOS_CL4):
+        df[producto] = compras[:, i]
+    return df
+
+
+def generar_clientes_detalle(cat: Catalogos) -> pd.DataFrame:
+    return pd.DataFrame({
+        'NIT': cat.cliente_id,
+        'NOMBRE': cat.cliente_nombre,
+        'POBLACION': cat.cliente_poblacion,
+        'TIPO NEGOCIO': np.array([t[1] for t in TIPOS_NEGOCIO], dtype=object)[cat.cliente_tipo]
+    })
+
+
+def generar_cliente_tipo(cat: Catalogos, dias: pd.Series, filas: int, semilla: int) -> pd.DataFrame:
+    """Ventas por cliente, producto y tipo de negocio (hoja CLIENTE_TIPO) con el mismo catálogo."""
+    rng = _rng(semilla, 4)
+    cliente = rng.choice(len(cat.cliente_id), size=filas, p=cat.cliente_peso)
+    articulo = rng.choice(len(cat.articulo_codigo), size=filas, p=cat.articulo_peso)
+    vendedor = cat.cliente_vendedor[cliente]
+    tipo = cat.cliente_tipo[cliente]
+    fechas = dias.index[np.sort(rng.choice(len(dias), size=filas, p=_pesos(dias.to_numpy())))]
+    return pd.DataFrame({
+        'Código': cat.vendedor_codigo[vendedor],
+        'NOMVENDEDOR': cat.vendedor_nombre[vendedor],
+        'CODIGO_TIPO_NEGOCIO': np.array([t[0] for t in TIPOS_NEGOCIO], dtype=object)[tipo],
+        'NOMBRE_TIPO_NEGOCIO': np.array([t[1] for t in TIPOS_NEGOCIO], dtype=object)[tipo],
+        'CODIGO_PRODUCTO': cat.articulo_codigo[articulo],
+        'NOMBRE_PRODUCTO': cat.articulo_nombre[articulo],
+        'Cod. Cliente': cat.cliente_id[cliente],
+        'NOMBRECLIENTE': cat.cliente_nombre[cliente],
+        'NIT': cat.cliente_id[cliente],
+        'Fecha': fechas,
+        'VALOR_TOTAL_ITEM_VENDIDO': np.round(cat.articulo_precio[articulo] * rng.geometric(0.35, filas), 2)
+    })[COLUMNAS_CLIENTE_TIPO]
+
+
+def _escribir_csv(df: pd.DataFrame, ruta: str, anexar: bool):
+    """Formato de Dropbox: sin encabezado, separado por '|', codificación latin-1."""
+    df.to_csv(ruta, sep='|', header=False, index=False, encoding='latin-1', errors='replace',
+              mode='a' if anexar else 'w')
+
+
+def _escribir_xlsx(df: pd.DataFrame, ruta: str, hoja: str):
+    with open(ruta, 'wb') as destino:
+        libro = utils_excel.LibroExcel(destino)
+        libro.escribir_tabla(libro.hoja(hoja), df)
+        libro.cerrar()
+
+
+def generar_datos(salida: str, lineas: int, semilla: int = 42,
+                  desde: datetime.date = datetime.date(2023, 1, 1),
+                  hasta: datetime.date = datetime.date(2025, 12, 31),
+                  lineas_por_bloque: int = LINEAS_POR_BLOQUE, progreso=None) -> dict:
+    """
+    Escribe en 'salida' ventas_detalle.csv, cobros_detalle.csv, reporte_cl4.xlsx,
+    clientes_detalle.xlsx y CLIENTE_TIPO.xlsx. La misma semilla, escala y bloque producen
+    archivos idénticos. Devuelve {archivo: filas}.
+    """
+    if not LINEAS_MIN <= lineas <= LINEAS_MAX:
+        raise ValueError(f"La escala debe estar entre {LINEAS_MIN:,} y {LINEAS_MAX:,} líneas.")
+    os.makedirs(salida, exist_ok=True)
+    cat = construir_catalogos(lineas, semilla)
+    pesos = pesos_diarios(desde, hasta)
+
+    ruta_ventas = os.path.join(salida, 'ventas_detalle.csv')
+    ruta_cobros = os.path.join(salida, 'cobros_detalle.csv')
+    filas = {'ventas_detalle.csv': 0, 'cobros_detalle.csv': 0}
+    documento = 1
+    bloques = _bloques(pesos, lineas, lineas_por_bloque)
+    for i, (inicio, fin, objetivo) in enumerate(bloques):
+        df_bloque, documento = generar_bloque_ventas(cat, pesos.iloc[inicio:fin], objetivo, semilla, i, documento)
+        df_cobros = generar_cobros(df_bloque, semilla, i)
+        _escribir_csv(df_bloque, ruta_ventas, anexar=i > 0)
+        _escribir_csv(df_cobros, ruta_cobros, anexar=i > 0)
+        filas['ventas_detalle.csv'] += len(df_bloque)
+        filas['cobros_detalle.csv'] += len(df_cobros)
+        if progreso:
+            progreso(i + 1, len(bloques))
+
+    df_cl4 = generar_reporte_cl4(cat, semilla)
+    _escribir_xlsx(df_cl4, os.path.join(salida, 'reporte_cl4.xlsx'), 'CL4')
+    df_clientes = generar_clientes_detalle(cat)
+    _escribir_xlsx(df_clientes, os.path.join(salida, 'clientes_detalle.xlsx'), 'Clientes')
+    df_tipo = generar_cliente_tipo(cat, pesos, int(min(FILAS_XLSX_MAX, max(10_000, lineas // 20))), semilla)
+    _escribir_xlsx(df_tipo, os.path.join(salida, 'CLIENTE_TIPO.xlsx'), 'CLIENTE_TIPO')
+    filas.update({'reporte_cl4.xlsx': len(df_cl4), 'clientes_detalle.xlsx': len(df_clientes),
+                  'CLIENTE_TIPO.xlsx': len(df_tipo)})
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con el formato de Dropbox.")
+    parser.add_argument('--lineas', default='1M', help="Líneas de venta: 100k a 50M (por defecto 1M)")
+    parser.add_argument('--salida', default='datos_sinteticos', help="Carpeta de salida")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--desde', default='2023-01-01')
+    parser.add_argument('--hasta', default='2025-12-31')
+    parser.add_argument('--bloque', default='1M', help="Líneas por bloque de escritura")
+    args = parser.parse_args(argv)
+
+    filas = generar_datos(
+        args.salida, parsear_escala(args.lineas), args.semilla,
+        datetime.date.fromisoformat(args.desde), datetime.date.fromisoformat(args.hasta),
+        parsear_escala(args.bloque),
+        progreso=lambda i, total: print(f"Bloque {i}/{total}", flush=True)
+    )
+    for archivo, n in filas.items():
+        print(f"{archivo}: {n:,} filas")
+
+
+if __name__ == '__main__':
+    main()
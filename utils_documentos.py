@@ -0,0 +1,87 @@
+# ==============================================================================
+# ARCHIVO: utils_documentos.py
+# DESCRIPCIÓN: Clasificación única de TipoDocumento en la ingesta (doc_class)
+# ==============================================================================
+import numpy as np
+import pandas as pd
+
+FACTURA = "FACTURA"
+NOTA_CREDITO = "NOTA_CREDITO"
+ALBARAN = "ALBARAN"
+OTRO = "OTRO"
+CLASES_DOCUMENTO = [FACTURA, NOTA_CREDITO, ALBARAN, OTRO]
+
+# Mismo criterio que el filtro histórico 'FACTURA|NOTA.*CREDITO' y contains('ALBARAN')
+PATRON_FACTURA = "FACTURA"
+PATRON_NOTA_CREDITO = "NOTA.*CREDITO"
+PATRON_ALBARAN = "ALBARAN"
+PATRON_VENTA_NETA = f"{PATRON_FACTURA}|{PATRON_NOTA_CREDITO}"
+
+
+def _valores_unicos(tipo_documento: pd.Series) -> tuple:
+    """(código por fila, textos únicos): las regex se evalúan sólo sobre los únicos (unas pocas decenas)."""
+    codigos, unicos = pd.factorize(tipo_documento)
+    return codigos, pd.Series(unicos, dtype=object).astype(str)
+
+
+def clasificar_tipo_documento(tipo_documento: pd.Series) -> pd.Categorical:
+    """
+    Clasifica cada línea en ALBARAN, FACTURA, NOTA_CREDITO u OTRO y expande el resultado por
+    código, sin volver a recorrer los textos de todas las filas. Como el histórico evaluaba
+    contains('ALBARAN') por separado, un tipo que nombra albarán y factura es ALBARAN: sigue
+    entrando en el neteo y en los pendientes (su venta neta la marca venta_neta_tipo_documento).
+    """
+    codigos, unicos = _valores_unicos(tipo_documento)
+    clases = np.select(
+        [
+            unicos.str.contains(PATRON_ALBARAN, case=False, regex=False),
+            unicos.str.contains(PATRON_FACTURA, case=False, regex=True),
+            unicos.str.contains(PATRON_NOTA_CREDITO, case=False, regex=True)
+        ],
+        [2, 0, 1],
+        default=3
+    )
+    # Código -1 (TipoDocumento vacío) cae en la última posición -> OTRO
+    codigos_clase = np.append(clases, 3).astype(np.int8)[codigos]
+    return pd.Categorical.from_codes(codigos_clase, categories=CLASES_DOCUMENTO)
+
+
+def venta_neta_tipo_documento(tipo_documento: pd.Series) -> np.ndarray:
+    """Filtro histórico 'FACTURA|NOTA.*CREDITO', independiente de la clase (también marca 'FACTURA ALBARAN')."""
+    codigos, unicos = _valores_unicos(tipo_documento)
+    netas = unicos.str.contains(PATRON_VENTA_NETA, case=False, regex=True).to_numpy(dtype=bool)
+    return np.append(netas, False)[codigos]
+
+
+def agregar_clase_documento(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade 'doc_class' (categórica) e 'is_venta_neta' (facturas + notas crédito) al DataFrame de ventas."""
+    if 'TipoDocumento' not in df.columns:
+        return df
+    df['doc_class'] = clasificar_tipo_documento(df['TipoDocumento'])
+    df['is_venta_neta'] = venta_neta_tipo_documento(df['TipoDocumento'])
+    return df
+
+
+def _asegurar_clase(df: pd.DataFrame) -> pd.Series:
+    if 'doc_class' in df.columns:
+        clase = df['doc_class']
+        if not isinstance(clase.dtype, pd.CategoricalDtype):
+            clase = clase.astype(pd.CategoricalDtype(CLASES_DOCUMENTO))
+        return clase
+    return pd.Series(clasificar_tipo_documento(df['TipoDocumento']), index=df.index)
+
+
+def mascara_venta_neta(df: pd.DataFrame) -> pd.Series:
+    """Máscara booleana de ventas netas (facturas + notas crédito)."""
+    if 'is_venta_neta' in df.columns:
+        return df['is_venta_neta']
+    if 'TipoDocumento' in df.columns:
+        return pd.Series(venta_neta_tipo_documento(df['TipoDocumento']), index=df.index)
+    return _asegurar_clase(df).isin([FACTURA, NOTA_CREDITO])
+
+
+def mascara_clase(df: pd.DataFrame, clase: str) -> pd.Series:
+    """Máscara booleana para una clase de documento (comparación por código de categoría)."""
+    clase_doc = _asegurar_clase(df)
+    codigo = CLASES_DOCUMENTO.index(clase)
+    return pd.Series(clase_doc.cat.codes.to_numpy() == codigo, index=df.index)
@@ -0,0 +1,189 @@
+# ==============================================================================
+# ARCHIVO: utils_excel.py
+# DESCRIPCIÓN: Motor común de exportación (XLSX en modo constant_memory con
+#              escritura por filas completas, y rutas rápidas CSV.gz / Parquet)
+# ==============================================================================
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_CSV_GZ = "application/gzip"
+MIME_PARQUET = "application/vnd.apache.parquet"
+
+FORMATO_EXCEL = "Excel (.xlsx)"
+FORMATO_CSV_GZ = "CSV comprimido (.csv.gz)"
+FORMATO_PARQUET = "Parquet (.parquet)"
+
+
+class LibroExcel:
+    """
+    Libro xlsxwriter con dos reglas para exportaciones grandes:
+    - constant_memory: cada fila se vuelca a disco al pasar a la siguiente, así que la
+      memoria no crece con el tamaño del reporte (las filas se escriben en orden ascendente).
+    - Los formatos se crean una sola vez por libro y se reutilizan por nombre.
+    """
+
+    def __init__(self, destino=None, constant_memory: bool = True):
+        self.salida = destino if destino is not None else io.BytesIO()
+        self.workbook = xlsxwriter.Workbook(self.salida, {
+            'constant_memory': constant_memory,
+            'default_date_format': 'yyyy-mm-dd',
+            'nan_inf_to_errors': True
+        })
+        self._formatos = {}
+
+    def formato(self, nombre: str, propiedades: dict = None):
+        """Devuelve el formato 'nombre'; la primera vez lo crea con 'propiedades'."""
+        if nombre not in self._formatos:
+            self._formatos[nombre] = self.workbook.add_format(propiedades or {})
+        return self._formatos[nombre]
+
+    def definir_formatos(self, formatos: dict):
+        """Registra varios formatos de una vez: {nombre: propiedades}."""
+        for nombre, propiedades in formatos.items():
+            self.formato(nombre, propiedades)
+
+    def _resolver(self, formato):
+        if formato is None or not isinstance(formato, str):
+            return formato
+        return self._formatos[formato]
+
+    def hoja(self, nombre: str):
+        return self.workbook.add_worksheet(nombre[:31])
+
+    def escribir_tabla(self, ws, df: pd.DataFrame, fila: int = 0, col: int = 0,
+                       encabezado: bool = True, formato_encabezado=None, formatos: dict = None,
+                       alto_filas: float = None) -> int:
+        """
+        Escribe 'df' desde (fila, col) fila por fila con write_row.
+        'formatos' = {columna: formato}; las columnas contiguas con el mismo formato se escriben
+        en una sola llamada. Devuelve el índice de la última fila escrita.
+        """
+        formatos = {k: self._resolver(v) for k, v in (formatos or {}).items()}
+        if encabezado:
+            ws.write_row(fila, col, [str(c) for c in df.columns], self._resolver(formato_encabezado))
+            fila += 1
+
+        tramos = _tramos_por_formato([formatos.get(c) for c in df.columns])
+        for r, valores in enumerate(filas_para_excel(df)):
+            if alto_filas is not None:
+                ws.set_row(fila + r, alto_filas)
+            for inicio, fin, formato in tramos:
+                ws.write_row(fila + r, col + inicio, valores[inicio:fin], formato)
+        return fila + len(df) - 1
+
+    def cerrar(self) -> bytes:
+        self.workbook.close()
+        if isinstance(self.salida, io.BytesIO):
+            return self.salida.getvalue()
+        return b""
+
+
+def _tramos_por_formato(formatos: list) -> list:
+    """[(inicio, fin, formato)] de columnas contiguas que comparten formato."""
+    tramos = []
+    inicio = 0
+    for i in range(1, len(formatos) + 1):
+        if i == len(formatos) or formatos[i] is not formatos[inicio]:
+            tramos.append((inicio, i, formatos[inicio]))
+            inicio = i
+    return tramos
+
+
+def _columna_para_excel(serie: pd.Series) -> np.ndarray:
+    """Convierte una columna completa a valores nativos de Python (None para vacíos)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie.dt.tz_localize(None) if getattr(serie.dt, 'tz', None) is not None else serie
+        # Timestamp es subclase de datetime: xlsxwriter lo escribe como fecha (sin el FutureWarning de to_pydatetime)
+        valores = fechas.astype(object).to_numpy()
+    elif pd.api.types.is_bool_dtype(serie):
+        valores = serie.to_numpy(dtype=object)
+    elif pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype=float, na_value=np.nan).astype(object)
+    else:
+        valores = serie.to_numpy(dtype=object)
+    vacios = pd.isna(serie).to_numpy()
+    if vacios.any():
+        valores = valores.copy()
+        valores[vacios] = None
+    return valores
+
+
+def filas_para_excel(df: pd.DataFrame):
+    """Itera las filas como listas de valores nativos; la conversión se hace por columna."""
+    columnas = [_columna_para_excel(df.iloc[:, i]) for i in range(df.shape[1])]
+    for fila in zip(*columnas):
+        yield list(fila)
+
+
+def exportar_tabla_simple(df: pd.DataFrame, hoja: str, anchos: dict = None, formatos: dict = None,
+                          formato_encabezado: dict = None, autofiltro: bool = True,
+                          congelar_encabezado: bool = False) -> bytes:
+    """
+    Exportación de una sola hoja: encabezado con estilo, formato por columna y anchos.
+    'anchos' y 'formatos' se indexan por nombre de columna; los formatos son dicts de propiedades.
+    """
+    libro = LibroExcel()
+    ws = libro.hoja(hoja)
+    formatos_libro = {c: libro.formato(f"col_{c}", p) for c, p in (formatos or {}).items()}
+    for c, ancho in (anchos or {}).items():
+        if c in df.columns:
+            i = df.columns.get_loc(c)
+            ws.set_column(i, i, ancho, formatos_libro.get(c))
+    encabezado = libro.formato("encabezado", formato_encabezado or {'bold': True, 'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1})
+    ultima = libro.escribir_tabla(ws, df, formato_encabezado=encabezado, formatos=formatos_libro)
+    if autofiltro and df.shape[1] > 0:
+        ws.autofilter(0, 0, max(ultima, 0), df.shape[1] - 1)
+    if congelar_encabezado:
+        ws.freeze_panes(1, 0)
+    return libro.cerrar()
+
+
+# ==============================================================================
+# RUTAS RÁPIDAS (SIN ESTILOS)
+# ==============================================================================
+def exportar_csv_gz(df: pd.DataFrame) -> bytes:
+    """CSV comprimido: mucho más rápido y liviano que XLSX para descargas masivas."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=5) as gz:
+        with io.TextIOWrapper(gz, encoding='utf-8-sig', newline='') as texto:
+            df.to_csv(texto, index=False)
+    return buffer.getvalue()
+
+
+def exportar_parquet(df: pd.DataFrame) -> bytes:
+    """Parquet columnar (requiere pyarrow)."""
+    if not PARQUET_DISPONIBLE:
+        raise ImportError("Parquet no disponible: instale pyarrow.")
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def formatos_disponibles() -> list:
+    formatos = [FORMATO_EXCEL, FORMATO_CSV_GZ]
+    if PARQUET_DISPONIBLE:
+        formatos.append(FORMATO_PARQUET)
+    return formatos
+
+
+def exportar_en_formato(df: pd.DataFrame, formato: str, exportar_xlsx, nombre_base: str) -> tuple:
+    """
+    Devuelve (bytes, nombre_archivo, mime) según el formato elegido.
+    'exportar_xlsx' es la función con estilos que se usa para la opción Excel.
+    """
+    if formato == FORMATO_CSV_GZ:
+        return exportar_csv_gz(df), f"{nombre_base}.csv.gz", MIME_CSV_GZ
+    if formato == FORMATO_PARQUET:
+        return exportar_parquet(df), f"{nombre_base}.parquet", MIME_PARQUET
+    return exportar_xlsx(df), f"{nombre_base}.xlsx", MIME_XLSX
@@ -0,0 +1,145 @@
+# ==============================================================================
+# ARCHIVO: utils_exportacion.py
+# DESCRIPCIÓN: Exportaciones bajo demanda: el archivo se genera en un hilo de
+#              trabajo sólo al pulsar "Preparar", sin bloquear la página, y queda en caché por
+#              (tipo de exportación, parámetros, versión de los datos)
+# ==============================================================================
+import contextvars
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+import streamlit as st
+
+import utils_memoria
+import utils_rendimiento
+
+EXPORTACIONES_MAX = 32
+HILOS_EXPORTACION = 2
+_CLAVE_ESTADO = "_exportaciones_pendientes"  # session_state: key del botón -> (clave, futuro)
+
+_RESULTADOS: "OrderedDict[str, tuple]" = OrderedDict()
+_EN_CURSO = {}
+_LOCK = Lock()
+_EJECUTOR = ThreadPoolExecutor(max_workers=HILOS_EXPORTACION, thread_name_prefix="exportacion")
+
+
+def clave_exportacion(tipo: str, parametros, version) -> str:
+    """Hash estable de (tipo, parámetros, versión de datos)."""
+    carga = json.dumps([tipo, parametros, version], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(carga.encode("utf-8")).hexdigest()
+
+
+def resultado(clave: str):
+    """(bytes, nombre_archivo, mime) si la exportación ya está lista; None si no."""
+    with _LOCK:
+        if clave in _RESULTADOS:
+            _RESULTADOS.move_to_end(clave)
+            return _RESULTADOS[clave]
+    return None
+
+
+def en_curso(clave: str):
+    """Future de la exportación si se está generando en este momento."""
+    with _LOCK:
+        return _EN_CURSO.get(clave)
+
+
+def _ejecutar(clave: str, generar, nombre: str):
+    try:
+        with utils_rendimiento.medir(utils_rendimiento.EXPORTACION, nombre):
+            salida = generar()
+        with _LOCK:
+            _RESULTADOS[clave] = salida
+            _RESULTADOS.move_to_end(clave)
+            while len(_RESULTADOS) > EXPORTACIONES_MAX:
+                _RESULTADOS.popitem(last=False)
+        return salida
+    finally:
+        with _LOCK:
+            _EN_CURSO.pop(clave, None)
+
+
+def solicitar(clave: str, generar, nombre: str = "exportacion") -> Future:
+    """
+    Encola 'generar' (sin argumentos, devuelve (bytes, nombre_archivo, mime)) en el hilo de trabajo.
+    Varias solicitudes con la misma clave comparten la misma ejecución. El hilo de trabajo corre
+    con el contexto de quien solicita, así el tiempo de exportación cuenta también para su sesión.
+    """
+    with _LOCK:
+        if clave in _RESULTADOS:
+            futuro = Future()
+            futuro.set_result(_RESULTADOS[clave])
+            return futuro
+        futuro = _EN_CURSO.get(clave)
+        if futuro is None:
+            contexto = contextvars.copy_context()
+            futuro = _EJECUTOR.submit(contexto.run, _ejecutar, clave, generar, nombre)
+            _EN_CURSO[clave] = futuro
+        return futuro
+
+
+def limpiar_cache():
+    with _LOCK:
+        _RESULTADOS.clear()
+
+
+utils_memoria.registrar_liberable("exportaciones", limpiar_cache)
+
+
+def _esperar(etiqueta: str, key: str, intervalo: int = 1):
+    """Aviso de generación en curso; un fragmento sondea el futuro y relanza la página al terminar."""
+    st.info(f"⏳ Generando {etiqueta} en segundo plano. Puedes seguir usando la página.")
+    if not hasattr(st, "fragment"):
+        st.button("🔄 Comprobar descarga", key=f"comprobar_{key}")
+        return
+
+    @st.fragment(run_every=intervalo)
+    def _sondeo():
+        _, futuro = st.session_state.get(_CLAVE_ESTADO, {}).get(key, (None, None))
+        if futuro is None or futuro.done():
+            st.rerun()
+
+    _sondeo()
+
+
+def boton_descarga_diferida(etiqueta: str, tipo: str, parametros, version, generar, key: str, **opciones_boton):
+    """
+    Muestra "Preparar <etiqueta>"; al pulsarlo encola el archivo en el hilo de trabajo sin
+    bloquear el rerun: el futuro queda en session_state, se muestra un aviso mientras se genera
+    y el botón de descarga aparece cuando termina. Los reruns normales no serializan ningún
+    archivo: sólo consultan la caché por clave.
+    """
+    clave = clave_exportacion(tipo, parametros, version)
+    pendientes = st.session_state.setdefault(_CLAVE_ESTADO, {})
+    listo = resultado(clave)
+    if listo is not None:
+        utils_rendimiento.registrar_cache("exportaciones", True)
+        pendientes.pop(key, None)
+    else:
+        clave_futuro, futuro = pendientes.get(key, (None, None))
+        if clave_futuro != clave:
+            # Cambiaron los parámetros, o la misma exportación la está generando otra sesión
+            futuro = en_curso(clave)
+        if futuro is None:
+            if not st.button(f"⚙️ Preparar {etiqueta}", key=f"preparar_{key}", use_container_width=True):
+                pendientes.pop(key, None)
+                return
+            utils_rendimiento.registrar_cache("exportaciones", False)
+            futuro = solicitar(clave, generar, nombre=tipo)
+        pendientes[key] = (clave, futuro)
+        if not futuro.done():
+            _esperar(etiqueta, key)
+            return
+        pendientes.pop(key, None)
+        try:
+            listo = futuro.result()
+        except Exception as e:
+            st.error(f"No se pudo generar {etiqueta}: {e}")
+            return
+
+    datos, nombre_archivo, mime = listo
+    st.download_button(label=f"📥 Descargar {etiqueta}", data=datos, file_name=nombre_archivo, mime=mime,
+                       key=f"descargar_{key}", **opciones_boton)
@@ -0,0 +1,311 @@
+# ==============================================================================
+# ARCHIVO: utils_memoria.py
+# DESCRIPCIÓN: Contabilidad de memoria por sesión: tamaño profundo de lo que
+#              guarda st.session_state y las cachés de Streamlit, crecimiento
+#              entre reruns (posibles fugas) y desalojo de datos derivados
+#              cuando se supera el presupuesto
+# ==============================================================================
+import os
+import sys
+import time
+import uuid
+import weakref
+from collections import deque
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+MB = 1024 * 1024
+
+# Presupuestos configurables por variable de entorno (en MB)
+PRESUPUESTO_SESION_MB = float(os.environ.get("MEMORIA_SESION_MB", 1024))
+PRESUPUESTO_PROCESO_MB = float(os.environ.get("MEMORIA_PROCESO_MB", 6144))
+
+HISTORIAL_RERUNS = 60
+RERUNS_FUGA = 6                    # reruns seguidos creciendo para marcar posible fuga
+CRECIMIENTO_FUGA_MB = 32           # y crecimiento mínimo acumulado en esa racha
+SESION_INACTIVA_SEG = 2 * 3600     # las sesiones sin rerun en este tiempo dejan de sumar
+
+CLAVE_ID_SESION = "memoria_id_sesion"
+CLAVE_CUENTA = "memoria_cuenta"
+USUARIO_PANEL = "GERENTE"
+
+# Datos base: sólo se recargan desde Dropbox, nunca se desalojan
+CLAVES_BASE = ("df_ventas", "df_cobros", "df_cl4", "APP_CONFIG", "DATA_CONFIG")
+# Datos derivados: cada página los reconstruye si faltan, así que se pueden desalojar
+CLAVES_DERIVADAS = [
+    "df_ventas_login",
+    "indice_propietarios",
+    "indice_propietarios_version",
+    "indice_transacciones",
+    "pdf_libro_presupuestos",
+    "zip_acuerdos_presupuestos",
+    "perfiles_capturados",
+]
+
+_LOCK = Lock()
+_SESIONES = {}        # id_sesion -> {'usuario', 'total', 'actualizado'}
+_LIBERABLES = {}      # nombre -> función sin argumentos que vacía una caché en proceso
+_MEMO_TAMANOS = {}    # id(objeto) -> (weakref, firma, bytes): evita recalcular frames sin cambios
+
+
+def registrar_derivada(clave: str):
+    """Marca una clave de session_state como derivada (desalojable)."""
+    if clave not in CLAVES_DERIVADAS:
+        CLAVES_DERIVADAS.append(clave)
+
+
+def registrar_liberable(nombre: str, limpiar):
+    """Caché en proceso que se vacía cuando el proceso completo supera su presupuesto."""
+    with _LOCK:
+        _LIBERABLES[nombre] = limpiar
+
+
+# ==============================================================================
+# TAMAÑO PROFUNDO
+# ==============================================================================
+def _firma(obj):
+    if isinstance(obj, pd.DataFrame):
+        return ("df", obj.shape, tuple(map(str, obj.dtypes)))
+    return (type(obj).__name__, len(obj))
+
+
+def _tamano_memo(obj, calcular) -> int:
+    """Los DataFrames/Series no se mutan entre reruns: su tamaño se memoriza por identidad y forma."""
+    clave = id(obj)
+    firma = _firma(obj)
+    with _LOCK:
+        previo = _MEMO_TAMANOS.get(clave)
+    if previo is not None and previo[0]() is obj and previo[1] == firma:
+        return previo[2]
+    tamano = int(calcular())
+    try:
+        ref = weakref.ref(obj, lambda _r, c=clave: _MEMO_TAMANOS.pop(c, None))
+    except TypeError:
+        return tamano
+    with _LOCK:
+        _MEMO_TAMANOS[clave] = (ref, firma, tamano)
+    return tamano
+
+
+def tamano_profundo(obj, _vistos: set = None) -> int:
+    """Bytes ocupados por 'obj' incluyendo el contenido de columnas de texto, contenedores y atributos."""
+    if _vistos is None:
+        _vistos = set()
+    if id(obj) in _vistos:
+        return 0
+    _vistos.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return _tamano_memo(obj, lambda: obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return _tamano_memo(obj, lambda: obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(sys.getsizeof(v) for v in obj.ravel())
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, str, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(tamano_profundo(k, _vistos) + tamano_profundo(v, _vistos) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(obj) + sum(tamano_profundo(v, _vistos) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + tamano_profundo(vars(obj), _vistos)
+    return sys.getsizeof(obj)
+
+
+def medir_estado(estado) -> dict:
+    """{clave: bytes} de cada entrada de session_state (sin las de esta contabilidad)."""
+    detalle = {}
+    for clave in list(estado.keys()):
+        if clave in (CLAVE_CUENTA, CLAVE_ID_SESION):
+            continue
+        try:
+            detalle[clave] = tamano_profundo(estado[clave])
+        except KeyError:
+            continue
+    return detalle
+
+
+def caches_streamlit() -> list:
+    """
+    Bytes en st.cache_data (valores serializados) y st.cache_resource, por función.
+    Usa las estadísticas internas de Streamlit; si la versión instalada no las expone, devuelve [].
+    """
+    filas = []
+    try:
+        from streamlit.runtime.caching.cache_data_api import _data_caches
+        from streamlit.runtime.caching.cache_resource_api import _resource_caches
+        for tipo, caches in (("cache_data", _data_caches), ("cache_resource", _resource_caches)):
+            for stat in caches.get_stats():
+                filas.append({'tipo': tipo, 'cache': stat.cache_name, 'bytes': int(stat.byte_length)})
+    except (ImportError, AttributeError):
+        return []
+    agregadas = {}
+    for fila in filas:
+        clave = (fila['tipo'], fila['cache'])
+        agregadas[clave] = agregadas.get(clave, 0) + fila['bytes']
+    return [{'tipo': t, 'cache': c, 'bytes': b} for (t, c), b in sorted(agregadas.items(), key=lambda x: -x[1])]
+
+
+# ==============================================================================
+# CUENTA POR SESIÓN Y TOTAL DEL PROCESO
+# ==============================================================================
+class CuentaMemoria:
+    """Historial de la memoria de una sesión por rerun y último desalojo realizado."""
+
+    def __init__(self, historial: int = HISTORIAL_RERUNS):
+        self.historial = deque(maxlen=historial)   # (marca de tiempo, bytes totales)
+        self.detalle = {}
+        self.desalojadas = []
+        self.liberadas = []
+
+    def registrar(self, detalle: dict):
+        self.detalle = detalle
+        self.historial.append((time.time(), sum(detalle.values())))
+
+    @property
+    def total(self) -> int:
+        return self.historial[-1][1] if self.historial else 0
+
+    def posible_fuga(self, reruns: int = RERUNS_FUGA, crecimiento_mb: float = CRECIMIENTO_FUGA_MB) -> bool:
+        """Crecimiento en cada uno de los últimos 'reruns' y, en conjunto, de al menos 'crecimiento_mb'."""
+        if len(self.historial) <= reruns:
+            return False
+        ultimos = [b for _, b in list(self.historial)[-(reruns + 1):]]
+        creciente = all(b > a for a, b in zip(ultimos, ultimos[1:]))
+        return creciente and (ultimos[-1] - ultimos[0]) >= crecimiento_mb * MB
+
+
+def desalojar_derivadas(estado, detalle: dict, bytes_a_liberar: int) -> list:
+    """Borra claves derivadas de session_state, de la más grande a la más chica, hasta liberar lo pedido."""
+    candidatas = sorted((c for c in CLAVES_DERIVADAS if c in detalle), key=lambda c: detalle[c], reverse=True)
+    desalojadas = []
+    liberado = 0
+    for clave in candidatas:
+        if liberado >= bytes_a_liberar:
+            break
+        estado.pop(clave, None)
+        liberado += detalle.pop(clave)
+        desalojadas.append(clave)
+    return desalojadas
+
+
+def liberar_caches_proceso() -> list:
+    with _LOCK:
+        liberables = list(_LIBERABLES.items())
+    for _, limpiar in liberables:
+        limpiar()
+    return [nombre for nombre, _ in liberables]
+
+
+def actualizar_sesion(id_sesion: str, usuario, total: int):
+    ahora = time.time()
+    with _LOCK:
+        _SESIONES[id_sesion] = {'usuario': usuario, 'total': total, 'actualizado': ahora}
+        for inactiva in [s for s, d in _SESIONES.items() if ahora - d['actualizado'] > SESION_INACTIVA_SEG]:
+            del _SESIONES[inactiva]
+
+
+def sesiones() -> list:
+    with _LOCK:
+        return sorted(({'sesion': s[:8], **d} for s, d in _SESIONES.items()), key=lambda d: -d['total'])
+
+
+def total_proceso() -> dict:
+    """Suma de las sesiones activas y de las cachés de Streamlit."""
+    bytes_sesiones = sum(d['total'] for d in sesiones())
+    bytes_caches = sum(c['bytes'] for c in caches_streamlit())
+    return {'sesiones': bytes_sesiones, 'caches': bytes_caches, 'total': bytes_sesiones + bytes_caches}
+
+
+def auditar(estado, id_sesion: str, cuenta: CuentaMemoria, usuario=None,
+            presupuesto_sesion_mb: float = None, presupuesto_proceso_mb: float = None) -> CuentaMemoria:
+    """
+    Mide la sesión, desaloja derivados si supera su presupuesto (o si el proceso supera el suyo,
+    en cuyo caso también vacía las cachés en proceso registradas) y actualiza el total del proceso.
+    """
+    presupuesto_sesion = (presupuesto_sesion_mb or PRESUPUESTO_SESION_MB) * MB
+    presupuesto_proceso = (presupuesto_proceso_mb or PRESUPUESTO_PROCESO_MB) * MB
+
+    detalle = medir_estado(estado)
+    total = sum(detalle.values())
+    cuenta.desalojadas, cuenta.liberadas = [], []
+    if total > presupuesto_sesion:
+        cuenta.desalojadas = desalojar_derivadas(estado, detalle, total - presupuesto_sesion)
+        total = sum(detalle.values())
+
+    actualizar_sesion(id_sesion, usuario, total)
+    proceso = total_proceso()
+    if proceso['total'] > presupuesto_proceso:
+        cuenta.desalojadas += desalojar_derivadas(estado, detalle, proceso['total'] - presupuesto_proceso)
+        cuenta.liberadas = liberar_caches_proceso()
+        actualizar_sesion(id_sesion, usuario, sum(detalle.values()))
+
+    cuenta.registrar(detalle)
+    return cuenta
+
+
+# ==============================================================================
+# INTEGRACIÓN CON STREAMLIT (importación diferida: el núcleo no depende de streamlit)
+# ==============================================================================
+def auditar_sesion_streamlit() -> CuentaMemoria:
+    """Se llama al inicio de cada página: mide lo que la sesión retuvo desde el rerun anterior."""
+    import streamlit as st
+    if CLAVE_ID_SESION not in st.session_state:
+        st.session_state[CLAVE_ID_SESION] = uuid.uuid4().hex
+    if CLAVE_CUENTA not in st.session_state:
+        st.session_state[CLAVE_CUENTA] = CuentaMemoria()
+    return auditar(st.session_state, st.session_state[CLAVE_ID_SESION], st.session_state[CLAVE_CUENTA],
+                   usuario=st.session_state.get('usuario'))
+
+
+def formatear_mb(cantidad: int) -> str:
+    return f"{cantidad / MB:,.1f} MB"
+
+
+def panel_memoria(usuario_normalizado: str):
+    """Panel lateral sólo para GERENTE: memoria de la sesión, del proceso y alertas de crecimiento."""
+    if usuario_normalizado != USUARIO_PANEL:
+        return
+    import streamlit as st
+    cuenta = st.session_state.get(CLAVE_CUENTA)
+    if cuenta is None:
+        return
+
+    with st.sidebar.expander("🧠 Memoria", expanded=False):
+        presupuesto = PRESUPUESTO_SESION_MB * MB
+        st.progress(min(cuenta.total / presupuesto, 1.0),
+                    text=f"Sesión: {formatear_mb(cuenta.total)} de {formatear_mb(presupuesto)}")
+        if cuenta.posible_fuga():
+            st.warning(f"La sesión creció en cada uno de los últimos {RERUNS_FUGA} reruns: posible fuga.")
+        if cuenta.desalojadas:
+            st.info("Desalojado por presupuesto: " + ", ".join(cuenta.desalojadas))
+        if cuenta.liberadas:
+            st.info("Cachés vaciadas por presupuesto del proceso: " + ", ".join(cuenta.liberadas))
+
+        if cuenta.detalle:
+            df = pd.DataFrame(sorted(cuenta.detalle.items(), key=lambda x: -x[1]), columns=['clave', 'bytes'])
+            df['MB'] = df['bytes'] / MB
+            df['tipo'] = np.where(df['clave'].isin(CLAVES_BASE), 'base',
+                                  np.where(df['clave'].isin(CLAVES_DERIVADAS), 'derivado', 'otro'))
+            st.dataframe(df[['clave', 'tipo', 'MB']].head(15), hide_index=True, use_container_width=True,
+                         column_config={'MB': st.column_config.NumberColumn('MB', format="%.1f")})
+        if len(cuenta.historial) > 1:
+            st.caption("Memoria de la sesión por rerun (MB)")
+            st.line_chart(pd.Series([b / MB for _, b in cuenta.historial]), height=120)
+
+        proceso = total_proceso()
+        presupuesto_proceso = PRESUPUESTO_PROCESO_MB * MB
+        st.progress(min(proceso['total'] / presupuesto_proceso, 1.0),
+                    text=f"Proceso: {formatear_mb(proceso['total'])} de {formatear_mb(presupuesto_proceso)}")
+        st.caption(f"Sesiones activas: {len(sesiones())} ({formatear_mb(proceso['sesiones'])}) · "
+                   f"Cachés de Streamlit: {formatear_mb(proceso['caches'])}")
+        caches = caches_streamlit()
+        if caches:
+            df_caches = pd.DataFrame(caches)
+            df_caches['MB'] = df_caches['bytes'] / MB
+            st.dataframe(df_caches[['tipo', 'cache', 'MB']].head(10), hide_index=True, use_container_width=True,
+                         column_config={'MB': st.column_config.NumberColumn('MB', format="%.1f")})
@@ -0,0 +1,522 @@
+# ==============================================================================
+# ARCHIVO: utils_pdf_presupuesto.py
+# DESCRIPCIÓN: Renderizado del libro de Acuerdos de Gestión Comercial 2026 (PDF)
+#              con matriz histórica precalculada, secciones en paralelo y caché
+# ==============================================================================
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+import utils_memoria
+import utils_presupuesto
+import utils_rendimiento
+
+# --- CONFIGURACIÓN ESTÉTICA ---
+COLOR_PRIMARY = (30, 58, 138)       # Azul Corporativo (Navy)
+COLOR_SECONDARY = (241, 245, 249)   # Gris muy claro para fondos
+COLOR_ACCENT = (220, 38, 38)        # Rojo sutil para énfasis
+COLOR_TEXT_HEADER = (255, 255, 255) # Blanco
+COLOR_TEXT_BODY = (51, 65, 85)      # Gris Oscuro (Slate)
+
+URL_LOGO = "https://raw.githubusercontent.com/DiegoMao2021/Resumen-Ventas-Gerenciales/main/LOGO%20FERREINOX%20SAS%20BIC%202024.png"
+RUTA_LOGO = "LOGO FERREINOX SAS BIC 2024.png"
+MESES = {1:"Enero", 2:"Febrero", 3:"Marzo", 4:"Abril", 5:"Mayo", 6:"Junio", 7:"Julio", 8:"Agosto", 9:"Septiembre", 10:"Octubre", 11:"Noviembre", 12:"Diciembre"}
+
+# Cambiar al modificar el diseño de las páginas: invalida todas las secciones en caché
+VERSION_PLANTILLA = "2026.1"
+SECCIONES_CACHE_MAX = 256
+
+
+# --- CLASE PDF PROFESIONAL ENTERPRISE ---
+class EnterpriseReport(FPDF):
+    def header(self):
+        # Franja superior azul
+        self.set_fill_color(*COLOR_PRIMARY)
+        self.rect(0, 0, 210, 35, 'F')
+        # Logo a la izquierda (usa archivo local)
+        try:
+            self.image(RUTA_LOGO, x=12, y=6, w=36)
+        except Exception as e:
+            pass # Si falla el logo local, no rompe el flujo
+        # Título a la derecha
+        self.set_font('Helvetica', 'B', 13)
+        self.set_text_color(255, 255, 255)
+        self.set_xy(60, 12)
+        self.cell(0, 8, 'ACUERDO DE GESTIÓN COMERCIAL 2026', 0, 1, 'L')
+        self.set_font('Helvetica', '', 9)
+        self.set_x(60)
+        self.cell(0, 6, 'CONFIDENCIAL - USO INTERNO EXCLUSIVO', 0, 1, 'L')
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-20)
+        # Línea divisoria elegante
+        self.set_draw_color(200, 200, 200)
+        self.line(10, self.get_y(), 200, self.get_y())
+
+        # Texto pie de página
+        self.set_y(-15)
+        self.set_font('Helvetica', '', 8)
+        self.set_text_color(128, 128, 128)
+
+        col1 = 'FERREINOX S.A.S. BIC'
+        col2 = f'Generado el: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}'
+        col3 = f'Página {self.page_no()}'
+
+        self.cell(60, 10, col1, 0, 0, 'L')
+        self.cell(70, 10, col2, 0, 0, 'C')
+        self.cell(60, 10, col3, 0, 0, 'R')
+
+    def draw_cover_page(self, total_compania):
+        self.add_page()
+        # Fondo superior azul
+        self.set_fill_color(*COLOR_PRIMARY)
+        self.rect(0, 0, 210, 60, 'F')
+        # Logo centrado arriba
+        try:
+            self.image(URL_LOGO, x=80, y=10, w=50)
+        except:
+            pass
+        # Título principal
+        self.set_xy(0, 65)
+        self.set_text_color(*COLOR_PRIMARY)
+        self.set_font('Helvetica', 'B', 22)
+        self.cell(0, 12, 'PLAN ESTRATÉGICO DE VENTAS 2026', 0, 1, 'C')
+        self.ln(2)
+        self.set_font('Helvetica', '', 14)
+        self.cell(0, 10, 'DOCUMENTO OFICIAL DE ASIGNACIÓN DE METAS', 0, 1, 'C')
+        self.ln(10)
+        # Tarjeta central con meta global
+        self.set_fill_color(255, 255, 255)
+        self.rect(40, 100, 130, 55, 'DF')
+        self.set_xy(40, 110)
+        self.set_text_color(*COLOR_PRIMARY)
+        self.set_font('Helvetica', 'B', 13)
+        self.cell(130, 8, 'META GLOBAL FERREINOX S.A.S. BIC', 0, 2, 'C')
+        self.set_font('Helvetica', 'B', 22)
+        self.set_text_color(*COLOR_ACCENT)
+        self.cell(130, 14, f"$ {total_compania:,.0f}", 0, 2, 'C')
+        self.set_font('Helvetica', 'I', 10)
+        self.set_text_color(100, 100, 100)
+        self.cell(130, 8, 'Moneda: COP', 0, 2, 'C')
+        self.set_y(-40)
+        self.set_text_color(*COLOR_PRIMARY)
+        self.set_font('Helvetica', 'B', 12)
+        self.cell(0, 10, 'FERREINOX S.A.S. BIC', 0, 1, 'C')
+
+    def section_title(self, title):
+        self.ln(5)
+        self.set_font('Helvetica', 'B', 14)
+        self.set_text_color(*COLOR_PRIMARY)
+        # Limpiar caracteres especiales básicos para el título
+        title_clean = title.encode('latin-1', 'replace').decode('latin-1')
+        self.cell(0, 10, title_clean.upper(), 0, 1, 'L')
+        # Subrayado grueso
+        self.set_draw_color(*COLOR_PRIMARY)
+        self.set_line_width(1)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.ln(5)
+
+    def draw_kpi_card(self, title, value, subtitle, x, y, w, h):
+        # Sombra simple
+        self.set_fill_color(220, 220, 220)
+        self.rect(x+1, y+1, w, h, 'F')
+        # Fondo blanco
+        self.set_fill_color(255, 255, 255)
+        self.set_draw_color(200, 200, 200)
+        self.set_line_width(0.2)
+        self.rect(x, y, w, h, 'DF')
+
+        # Texto
+        self.set_xy(x, y+2)
+        self.set_font('Helvetica', 'B', 9)
+        self.set_text_color(100, 100, 100)
+        self.cell(w, 5, title, 0, 1, 'C')
+
+        self.set_xy(x, y+10)
+        self.set_font('Helvetica', 'B', 14)
+        self.set_text_color(*COLOR_PRIMARY)
+        self.cell(w, 8, value, 0, 1, 'C')
+
+        self.set_xy(x, y+20)
+        self.set_font('Helvetica', '', 7)
+        self.set_text_color(128, 128, 128)
+        self.cell(w, 4, subtitle, 0, 1, 'C')
+
+    def table_header(self, headers, widths, align='C'):
+        self.set_font('Helvetica', 'B', 10)
+        self.set_fill_color(30, 58, 138)
+        self.set_text_color(255, 255, 255)
+
+        # --- FIX: FORZAR MARGEN IZQUIERDO ---
+        self.set_x(10)
+
+        for i, (header, w) in enumerate(zip(headers, widths)):
+            # Determinar alineación (si es lista usa la específica, si no la global)
+            curr_align = align[i] if isinstance(align, list) else align
+            self.cell(w, 10, str(header), 0, 0, curr_align, 1)
+
+        self.ln()
+        self.set_text_color(50, 50, 50)  # Restaura color texto para las filas
+
+    def table_row(self, data, widths, fill=False):
+        self.set_font('Helvetica', '', 8) # Fuente ligeramente más pequeña
+        self.set_text_color(50, 50, 50)
+        if fill:
+            self.set_fill_color(245, 247, 250)
+        else:
+            self.set_fill_color(255, 255, 255)
+
+        # --- FIX: FORZAR MARGEN IZQUIERDO EN CADA FILA ---
+        self.set_x(10)
+
+        for i, (datum, w) in enumerate(zip(data, widths)):
+            align = 'L' if i == 0 else 'R' # Primer columna izq, resto derecha
+            if i == 2: align = 'C' # Centrar porcentajes
+
+            # Truncar texto si es muy largo para la celda
+            text_str = str(datum).encode('latin-1', 'replace').decode('latin-1')
+            self.cell(w, 8, text_str, 0, 0, align, 1)
+        self.ln()
+
+
+def _nuevo_documento() -> EnterpriseReport:
+    pdf = EnterpriseReport()
+    pdf.set_auto_page_break(auto=True, margin=18)  # O 15 si necesitas más espacio
+    return pdf
+
+
+def _a_bytes(pdf: FPDF) -> bytes:
+    pdf_bytes = pdf.output(dest='S')
+    if isinstance(pdf_bytes, str):
+        pdf_bytes = pdf_bytes.encode('latin-1')
+    elif isinstance(pdf_bytes, bytearray):
+        pdf_bytes = bytes(pdf_bytes)
+    return pdf_bytes
+
+
+# ==============================================================================
+# DATOS PRECALCULADOS
+# ==============================================================================
+def matriz_historico(df_historico: pd.DataFrame, grupos: dict, anio: int = 2025) -> pd.DataFrame:
+    """
+    Matriz vendedor × mes (1..12) de la venta del año base, calculada una sola vez.
+    Incluye una fila por grupo (suma de sus miembros) con la clave normalizada del grupo.
+    """
+    df_anio = df_historico[df_historico['anio'] == anio]
+    matriz = (
+        df_anio.groupby(['nomvendedor', 'mes'])['valor_venta'].sum()
+        .unstack(fill_value=0)
+        .reindex(columns=range(1, 13), fill_value=0)
+    )
+    filas_grupo = {}
+    for grupo, miembros in grupos.items():
+        miembros_norm = [utils_presupuesto.normalizar_texto(m) for m in miembros]
+        filas_grupo[utils_presupuesto.normalizar_texto(grupo)] = matriz.reindex(miembros_norm, fill_value=0).sum(axis=0)
+    if filas_grupo:
+        matriz = pd.concat([matriz, pd.DataFrame(filas_grupo).T.reindex(columns=range(1, 13), fill_value=0)])
+    return matriz
+
+
+def datos_secciones(df_mensual_unificado: pd.DataFrame, df_resumen_pdf: pd.DataFrame, matriz: pd.DataFrame) -> list:
+    """
+    Datos planos (serializables) de cada página individual, en el orden de df_resumen_pdf.
+    Cada sección lleva su propia versión: sólo cambia si cambian sus metas o su histórico.
+    """
+    metas = df_mensual_unificado.pivot_table(
+        index='vendedor_unificado', columns='mes', values='presupuesto_mensual', aggfunc='sum'
+    )
+    secciones = []
+    for nombre in df_resumen_pdf['vendedor_unificado']:
+        nombre_norm = utils_presupuesto.normalizar_texto(nombre)
+        metas_v = metas.loc[nombre].dropna() if nombre in metas.index else pd.Series(dtype=float)
+        historico_v = matriz.loc[nombre_norm] if nombre_norm in matriz.index else pd.Series(0.0, index=range(1, 13))
+        seccion = {
+            "nombre": str(nombre),
+            "meses": [int(m) for m in metas_v.index],
+            "metas": [float(v) for v in metas_v.to_numpy()],
+            "historico": [float(historico_v.get(int(m), 0)) for m in metas_v.index],
+        }
+        seccion["version"] = _huella({"plantilla": VERSION_PLANTILLA, **seccion})
+        secciones.append(seccion)
+    return secciones
+
+
+def _huella(contenido) -> str:
+    return hashlib.sha1(json.dumps(contenido, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+# ==============================================================================
+# DIBUJO DE PÁGINAS
+# ==============================================================================
+def dibujar_resumen(pdf: EnterpriseReport, df_resumen_pdf: pd.DataFrame, excluir_norm: list):
+    """Portada y vista gerencial (tabla anual por vendedor/grupo)."""
+    total_compania = df_resumen_pdf['presupuesto_mensual'].sum()
+    pdf.draw_cover_page(total_compania)
+
+    pdf.add_page()
+    pdf.section_title("VISTA GERENCIAL: PRESUPUESTO ANUAL")
+    pdf.set_font('Helvetica', '', 10)
+    pdf.multi_cell(0, 5, "Resumen ejecutivo de metas comerciales 2026. Incluye presupuesto anual, crecimiento porcentual y participación sobre el total.")
+
+    # Filtra solo para mostrar (no afecta totales de cálculo)
+    df_vista = df_resumen_pdf[~df_resumen_pdf['vendedor_unificado'].apply(utils_presupuesto.normalizar_texto).isin(excluir_norm)]
+
+    # Ancho total 185mm (75+45+35+30) para caber dentro de los márgenes estándar (190mm)
+    widths_gerencia = [75, 45, 35, 30]
+    pdf.ln(5)
+
+    # Pasamos alineaciones explícitas: Izq, Der, Centro, Centro
+    pdf.table_header(
+        ['Vendedor / Grupo', 'Presupuesto 2026', '% Crecimiento', 'Part.%'],
+        widths_gerencia,
+        align=['L', 'R', 'C', 'C']
+    )
+
+    nombres = df_vista['vendedor_unificado'].to_numpy()
+    valores = df_vista['presupuesto_mensual'].to_numpy(dtype=float)
+    crecimientos = df_vista['crecimiento_pct'].to_numpy(dtype=float)
+    participaciones = valores / total_compania * 100 if total_compania > 0 else np.zeros(len(valores))
+
+    fill = False
+    for nombre, valor, crecimiento_pct, participacion in zip(nombres, valores, crecimientos, participaciones):
+        pdf.table_row([
+            f"  {nombre}",
+            f"$ {valor:,.0f}",
+            f"{crecimiento_pct:.1f}%" if np.isfinite(crecimiento_pct) else "N/A",
+            f"{participacion:.1f}%"
+        ], widths_gerencia, fill)
+        fill = not fill
+
+    # Fila de Totales
+    pdf.set_font('Helvetica', 'B', 9)
+    pdf.set_fill_color(30, 58, 138)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_x(10) # FIX: Forzar margen también en el total
+    pdf.cell(widths_gerencia[0], 10, '  TOTAL GENERAL', 0, 0, 'L', 1)
+    pdf.cell(widths_gerencia[1], 10, f"$ {total_compania:,.0f}", 0, 0, 'R', 1)
+    pdf.cell(widths_gerencia[2], 10, '', 0, 0, 'C', 1)
+    pdf.cell(widths_gerencia[3], 10, '100.0%', 0, 1, 'C', 1)
+    pdf.ln(8)
+
+
+def dibujar_seccion(pdf: EnterpriseReport, seccion: dict):
+    """Página individual de un vendedor/grupo a partir de sus datos precalculados."""
+    nombre = seccion["nombre"]
+    meses = seccion["meses"]
+    metas = np.asarray(seccion["metas"], dtype=float)
+    historico = np.asarray(seccion["historico"], dtype=float)
+    total_vendedor = metas.sum()
+
+    # --- INICIO PÁGINA INDIVIDUAL ---
+    pdf.add_page()
+    pdf.section_title(f"META INDIVIDUAL: {nombre}")
+
+    # --- KPIs Compactos ---
+    y_start = pdf.get_y()
+    pdf.draw_kpi_card("META ANUAL 2026", f"$ {total_vendedor:,.0f}", "Presupuesto Total Asignado", x=15, y=y_start, w=60, h=28)
+    pdf.draw_kpi_card("PROMEDIO MENSUAL", f"$ {total_vendedor/12:,.0f}", "Base de cumplimiento", x=80, y=y_start, w=60, h=28)
+
+    # Calculamos meta Q1 (Trimestre 1)
+    meta_q1 = metas[np.asarray(meses, dtype=int) <= 3].sum() if meses else 0
+    pdf.draw_kpi_card("META PRIMER TRIMESTRE", f"$ {meta_q1:,.0f}", "Ene - Feb - Mar", x=145, y=y_start, w=60, h=28)
+    pdf.set_y(y_start + 35)
+
+    # --- Mensaje Corporativo ---
+    pdf.set_font('Helvetica', 'B', 11)
+    pdf.set_text_color(30, 58, 138)
+    pdf.cell(0, 7, "OBJETIVOS Y COMPROMISO", 0, 1)
+    pdf.set_font('Helvetica', '', 10)
+    pdf.set_text_color(70, 70, 70)
+    pdf.multi_cell(0, 5,
+        "Este acuerdo establece las metas comerciales para el periodo 2026. "
+        "El presupuesto asignado representa el aporte directo a la sostenibilidad y crecimiento de FERREINOX S.A.S. BIC. "
+        "Tu compromiso y desempeño son clave para alcanzar los objetivos estratégicos."
+    )
+    pdf.ln(6)
+
+    # --- TABLA MENSUAL DETALLADA ---
+    pdf.set_font('Helvetica', 'B', 10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 6, "DETALLE DE EJECUCIÓN MENSUAL", 0, 1)
+
+    widths_ind = [50, 60, 40, 40]
+    pdf.table_header(['MES', 'META DE VENTA', '% CRECIMIENTO', 'ACUMULADO'], widths_ind)
+
+    # Crecimiento vectorizado: 100% si no hay base pero sí meta; "-" si ambos son cero
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_mes = np.where(historico > 0, (metas - historico) / historico * 100, np.where(metas > 0, 100.0, 0.0))
+    acumulado = np.cumsum(metas)
+
+    fill = False
+    for i, mes in enumerate(meses):
+        str_pct = "-" if pct_mes[i] == 0 and historico[i] == 0 else f"{pct_mes[i]:+.1f}%"
+        pdf.table_row([
+            f"  {MESES.get(mes, str(mes))}",
+            f"$ {metas[i]:,.0f}",
+            str_pct,
+            f"$ {acumulado[i]:,.0f}"
+        ], widths_ind, fill)
+        fill = not fill
+
+    # Fila Total Individual
+    pdf.set_font('Helvetica', 'B', 10)
+    pdf.set_fill_color(30, 58, 138)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_x(10) # FIX MARGEN
+    pdf.cell(50, 10, '  TOTAL 2026', 0, 0, 'L', 1)
+    pdf.cell(60, 10, f"$ {total_vendedor:,.0f}", 0, 0, 'R', 1)
+    pdf.cell(40, 10, '', 0, 0, 'C', 1)
+    pdf.cell(40, 10, '', 0, 1, 'C', 1)
+
+    # --- Firmas ---
+    pdf.ln(10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font('Helvetica', '', 9)
+    pdf.cell(0, 5, "Se firma en constancia de aceptación y compromiso:", 0, 1, 'L')
+    pdf.ln(8)
+
+    y_firma = pdf.get_y()
+    # Firma Vendedor
+    pdf.set_draw_color(100, 100, 100)
+    pdf.line(20, y_firma, 100, y_firma)  # Línea más corta
+    pdf.set_xy(20, y_firma + 2)
+    pdf.set_font('Helvetica', 'B', 9)
+    nombre_firma = (nombre[:30] + '..') if len(nombre) > 30 else nombre
+    pdf.cell(80, 5, nombre_firma.upper(), 0, 1, 'C')
+    pdf.set_x(20)
+    pdf.set_font('Helvetica', '', 8)
+    pdf.cell(80, 4, "Asesor / Responsable Comercial", 0, 1, 'C')
+
+    # Firma Gerencia
+    pdf.line(120, y_firma, 200, y_firma)
+    pdf.set_xy(120, y_firma + 2)
+    pdf.set_font('Helvetica', 'B', 9)
+    pdf.cell(80, 5, "GERENCIA COMERCIAL", 0, 1, 'C')
+    pdf.set_x(120)
+    pdf.set_font('Helvetica', '', 8)
+    pdf.cell(80, 4, "Aprobación Gerencial", 0, 1, 'C')
+
+
+def renderizar_seccion(seccion: dict) -> bytes:
+    """Acuerdo individual como PDF independiente (función de nivel módulo para el pool de procesos)."""
+    pdf = _nuevo_documento()
+    dibujar_seccion(pdf, seccion)
+    return _a_bytes(pdf)
+
+
+# ==============================================================================
+# CACHÉ Y EJECUCIÓN EN PARALELO
+# ==============================================================================
+_SECCIONES: "OrderedDict[str, bytes]" = OrderedDict()
+_LIBROS: "OrderedDict[str, bytes]" = OrderedDict()
+_CACHE_LOCK = Lock()
+_POOL = None
+_POOL_LOCK = Lock()
+
+
+def _guardar(cache: OrderedDict, clave: str, valor: bytes, maximo: int):
+    with _CACHE_LOCK:
+        cache[clave] = valor
+        cache.move_to_end(clave)
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+
+
+def limpiar_cache():
+    """Vacía las secciones y libros renderizados."""
+    with _CACHE_LOCK:
+        _SECCIONES.clear()
+        _LIBROS.clear()
+
+
+utils_memoria.registrar_liberable("pdf_presupuestos", limpiar_cache)
+
+
+def _pool_procesos() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # 'spawn' evita heredar los hilos del servidor de Streamlit en el proceso hijo
+            _POOL = ProcessPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def _reiniciar_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def renderizar_secciones(secciones: list, paralelo: bool = True) -> dict:
+    """
+    Devuelve {nombre: bytes PDF} de cada acuerdo individual.
+    Sólo se renderizan las secciones cuya versión no está en caché; si hay varias, en un pool de procesos.
+    """
+    resultado = {}
+    pendientes = []
+    with _CACHE_LOCK:
+        for seccion in secciones:
+            en_cache = seccion["version"] in _SECCIONES
+            utils_rendimiento.registrar_cache("pdf_secciones", en_cache)
+            if en_cache:
+                _SECCIONES.move_to_end(seccion["version"])
+                resultado[seccion["nombre"]] = _SECCIONES[seccion["version"]]
+            else:
+                pendientes.append(seccion)
+
+    renderizados = None
+    if paralelo and len(pendientes) > 1:
+        try:
+            renderizados = list(_pool_procesos().map(renderizar_seccion, pendientes))
+        except (BrokenProcessPool, OSError):
+            _reiniciar_pool()  # Sin procesos disponibles: se renderiza en el hilo actual
+    if renderizados is None:
+        renderizados = [renderizar_seccion(s) for s in pendientes]
+
+    for seccion, pdf_bytes in zip(pendientes, renderizados):
+        _guardar(_SECCIONES, seccion["version"], pdf_bytes, SECCIONES_CACHE_MAX)
+        resultado[seccion["nombre"]] = pdf_bytes
+    return resultado
+
+
+def generar_libro(df_resumen_pdf: pd.DataFrame, secciones: list, excluir_norm: list) -> bytes:
+    """
+    Libro completo (portada + vista gerencial + una página por vendedor/grupo) en un solo documento
+    con paginación continua. Se guarda por la versión de su resumen y de todas sus secciones.
+    """
+    clave = _huella({
+        "plantilla": VERSION_PLANTILLA,
+        "resumen": df_resumen_pdf[['vendedor_unificado', 'presupuesto_mensual', 'crecimiento_pct']].to_numpy().tolist(),
+        "secciones": [s["version"] for s in secciones],
+        "excluir": list(excluir_norm),
+    })
+    with _CACHE_LOCK:
+        en_cache = clave in _LIBROS
+        utils_rendimiento.registrar_cache("pdf_libros", en_cache)
+        if en_cache:
+            _LIBROS.move_to_end(clave)
+            return _LIBROS[clave]
+
+    pdf = _nuevo_documento()
+    dibujar_resumen(pdf, df_resumen_pdf, excluir_norm)
+    for seccion in secciones:
+        dibujar_seccion(pdf, seccion)
+    pdf_bytes = _a_bytes(pdf)
+    _guardar(_LIBROS, clave, pdf_bytes, 8)
+    return pdf_bytes
@@ -0,0 +1,256 @@
+# ==============================================================================
+# ARCHIVO: utils_perfilado.py
+# DESCRIPCIÓN: Perfilado bajo demanda de un rerun (cProfile o muestreo de pila
+#              de bajo costo) con descarga .prof / pilas colapsadas y tabla de
+#              las funciones más costosas
+# ==============================================================================
+import contextlib
+import cProfile
+import datetime
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+MODO_CPROFILE = "cprofile"
+MODO_MUESTREO = "muestreo"
+MODOS = {MODO_CPROFILE: "cProfile (exacto)", MODO_MUESTREO: "Muestreo (bajo costo)"}
+
+INTERVALO_MUESTREO = 0.005        # segundos entre muestras de la pila
+FUNCIONES_TOP = 25
+PERFILES_MAX = 3                  # capturas que se conservan por sesión
+
+PARAMETRO_URL = "perfil"          # ?perfil=1 | ?perfil=cprofile | ?perfil=muestreo
+CLAVE_SOLICITUD = "perfil_solicitado"
+CLAVE_PERFILES = "perfiles_capturados"
+USUARIO_PANEL = "GERENTE"
+
+
+_ARCHIVOS_PROPIOS = {os.path.abspath(__file__), __file__, contextlib.__file__}
+
+
+def _etiqueta(codigo) -> str:
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+
+
+class Muestreador:
+    """
+    Hilo que toma la pila del hilo perfilado cada 'intervalo' segundos y cuenta pilas
+    colapsadas ("a;b;c"). Sólo incluye los marcos creados después de iniciar la captura.
+    """
+
+    def __init__(self, hilo_id: int, intervalo: float = INTERVALO_MUESTREO):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.muestras = Counter()
+        self._raiz = set()
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="perfil_muestreo", daemon=True)
+
+    def iniciar(self):
+        """Se llama desde el hilo perfilado: la raíz son los marcos vivos del código que pidió la captura."""
+        marco = sys._getframe(1)
+        while marco is not None and marco.f_code.co_filename in _ARCHIVOS_PROPIOS:
+            marco = marco.f_back
+        while marco is not None:
+            self._raiz.add(id(marco))
+            marco = marco.f_back
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while marco is not None and id(marco) not in self._raiz:
+                pila.append(_etiqueta(marco.f_code))
+                marco = marco.f_back
+            if pila:
+                self.muestras[";".join(reversed(pila))] += 1
+
+    def colapsado(self) -> str:
+        """Formato de pilas colapsadas (flamegraph.pl, speedscope): 'a;b;c N' por línea."""
+        return "\n".join(f"{pila} {n}" for pila, n in self.muestras.most_common()) + "\n"
+
+    def top(self, n: int = FUNCIONES_TOP) -> list:
+        """Funciones por muestras inclusivas (presentes en la pila) y exclusivas (en la cima)."""
+        total = sum(self.muestras.values()) or 1
+        inclusivas, exclusivas = Counter(), Counter()
+        for pila, cantidad in self.muestras.items():
+            marcos = pila.split(";")
+            for marco in set(marcos):
+                inclusivas[marco] += cantidad
+            exclusivas[marcos[-1]] += cantidad
+        return [{'funcion': f, 'muestras': c, 'inclusivo_pct': 100 * c / total,
+                 'exclusivo_pct': 100 * exclusivas[f] / total}
+                for f, c in inclusivas.most_common(n)]
+
+
+def top_cprofile(perfil: cProfile.Profile, n: int = FUNCIONES_TOP) -> list:
+    """Funciones ordenadas por tiempo acumulado."""
+    estadisticas = pstats.Stats(perfil).stats
+    filas = []
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.items():
+        filas.append({'funcion': f"{os.path.basename(archivo)}:{linea}({funcion})", 'llamadas': llamadas,
+                      'propio_s': propio, 'acumulado_s': acumulado})
+    return sorted(filas, key=lambda f: f['acumulado_s'], reverse=True)[:n]
+
+
+class Captura:
+    """Perfilado de un bloque: 'iniciar'/'detener' o el context manager 'perfilar'."""
+
+    def __init__(self, nombre: str, modo: str = MODO_CPROFILE):
+        self.nombre = nombre
+        self.modo = modo if modo in MODOS else MODO_CPROFILE
+        self._perfil = None
+        self._muestreador = None
+        self._inicio = None
+        self.resultado = None
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        if self.modo == MODO_MUESTREO:
+            self._muestreador = Muestreador(threading.get_ident())
+            self._muestreador.iniciar()
+        else:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        return self
+
+    def detener(self) -> dict:
+        duracion = time.perf_counter() - self._inicio
+        resultado = {'nombre': self.nombre, 'modo': self.modo, 'duracion_s': duracion,
+                     'fecha': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                     'prof': None, 'colapsado': None}
+        if self._muestreador is not None:
+            self._muestreador.detener()
+            resultado['colapsado'] = self._muestreador.colapsado().encode("utf-8")
+            resultado['top'] = self._muestreador.top()
+        else:
+            self._perfil.disable()
+            # Mismo contenido que pstats.Stats.dump_stats: se abre con pstats, snakeviz, etc.
+            resultado['prof'] = marshal.dumps(pstats.Stats(self._perfil).stats)
+            resultado['top'] = top_cprofile(self._perfil)
+        self.resultado = resultado
+        return resultado
+
+
+@contextlib.contextmanager
+def perfilar(nombre: str, modo: str = None):
+    """Perfila el bloque si 'modo' no es None; el resultado queda en captura.resultado."""
+    if modo is None:
+        yield None
+        return
+    captura = Captura(nombre, modo).iniciar()
+    try:
+        yield captura
+    finally:
+        captura.detener()
+
+
+# ==============================================================================
+# INTEGRACIÓN CON STREAMLIT (importación diferida: el núcleo no depende de streamlit)
+# ==============================================================================
+def _es_gerente() -> bool:
+    import streamlit as st
+    return str(st.session_state.get('usuario', '')).strip().upper() == USUARIO_PANEL
+
+
+def modo_solicitado():
+    """
+    Modo pedido para este rerun (desde el panel o con ?perfil=...) o None. La solicitud
+    se consume: sólo se perfila un rerun por pedido. Exclusivo de GERENTE.
+    """
+    import streamlit as st
+    if not st.session_state.get('autenticado') or not _es_gerente():
+        return None
+    modo = st.session_state.pop(CLAVE_SOLICITUD, None)
+    valor = st.query_params.get(PARAMETRO_URL)
+    if valor is not None:
+        del st.query_params[PARAMETRO_URL]
+        if modo is None:
+            modo = valor if valor in MODOS else MODO_CPROFILE
+    return modo
+
+
+_ACTIVAS = {}                     # hilo -> Captura iniciada y aún no finalizada
+_ACTIVAS_LOCK = threading.Lock()
+
+
+def _guardar(resultado: dict):
+    import streamlit as st
+    perfiles = st.session_state.get(CLAVE_PERFILES, [])
+    st.session_state[CLAVE_PERFILES] = ([resultado] + perfiles)[:PERFILES_MAX]
+
+
+def iniciar_si_solicitado(nombre: str):
+    """
+    Para páginas escritas como script plano: devuelve la Captura en curso o None.
+    Si un rerun anterior de este hilo terminó sin 'finalizar' (excepción a mitad de página),
+    su captura se detiene aquí para no dejar el perfilador activo.
+    """
+    hilo = threading.get_ident()
+    with _ACTIVAS_LOCK:
+        pendiente = _ACTIVAS.pop(hilo, None)
+    if pendiente is not None:
+        pendiente.detener()
+    modo = modo_solicitado()
+    if modo is None:
+        return None
+    captura = Captura(nombre, modo).iniciar()
+    with _ACTIVAS_LOCK:
+        _ACTIVAS[hilo] = captura
+    return captura
+
+
+def finalizar(captura):
+    if captura is None:
+        return
+    with _ACTIVAS_LOCK:
+        _ACTIVAS.pop(threading.get_ident(), None)
+    _guardar(captura.detener())
+
+
+@contextlib.contextmanager
+def perfilar_si_solicitado(nombre: str):
+    """
+    Envuelve la ejecución de la página; sólo perfila si GERENTE lo pidió para este rerun.
+    La captura se guarda aunque la página termine con st.stop() o st.rerun().
+    """
+    captura = iniciar_si_solicitado(nombre)
+    try:
+        yield
+    finally:
+        finalizar(captura)
+
+
+def panel_perfilado():
+    """Panel lateral sólo para GERENTE: pedir un perfil del próximo rerun y descargar los capturados."""
+    if not _es_gerente():
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("🔬 Perfilado", expanded=False):
+        modo = st.radio("Modo", list(MODOS), format_func=MODOS.get, key="perfil_modo")
+        if st.button("⏺️ Perfilar el próximo rerun", key="perfil_solicitar", use_container_width=True):
+            st.session_state[CLAVE_SOLICITUD] = modo
+            st.rerun()
+        st.caption(f"También con el parámetro de URL ?{PARAMETRO_URL}=1 (o ={MODO_MUESTREO}).")
+
+        for i, perfil in enumerate(st.session_state.get(CLAVE_PERFILES, [])):
+            st.markdown(f"**{perfil['nombre']}** · {MODOS[perfil['modo']]} · {perfil['duracion_s']:.2f} s · {perfil['fecha']}")
+            base = f"perfil_{perfil['nombre']}_{perfil['fecha'].replace(' ', '_').replace(':', '')}"
+            if perfil['prof'] is not None:
+                st.download_button("📥 .prof", data=perfil['prof'], file_name=f"{base}.prof",
+                                   mime="application/octet-stream", key=f"perfil_prof_{i}")
+            if perfil['colapsado'] is not None:
+                st.download_button("📥 Pilas colapsadas", data=perfil['colapsado'], file_name=f"{base}.collapsed.txt",
+                                   mime="text/plain", key=f"perfil_colapsado_{i}")
+            st.dataframe(pd.DataFrame(perfil['top']), hide_index=True, use_container_width=True, height=260)
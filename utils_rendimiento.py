@@ -0,0 +1,264 @@
+# ==============================================================================
+# ARCHIVO: utils_rendimiento.py
+# DESCRIPCIÓN: Instrumentación ligera de las rutas calientes: tramos cronometrados
+#              (decorador y context manager) por etapa, percentiles móviles por
+#              sesión y por proceso, tasas de acierto de caché y bytes descargados
+# ==============================================================================
+import functools
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+# Etapas estándar de cada página (el orden es el del flujo de datos)
+CARGA = "carga"
+LIMPIEZA = "limpieza"
+PROCESO = "proceso"
+AGREGACION = "agregacion"
+RENDER = "render"
+EXPORTACION = "exportacion"
+ETAPAS = (CARGA, LIMPIEZA, PROCESO, AGREGACION, RENDER, EXPORTACION)
+
+VENTANA_MUESTRAS = 256
+PERCENTILES = (50, 90, 99)
+CLAVE_SESION = "rendimiento_sesion"
+USUARIO_PANEL = "GERENTE"
+
+
+class RegistroRendimiento:
+    """
+    Duraciones por (etapa, nombre) en una ventana móvil de las últimas
+    VENTANA_MUESTRAS ejecuciones, más contadores de caché y de bytes descargados.
+    Es seguro entre hilos (las exportaciones se registran desde el hilo de trabajo).
+    """
+
+    def __init__(self, ventana: int = VENTANA_MUESTRAS):
+        self._ventana = ventana
+        self._muestras = defaultdict(lambda: deque(maxlen=self._ventana))
+        self._conteos = defaultdict(int)
+        self._caches = defaultdict(lambda: [0, 0])  # nombre -> [llamadas, fallos]
+        self._bytes = defaultdict(int)
+        self._lock = Lock()
+
+    def registrar(self, etapa: str, nombre: str, segundos: float):
+        with self._lock:
+            self._muestras[(etapa, nombre)].append(segundos)
+            self._conteos[(etapa, nombre)] += 1
+
+    def registrar_llamada_cache(self, nombre: str):
+        with self._lock:
+            self._caches[nombre][0] += 1
+
+    def registrar_fallo_cache(self, nombre: str):
+        with self._lock:
+            self._caches[nombre][1] += 1
+
+    def registrar_bytes(self, origen: str, cantidad: int):
+        with self._lock:
+            self._bytes[origen] += int(cantidad)
+
+    def etapas(self) -> list:
+        """
+        Una fila por (etapa, nombre) con ejecuciones totales y p50/p90/p99/máx/último
+        (en segundos) de la ventana móvil.
+        """
+        with self._lock:
+            copia = {k: list(v) for k, v in self._muestras.items()}
+            conteos = dict(self._conteos)
+        filas = []
+        for (etapa, nombre), valores in copia.items():
+            ordenados = sorted(valores)
+            fila = {'etapa': etapa, 'nombre': nombre, 'ejecuciones': conteos[(etapa, nombre)]}
+            for p in PERCENTILES:
+                fila[f'p{p}'] = percentil(ordenados, p)
+            fila['max'] = ordenados[-1]
+            fila['ultimo'] = valores[-1]
+            filas.append(fila)
+        return sorted(filas, key=lambda f: f['p90'], reverse=True)
+
+    def caches(self) -> list:
+        """Llamadas, fallos y tasa de acierto por caché (la tasa es None si aún no hay llamadas)."""
+        with self._lock:
+            copia = {k: tuple(v) for k, v in self._caches.items()}
+        filas = []
+        for nombre, (llamadas, fallos) in sorted(copia.items()):
+            # Los fallos se cuentan dentro de la función cacheada; con llamadas concurrentes
+            # pueden superar momentáneamente a las llamadas registradas
+            aciertos = max(llamadas - fallos, 0)
+            filas.append({'cache': nombre, 'llamadas': llamadas, 'fallos': fallos,
+                          'tasa_acierto': aciertos / llamadas if llamadas else None})
+        return filas
+
+    def bytes_descargados(self) -> dict:
+        with self._lock:
+            return dict(self._bytes)
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._conteos.clear()
+            self._caches.clear()
+            self._bytes.clear()
+
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    indice = max(math.ceil(p / 100 * len(ordenados)) - 1, 0)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+REGISTRO_GLOBAL = RegistroRendimiento()
+_SESION_ACTIVA: ContextVar = ContextVar("rendimiento_sesion_activa", default=None)
+
+
+def activar_sesion(registro):
+    """Asocia el registro de la sesión al hilo/contexto actual (None para desactivar)."""
+    _SESION_ACTIVA.set(registro)
+
+
+def registro_sesion():
+    return _SESION_ACTIVA.get()
+
+
+def _registros():
+    sesion = _SESION_ACTIVA.get()
+    return (REGISTRO_GLOBAL,) if sesion is None else (REGISTRO_GLOBAL, sesion)
+
+
+def registrar(etapa: str, nombre: str, segundos: float):
+    for registro in _registros():
+        registro.registrar(etapa, nombre, segundos)
+
+
+def registrar_cache(nombre: str, acierto: bool):
+    """Para cachés propias (diccionarios/LRU): una llamada, y un fallo si no hubo acierto."""
+    for registro in _registros():
+        registro.registrar_llamada_cache(nombre)
+        if not acierto:
+            registro.registrar_fallo_cache(nombre)
+
+
+def registrar_bytes(origen: str, cantidad: int):
+    for registro in _registros():
+        registro.registrar_bytes(origen, cantidad)
+
+
+@contextmanager
+def medir(etapa: str, nombre: str, cache: str = None):
+    """
+    Cronometra el bloque como un tramo (etapa, nombre). Con 'cache' se cuenta además
+    una llamada a esa caché (los fallos los marca 'fallo_cache' dentro de la función).
+    """
+    if cache is not None:
+        for registro in _registros():
+            registro.registrar_llamada_cache(cache)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(etapa, nombre, time.perf_counter() - inicio)
+
+
+def instrumentar(etapa: str, nombre: str = None, cache: str = None):
+    """
+    Decorador equivalente a 'medir'. Sobre funciones con @st.cache_data va por fuera
+    (mide también los aciertos) y conserva el método .clear() de la función cacheada.
+    """
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(etapa, etiqueta, cache=cache):
+                return funcion(*args, **kwargs)
+
+        if hasattr(funcion, "clear"):
+            envoltura.clear = funcion.clear
+        return envoltura
+    return decorador
+
+
+def fallo_cache(nombre: str):
+    """
+    Decorador para el cuerpo real de una función cacheada (va por dentro de @st.cache_data):
+    cada ejecución es un fallo de caché.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            for registro in _registros():
+                registro.registrar_fallo_cache(nombre)
+            return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# ==============================================================================
+# INTEGRACIÓN CON STREAMLIT (importación diferida: el núcleo no depende de streamlit)
+# ==============================================================================
+def activar_sesion_streamlit():
+    """Crea (una vez por sesión) y activa el registro de la sesión. Se llama al inicio de cada página."""
+    import streamlit as st
+    if CLAVE_SESION not in st.session_state:
+        st.session_state[CLAVE_SESION] = RegistroRendimiento()
+    activar_sesion(st.session_state[CLAVE_SESION])
+    return st.session_state[CLAVE_SESION]
+
+
+def _formatear_bytes(cantidad: int) -> str:
+    for unidad in ("B", "KB", "MB", "GB"):
+        if cantidad < 1024 or unidad == "GB":
+            return f"{cantidad:,.0f} {unidad}" if unidad == "B" else f"{cantidad:,.1f} {unidad}"
+        cantidad /= 1024
+
+
+def panel_rendimiento(usuario_normalizado: str, max_etapas: int = 12):
+    """Panel lateral sólo para GERENTE: etapas más lentas, aciertos de caché y bytes descargados."""
+    if usuario_normalizado != USUARIO_PANEL:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+        alcance = st.radio("Alcance", ["Sesión", "Proceso"], horizontal=True, key="rendimiento_alcance")
+        registro = REGISTRO_GLOBAL if alcance == "Proceso" else (registro_sesion() or REGISTRO_GLOBAL)
+
+        st.markdown("**Etapas más lentas (p90)**")
+        etapas = registro.etapas()[:max_etapas]
+        if etapas:
+            df = pd.DataFrame(etapas)
+            for col in [f'p{p}' for p in PERCENTILES] + ['max', 'ultimo']:
+                df[col] = df[col] * 1000
+            st.dataframe(df, hide_index=True, use_container_width=True, column_config={
+                col: st.column_config.NumberColumn(col, format="%.0f ms")
+                for col in [f'p{p}' for p in PERCENTILES] + ['max', 'ultimo']
+            })
+        else:
+            st.caption("Sin mediciones todavía.")
+
+        st.markdown("**Cachés**")
+        caches = registro.caches()
+        if caches:
+            df = pd.DataFrame(caches)
+            df['tasa_acierto'] = df['tasa_acierto'] * 100
+            st.dataframe(df, hide_index=True, use_container_width=True, column_config={
+                'tasa_acierto': st.column_config.ProgressColumn("Acierto", format="%.0f%%", min_value=0, max_value=100)
+            })
+        else:
+            st.caption("Sin llamadas a caché registradas.")
+
+        st.markdown("**Bytes descargados**")
+        descargas = registro.bytes_descargados()
+        if descargas:
+            for origen, cantidad in sorted(descargas.items()):
+                st.caption(f"{origen}: {_formatear_bytes(cantidad)}")
+        else:
+            st.caption("Sin descargas registradas.")
+
+        if st.button("Reiniciar métricas de la sesión", key="rendimiento_reiniciar"):
+            if registro_sesion() is not None:
+                registro_sesion().limpiar()
@@ -7,55 +7,32 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import dropbox
-import io
-import unicodedata
 import time
 import re
 import datetime
 import calendar
 import functools
 import hashlib
-import utils_presupuesto
+import utils_clientes
+import utils_documentos
+import utils_excel
+import utils_exportacion
+import utils_rendimiento
+import utils_memoria
+import utils_perfilado
+from utils_rendimiento import CARGA, PROCESO, AGREGACION, RENDER
+from utils_documentos import FACTURA
+import nucleo
+import nucleo.paquetes
+import nucleo.periodos
+from nucleo import APP_CONFIG, DATA_CONFIG, normalizar_texto
+from nucleo.exportacion import (
+    excel_oportunidades, excel_ventas_mensual, excel_analisis_cliente, preparar_ventas_mensual, exportar_albaranes_anuales
+)
 
 # ==============================================================================
-# 1. CONFIGURACIÓN CENTRALIZADA
+# 1. CONFIGURACIÓN CENTRALIZADA (nucleo/config.py)
 # ==============================================================================
-APP_CONFIG = {
-    "page_title": "Resumen Mensual | Tablero de Ventas",
-    "url_logo": "https://raw.githubusercontent.com/DiegoMao2021/Resumen-Ventas-Gerenciales/main/LOGO%20FERREINOX%20SAS%20BIC%202024.png",
-    "dropbox_paths": {
-        "ventas": "/data/ventas_detalle.csv",
-        "cobros": "/data/cobros_detalle.csv",
-        "cl4_report": "/data/reporte_cl4.xlsx"
-    },
-    "column_names": {
-        "ventas": ['anio', 'mes', 'fecha_venta', 'Serie', 'TipoDocumento', 'codigo_vendedor', 'nomvendedor', 'cliente_id', 'nombre_cliente', 'codigo_articulo', 'nombre_articulo', 'categoria_producto', 'linea_producto', 'marca_producto', 'valor_venta', 'unidades_vendidas', 'costo_unitario', 'super_categoria'],
-        "cobros": ['anio', 'mes', 'fecha_cobro', 'codigo_vendedor', 'valor_cobro']
-    },
-    "kpi_goals": {
-        "meta_clientes_cl4": 120 
-    },
-    "marquillas_clave": ['VINILTEX', 'KORAZA', 'ESTUCOMAS', 'VINILICO', 'PINTULUX'],
-    "productos_oportunidad_cl4": ['ESTUCOMAS', 'PINTULUX', 'KORAZA', 'VINILTEX', 'VINILICO'],
-    "complementarios": {"exclude_super_categoria": "Pintuco", "presupuesto_pct": 0.10},
-    "sub_meta_complementarios": {"nombre_marca_objetivo": "non-AN Third Party", "presupuesto_pct": 0.10},
-    "categorias_clave_venta": ['ABRACOL', 'YALE', 'SAINT GOBAIN', 'GOYA', 'ALLEGION', 'SEGUREX', 'ARTECOLA', 'ATLAS', 'INDUMA'],
-    "presupuesto_mostradores": {"incremento_anual_pct": 0.10} # Se mantiene como referencia, aunque ahora usamos utils
-}
-
-DATA_CONFIG = {
-    "presupuestos": {'154033':{'presupuesto':123873239, 'presupuestocartera':121955931}, '154044':{'presupuesto':80000000, 'presupuestocartera':64853530}, '154034':{'presupuesto':82753045, 'presupuestocartera':35242575}, '154014':{'presupuesto':268214737, 'presupuestocartera':283458406}, '154046':{'presupuesto':85469798, 'presupuestocartera':37112627}, '154012':{'presupuesto':246616193, 'presupuestocartera':301988912}, '154043':{'presupuesto':124885413, 'presupuestocartera':183134333}, '154035':{'presupuesto':80000000, 'presupuestocartera':39077583}, '154006':{'presupuesto':81250000, 'presupuestocartera':146638108}, '154049':{'presupuesto':0, 'presupuestocartera':0}, '154013':{'presupuesto':303422639, 'presupuestocartera':379543527}, '154011':{'presupuesto':447060250, 'presupuestocartera':484588896}, '154029':{'presupuesto':50000000, 'presupuestocartera':2172522}, '154040':{'presupuesto':0, 'presupuestocartera':18312455}, '154053':{'presupuesto':0, 'presupuestocartera':0}, '154048':{'presupuesto':0, 'presupuestocartera':4129945}, '154042':{'presupuesto':30000000, 'presupuestocartera':669842}, '154031':{'presupuesto':0, 'presupuestocartera':0}, '154039':{'presupuesto':0, 'presupuestocartera':0}, '154051':{'presupuesto':0, 'presupuestocartera':0}, '154008':{'presupuesto':0, 'presupuestocartera':0}, '154052':{'presupuesto':30000000, 'presupuestocartera':8161068}, '154055':{'presupuesto':40000000, 'presupuestocartera':90519052}, '154050':{'presupuesto':0, 'presupuestocartera':783906}},
-    "grupos_vendedores": {"MOSTRADOR PEREIRA": ["ALEJANDRO CARBALLO MARQUEZ", "GEORGINA A. GALVIS HERRERA"], "MOSTRADOR ARMENIA": ["CRISTIAN CAMILO RENDON MONTES", "FANDRY JOHANA ABRIL PENHA", "JAVIER ORLANDO PATINO HURTADO"], "MOSTRADOR MANIZALES": ["DAVID FELIPE MARTINEZ RIOS", "JHON JAIRO CASTAÑO MONTES"], "MOSTRADOR LAURELES": ["MAURICIO RIOS MORALES"], "MOSTRADOR OPALO": ["MARIA PAULA DEL JESUS GALVIS HERRERA"]},
-    "metas_cl4_individual": {
-        '154033': 15, '154044': 2, '154034': 2, '154014': 30, '154046': 2, '154012': 30,
-        '154043': 15, '154035': 2, '154006': 15, '154049': 15, '154013': 3, '154011': 3, '154029': 10, '154055': 10,
-        'MOSTRADOR PEREIRA': 3, 'MOSTRADOR ARMENIA': 3, 'MOSTRADOR MANIZALES': 3,
-        'MOSTRADOR LAURELES': 3, 'MOSTRADOR OPALO': 3
-    },
-    "mapeo_meses": {1:"Enero", 2:"Febrero", 3:"Marzo", 4:"Abril", 5:"Mayo", 6:"Junio", 7:"Julio", 8:"Agosto", 9:"Septiembre", 10:"Octubre", 11:"Noviembre", 12:"Diciembre"},
-    "mapeo_marcas": {50:"P8-ASC-MEGA", 54:"MPY-International", 55:"DPP-AN COLORANTS LATAM", 56:"DPP-Pintuco Profesional", 57:"ASC-Mega", 58:"DPP-Pintuco", 59:"DPP-Madetec", 60:"POW-Interpon", 61:"various", 62:"DPP-ICO", 63:"DPP-Terinsa", 64:"MPY-Pintuco", 65:"non-AN Third Party", 66:"ICO-AN Packaging", 67:"ASC-Automotive OEM", 68:"POW-Resicoat", 73:"DPP-Coral", 91:"DPP-Sikkens"}
-}
-
 st.set_page_config(page_title=APP_CONFIG["page_title"], page_icon="🏠", layout="wide", initial_sidebar_state="expanded")
 
 # === ESTILOS CSS ===
@@ -131,387 +108,98 @@ def get_dropbox_client():
         oauth2_refresh_token=st.secrets.dropbox.refresh_token
     )
 
-def to_excel(df):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='AlbaranesPendientes', startrow=1, header=False)
-        workbook = writer.book
-        worksheet = writer.sheets['AlbaranesPendientes']
-        header_format = workbook.add_format({'bold': True, 'text_wrap': False, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1})
-        currency_format = workbook.add_format({'num_format': '$#,##0', 'border': 1})
-        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd', 'border': 1, 'align': 'left'})
-        default_format = workbook.add_format({'border': 1})
-        for col_num, value in enumerate(df.columns.values): worksheet.write(0, col_num, value, header_format)
-        worksheet.set_column('A:A', 12, date_format)
-        worksheet.set_column('B:B', 35, default_format)
-        worksheet.set_column('C:C', 25, default_format)
-        worksheet.set_column('D:D', 35, default_format)
-        worksheet.set_column('E:E', 20, currency_format)
-        worksheet.autofilter(0, 0, df.shape[0], df.shape[1] - 1)
-    return output.getvalue()
-
-def to_excel_oportunidades(df):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Oportunidades_CL4')
-        workbook = writer.book
-        worksheet = writer.sheets['Oportunidades_CL4']
-        header_format = workbook.add_format({'bold': True, 'text_wrap': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#1F4E78', 'font_color': 'white', 'border': 1})
-        opportunity_format = workbook.add_format({'bg_color': '#FFFFCC', 'border': 1})
-        default_format = workbook.add_format({'border': 1})
-        for col_num, value in enumerate(df.columns.values): worksheet.write(0, col_num, value, header_format)
-        marcas_cols = APP_CONFIG['productos_oportunidad_cl4']
-        for marca in marcas_cols:
-            if marca in df.columns:
-                col_idx = df.columns.get_loc(marca)
-                worksheet.conditional_format(1, col_idx, len(df), col_idx, {'type': 'cell', 'criteria': '==', 'value': 0, 'format': opportunity_format})
-        worksheet.set_column('A:A', 45, default_format)
-        worksheet.set_column('B:B', 15, default_format)
-        col_start_marcas = df.columns.get_loc(marcas_cols[0]) if marcas_cols and marcas_cols[0] in df.columns else 4
-        worksheet.set_column(col_start_marcas, col_start_marcas + len(marcas_cols) - 1, 15, default_format)
-        worksheet.autofilter(0, 0, df.shape[0], df.shape[1] - 1)
-    return output.getvalue()
-
-def to_excel_ventas_mensual(df):
-    output = io.BytesIO()
-    df_excel = df[['fecha_venta', 'TipoDocumento', 'Serie', 'nombre_cliente', 'nombre_articulo', 'unidades_vendidas', 'valor_venta', 'nomvendedor']].copy()
-    df_excel.columns = ['Fecha', 'Tipo Documento', 'Serie', 'Cliente', 'Artículo', 'Unidades', 'Valor Venta', 'Vendedor']
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_excel.to_excel(writer, index=False, sheet_name='Ventas_del_Mes')
-        workbook = writer.book
-        worksheet = writer.sheets['Ventas_del_Mes']
-        header_format = workbook.add_format({'bold': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1})
-        currency_format = workbook.add_format({'num_format': '$#,##0.00', 'border': 1})
-        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd', 'border': 1})
-        default_format = workbook.add_format({'border': 1})
-        for col_num, value in enumerate(df_excel.columns): worksheet.write(0, col_num, value, header_format)
-        worksheet.set_column('A:A', 12, date_format)
-        worksheet.set_column('B:B', 18, default_format)
-        worksheet.set_column('C:C', 15, default_format)
-        worksheet.set_column('D:D', 40, default_format)
-        worksheet.set_column('E:E', 45, default_format)
-        worksheet.set_column('G:G', 18, currency_format)
-        worksheet.autofilter(0, 0, df_excel.shape[0], df_excel.shape[1] - 1)
-        worksheet.freeze_panes(1, 0)
-    return output.getvalue()
-
-def to_excel_analisis_cliente(df, cliente_nombre, fecha_inicio, fecha_fin, total_venta, num_facturas):
-    output = io.BytesIO()
-    df_excel = df[['fecha_venta', 'TipoDocumento', 'Serie', 'nombre_articulo', 'unidades_vendidas', 'valor_venta']].copy()
-    df_excel.columns = ['Fecha', 'Tipo Documento', 'Serie', 'Artículo', 'Unidades', 'Valor Venta']
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_excel.to_excel(writer, index=False, sheet_name='Analisis_Cliente', startrow=5)
-        workbook = writer.book
-        worksheet = writer.sheets['Analisis_Cliente']
-        title_format = workbook.add_format({'bold': True, 'font_size': 16, 'font_color': '#1F4E78', 'valign': 'vcenter'})
-        subtitle_format = workbook.add_format({'bold': True, 'font_size': 12, 'fg_color': '#DDEBF7', 'border': 1, 'align': 'right'})
-        value_format = workbook.add_format({'font_size': 12, 'border': 1, 'num_format': '$#,##0.00'})
-        header_format = workbook.add_format({'bold': True, 'valign': 'vcenter', 'align': 'center', 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1})
-        currency_format = workbook.add_format({'num_format': '$#,##0.00', 'border': 1})
-        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd', 'border': 1})
-        default_format = workbook.add_format({'border': 1})
-        worksheet.merge_range('B1:F1', f"Análisis de Compras: {cliente_nombre}", title_format)
-        worksheet.write('B2', 'Periodo Desde:', subtitle_format)
-        worksheet.write('C2', fecha_inicio.strftime('%Y-%m-%d'), value_format)
-        worksheet.write('B3', 'Periodo Hasta:', subtitle_format)
-        worksheet.write('C3', fecha_fin.strftime('%Y-%m-%d'), value_format)
-        worksheet.write('E2', 'Total Venta Neta:', subtitle_format)
-        worksheet.write('F2', total_venta, value_format)
-        worksheet.write('E3', 'Número de Facturas:', subtitle_format)
-        worksheet.write('F3', num_facturas, workbook.add_format({'font_size': 12, 'border': 1}))
-        for col_num, value in enumerate(df_excel.columns): worksheet.write(4, col_num, value, header_format)
-        worksheet.set_column(0, 0, 12, date_format)
-        worksheet.set_column(1, 1, 18, default_format)
-        worksheet.set_column(3, 3, 50, default_format)
-        worksheet.set_column(5, 5, 18, currency_format)
-        worksheet.autofilter(4, 0, df_excel.shape[0] + 4, df_excel.shape[1] - 1)
-        worksheet.freeze_panes(5, 0)
-    return output.getvalue()
-
-def normalizar_texto(texto):
-    if not isinstance(texto, str): return texto
-    try:
-        texto_sin_tildes = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
-        return texto_sin_tildes.upper().replace('-', ' ').replace('_', ' ').replace('.', ' ').strip().replace('  ', ' ')
-    except (TypeError, AttributeError): return texto
-
-APP_CONFIG['complementarios']['exclude_super_categoria'] = normalizar_texto(APP_CONFIG['complementarios']['exclude_super_categoria'])
-APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo'] = normalizar_texto(APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo'])
-APP_CONFIG['categorias_clave_venta'] = [normalizar_texto(cat) for cat in APP_CONFIG['categorias_clave_venta']]
-
+@utils_rendimiento.instrumentar(CARGA, cache="cargar_y_limpiar_datos")
 @st.cache_data(ttl=1800)
+@utils_rendimiento.fallo_cache("cargar_y_limpiar_datos")
 def cargar_y_limpiar_datos(ruta_archivo, nombres_columnas):
     try:
         dbx = get_dropbox_client()
-        _, res = dbx.files_download(path=ruta_archivo)
-        contenido_csv = res.content.decode('latin-1')
-        df = pd.read_csv(io.StringIO(contenido_csv), header=None, sep='|', engine='python', quoting=3, on_bad_lines='warn')
-        if df.shape[1] < 5 and not df.empty:
-            st.error(f"Error de Carga en {ruta_archivo}: Se leyó una sola columna.")
-            return pd.DataFrame(columns=nombres_columnas)
-        if df.shape[1] != len(nombres_columnas):
-            if df.shape[1] < len(nombres_columnas): df = df.reindex(columns=range(len(nombres_columnas)))
-        df.columns = nombres_columnas
-        if 'codigo_vendedor' in df.columns:
-            df['codigo_vendedor'] = pd.to_numeric(df['codigo_vendedor'], errors='coerce').fillna(0).astype(int).astype(str)
-        numeric_cols = ['anio', 'mes', 'valor_venta', 'valor_cobro', 'unidades_vendidas', 'costo_unitario', 'marca_producto']
-        for col in numeric_cols:
-            if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce')
-        df.dropna(subset=['anio', 'mes'], inplace=True)
-        df = df.astype({'anio': int, 'mes': int})
-        if 'fecha_venta' in df.columns: df['fecha_venta'] = pd.to_datetime(df['fecha_venta'], errors='coerce')
-        if 'cliente_id' in df.columns: df['cliente_id'] = df['cliente_id'].astype(str)
-        if 'marca_producto' in df.columns: df['nombre_marca'] = df['marca_producto'].map(DATA_CONFIG["mapeo_marcas"]).fillna('No Especificada')
-        cols_a_normalizar = ['super_categoria', 'categoria_producto', 'nombre_marca', 'nomvendedor', 'TipoDocumento', 'nombre_articulo', 'nombre_cliente']
-        for col in cols_a_normalizar:
-            if col in df.columns: df[col] = df[col].apply(normalizar_texto)
-        return df
+        with utils_rendimiento.medir(CARGA, "descarga Dropbox"):
+            _, res = dbx.files_download(path=ruta_archivo)
+        utils_rendimiento.registrar_bytes("Dropbox", len(res.content))
+        return nucleo.limpiar_csv(res.content, nombres_columnas)
+    except nucleo.ErrorIngesta as e:
+        st.error(f"Error de Carga en {ruta_archivo}: {e}")
+        return pd.DataFrame(columns=nombres_columnas)
     except Exception as e:
         st.error(f"Error crítico al cargar {ruta_archivo}: {e}")
         return pd.DataFrame(columns=nombres_columnas)
 
+@utils_rendimiento.instrumentar(CARGA, cache="cargar_reporte_cl4")
 @st.cache_data(ttl=1800)
+@utils_rendimiento.fallo_cache("cargar_reporte_cl4")
 def cargar_reporte_cl4(ruta_archivo):
     try:
         dbx = get_dropbox_client()
-        _, res = dbx.files_download(path=ruta_archivo)
-        df = pd.read_excel(io.BytesIO(res.content))
-        df.columns = [normalizar_texto(col) for col in df.columns]
-        columna_id_encontrada = None
-        for nombre in ['ID CLIENTE', 'IDCLIENTE']:
-            if nombre in df.columns:
-                columna_id_encontrada = nombre
-                break
-        if columna_id_encontrada:
-            df.rename(columns={columna_id_encontrada: 'cliente_id'}, inplace=True)
-            df['cliente_id'] = df['cliente_id'].astype(str)
-            if 'NIT' in df.columns: df['NIT'] = df['NIT'].astype(str).str.strip()
-            if 'NOMBRE' in df.columns: df['NOMBRE'] = df['NOMBRE'].astype(str)
-            for producto in APP_CONFIG['productos_oportunidad_cl4']:
-                if producto in df.columns: df[producto] = pd.to_numeric(df[producto], errors='coerce').fillna(0)
-        else:
-            return pd.DataFrame()
-        return df
+        with utils_rendimiento.medir(CARGA, "descarga Dropbox"):
+            _, res = dbx.files_download(path=ruta_archivo)
+        utils_rendimiento.registrar_bytes("Dropbox", len(res.content))
+        return nucleo.limpiar_reporte_cl4(res.content)
     except Exception as e:
         st.error(f"Error crítico al cargar el reporte de oportunidades: {e}")
         return pd.DataFrame()
 
+@utils_rendimiento.instrumentar(PROCESO)
+def obtener_indice_propietarios(df_ventas_historicas):
+    """Índice cliente → propietario actual, versionado por el histórico (ver utils_clientes.indice_propietarios_al_dia)."""
+    vigente = st.session_state.get('indice_propietarios_version') == utils_clientes.version_ventas(df_ventas_historicas)
+    utils_rendimiento.registrar_cache("indice_propietarios", vigente and st.session_state.get('indice_propietarios') is not None)
+    return utils_clientes.indice_propietarios_al_dia(st.session_state, df_ventas_historicas)
+
+@utils_rendimiento.instrumentar(PROCESO)
+def obtener_indice_transacciones(df_ventas_historicas):
+    """Índice (cliente, fecha) de las ventas netas; se reconstruye sólo si cambia el histórico."""
+    indice = st.session_state.get('indice_transacciones')
+    version = utils_clientes.version_ventas(df_ventas_historicas)
+    utils_rendimiento.registrar_cache("indice_transacciones", indice is not None and indice.version == version)
+    if indice is None or indice.version != version:
+        df_neto = df_ventas_historicas
+        if df_ventas_historicas is not None and not df_ventas_historicas.empty:
+            df_neto = df_ventas_historicas[utils_documentos.mascara_venta_neta(df_ventas_historicas)]
+        indice = utils_clientes.construir_indice_transacciones(df_neto, version=version)
+        st.session_state.indice_transacciones = indice
+    return indice
+
+@utils_rendimiento.instrumentar(PROCESO)
 def actualizar_oportunidades_con_ventas_del_trimestre(df_cl4_original, df_ventas_historicas, anio_seleccionado, mes_seleccionado):
-    if df_cl4_original is None or df_cl4_original.empty: return pd.DataFrame()
-    df_cl4_actualizado = df_cl4_original.copy()
-    inicio_trimestre = (((mes_seleccionado - 1) // 3) * 3) + 1
-    meses_a_buscar = list(range(inicio_trimestre, mes_seleccionado + 1))
-    df_ventas_trimestre = df_ventas_historicas[
-        (df_ventas_historicas['anio'] == anio_seleccionado) &
-        (df_ventas_historicas['mes'].isin(meses_a_buscar))
-    ].copy()
-    if df_ventas_trimestre.empty: return df_cl4_actualizado
-    productos_oportunidad = APP_CONFIG['productos_oportunidad_cl4']
-    clientes_cl4 = set(df_cl4_actualizado['cliente_id'])
-    df_ventas_clientes_cl4 = df_ventas_trimestre[df_ventas_trimestre['cliente_id'].isin(clientes_cl4)]
-    if df_ventas_clientes_cl4.empty: return df_cl4_actualizado
-    mes_inicio_str = DATA_CONFIG['mapeo_meses'].get(inicio_trimestre, '')
-    mes_fin_str = DATA_CONFIG['mapeo_meses'].get(mes_seleccionado, '')
-    st.toast(f"Actualizando oportunidades con ventas de {mes_inicio_str} a {mes_fin_str}...", icon="🔍")
-    compras_por_cliente = {}
-    for producto in productos_oportunidad:
-        clientes_que_compraron = df_ventas_clientes_cl4[
-            df_ventas_clientes_cl4['nombre_articulo'].str.contains(producto, case=False, na=False)
-        ]['cliente_id'].unique()
-        compras_por_cliente[producto] = set(clientes_que_compraron)
-    for producto in productos_oportunidad:
-        if producto in df_cl4_actualizado.columns:
-            df_cl4_actualizado[producto] = df_cl4_actualizado['cliente_id'].apply(
-                lambda cid: 1 if cid in compras_por_cliente[producto] else 0
-            )
-    columnas_producto_existentes = [p for p in productos_oportunidad if p in df_cl4_actualizado.columns]
-    if columnas_producto_existentes:
-        df_cl4_actualizado['CL4'] = df_cl4_actualizado[columnas_producto_existentes].sum(axis=1)
-    return df_cl4_actualizado
+    return nucleo.actualizar_oportunidades_con_ventas_del_trimestre(
+        df_cl4_original, df_ventas_historicas, anio_seleccionado, mes_seleccionado,
+        aviso=lambda mensaje: st.toast(mensaje, icon="🔍")
+    )
 
+@utils_rendimiento.instrumentar(AGREGACION, cache="calcular_presupuesto_dinamico_global")
 @st.cache_data(ttl=3600)
+@utils_rendimiento.fallo_cache("calcular_presupuesto_dinamico_global")
 def calcular_presupuesto_dinamico_global(df_ventas_historicas):
-    """
-    Función que envuelve la lógica del utils_presupuesto para calcular 
-    el presupuesto dinámico para todo el año 2026.
-    """
-    # 1. Obtener totales 2024 y 2025 para la proyección global
-    total_2024 = df_ventas_historicas[df_ventas_historicas['anio'] == 2024]['valor_venta'].sum()
-    total_2025 = df_ventas_historicas[df_ventas_historicas['anio'] == 2025]['valor_venta'].sum()
-    
-    # 2. Proyectar Total 2026 usando la lógica del utils
-    target_2026, tasa_crec = utils_presupuesto.proyectar_total_2026(total_2024, total_2025)
-    
-    # 3. Asignar presupuesto anual por vendedor
-    # Nota: Asegurarse de que el DataFrame histórico esté limpio y tenga columnas correctas
-    df_asignacion_anual = utils_presupuesto.asignar_presupuesto(
-        df_ventas_historicas, 
-        DATA_CONFIG['grupos_vendedores'], 
-        target_2026
-    )
-    
-    # 4. Distribuir mensualmente según estacionalidad histórica individual
-    df_presupuesto_mensual = utils_presupuesto.distribuir_presupuesto_mensual(
-        df_asignacion_anual, 
-        df_ventas_historicas
-    )
-    
-    # Normalizar nombres para facilitar el merge posterior
-    df_presupuesto_mensual['nomvendedor'] = df_presupuesto_mensual['nomvendedor'].apply(normalizar_texto)
-
-    return df_presupuesto_mensual
-
-def calcular_mejor_venta_semestre(df_ventas_historicas, anio, meses=range(1, 7)):
-    """
-    EXCEPCIÓN JULIO: por cada vendedor devuelve su MEJOR venta NETA mensual
-    (facturas + notas crédito) dentro de los meses indicados del año dado.
-    Retorna un dict {nomvendedor_normalizado: mejor_venta_mensual}.
-    """
-    filtro_ventas_netas = 'FACTURA|NOTA.*CREDITO'
-    df = df_ventas_historicas[
-        (df_ventas_historicas['anio'] == anio) &
-        (df_ventas_historicas['mes'].isin(list(meses))) &
-        (df_ventas_historicas['TipoDocumento'].str.contains(filtro_ventas_netas, na=False, case=False, regex=True))
-    ]
-    if df.empty:
-        return {}
-    # Venta neta por vendedor y mes, luego el mejor mes de cada vendedor
-    ventas_mes = df.groupby(['nomvendedor', 'mes'])['valor_venta'].sum().reset_index()
-    mejor = ventas_mes.groupby('nomvendedor')['valor_venta'].max()
-    return {normalizar_texto(k): v for k, v in mejor.items()}
+    return nucleo.calcular_presupuesto_dinamico_global(df_ventas_historicas)
 
+@utils_rendimiento.instrumentar(PROCESO)
 def procesar_datos_periodo(df_ventas_periodo, df_cobros_periodo, df_ventas_historicas, anio_sel, mes_sel):
-    filtro_ventas_netas = 'FACTURA|NOTA.*CREDITO'
-    df_ventas_reales = df_ventas_periodo[df_ventas_periodo['TipoDocumento'].str.contains(filtro_ventas_netas, na=False, case=False, regex=True)].copy()
-    
-    # Resúmenes básicos
-    resumen_ventas = df_ventas_reales.groupby(['codigo_vendedor', 'nomvendedor']).agg(ventas_totales=('valor_venta', 'sum'), impactos=('cliente_id', 'nunique')).reset_index()
-    resumen_cobros = df_cobros_periodo.groupby('codigo_vendedor').agg(cobros_totales=('valor_cobro', 'sum')).reset_index()
-    
-    categorias_objetivo = APP_CONFIG['categorias_clave_venta']
-    df_ventas_comp = df_ventas_reales[df_ventas_reales['categoria_producto'].isin(categorias_objetivo)]
-    resumen_complementarios = df_ventas_comp.groupby(['codigo_vendedor','nomvendedor']).agg(ventas_complementarios=('valor_venta', 'sum')).reset_index()
-    
-    marca_sub_meta = APP_CONFIG['sub_meta_complementarios']['nombre_marca_objetivo']
-    df_ventas_sub_meta = df_ventas_reales[df_ventas_reales['nombre_marca'] == marca_sub_meta]
-    resumen_sub_meta = df_ventas_sub_meta.groupby(['codigo_vendedor', 'nomvendedor']).agg(ventas_sub_meta=('valor_venta', 'sum')).reset_index()
-    
-    # Albaranes
-    df_albaranes_historicos_bruto = df_ventas_historicas[df_ventas_historicas['TipoDocumento'].str.contains('ALBARAN', na=False, case=False)].copy()
-    grouping_keys = ['Serie', 'cliente_id', 'codigo_articulo', 'codigo_vendedor']
-    if not df_albaranes_historicos_bruto.empty:
-        df_neto_historico = df_albaranes_historicos_bruto.groupby(grouping_keys).agg(valor_neto=('valor_venta', 'sum')).reset_index()
-        df_grupos_cancelados_global = df_neto_historico[df_neto_historico['valor_neto'] == 0]
-    else:
-        df_grupos_cancelados_global = pd.DataFrame(columns=grouping_keys)
-    df_albaranes_bruto_periodo = df_ventas_periodo[df_ventas_periodo['TipoDocumento'].str.contains('ALBARAN', na=False, case=False)].copy()
-    if not df_albaranes_bruto_periodo.empty and not df_grupos_cancelados_global.empty:
-        df_albaranes_reales_pendientes = df_albaranes_bruto_periodo.merge(
-            df_grupos_cancelados_global[grouping_keys], on=grouping_keys, how='left', indicator=True
-        ).query('_merge == "left_only"').drop(columns=['_merge'])
-    else:
-        df_albaranes_reales_pendientes = df_albaranes_bruto_periodo.copy()
-    if not df_albaranes_reales_pendientes.empty:
-        resumen_albaranes = df_albaranes_reales_pendientes[df_albaranes_reales_pendientes['valor_venta'] > 0].groupby(['codigo_vendedor', 'nomvendedor']).agg(albaranes_pendientes=('valor_venta', 'sum')).reset_index()
-    else:
-        resumen_albaranes = pd.DataFrame(columns=['codigo_vendedor', 'nomvendedor', 'albaranes_pendientes'])
-    
-    # Merge inicial
-    df_resumen = pd.merge(resumen_ventas, resumen_cobros, on='codigo_vendedor', how='left')
-    df_resumen = pd.merge(df_resumen, resumen_complementarios, on=['codigo_vendedor', 'nomvendedor'], how='left')
-    df_resumen = pd.merge(df_resumen, resumen_sub_meta, on=['codigo_vendedor', 'nomvendedor'], how='left')
-    df_resumen = pd.merge(df_resumen, resumen_albaranes, on=['codigo_vendedor', 'nomvendedor'], how='left')
-    
-    # ==============================================================================
-    # INTEGRACIÓN DE PRESUPUESTOS (VENTAS: DINÁMICO / CARTERA: ESTÁTICO)
-    # ==============================================================================
-    
-    # 1. Cartera Estática (Original)
-    presupuestos_fijos = DATA_CONFIG['presupuestos']
-    df_resumen['presupuestocartera'] = df_resumen['codigo_vendedor'].map(lambda x: presupuestos_fijos.get(x, {}).get('presupuestocartera', 0))
-    
-    # 2. Ventas Dinámicas (Nuevo con utils_presupuesto)
-    # Calculamos el presupuesto dinámico global
-    df_dynamic_full = calcular_presupuesto_dinamico_global(df_ventas_historicas)
-    
-    # Filtramos para el mes seleccionado
-    df_dynamic_mes = df_dynamic_full[df_dynamic_full['mes'] == mes_sel][['nomvendedor', 'presupuesto_mensual']]
-    df_dynamic_mes.rename(columns={'presupuesto_mensual': 'presupuesto_dinamico'}, inplace=True)
-    
-    # Normalizamos el nombre en el resumen actual para asegurar el cruce
-    df_resumen['nomvendedor_norm'] = df_resumen['nomvendedor'].apply(normalizar_texto)
-    
-    # Merge con el presupuesto dinámico
-    df_resumen = pd.merge(df_resumen, df_dynamic_mes, left_on='nomvendedor_norm', right_on='nomvendedor', how='left')
-    
-    # Asignamos el presupuesto dinámico a la columna 'presupuesto' (y manejamos nulos)
-    df_resumen['presupuesto'] = df_resumen['presupuesto_dinamico'].fillna(0)
-
-    # ==============================================================================
-    # EXCEPCIÓN ÚNICA: JULIO 2026
-    # El presupuesto de ventas de julio/2026 = la MEJOR venta neta mensual de cada
-    # vendedor entre enero y junio 2026. Solo aplica a este mes; los demás meses
-    # siguen usando el presupuesto dinámico normal.
-    # ==============================================================================
-    if anio_sel == 2026 and mes_sel == 7:
-        mejor_venta = calcular_mejor_venta_semestre(df_ventas_historicas, 2026, meses=range(1, 7))
-        if mejor_venta:
-            # En este punto el nombre normalizado vive en 'nomvendedor_norm'
-            # (la columna 'nomvendedor' aún no se ha renombrado tras el merge).
-            override = df_resumen['nomvendedor_norm'].map(mejor_venta)
-            # Solo reemplaza donde hay dato de ene-jun; si no, conserva el dinámico
-            df_resumen['presupuesto'] = override.fillna(df_resumen['presupuesto'])
+    return nucleo.procesar_datos_periodo(
+        df_ventas_periodo, df_cobros_periodo, df_ventas_historicas, anio_sel, mes_sel,
+        df_presupuesto_mensual=calcular_presupuesto_dinamico_global(df_ventas_historicas)
+    )
 
-    # Limpieza
-    if 'presupuesto_dinamico' in df_resumen.columns: df_resumen.drop(columns=['presupuesto_dinamico'], inplace=True)
-    if 'nomvendedor_y' in df_resumen.columns: df_resumen.drop(columns=['nomvendedor_y'], inplace=True)
-    if 'nomvendedor_x' in df_resumen.columns: df_resumen.rename(columns={'nomvendedor_x': 'nomvendedor'}, inplace=True)
-    if 'nomvendedor_norm' in df_resumen.columns: df_resumen.drop(columns=['nomvendedor_norm'], inplace=True)
+@utils_rendimiento.instrumentar(AGREGACION)
+def crecimiento_comparable_vista(df_ventas_historicas, nombres_vendedores, anio_sel, mes_sel):
+    """(corte, {MTD/YTD: venta neta vs. el año anterior hasta el mismo día}) para los vendedores de la vista."""
+    corte = nucleo.periodos.corte_del_mes(df_ventas_historicas, anio_sel, mes_sel)
+    mascara = utils_documentos.mascara_venta_neta(df_ventas_historicas) & df_ventas_historicas['nomvendedor'].isin(nombres_vendedores)
+    df_vista = df_ventas_historicas[mascara]
+    return corte, {
+        alcance: nucleo.periodos.crecimiento_comparable(df_vista, anio_sel, alcance, corte, base=df_ventas_historicas)
+        for alcance in ('MTD', 'YTD')
+    }
 
-    df_resumen.fillna(0, inplace=True)
-    
-    # Agrupación de Grupos / Mostradores
-    registros_agrupados = []
-    
-    # Para los grupos, ya no usamos "incremento_mostradores" manual.
-    # Sumamos los presupuestos dinámicos individuales calculados por el utils.
-    
-    for grupo, lista_vendedores in DATA_CONFIG['grupos_vendedores'].items():
-        lista_vendedores_norm = [normalizar_texto(v) for v in lista_vendedores]
-        
-        # Filtramos el DF resumen actual (que ya tiene ventas reales y presupuesto dinámico individual)
-        df_grupo_actual = df_resumen[df_resumen['nomvendedor'].apply(normalizar_texto).isin(lista_vendedores_norm)]
-        
-        cols_a_sumar = ['ventas_totales', 'cobros_totales', 'impactos', 'presupuestocartera', 'ventas_complementarios', 'ventas_sub_meta', 'albaranes_pendientes']
-        suma_grupo = df_grupo_actual[cols_a_sumar].sum().to_dict()
-        
-        # Sumar los presupuestos individuales dinámicos para obtener la meta del grupo
-        suma_grupo['presupuesto'] = df_grupo_actual['presupuesto'].sum()
-        
-        # Si el grupo está vacío en ventas reales, buscamos si tiene presupuesto asignado en la tabla dinámica
-        if df_grupo_actual.empty:
-            presupuesto_grupo_faltante = df_dynamic_mes[df_dynamic_mes['nomvendedor'].isin(lista_vendedores_norm)]['presupuesto_dinamico'].sum()
-            suma_grupo['presupuesto'] = presupuesto_grupo_faltante
+@utils_rendimiento.instrumentar(CARGA, cache="cargar_paquete_periodo")
+@st.cache_data(ttl=1800)
+@utils_rendimiento.fallo_cache("cargar_paquete_periodo")
+def cargar_paquete_periodo(anio_sel, mes_sel, huella, marca):
+    """Resumen, albaranes y CL4 pre-generados por 'python -m nucleo.paquetes' si coinciden con los datos cargados."""
+    return nucleo.paquetes.leer_periodo(nucleo.paquetes.DIRECTORIO_PAQUETES, anio_sel, mes_sel, huella)
 
-        codigo_grupo_norm = normalizar_texto(grupo)
-        registro = {'nomvendedor': codigo_grupo_norm, 'codigo_vendedor': codigo_grupo_norm, **suma_grupo}
-        registros_agrupados.append(registro)
-    
-    df_agrupado = pd.DataFrame(registros_agrupados)
-    vendedores_en_grupos = [v for lista in DATA_CONFIG['grupos_vendedores'].values() for v in [normalizar_texto(i) for i in lista]]
-    
-    # Filtramos individuales (quitamos los que pertenecen a grupos para no duplicar en la vista general si fuera necesario)
-    # Pero mantenemos la lógica original de concatenar
-    df_individuales = df_resumen[~df_resumen['nomvendedor'].apply(normalizar_texto).isin(vendedores_en_grupos)]
-    
-    df_final = pd.concat([df_agrupado, df_individuales], ignore_index=True)
-    df_final.fillna(0, inplace=True)
-    
-    # Presupuestos derivados (Complementarios y Sub-meta)
-    df_final['presupuesto_complementarios'] = df_final['presupuesto'] * APP_CONFIG['complementarios']['presupuesto_pct']
-    df_final['presupuesto_sub_meta'] = df_final['presupuesto_complementarios'] * APP_CONFIG['sub_meta_complementarios']['presupuesto_pct']
-    
-    return df_final, df_albaranes_reales_pendientes
+def generar_desde_paquete(ruta, nombre_archivo):
+    return lambda: (nucleo.paquetes.leer_archivo(ruta), nombre_archivo, utils_excel.MIME_XLSX)
 
 def generar_comentario_asesor(avance_v, avance_c, clientes_meta, meta_clientes, avance_comp, avance_sub_meta):
     comentarios = []
@@ -544,27 +232,19 @@ def mostrar_alerta_inteligente(avance_ventas, avance_cobros, avance_cl4, dias_re
     if avance_cobros >= 100 and avance_ventas >= 100:
         st.toast("⭐ ¡Doble meta! Ventas y Cobros al 100%", icon="⭐")
 
-def render_analisis_detallado(df_vista, df_ventas_periodo):
+@utils_rendimiento.instrumentar(RENDER)
+def render_analisis_detallado(df_vista, df_ventas_periodo, ruta_ventas_mes=None):
     st.markdown("---")
     st.header("🔬 Análisis Detallado del Periodo")
     opciones_enfoque = ["Visión General"] + sorted(df_vista['nomvendedor'].unique())
     enfoque_sel = st.selectbox("Enfocar análisis en:", opciones_enfoque, index=0, key="sb_enfoque_analisis")
     if enfoque_sel == "Visión General":
-        nombres_a_filtrar = []
-        for vendedor in df_vista['nomvendedor']:
-            vendedor_norm = normalizar_texto(vendedor)
-            nombre_grupo_orig = next((k for k in DATA_CONFIG['grupos_vendedores'] if normalizar_texto(k) == vendedor_norm), None)
-            if nombre_grupo_orig:
-                lista_vendedores = DATA_CONFIG['grupos_vendedores'].get(nombre_grupo_orig, [])
-                nombres_a_filtrar.extend([normalizar_texto(v) for v in lista_vendedores])
-            else:
-                nombres_a_filtrar.append(vendedor_norm)
+        nombres_a_filtrar = nucleo.expandir_grupos(normalizar_texto(v) for v in df_vista['nomvendedor'])
         df_ventas_enfocadas = df_ventas_periodo[df_ventas_periodo['nomvendedor'].isin(nombres_a_filtrar)]
         df_ranking = df_vista
     else:
         enfoque_sel_norm = normalizar_texto(enfoque_sel)
-        nombre_grupo_orig = next((k for k in DATA_CONFIG['grupos_vendedores'] if normalizar_texto(k) == enfoque_sel_norm), enfoque_sel_norm)
-        nombres_a_filtrar = [normalizar_texto(n) for n in DATA_CONFIG['grupos_vendedores'].get(nombre_grupo_orig, [enfoque_sel_norm])]
+        nombres_a_filtrar = nucleo.expandir_grupos([enfoque_sel_norm])
         df_ventas_enfocadas = df_ventas_periodo[df_ventas_periodo['nomvendedor'].isin(nombres_a_filtrar)]
         df_ranking = df_vista[df_vista['nomvendedor'] == enfoque_sel_norm]
 
@@ -596,17 +276,29 @@ def render_analisis_detallado(df_vista, df_ventas_periodo):
             st.plotly_chart(fig, use_container_width=True)
         else: st.info("No hay datos de presupuesto para generar el ranking.")
     with tab3:
-        filtro_ventas_netas = 'FACTURA|NOTA.*CREDITO'
         if not df_ventas_enfocadas.empty:
-            df_facturas_enfocadas = df_ventas_enfocadas[df_ventas_enfocadas['TipoDocumento'].str.contains(filtro_ventas_netas, na=False, case=False, regex=True)]
+            df_facturas_enfocadas = df_ventas_enfocadas[utils_documentos.mascara_venta_neta(df_ventas_enfocadas)]
             top_clientes = df_facturas_enfocadas.groupby('nombre_cliente')['valor_venta'].sum().nlargest(10).reset_index()
             st.dataframe(top_clientes, column_config={"nombre_cliente": "Cliente", "valor_venta": st.column_config.NumberColumn("Total Compra (Neta)", format="$ %d")}, use_container_width=True, hide_index=True)
             
             st.markdown("---")
             st.subheader("📥 Descargar Reporte de Ventas del Mes")
-            df_para_descarga_mes = df_facturas_enfocadas.copy()
-            excel_data_mes = to_excel_ventas_mensual(df_para_descarga_mes)
-            st.download_button(label="📥 Descargar Ventas del Mes (Excel)", data=excel_data_mes, file_name=f"Ventas_Mes_{enfoque_sel.replace(' ', '_')}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+            formato_mes = st.radio("Formato:", utils_excel.formatos_disponibles(), horizontal=True, key="formato_ventas_mes")
+            nombre_ventas_mes = f"Ventas_Mes_{enfoque_sel.replace(' ', '_')}"
+            if ruta_ventas_mes and enfoque_sel == "Visión General" and formato_mes == utils_excel.FORMATO_EXCEL:
+                generar_ventas_mes = generar_desde_paquete(ruta_ventas_mes, f"{nombre_ventas_mes}.xlsx")
+            else:
+                generar_ventas_mes = lambda: utils_excel.exportar_en_formato(
+                    preparar_ventas_mensual(df_facturas_enfocadas), formato_mes,
+                    lambda d: excel_ventas_mensual(d, preparado=True), nombre_ventas_mes
+                )
+            utils_exportacion.boton_descarga_diferida(
+                f"Ventas del Mes ({formato_mes})", "ventas_mes",
+                parametros=[st.session_state.get('usuario'), st.session_state.get('anio_sel'), st.session_state.get('mes_sel_num'), enfoque_sel, sorted(nombres_a_filtrar), formato_mes],
+                version=utils_clientes.version_ventas(st.session_state.df_ventas),
+                generar=generar_ventas_mes,
+                key="ventas_mes", use_container_width=True
+            )
             
             st.markdown("---")
             st.subheader("🔍 Análisis Específico por Cliente")
@@ -618,19 +310,16 @@ def render_analisis_detallado(df_vista, df_ventas_periodo):
                 with col2: fecha_fin = st.date_input("Fecha de Fin", datetime.date.today())
 
                 if fecha_inicio and fecha_fin and fecha_inicio <= fecha_fin:
-                    df_ventas_historicas = st.session_state.df_ventas
-                    mask_documento = df_ventas_historicas['TipoDocumento'].str.contains(filtro_ventas_netas, na=False, case=False, regex=True)
-                    df_historico_facturas = df_ventas_historicas[mask_documento]
-                    mask_cliente_rango = ((df_historico_facturas['nombre_cliente'] == cliente_seleccionado) & (df_historico_facturas['fecha_venta'].dt.date >= fecha_inicio) & (df_historico_facturas['fecha_venta'].dt.date <= fecha_fin))
-                    df_cliente_rango = df_historico_facturas[mask_cliente_rango].copy()
+                    indice_transacciones = obtener_indice_transacciones(st.session_state.df_ventas)
+                    df_cliente_rango = utils_clientes.transacciones_cliente(indice_transacciones, cliente_seleccionado, fecha_inicio, fecha_fin)
                     if not df_cliente_rango.empty:
                         total_venta_cliente = df_cliente_rango['valor_venta'].sum()
-                        num_facturas_cliente = df_cliente_rango[df_cliente_rango['TipoDocumento'] == 'FACTURA']['Serie'].nunique()
+                        num_facturas_cliente = df_cliente_rango[utils_documentos.mascara_clase(df_cliente_rango, FACTURA)]['Serie'].nunique()
                         m_col1, m_col2 = st.columns(2)
                         m_col1.metric("Total Venta Neta en Rango", f"${total_venta_cliente:,.0f}")
                         m_col2.metric("Número de Facturas", f"{num_facturas_cliente}")
                         st.dataframe(df_cliente_rango[['fecha_venta', 'TipoDocumento', 'Serie', 'nombre_articulo', 'valor_venta']], use_container_width=True, hide_index=True)
-                        excel_data_cliente = to_excel_analisis_cliente(df_cliente_rango, cliente_seleccionado, fecha_inicio, fecha_fin, total_venta_cliente, num_facturas_cliente)
+                        excel_data_cliente = excel_analisis_cliente(df_cliente_rango, cliente_seleccionado, fecha_inicio, fecha_fin, total_venta_cliente, num_facturas_cliente)
                         st.download_button(label=f"📥 Descargar Análisis para {cliente_seleccionado}", data=excel_data_cliente, file_name=f"Analisis_{cliente_seleccionado.replace(' ', '_')}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
                     else: st.warning("El cliente seleccionado no tiene ventas en el rango de fechas especificado.")
             else: st.info("No hay clientes con ventas para analizar en la selección actual.")
@@ -651,28 +340,10 @@ def render_analisis_detallado(df_vista, df_ventas_periodo):
                 st.plotly_chart(fig, use_container_width=True)
         else: st.info("No hay ventas en categorías clave.")
 
-@st.cache_data
-def calcular_albaranes_anuales(df_ventas_historicas, anio_sel):
-    df_albaranes_historicos_bruto = df_ventas_historicas[df_ventas_historicas['TipoDocumento'].str.contains('ALBARAN', na=False, case=False)].copy()
-    grouping_keys = ['Serie', 'cliente_id', 'codigo_articulo', 'codigo_vendedor']
-    if not df_albaranes_historicos_bruto.empty:
-        df_neto_historico = df_albaranes_historicos_bruto.groupby(grouping_keys).agg(valor_neto=('valor_venta', 'sum')).reset_index()
-        df_grupos_cancelados_global = df_neto_historico[df_neto_historico['valor_neto'] == 0]
-    else:
-        df_grupos_cancelados_global = pd.DataFrame(columns=grouping_keys)
-    df_ventas_anual = df_ventas_historicas[df_ventas_historicas['anio'] == anio_sel]
-    df_albaranes_bruto_anual = df_ventas_anual[df_ventas_anual['TipoDocumento'].str.contains('ALBARAN', na=False, case=False)].copy()
-    if not df_albaranes_bruto_anual.empty and not df_grupos_cancelados_global.empty:
-        df_albaranes_pendientes_del_anio = df_albaranes_bruto_anual.merge(
-            df_grupos_cancelados_global[grouping_keys], on=grouping_keys, how='left', indicator=True
-        ).query('_merge == "left_only"').drop(columns=['_merge'])
-    else:
-        df_albaranes_pendientes_del_anio = df_albaranes_bruto_anual.copy()
-    return df_albaranes_pendientes_del_anio[df_albaranes_pendientes_del_anio['valor_venta'] > 0]
-
 # ==============================================================================
 # 3. INTERFAZ Y RENDERIZADO (DASHBOARD)
 # ==============================================================================
+@utils_rendimiento.instrumentar(RENDER)
 def render_dashboard():
     st.sidebar.markdown("---")
     st.sidebar.header("Filtros de Periodo")
@@ -707,15 +378,27 @@ def render_dashboard():
         return
     else:
         df_cobros_periodo = df_cobros_historicos[(df_cobros_historicos['anio'] == anio_sel) & (df_cobros_historicos['mes'] == mes_sel_num)] if not df_cobros_historicos.empty else pd.DataFrame()
-        df_resumen_final, df_albaranes_pendientes = procesar_datos_periodo(df_ventas_periodo, df_cobros_periodo, df_ventas_historicas, anio_sel, mes_sel_num)
+        # Paquete de cierre pre-generado (nucleo/paquetes.py): sólo se usa si se armó con estos mismos datos
+        huella_paquete = nucleo.paquetes.huella_datos(df_ventas_historicas, df_cobros_historicos, df_cl4_base)
+        paquete = cargar_paquete_periodo(anio_sel, mes_sel_num, huella_paquete, nucleo.paquetes.marca_periodo(nucleo.paquetes.DIRECTORIO_PAQUETES, anio_sel, mes_sel_num))
+        if paquete is not None:
+            df_resumen_final, df_albaranes_pendientes = paquete['resumen'], paquete['albaranes']
+        else:
+            df_resumen_final, df_albaranes_pendientes = procesar_datos_periodo(df_ventas_periodo, df_cobros_periodo, df_ventas_historicas, anio_sel, mes_sel_num)
 
         usuario_actual_norm = normalizar_texto(st.session_state.usuario)
         if usuario_actual_norm == "GERENTE":
             lista_filtro = sorted(df_resumen_final['nomvendedor'].unique())
             vendedores_sel = st.sidebar.multiselect("Filtrar Vendedores/Grupos", options=lista_filtro, default=lista_filtro, key="ms_vendedores")
             df_vista = df_resumen_final[df_resumen_final['nomvendedor'].isin(vendedores_sel)]
+            if set(vendedores_sel) == set(lista_filtro):
+                alcance_paquete = nucleo.paquetes.ALCANCE_GERENTE
+            else:
+                alcance_paquete = vendedores_sel[0] if len(vendedores_sel) == 1 else None
         else:
             df_vista = df_resumen_final[df_resumen_final['nomvendedor'] == usuario_actual_norm]
+            alcance_paquete = usuario_actual_norm
+        archivos_paquete = nucleo.paquetes.archivos_vigentes(nucleo.paquetes.DIRECTORIO_PAQUETES, anio_sel, mes_sel_num, huella_paquete, alcance_paquete) if paquete is not None else {}
 
         if df_vista.empty and (df_cl4_base is None or df_cl4_base.empty):
             st.warning("No hay datos disponibles para la selección de usuario/grupo actual.")
@@ -751,43 +434,22 @@ def render_dashboard():
             st.markdown(f"**Vista para:** `{vista_para}`")
 
             # Lógica Oportunidades
-            df_cl4_actualizado = actualizar_oportunidades_con_ventas_del_trimestre(df_cl4_base, df_ventas_historicas, anio_sel, mes_sel_num)
-            mapa_cliente_vendedor = df_ventas_historicas.drop_duplicates(subset=['cliente_id'], keep='last')[['cliente_id', 'nomvendedor', 'codigo_vendedor']]
-            if not df_cl4_actualizado.empty:
-                df_cl4_con_vendedor = pd.merge(df_cl4_actualizado, mapa_cliente_vendedor, on='cliente_id', how='left')
-                df_cl4_con_vendedor['nomvendedor'] = df_cl4_con_vendedor['nomvendedor'].apply(normalizar_texto).fillna('SIN ASIGNAR')
-                df_cl4_con_vendedor['codigo_vendedor'].fillna('SIN ASIGNAR', inplace=True)
+            if paquete is not None:
+                df_cl4_con_vendedor = paquete['cl4']
             else:
-                df_cl4_con_vendedor = pd.DataFrame()
+                df_cl4_actualizado = actualizar_oportunidades_con_ventas_del_trimestre(df_cl4_base, df_ventas_historicas, anio_sel, mes_sel_num)
+                df_cl4_con_vendedor = nucleo.cl4_con_vendedor(df_cl4_actualizado, obtener_indice_propietarios(df_ventas_historicas))
 
             vendedores_vista_actual = df_vista['nomvendedor'].unique() if not df_vista.empty else []
             codigos_vista_actual = df_vista['codigo_vendedor'].unique() if not df_vista.empty else []
+            nombres_a_filtrar = nucleo.expandir_grupos(vendedores_vista_actual)
 
-            nombres_a_filtrar = []
-            for vendedor_norm in vendedores_vista_actual:
-                nombre_grupo_orig = next((k for k in DATA_CONFIG['grupos_vendedores'] if normalizar_texto(k) == vendedor_norm), None)
-                if nombre_grupo_orig:
-                    lista_vendedores = DATA_CONFIG['grupos_vendedores'].get(nombre_grupo_orig, [])
-                    nombres_a_filtrar.extend([normalizar_texto(v) for v in lista_vendedores])
-                else:
-                    nombres_a_filtrar.append(vendedor_norm)
-
-            if not df_cl4_con_vendedor.empty:
-                df_cl4_filtrado = df_cl4_con_vendedor[df_cl4_con_vendedor['nomvendedor'].isin(nombres_a_filtrar)]
-            else:
-                df_cl4_filtrado = pd.DataFrame()
-
-            meta_clientes_cl4 = 0
             if usuario_actual_norm == "GERENTE":
-                metas_a_sumar = {k: v for k, v in DATA_CONFIG['metas_cl4_individual'].items()}
-                for codigo_v_o_g in codigos_vista_actual:
-                    meta_clientes_cl4 += metas_a_sumar.get(str(codigo_v_o_g), 0)
+                meta_clientes_cl4 = nucleo.meta_clientes_cl4(codigos_vista_actual)
             else:
-                codigo_usuario_actual = df_vista['codigo_vendedor'].iloc[0] if not df_vista.empty else None
-                if codigo_usuario_actual:
-                    meta_clientes_cl4 = DATA_CONFIG['metas_cl4_individual'].get(str(codigo_usuario_actual), 0)
+                meta_clientes_cl4 = nucleo.meta_clientes_cl4(codigos_vista_actual[:1])
 
-            clientes_en_meta = df_cl4_filtrado[df_cl4_filtrado['CL4'] >= 4].shape[0] if not df_cl4_filtrado.empty else 0
+            clientes_en_meta = nucleo.clientes_en_meta(df_cl4_con_vendedor, nombres_a_filtrar)
             avance_clientes_cl4 = (clientes_en_meta / meta_clientes_cl4 * 100) if meta_clientes_cl4 > 0 else 0
 
             ventas_total, meta_ventas, cobros_total, meta_cobros, comp_total, meta_comp, sub_meta_total, meta_sub_meta, total_albaranes = [0] * 9
@@ -845,38 +507,50 @@ def render_dashboard():
                 st.metric(label="Clientes en Meta (CL4 ≥ 4)", value=f"{clientes_en_meta}", delta=f"{clientes_en_meta - meta_clientes_cl4}", help=f"Meta: {meta_clientes_cl4} clientes")
                 st.progress(min((avance_clientes_cl4 / 100), 1.0), text=f"Avance: {avance_clientes_cl4:.1f}%")
 
+            # Crecimiento comparable: ambos años hasta el mismo mes y día de corte
+            corte_comparable, crecimientos = crecimiento_comparable_vista(df_ventas_historicas, nombres_a_filtrar, anio_sel, mes_sel_num)
+            st.markdown("<br>", unsafe_allow_html=True)
+            col7, col8 = st.columns(2)
+            for col, (alcance, crecimiento) in zip((col7, col8), crecimientos.items()):
+                variacion = crecimiento['variacion_pct']
+                col.metric(
+                    label=f"Venta Neta {nucleo.periodos.etiqueta(alcance, corte_comparable)} vs {anio_sel - 1}",
+                    value=f"${crecimiento['actual']:,.0f}",
+                    delta=f"{variacion:+.1f}%" if variacion is not None else None,
+                    help=f"{anio_sel - 1} hasta el mismo día: ${crecimiento['anterior']:,.0f}"
+                )
+
             with st.expander("🎯 Análisis de Oportunidades (Clientes con CL4 < 4)", expanded=True):
                 st.info(f"Utiliza esta tabla para identificar clientes con potencial de crecimiento. **(Datos actualizados con ventas del trimestre en curso)**")
-                df_oportunidades = df_cl4_filtrado[df_cl4_filtrado['CL4'] < 4].copy() if not df_cl4_filtrado.empty else pd.DataFrame()
+                df_oportunidades = nucleo.oportunidades(df_cl4_con_vendedor, nombres_a_filtrar)
                 if df_oportunidades.empty:
                     st.success("¡Felicidades! No tienes clientes con oportunidades pendientes en la selección actual.")
                 else:
-                    def encontrar_faltantes(row):
-                        faltantes = [prod for prod in APP_CONFIG['productos_oportunidad_cl4'] if prod in row.index and row[prod] == 0]
-                        return ", ".join(faltantes) if faltantes else "N/A"
-                    df_oportunidades['Productos a Ofrecer'] = df_oportunidades.apply(encontrar_faltantes, axis=1)
                     cols_display = ['NOMBRE', 'NIT', 'CL4', 'Productos a Ofrecer', 'nomvendedor']
-                    df_oportunidades_display = df_oportunidades[cols_display].rename(columns={'NOMBRE': 'Cliente', 'NIT': 'NIT', 'CL4': 'Nivel Actual', 'nomvendedor': 'Vendedor Asignado'})
+                    df_oportunidades_display = df_oportunidades[cols_display].rename(columns=nucleo.cl4.COLUMNAS_OPORTUNIDADES)
                     st.dataframe(df_oportunidades_display, use_container_width=True, hide_index=True, column_config={ "NIT": st.column_config.TextColumn("NIT", width="medium") })
                     st.markdown("---")
                     st.subheader("📥 Descargar Reporte de Oportunidades Filtrado")
-                    cols_excel = ['NOMBRE', 'NIT', 'CL4', 'nomvendedor'] + APP_CONFIG['productos_oportunidad_cl4']
-                    cols_excel_existentes = [c for c in cols_excel if c in df_oportunidades.columns]
-                    df_para_descargar_oportunidades = df_oportunidades[cols_excel_existentes].rename(columns={'NOMBRE': 'Cliente', 'NIT': 'NIT Cliente', 'CL4': 'Nivel Actual', 'nomvendedor': 'Vendedor Asignado'})
-                    excel_data_oportunidades = to_excel_oportunidades(df_para_descargar_oportunidades)
-                    st.download_button(label="📥 Descargar Reporte de Oportunidades (Excel)", data=excel_data_oportunidades, file_name=f"Reporte_Oportunidades_CL4_{anio_sel}_{mes_sel_num}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+                    df_para_descargar_oportunidades = nucleo.tabla_descarga_oportunidades(df_oportunidades)
+                    nombre_oportunidades = f"Reporte_Oportunidades_CL4_{anio_sel}_{mes_sel_num}.xlsx"
+                    if nucleo.paquetes.ARCHIVO_OPORTUNIDADES in archivos_paquete:
+                        generar_oportunidades = generar_desde_paquete(archivos_paquete[nucleo.paquetes.ARCHIVO_OPORTUNIDADES], nombre_oportunidades)
+                    else:
+                        generar_oportunidades = lambda: (excel_oportunidades(df_para_descargar_oportunidades), nombre_oportunidades, utils_excel.MIME_XLSX)
+                    utils_exportacion.boton_descarga_diferida(
+                        "Reporte de Oportunidades (Excel)", "oportunidades_cl4",
+                        parametros=[st.session_state.get('usuario'), anio_sel, mes_sel_num, sorted(nombres_a_filtrar)],
+                        version=[utils_clientes.version_ventas(df_ventas_historicas), len(df_cl4_base) if df_cl4_base is not None else 0],
+                        generar=generar_oportunidades,
+                        key="oportunidades_cl4", use_container_width=True
+                    )
 
             st.markdown("---")
             st.subheader("Desglose por Vendedor / Grupo")
             if not df_vista.empty:
-                def contar_clientes_meta_por_vendedor(nomvendedor_o_grupo):
-                    vendedor_norm = normalizar_texto(nomvendedor_o_grupo)
-                    nombre_grupo_orig = next((k for k in DATA_CONFIG['grupos_vendedores'] if normalizar_texto(k) == vendedor_norm), None)
-                    vendedores_del_grupo = [normalizar_texto(v) for v in DATA_CONFIG['grupos_vendedores'].get(nombre_grupo_orig, [nomvendedor_o_grupo])]
-                    df_cl4_vendedor = df_cl4_con_vendedor[df_cl4_con_vendedor['nomvendedor'].isin(vendedores_del_grupo)] if not df_cl4_con_vendedor.empty else pd.DataFrame()
-                    return df_cl4_vendedor[df_cl4_vendedor['CL4'] >= 4].shape[0] if not df_cl4_vendedor.empty else 0
-
-                df_vista['clientes_meta_cl4'] = df_vista['nomvendedor'].apply(contar_clientes_meta_por_vendedor)
+                df_vista['clientes_meta_cl4'] = df_vista['nomvendedor'].apply(
+                    lambda v: nucleo.clientes_en_meta(df_cl4_con_vendedor, nucleo.expandir_grupos([normalizar_texto(v)]))
+                )
                 df_display = df_vista.copy()
                 df_display['Avance Ventas %'] = ((df_display['ventas_totales'] / df_display['presupuesto']) * 100).fillna(0)
                 df_display['Avance Cobros %'] = ((df_display['cobros_totales'] / df_display['presupuestocartera']) * 100).fillna(0)
@@ -897,7 +571,7 @@ def render_dashboard():
                 }, use_container_width=True, hide_index=True)
 
             if not df_vista.empty:
-                render_analisis_detallado(df_vista, df_ventas_periodo)
+                render_analisis_detallado(df_vista, df_ventas_periodo, archivos_paquete.get(nucleo.paquetes.ARCHIVO_VENTAS_MES))
 
             st.markdown("<hr style='border:2px solid #FF4B4B'>", unsafe_allow_html=True)
             st.header("📦 Gestión de Albaranes Pendientes")
@@ -914,21 +588,18 @@ def render_dashboard():
 
             st.subheader(f"Descarga Anual de Albaranes ({anio_sel})")
             st.info(f"Descarga el reporte con el valor total por albarán para TODO el año {anio_sel}.")
-            with st.spinner(f"Calculando albaranes totales del año {anio_sel}..."):
-                df_albaranes_pendientes_del_anio = calcular_albaranes_anuales(df_ventas_historicas, anio_sel)
-            if df_albaranes_pendientes_del_anio.empty:
-                st.warning(f"No se encontraron albaranes pendientes para descargar en todo el año {anio_sel}.")
+            formato_anual = st.radio("Formato:", utils_excel.formatos_disponibles(), horizontal=True, key="formato_albaranes_anual")
+            if nucleo.paquetes.ARCHIVO_ALBARANES_ANUALES in archivos_paquete and formato_anual == utils_excel.FORMATO_EXCEL:
+                generar_anual = generar_desde_paquete(archivos_paquete[nucleo.paquetes.ARCHIVO_ALBARANES_ANUALES], f"Reporte_Albaranes_Pendientes_{anio_sel}.xlsx")
             else:
-                claves_agrupacion = ['fecha_venta', 'nombre_cliente', 'Serie', 'nomvendedor']
-                df_agrupado_anual = df_albaranes_pendientes_del_anio.groupby(claves_agrupacion).agg(valor_venta=('valor_venta', 'sum')).reset_index()
-                df_para_descargar_anual = df_agrupado_anual.copy()
-                df_para_descargar_anual.columns = ['Fecha', 'Nombre Cliente', 'Numero Albaran/Serie', 'Nombre Vendedor', 'Valor Total Albaran']
-                df_para_descargar_anual = df_para_descargar_anual.sort_values(by=['Fecha', 'Nombre Cliente'], ascending=[False, True])
-                excel_data_anual = to_excel(df_para_descargar_anual)
-                st.download_button(label=f"📥 Descargar Reporte Anual de Albaranes de {anio_sel}", data=excel_data_anual,
-                                   file_name=f"Reporte_Albaranes_Pendientes_{anio_sel}.xlsx",
-                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                   use_container_width=True, type="primary")
+                generar_anual = lambda: exportar_albaranes_anuales(df_ventas_historicas, anio_sel, formato_anual)
+            utils_exportacion.boton_descarga_diferida(
+                f"Reporte Anual de Albaranes de {anio_sel}", "albaranes_anual",
+                parametros=[anio_sel, formato_anual],
+                version=utils_clientes.version_ventas(df_ventas_historicas),
+                generar=generar_anual,
+                key="albaranes_anual", use_container_width=True, type="primary"
+            )
 
     # Footer
     st.markdown("---")
@@ -941,6 +612,8 @@ def render_dashboard():
     """, unsafe_allow_html=True)
 
 def main():
+    utils_rendimiento.activar_sesion_streamlit()
+    utils_memoria.auditar_sesion_streamlit()
     if 'autenticado' not in st.session_state: st.session_state.autenticado = False
     if not st.session_state.autenticado:
         st.sidebar.image(APP_CONFIG["url_logo"], use_container_width=True)
@@ -987,27 +660,28 @@ def main():
         st.info("Por favor, utilice el panel de la izquierda para ingresar sus credenciales de acceso.")
     else:
         if 'df_ventas' not in st.session_state:
-            progress_container = st.empty()
-            status_container = st.empty()
-            with progress_container.container():
-                st.markdown("""<div style="text-align: center; padding: 2rem; background: linear-gradient(135deg, #f8fafc 0%, #ffffff 100%); border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.1);"><h3 style="color: #1e3a8a; margin-bottom: 1rem;">🔄 Inicializando Sistema</h3><p style="color: #6b7280;">Cargando datos desde Dropbox...</p></div>""", unsafe_allow_html=True)
-            progress_bar = st.progress(0)
+            # Cada paso avanza la barra al terminar y muestra su duración real (medida también
+            # en el panel de rendimiento), en lugar de porcentajes fijos
+            pasos_carga = [
+                ("📊 Datos de ventas", 'df_ventas', lambda: cargar_y_limpiar_datos(APP_CONFIG["dropbox_paths"]["ventas"], APP_CONFIG["column_names"]["ventas"])),
+                ("💰 Datos de cobros", 'df_cobros', lambda: cargar_y_limpiar_datos(APP_CONFIG["dropbox_paths"]["cobros"], APP_CONFIG["column_names"]["cobros"])),
+                ("🎯 Oportunidades CL4", 'df_cl4', lambda: cargar_reporte_cl4(APP_CONFIG["dropbox_paths"]["cl4_report"])),
+                ("🗂️ Índices de clientes", None, lambda: (obtener_indice_propietarios(st.session_state.df_ventas), obtener_indice_transacciones(st.session_state.df_ventas))),
+            ]
+            contenedor_carga = st.empty()
             try:
-                status_container.info("📊 Cargando datos de ventas...")
-                progress_bar.progress(25)
-                st.session_state.df_ventas = cargar_y_limpiar_datos(APP_CONFIG["dropbox_paths"]["ventas"], APP_CONFIG["column_names"]["ventas"])
-                status_container.info("💰 Cargando datos de cobros...")
-                progress_bar.progress(50)
-                st.session_state.df_cobros = cargar_y_limpiar_datos(APP_CONFIG["dropbox_paths"]["cobros"], APP_CONFIG["column_names"]["cobros"])
-                status_container.info("🎯 Cargando oportunidades CL4...")
-                progress_bar.progress(75)
-                st.session_state.df_cl4 = cargar_reporte_cl4(APP_CONFIG["dropbox_paths"]["cl4_report"])
-                progress_bar.progress(100)
-                status_container.success("✅ ¡Datos cargados exitosamente!")
-                time.sleep(0.5)
-                progress_bar.empty()
-                status_container.empty()
-                progress_container.empty()
+                with contenedor_carga.status("🔄 Inicializando sistema: cargando datos desde Dropbox...", expanded=True) as estado_carga:
+                    progress_bar = st.progress(0.0)
+                    for i, (etiqueta, clave, cargar) in enumerate(pasos_carga):
+                        inicio = time.perf_counter()
+                        resultado = cargar()
+                        if clave is not None:
+                            st.session_state[clave] = resultado
+                        duracion = time.perf_counter() - inicio
+                        st.write(f"{etiqueta}: {duracion:.1f} s")
+                        progress_bar.progress((i + 1) / len(pasos_carga), text=etiqueta)
+                    estado_carga.update(label="✅ ¡Datos cargados exitosamente!", state="complete", expanded=False)
+                contenedor_carga.empty()
                 st.session_state.APP_CONFIG = APP_CONFIG
                 st.session_state.DATA_CONFIG = DATA_CONFIG
             except Exception as e:
@@ -1016,7 +690,11 @@ def main():
 
         st.sidebar.image(APP_CONFIG["url_logo"], use_container_width=True)
         st.sidebar.header(f"Bienvenido, {st.session_state.usuario}")
-        render_dashboard()
+        with utils_perfilado.perfilar_si_solicitado("render_dashboard"):
+            render_dashboard()
+        utils_rendimiento.panel_rendimiento(normalizar_texto(st.session_state.usuario))
+        utils_memoria.panel_memoria(normalizar_texto(st.session_state.usuario))
+        utils_perfilado.panel_perfilado()
         if st.sidebar.button("Salir", key="btn_logout"):
             st.session_state.clear()
             st.rerun()